@@ -2,20 +2,53 @@
 # ACTIONS BUSINESS - Actions métier pour le chatbot
 # ============================================================================
 
-"""Actions métier : tickets, callbacks, logging, etc."""
+"""
+Actions métier : tickets, callbacks, logging, etc.
 
-from typing import Any, Text, Dict, List
-from datetime import datetime
-import uuid
+Les conversations et feedbacks sont persistés dans MongoDB par le writer
+asynchrone (core/persistence.py) : l'action dépose l'écriture et répond
+sans attendre MongoDB. Les tickets passent par core/tickets.py : leur
+numéro n'est annoncé qu'une fois l'écriture confirmée (hors de la boucle).
+"""
+
+from typing import Any, Text, Dict, List, Optional
+from datetime import datetime, timezone
+from functools import partial
+import asyncio
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet, SessionStarted, ActionExecuted
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
+from utils.config import config
 from utils.logger import logger
+from core.persistence import get_mongo_writer
+from core.tickets import STATUS_IN_PROGRESS, STATUS_OPEN, get_ticket_store
+
+
+def _utc(timestamp: Optional[float] = None) -> datetime:
+    """Date UTC d'un timestamp d'événement Rasa (défaut : maintenant)"""
+    if timestamp is None:
+        return datetime.now(timezone.utc)
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+async def _create_ticket(ticket_type: str, sender_id: Optional[str], **kwargs: Any):
+    """Crée le ticket hors de la boucle ; None si l'écriture a échoué"""
+    store = get_ticket_store()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(store.create, ticket_type, sender_id, **kwargs))
+    except Exception as e:
+        logger.error(f"Ticket creation failed: {str(e)}", type=ticket_type, sender_id=sender_id)
+        return None
+
+
+def _session_events(events: List[Dict[Text, Any]]) -> List[Dict[Text, Any]]:
+    """Événements depuis le dernier session_started"""
+    for index in range(len(events) - 1, -1, -1):
+        if events[index].get("event") == "session_started":
+            return events[index:]
+    return events
 
 
 class ActionCreateTicket(Action):
@@ -24,13 +57,22 @@ class ActionCreateTicket(Action):
     def name(self) -> Text:
         return "action_create_ticket"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, 
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
-        ticket_id = f"TKT-{uuid.uuid4().hex[:6].upper()}"
         user_name = tracker.get_slot("user_name") or "Utilisateur"
         user_email = tracker.get_slot("user_email") or ""
         
+        ticket = await _create_ticket(
+            "support", tracker.sender_id, user_name=user_name, user_email=user_email
+        )
+        if ticket is None:
+            dispatcher.utter_message(
+                text="Je n'ai pas pu créer votre ticket pour le moment. "
+                     "Merci de réessayer dans quelques minutes."
+            )
+            return []
+        ticket_id = ticket.ticket_id
         logger.info(f"Ticket created: {ticket_id}", user=user_name, email=user_email)
         
         dispatcher.utter_message(
@@ -48,8 +90,8 @@ class ActionGetTicketStatus(Action):
     def name(self) -> Text:
         return "action_get_ticket_status"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         ticket_number = tracker.get_slot("ticket_number")
         
@@ -57,11 +99,32 @@ class ActionGetTicketStatus(Action):
             dispatcher.utter_message(text="Quel est votre numéro de ticket ?")
             return []
         
-        dispatcher.utter_message(
-            text=f"📋 Ticket {ticket_number}\n"
-                 f"Status: En cours de traitement\n"
-                 f"Un conseiller vous contactera sous 24h."
-        )
+        # Statut en cache : réponse sans I/O ; sinon lecture MongoDB hors de la boucle
+        store = get_ticket_store()
+        try:
+            hit, ticket = store.get_cached(ticket_number)
+            if not hit:
+                loop = asyncio.get_running_loop()
+                ticket = await loop.run_in_executor(None, store.fetch, ticket_number)
+        except Exception as e:
+            logger.error(f"Ticket lookup failed: {str(e)}", ticket_number=ticket_number)
+            dispatcher.utter_message(
+                text="Je ne parviens pas à consulter ce ticket pour le moment. "
+                     "Merci de réessayer dans quelques minutes."
+            )
+            return []
+        
+        if ticket is None:
+            dispatcher.utter_message(
+                text=f"Je ne trouve aucun ticket {ticket_number}. "
+                     f"Pouvez-vous vérifier le numéro ?"
+            )
+            return [SlotSet("ticket_number", None)]
+        
+        text = f"📋 Ticket {ticket.ticket_id}\nStatus: {ticket.status_label}"
+        if ticket.status in (STATUS_OPEN, STATUS_IN_PROGRESS):
+            text += "\nUn conseiller vous contactera sous 24h."
+        dispatcher.utter_message(text=text)
         return []
 
 
@@ -71,8 +134,8 @@ class ActionRequestCallback(Action):
     def name(self) -> Text:
         return "action_request_callback"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         user_name = tracker.get_slot("user_name") or "Client"
         user_phone = tracker.get_slot("user_phone")
@@ -81,7 +144,16 @@ class ActionRequestCallback(Action):
             dispatcher.utter_message(text="Quel est votre numéro de téléphone ?")
             return []
         
-        logger.info(f"Callback requested", user=user_name, phone=user_phone)
+        ticket = await _create_ticket(
+            "callback", tracker.sender_id, prefix="CB", user_name=user_name, user_phone=user_phone
+        )
+        if ticket is None:
+            dispatcher.utter_message(
+                text="Je n'ai pas pu enregistrer votre demande de rappel pour le moment. "
+                     "Merci de réessayer dans quelques minutes."
+            )
+            return []
+        logger.info(f"Callback requested", ticket_id=ticket.ticket_id, user=user_name, phone=user_phone)
         
         dispatcher.utter_message(
             text=f"📞 Demande de rappel enregistrée !\n"
@@ -99,14 +171,67 @@ class ActionLogConversation(Action):
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
-        events = tracker.events
-        messages = [e for e in events if e.get("event") == "user"]
+        events = _session_events(tracker.events)
+        started_at = events[0].get("timestamp") if events else None
+        conversation_id = f"{tracker.sender_id}:{int(started_at or 0)}"
+        
+        messages = []
+        for event in events:
+            if event.get("event") not in ("user", "bot") or not event.get("text"):
+                continue
+            message = {
+                "sender": event["event"],
+                "text": event["text"],
+                "timestamp": _utc(event.get("timestamp"))
+            }
+            if event["event"] == "user":
+                intent = (event.get("parse_data") or {}).get("intent") or {}
+                message["intent"] = intent.get("name")
+                message["confidence"] = intent.get("confidence")
+            messages.append(message)
+        
+        user_messages = [m for m in messages if m["sender"] == "user"]
+        duration_seconds = (
+            (messages[-1]["timestamp"] - messages[0]["timestamp"]).total_seconds()
+            if messages else 0.0
+        )
+        
+        # Upserts idempotents : l'action peut tourner plusieurs fois par session
+        writer = get_mongo_writer()
+        writer.upsert(
+            config.mongodb.conversations_collection,
+            {"conversation_id": conversation_id},
+            {
+                "$set": {
+                    "sender_id": tracker.sender_id,
+                    "messages": messages,
+                    "message_count": len(user_messages),
+                    "duration_seconds": duration_seconds,
+                    "updatedAt": _utc()
+                },
+                "$setOnInsert": {"createdAt": _utc(started_at)}
+            }
+        )
+        for index, message in enumerate(user_messages):
+            if not message.get("intent"):
+                continue
+            writer.upsert(
+                config.mongodb.analytics_collection,
+                {"type": "nlu", "conversation_id": conversation_id, "message_index": index},
+                {"$setOnInsert": {
+                    "sender_id": tracker.sender_id,
+                    "intent": message["intent"],
+                    "confidence": message["confidence"],
+                    "createdAt": message["timestamp"]
+                }}
+            )
         
         logger.info(
             "Conversation logged",
             sender_id=tracker.sender_id,
-            message_count=len(messages),
-            duration_seconds=len(messages) * 30  # estimation
+            conversation_id=conversation_id,
+            message_count=len(user_messages),
+            duration_seconds=round(duration_seconds, 1)
         )
         return []
 
@@ -137,6 +262,13 @@ class ActionSendFeedback(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         feedback = tracker.get_slot("user_feedback")
+        get_mongo_writer().insert(config.mongodb.analytics_collection, {
+            "type": "feedback",
+            "sender_id": tracker.sender_id,
+            "feedback": feedback,
+            "intent": tracker.latest_message.get("intent", {}).get("name"),
+            "createdAt": _utc()
+        })
         logger.info(f"Feedback received: {feedback}", sender_id=tracker.sender_id)
         
         dispatcher.utter_message(text="Merci pour votre retour ! 🙏")
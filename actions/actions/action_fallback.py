@@ -7,13 +7,11 @@
 from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.events import UserUtteranceReverted, FollowupAction
-
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rasa_sdk.events import SlotSet, UserUtteranceReverted
 
 from utils.logger import logger
+from .action_rag_query import ActionRAGQuery
+from .chaining import followup
 
 
 class ActionDefaultFallback(Action):
@@ -25,7 +23,7 @@ class ActionDefaultFallback(Action):
     def name(self) -> Text:
         return "action_default_fallback"
     
-    def run(
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -37,11 +35,11 @@ class ActionDefaultFallback(Action):
         
         logger.warning(
             f"Fallback triggered for user {sender_id}",
-            message=user_message[:100]
+            user_message=user_message[:100]
         )
         
-        # Compteur de fallbacks consécutifs
-        fallback_count = tracker.get_slot("fallback_count") or 0
+        # Compteur de fallbacks consécutifs (remis à zéro par une réponse RAG exploitable)
+        fallback_count = int(tracker.get_slot("fallback_count") or 0)
         fallback_count += 1
         
         if fallback_count >= 3:
@@ -49,11 +47,14 @@ class ActionDefaultFallback(Action):
                 text="Je n'arrive pas à comprendre vos demandes. "
                      "Souhaitez-vous parler à un conseiller humain ?"
             )
-            return [UserUtteranceReverted()]
+            # Appliqué après le revert : le compteur repart de zéro
+            return [UserUtteranceReverted(), SlotSet("fallback_count", 0)]
         
         # Premier fallback → tenter RAG
         dispatcher.utter_message(
             text="Laissez-moi chercher dans notre base de connaissances..."
         )
         
-        return [FollowupAction("action_rag_query")]
+        return await followup(
+            ActionRAGQuery(), dispatcher, tracker, domain, [SlotSet("fallback_count", fallback_count)]
+        )
@@ -8,14 +8,16 @@ from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
+import asyncio
 import time
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from core.rag_pipeline import get_rag_pipeline
+from core.speculative import get_speculative_retriever
+from core.usage import usage_scope
+from utils.config import config
+from utils.deadline import Deadline
 from utils.logger import logger
+from utils.tracing import tracer, wrap
 
 
 class ActionRAGQuery(Action):
@@ -27,7 +29,7 @@ class ActionRAGQuery(Action):
     def name(self) -> Text:
         return "action_rag_query"
     
-    def run(
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -36,6 +38,10 @@ class ActionRAGQuery(Action):
         """
         Exécute la requête RAG
         
+        Le pipeline (bloquant) tourne dans un thread pour ne pas bloquer
+        la boucle Sanic : les requêtes concurrentes peuvent se chevaucher
+        et les questions identiques être dédupliquées.
+        
         Args:
             dispatcher: Pour envoyer des messages
             tracker: État de la conversation
@@ -45,6 +51,7 @@ class ActionRAGQuery(Action):
             List[Dict]: Événements Rasa (slots à mettre à jour)
         """
         start_time = time.time()
+        deadline = Deadline.after_ms(config.rag.request_deadline_ms)
         sender_id = tracker.sender_id
         user_message = tracker.latest_message.get("text", "")
         intent = tracker.latest_message.get("intent", {}).get("name", "unknown")
@@ -52,21 +59,29 @@ class ActionRAGQuery(Action):
         
         logger.info(
             f"RAG Query started for user {sender_id}",
-            message=user_message[:100],
+            user_message=user_message[:100],
             intent=intent,
             confidence=confidence
         )
         
+        span = tracer.start_trace(
+            "action.action_rag_query", sender_id, user_message, intent=intent
+        )
         try:
-            # Exécuter le pipeline RAG
-            rag_pipeline = get_rag_pipeline()
-            response = rag_pipeline.query(user_message)
+            # Exécuter le pipeline RAG hors de la boucle d'événements
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                None, wrap(self._query), sender_id, user_message, intent, deadline
+            )
+            if span is not None:
+                span.set(degraded=response.degraded, shed=response.shed, num_sources=len(response.sources))
             
             # Envoyer la réponse
             dispatcher.utter_message(text=response.answer)
             
             # Si des sources sont disponibles, les mentionner
-            if response.sources and response.confidence > 0.6:
+            # (déjà citées dans une réponse dégradée)
+            if response.sources and response.confidence > 0.6 and not response.degraded:
                 sources_text = ", ".join([s["source"] for s in response.sources[:3]])
                 dispatcher.utter_message(
                     text=f"📚 Sources: {sources_text}"
@@ -84,10 +99,14 @@ class ActionRAGQuery(Action):
                 success=True
             )
             
-            return [
+            events = [
                 SlotSet("rag_response", response.answer),
                 SlotSet("rag_context", response.context_used[:500] if response.context_used else None)
             ]
+            # Réponse exploitable : la série de fallbacks est interrompue
+            if tracker.get_slot("fallback_count") and response.confidence > 0.6 and not response.degraded:
+                events.append(SlotSet("fallback_count", 0))
+            return events
             
         except Exception as e:
             logger.error(
@@ -95,9 +114,29 @@ class ActionRAGQuery(Action):
                 exc_info=True,
                 sender_id=sender_id
             )
+            tracer.finish(span, e)
             
             dispatcher.utter_message(
                 text="Je rencontre un problème technique. Souhaitez-vous parler à un conseiller ?"
             )
             
             return [SlotSet("rag_response", None)]
+        
+        finally:
+            tracer.finish(span)
+    
+    @staticmethod
+    def _query(sender_id: str, user_message: str, intent: str, deadline: Deadline):
+        """Exécution bloquante du pipeline RAG (tokens attribués à sender_id/intent)"""
+        rag_pipeline = get_rag_pipeline()
+        
+        # Reprendre la recherche lancée par le router si disponible (aucune
+        # n'est lancée en chaînage inline : take() ne compterait que des échecs)
+        results = None
+        if config.rag.speculative_enabled and not config.rag.inline_chaining:
+            results = get_speculative_retriever().take(
+                sender_id, user_message, timeout=deadline.remaining()
+            )
+        
+        with usage_scope(sender_id=sender_id, intent=intent):
+            return rag_pipeline.query(user_message, results=results, deadline=deadline)
@@ -7,27 +7,44 @@
 from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.events import SlotSet, FollowupAction
-
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rasa_sdk.events import SlotSet
 
 from utils.config import config
 from utils.logger import logger
+from utils.tracing import tracer
+from core.speculative import get_speculative_retriever
+from core.usage import usage_scope
+from .action_rag_query import ActionRAGQuery
+from .chaining import followup
+
+
+def start_speculative_retrieval(tracker: Tracker) -> None:
+    """Lance la recherche RAG en arrière-plan avant le follow-up"""
+    if not config.rag.speculative_enabled:
+        return
+    
+    user_message = tracker.latest_message.get("text", "")
+    intent = tracker.latest_message.get("intent", {}).get("name")
+    try:
+        # Tokens de la recherche anticipée attribués à l'utilisateur
+        with usage_scope(sender_id=tracker.sender_id, intent=intent):
+            get_speculative_retriever().start(tracker.sender_id, user_message)
+    except Exception as e:
+        # La spéculation est une optimisation : ne jamais bloquer le routing
+        logger.warning(f"Speculative retrieval not started: {str(e)}")
 
 
 class ActionRouter(Action):
     """
     Router intelligent basé sur la confiance NLU
-    Si confiance < seuil → déclenche RAG
+    Si confiance < seuil → déclenche RAG (dans la même requête, cf. chaining)
     Si confiance >= seuil → laisse Rasa Core gérer
     """
     
     def name(self) -> Text:
         return "action_router"
     
-    def run(
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -44,13 +61,24 @@ class ActionRouter(Action):
         )
         
         events = [SlotSet("nlu_confidence", confidence)]
+        user_message = tracker.latest_message.get("text", "")
         
-        if confidence < threshold:
-            logger.info(f"Low confidence ({confidence:.2f} < {threshold}), routing to RAG")
-            dispatcher.utter_message(text="Je recherche dans notre documentation...")
-            events.append(FollowupAction("action_rag_query"))
-        else:
-            logger.info(f"High confidence ({confidence:.2f}), using standard response")
+        with tracer.trace(
+            "action.action_router", tracker.sender_id, user_message,
+            intent=intent, confidence=confidence
+        ) as span:
+            span.set(routed_to_rag=confidence < threshold)
+            if confidence < threshold:
+                logger.info(f"Low confidence ({confidence:.2f} < {threshold}), routing to RAG")
+                dispatcher.utter_message(text="Je recherche dans notre documentation...")
+                if not config.rag.inline_chaining:
+                    # Recherche anticipée pendant l'aller-retour Rasa ; la
+                    # requête action_rag_query continue cette trace
+                    start_speculative_retrieval(tracker)
+                    tracer.expect_followup(tracker.sender_id, user_message)
+                events = await followup(ActionRAGQuery(), dispatcher, tracker, domain, events)
+            else:
+                logger.info(f"High confidence ({confidence:.2f}), using standard response")
         
         return events
 
@@ -71,6 +99,12 @@ class ActionCheckConfidence(Action):
         confidence = tracker.latest_message.get("intent", {}).get("confidence", 0)
         threshold = config.rag.confidence_threshold
         
+        # En chaînage inline, action_rag_query ne reprend pas de recherche
+        # spéculative (voir ActionRouter) : inutile d'en lancer une
+        if confidence < threshold and not config.rag.inline_chaining:
+            start_speculative_retrieval(tracker)
+            tracer.expect_followup(tracker.sender_id, tracker.latest_message.get("text", ""))
+        
         return [
             SlotSet("nlu_confidence", confidence),
             SlotSet("current_topic", "rag" if confidence < threshold else "standard")
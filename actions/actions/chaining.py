@@ -0,0 +1,85 @@
+# ============================================================================
+# CHAINING - Enchaînement d'actions dans la même requête webhook
+# ============================================================================
+
+"""
+Enchaînement d'actions sans aller-retour Rasa
+
+FollowupAction("action_rag_query") coûte une prédiction de policy et une
+seconde requête /webhook (tracker complet resérialisé) avant que le RAG
+ne démarre. chain_action() exécute l'action suivante directement, dans la
+requête en cours, et renvoie les événements des deux actions.
+
+L'historique reste celui d'un FollowupAction : ActionExecuted de l'action
+enchaînée est inséré entre les deux listes d'événements, donc les règles
+et stories (action_router -> action_rag_query) restent valides.
+"""
+
+from typing import Any, Text, Dict, List
+from rasa_sdk import Action, Tracker, utils
+from rasa_sdk.executor import CollectingDispatcher
+from rasa_sdk.events import ActionExecuted, FollowupAction
+
+from utils.config import config
+from utils.metrics import metrics
+
+
+def chained_tracker(tracker: Tracker, events: List[Dict[Text, Any]], action_name: Text) -> Tracker:
+    """
+    Tracker vu par l'action enchaînée : slots et événements de l'action
+    courante appliqués (copie superficielle, le tracker reçu est intact)
+    """
+    chained = Tracker(
+        tracker.sender_id,
+        dict(tracker.slots),
+        tracker.latest_message,
+        list(tracker.events),
+        tracker.is_paused(),
+        None,
+        tracker.active_loop,
+        action_name,
+    )
+    chained.add_slots(events)
+    chained.events.append(ActionExecuted(action_name))
+    return chained
+
+
+async def chain_action(
+    action: Action,
+    dispatcher: CollectingDispatcher,
+    tracker: Tracker,
+    domain: Dict[Text, Any],
+    events: List[Dict[Text, Any]]
+) -> List[Dict[Text, Any]]:
+    """
+    Exécute `action` à la suite de l'action courante
+
+    Args:
+        action: Action à enchaîner
+        dispatcher: Dispatcher de la requête (messages des deux actions)
+        tracker: Tracker reçu par l'action courante
+        domain: Domaine Rasa
+        events: Événements déjà produits par l'action courante
+
+    Returns:
+        List[Dict]: events + ActionExecuted(action) + événements de l'action
+    """
+    name = action.name()
+    metrics.increment("actions_chained", action=name)
+    result = await utils.call_potential_coroutine(
+        action.run(dispatcher, chained_tracker(tracker, events, name), domain)
+    )
+    return [*events, ActionExecuted(name), *(result or [])]
+
+
+async def followup(
+    action: Action,
+    dispatcher: CollectingDispatcher,
+    tracker: Tracker,
+    domain: Dict[Text, Any],
+    events: List[Dict[Text, Any]]
+) -> List[Dict[Text, Any]]:
+    """chain_action() si RAG_INLINE_CHAINING, sinon FollowupAction classique"""
+    if config.rag.inline_chaining:
+        return await chain_action(action, dispatcher, tracker, domain, events)
+    return [*events, FollowupAction(action.name())]
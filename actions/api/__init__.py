@@ -0,0 +1,5 @@
+# API package (routes HTTP montées par server.py)
+from .index_api import index_api
+from .admin_api import admin_api
+
+__all__ = ['index_api', 'admin_api']
@@ -0,0 +1,212 @@
+# ============================================================================
+# ADMIN API - Profilage CPU, allocations mémoire et état des caches (HTTP)
+# ============================================================================
+
+"""
+Routes d'inspection d'une instance en production, montées par server.py
+seulement si ADMIN_API_ENABLED=true et ADMIN_API_TOKEN est défini
+
+    GET    /admin/profile/cpu?seconds=10   profil CPU échantillonné
+                                           (collapsed stacks, ?format=json : résumé)
+    POST   /admin/memory/tracemalloc       démarre tracemalloc (snapshot de référence)
+    GET    /admin/memory/tracemalloc       diff des allocations depuis la référence
+    DELETE /admin/memory/tracemalloc       arrête tracemalloc
+    GET    /admin/state                    caches, singletons et processus
+
+Chaque réponse porte le pid du processus inspecté (X-Process-Id) : avec
+plusieurs workers, chaque appel n'inspecte que le worker qui le reçoit.
+Le profil attend dans la boucle d'événements (asyncio.sleep) ; snapshots
+et diffs tracemalloc tournent dans l'executor.
+"""
+
+import os
+import sys
+import hmac
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sanic import Blueprint, response
+from sanic.request import Request
+from sanic.response import HTTPResponse
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.profiling import ProfilerBusy, SamplingProfiler, allocation_tracker, process_stats
+from utils.tracing import tracer
+from core.circuit_breaker import circuit_breaker_stats
+from core.generations import get_reembedding_job
+from core.usage import get_usage_tracker
+
+
+admin_api = Blueprint("admin_api", url_prefix="/admin")
+
+_GROUP_BY = ("lineno", "filename", "traceback")
+
+# Marge laissée sous RESPONSE_TIMEOUT pour arrêter le profileur et répondre
+PROFILE_RESPONSE_MARGIN_S = 5
+
+
+def _int_arg(request: Request, name: str, default: int, low: int, high: int) -> int:
+    try:
+        return min(max(int(request.args.get(name, default)), low), high)
+    except (TypeError, ValueError):
+        return default
+
+
+def _json(body: Dict[str, Any], status: int = 200) -> HTTPResponse:
+    return response.json(body, status=status, headers={"X-Process-Id": str(os.getpid())})
+
+
+def _error(message: str, status: int, **extra: Any) -> HTTPResponse:
+    return _json({"error": message, **extra}, status=status)
+
+
+async def _in_executor(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+@admin_api.middleware("request")
+async def authenticate(request: Request) -> Optional[HTTPResponse]:
+    """Bearer token ADMIN_API_TOKEN exigé (distinct de ACTION_API_TOKEN)"""
+    token = config.admin.token
+    provided = request.headers.get("authorization", "")
+    if token is None or not hmac.compare_digest(provided.encode(), f"Bearer {token}".encode()):
+        return _error("unauthorized", 401)
+    return None
+
+
+@admin_api.get("/profile/cpu")
+async def profile_cpu(request: Request) -> HTTPResponse:
+    """Échantillonne les piles de tous les threads pendant ?seconds="""
+    # Au-delà de RESPONSE_TIMEOUT, Sanic répondrait 503 avant la fin du profil
+    max_seconds = min(
+        int(config.admin.max_profile_seconds),
+        int(request.app.config.RESPONSE_TIMEOUT) - PROFILE_RESPONSE_MARGIN_S
+    )
+    seconds = _int_arg(request, "seconds", 10, 1, max(1, max_seconds))
+    interval_ms = _int_arg(request, "interval_ms", 10, 1, 1000)
+    profiler = SamplingProfiler(
+        interval_ms=interval_ms,
+        thread_filter=request.args.get("thread") or None,
+        line_numbers=request.args.get("lines", "").lower() in ("1", "true", "yes")
+    )
+    try:
+        profiler.start()
+    except ProfilerBusy as e:
+        return _error(str(e), 409)
+
+    logger.warning("CPU profile started", seconds=seconds, interval_ms=interval_ms)
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await _in_executor(profiler.stop)
+    metrics.increment("admin_profiles")
+
+    summary = profiler.summary()
+    logger.info("CPU profile done", samples=summary["samples"], overhead_pct=summary["overhead_pct"])
+    if request.args.get("format") == "json":
+        return _json(summary)
+    filename = f"cpu-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return response.text(profiler.collapsed(), headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Process-Id": str(os.getpid()),
+        "X-Profile-Samples": str(summary["samples"]),
+        "X-Profile-Overhead-Pct": str(summary["overhead_pct"]),
+    })
+
+
+@admin_api.post("/memory/tracemalloc")
+async def start_tracemalloc(request: Request) -> HTTPResponse:
+    frames = _int_arg(request, "frames", config.admin.tracemalloc_frames, 1, 50)
+    try:
+        status = await _in_executor(allocation_tracker.start, frames)
+    except ProfilerBusy as e:
+        return _error(str(e), 409, **allocation_tracker.status())
+    return _json(status, status=201)
+
+
+@admin_api.get("/memory/tracemalloc")
+async def diff_tracemalloc(request: Request) -> HTTPResponse:
+    group_by = request.args.get("group_by", "lineno")
+    if group_by not in _GROUP_BY:
+        return _error(f"group_by must be one of {', '.join(_GROUP_BY)}", 400)
+    limit = _int_arg(request, "limit", 20, 1, 200)
+    reset = request.args.get("reset", "").lower() in ("1", "true", "yes")
+    if not allocation_tracker.running:
+        return _error("tracemalloc is not running (POST /admin/memory/tracemalloc)", 409)
+    try:
+        return _json(await _in_executor(allocation_tracker.diff, limit, group_by, reset))
+    except RuntimeError as e:
+        # Arrêt automatique entre-temps
+        return _error(str(e), 409)
+
+
+@admin_api.delete("/memory/tracemalloc")
+async def stop_tracemalloc(request: Request) -> HTTPResponse:
+    return _json(await _in_executor(allocation_tracker.stop))
+
+
+def _singleton(module: str, name: str) -> Any:
+    """Singleton d'un module core s'il est déjà importé et créé (sinon None)"""
+    return getattr(sys.modules.get(f"core.{module}"), name, None)
+
+
+def _state() -> Dict[str, Any]:
+    """Singletons créés, sans instancier ceux qui ne le sont pas encore"""
+    state: Dict[str, Any] = {"process": process_stats()}
+
+    store = _singleton("vector_store", "_vector_store")
+    if store is not None:
+        state["vector_store"] = {"generation": store.generation.to_dict(), "count": store.count()}
+        shared = getattr(store, "shared", None)
+        if shared is not None:
+            state["shared_index"] = {"role": "reader", **shared.stats()}
+        elif store.publisher is not None:
+            state["shared_index"] = {"role": "writer", **store.publisher.stats()}
+    embeddings_module = sys.modules.get("core.embeddings")
+    if embeddings_module is not None:
+        state["embedding_caches"] = embeddings_module.embedding_cache_stats()
+    shared_cache_module = sys.modules.get("core.shared_cache")
+    if shared_cache_module is not None:
+        state["shared_embedding_caches"] = shared_cache_module.shared_embedding_cache_stats()
+
+    client = _singleton("llm_client", "_llm_client")
+    if client is not None:
+        state["llm_client"] = {"model": client.model}
+    pipeline = _singleton("rag_pipeline", "_rag_pipeline")
+    if pipeline is not None and pipeline.single_flight is not None:
+        state["single_flight_in_flight"] = pipeline.single_flight.in_flight()
+    retriever = _singleton("speculative", "_speculative_retriever")
+    if retriever is not None:
+        state["speculative_entries"] = len(retriever)
+
+    job = get_reembedding_job()
+    state["reembedding_job"] = job.to_dict() if job is not None else None
+    state["circuit_breakers"] = circuit_breaker_stats()
+    controller = _singleton("admission", "_admission_controller")
+    if controller is not None:
+        state["admission"] = controller.stats()
+    state["usage"] = get_usage_tracker().stats()
+    writer = _singleton("persistence", "_mongo_writer")
+    if writer is not None:
+        state["mongo_writer"] = writer.stats()
+    ticket_store = _singleton("tickets", "_ticket_store")
+    if ticket_store is not None:
+        state["tickets"] = ticket_store.stats()
+    state["tracing"] = tracer.stats()
+    state["logging"] = logger.stats()
+    state["metrics"] = metrics.size()
+    state["tracemalloc"] = allocation_tracker.status()
+    state["executor_threads"] = sum(
+        1 for thread in threading.enumerate() if thread.name.startswith("asyncio_")
+    )
+    return state
+
+
+@admin_api.get("/state")
+async def state(request: Request) -> HTTPResponse:
+    """Taille des caches et singletons en mémoire"""
+    return _json(await _in_executor(_state))
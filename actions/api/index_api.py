@@ -0,0 +1,528 @@
+# ============================================================================
+# INDEX API - Indexation, recherche et suppression en masse (HTTP)
+# ============================================================================
+
+"""
+Routes HTTP montées sur le serveur d'actions (server.py)
+
+    POST   /index               upload NDJSON en flux, un chunk par ligne
+                                (?async=true : job en arrière-plan, 202)
+    GET    /index/jobs          jobs d'indexation récents
+    GET    /index/jobs/<id>     état d'un job
+    DELETE /index?source=...    suppression par source (ou ?doc_id=...)
+    POST   /search              recherche batch {"queries": [...], "top_k": 5}
+
+    GET    /index/generations               générations et job de ré-embedding
+    POST   /index/generations               ré-embedding en arrière-plan (202)
+    POST   /index/generations/<id>/activate rollback vers une génération gardée
+    DELETE /index/generations/job           annule le ré-embedding en cours
+
+Format d'une ligne NDJSON :
+    {"id": "...", "content": "...", "metadata": {...}, "doc_id": "...", "source": "..."}
+Seul "content" est obligatoire ; l'id par défaut dérive du doc_id/source
+et du contenu, ce qui rend un ré-upload idempotent.
+
+Les routes utilisent le VectorStore du serveur d'actions : un seul
+processus ouvre les fichiers ChromaDB. En mode multi-worker (voir
+core/shared_index.py), les workers ne servent que /search ; les autres
+routes répondent 421 avec le port du processus d'indexation.
+"""
+
+import hmac
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from sanic import Blueprint, response
+from sanic.request import Request
+from sanic.response import HTTPResponse
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+from core.circuit_breaker import CircuitOpenError
+from core.generations import (
+    STATUS_RETIRED,
+    GenerationError,
+    get_reembedding_job,
+    start_reembedding,
+)
+from core.vector_store import get_vector_store
+from core.usage import usage_scope
+
+
+index_api = Blueprint("index_api")
+
+# Écritures ChromaDB sérialisées (les embeddings restent concurrents)
+_write_lock = threading.Lock()
+
+# Lecture du fichier tampon des jobs asynchrones
+_SPOOL_READ_BYTES = 64 * 1024
+# Au-delà, l'upload asynchrone est écrit sur disque
+_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+# Erreurs détaillées conservées par job
+_MAX_JOB_ERRORS = 20
+# Clés de métadonnées reprises des champs de premier niveau
+_METADATA_FIELDS = ("doc_id", "source")
+# Filtres acceptés par DELETE /index
+_DELETE_FILTERS = ("source", "doc_id")
+
+
+class LineTooLongError(ValueError):
+    """Ligne NDJSON au-delà de API_MAX_LINE_KB"""
+
+
+@dataclass
+class IndexJob:
+    """Suivi d'un upload NDJSON"""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, running, done, failed
+    received: int = 0
+    indexed: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def record_error(self, message: str, count: int = 1) -> None:
+        self.failed += count
+        if len(self.errors) < _MAX_JOB_ERRORS:
+            self.errors.append(message)
+
+    def finish(self, error: Optional[str] = None) -> None:
+        if error:
+            self.errors.append(error)
+        self.status = "failed" if error else "done"
+        self.finished_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "received": self.received,
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "duration_s": round(end - self.created_at, 3),
+        }
+
+
+class JobRegistry:
+    """Jobs en mémoire (par processus), les plus anciens terminés sont oubliés"""
+
+    def __init__(self, retention: int):
+        self.retention = retention
+        self._jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+
+    def create(self) -> IndexJob:
+        job = IndexJob()
+        self._jobs[job.id] = job
+        finished = [job_id for job_id, item in self._jobs.items() if item.finished]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[IndexJob]:
+        return list(reversed(self._jobs.values()))
+
+
+jobs = JobRegistry(config.api.job_retention)
+
+
+def parse_document(line: bytes) -> Dict[str, Any]:
+    """
+    Convertit une ligne NDJSON en document pour VectorStore.add_documents
+
+    Raises:
+        ValueError: Ligne invalide
+    """
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e.msg})")
+    if not isinstance(item, dict):
+        raise ValueError("expected a JSON object")
+
+    content = item.get("content")
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("missing 'content'")
+
+    raw_metadata = item.get("metadata") or {}
+    if not isinstance(raw_metadata, dict):
+        raise ValueError("'metadata' must be an object")
+    for key in _METADATA_FIELDS:
+        if item.get(key) is not None:
+            raw_metadata[key] = item[key]
+
+    # ChromaDB n'accepte que des scalaires
+    metadata = {}
+    for key, value in raw_metadata.items():
+        if value is None:
+            continue
+        if isinstance(value, (str, int, float, bool)):
+            metadata[key] = value
+        else:
+            metadata[key] = json.dumps(value, ensure_ascii=False)
+
+    doc_id = item.get("id")
+    if not doc_id:
+        prefix = metadata.get("doc_id") or metadata.get("source") or "doc"
+        doc_id = f"{prefix}_{hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]}"
+
+    return {"id": str(doc_id), "content": content, "metadata": metadata}
+
+
+class LineSplitter:
+    """Découpe un flux d'octets en lignes (taille de ligne bornée)"""
+
+    def __init__(self, max_line_bytes: int):
+        self.max_line_bytes = max_line_bytes
+        self.partial = b""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        if len(self.partial) > self.max_line_bytes:
+            raise LineTooLongError(f"line longer than {self.max_line_bytes} bytes")
+        return lines
+
+    def close(self) -> List[bytes]:
+        lines = [self.partial] if self.partial.strip() else []
+        self.partial = b""
+        return lines
+
+
+class BatchIndexer:
+    """Regroupe les documents en batches : embeddings concurrents, écritures sérialisées"""
+
+    def __init__(self, job: IndexJob, batch_size: Optional[int] = None,
+                 max_inflight: Optional[int] = None):
+        self.job = job
+        self.vector_store = get_vector_store()
+        self.batch_size = batch_size or config.api.batch_size
+        self.max_inflight = max_inflight or config.ingestion.embed_workers
+        self.batch: List[Dict[str, Any]] = []
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def add_line(self, line: bytes, number: int) -> None:
+        if not line.strip():
+            return
+        self.job.received += 1
+        try:
+            document = parse_document(line)
+        except ValueError as e:
+            self.job.record_error(f"line {number}: {e}")
+            return
+        self.batch.append(document)
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Lance le batch courant ; attend si trop de batches sont en cours"""
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+        if len(self._inflight) >= self.max_inflight:
+            _, self._inflight = await asyncio.wait(
+                self._inflight, return_when=asyncio.FIRST_COMPLETED
+            )
+        self._inflight.add(asyncio.ensure_future(self._index(batch)))
+
+    async def finish(self) -> None:
+        await self.flush()
+        if self._inflight:
+            await asyncio.wait(self._inflight)
+            self._inflight = set()
+
+    async def _index(self, batch: List[Dict[str, Any]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, batch)
+        except Exception as e:
+            self.job.record_error(f"batch of {len(batch)} starting at {batch[0]['id']}: {e}", len(batch))
+            return
+        self.job.indexed += len(batch)
+        metrics.increment("api_indexed_chunks", value=len(batch))
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        service = self.vector_store.embedding_service
+        with usage_scope(stage="indexing"):
+            embeddings = service.embed_batch([document["content"] for document in batch])
+        with _write_lock:
+            self.vector_store.add_documents(
+                batch, embeddings=embeddings, embedding_model=service.model
+            )
+
+
+async def index_stream(job: IndexJob, chunks: AsyncIterator[bytes]) -> IndexJob:
+    """Indexe un flux NDJSON et met à jour le job"""
+    job.status = "running"
+    indexer = BatchIndexer(job)
+    splitter = LineSplitter(config.api.max_line_kb * 1024)
+    number = 0
+    error = None
+    try:
+        async for data in chunks:
+            for line in splitter.feed(data):
+                number += 1
+                await indexer.add_line(line, number)
+        for line in splitter.close():
+            number += 1
+            await indexer.add_line(line, number)
+    except LineTooLongError as e:
+        error = f"line {number + 1}: {e}"
+    finally:
+        await indexer.finish()
+
+    job.finish(error)
+    logger.info(
+        f"Index job {job.status}: {job.id}",
+        received=job.received,
+        indexed=job.indexed,
+        failed=job.failed,
+        duration_s=job.to_dict()["duration_s"]
+    )
+    return job
+
+
+async def _request_chunks(request: Request) -> AsyncIterator[bytes]:
+    while True:
+        data = await request.stream.read()
+        if data is None:
+            return
+        yield data
+
+
+async def _spool_chunks(spool) -> AsyncIterator[bytes]:
+    try:
+        spool.seek(0)
+        while True:
+            data = spool.read(_SPOOL_READ_BYTES)
+            if not data:
+                return
+            yield data
+    finally:
+        spool.close()
+
+
+def _error(message: str, status: int, **extra: Any) -> HTTPResponse:
+    return response.json({"error": message, **extra}, status=status)
+
+
+@index_api.middleware("request")
+async def authenticate(request: Request) -> Optional[HTTPResponse]:
+    """
+    Bearer token ACTION_API_TOKEN exigé
+
+    Sans jeton configuré, seules les routes GET sont servies : les
+    écritures et /search (jusqu'à 50 embeddings OpenAI par requête, hors
+    contrôle d'admission) sont refusées.
+    """
+    token = config.api.token
+    if token is None:
+        if request.method == "GET":
+            return None
+        return _error("ACTION_API_TOKEN is not set: only GET routes are served", 403)
+    provided = request.headers.get("authorization", "")
+    if not hmac.compare_digest(provided.encode(), f"Bearer {token}".encode()):
+        return _error("unauthorized", 401)
+    return None
+
+
+@index_api.middleware("request")
+async def route_to_writer(request: Request) -> Optional[HTTPResponse]:
+    """Workers multi-worker : écritures et jobs servis par le processus d'indexation"""
+    if request.path == "/search" or not config.shared_index.enabled:
+        return None
+    from core.shared_index import is_reader
+
+    if is_reader():
+        return _error("index writes are served by the writer process", 421,
+                      writer_port=config.shared_index.writer_port)
+    return None
+
+
+@index_api.post("/index", stream=True)
+async def index(request: Request) -> HTTPResponse:
+    """Upload NDJSON en flux, indexé par batches"""
+    # Sanic lève la limite de taille pour un handler en flux : la taille
+    # d'upload n'est autorisée que sur cette route (413 au-delà)
+    request.stream.request_max_size = config.api.max_upload_mb * 1024 * 1024
+    job = jobs.create()
+
+    if request.args.get("async", "").lower() not in ("1", "true", "yes"):
+        await index_stream(job, _request_chunks(request))
+        status = 413 if job.status == "failed" else 200
+        return response.json(job.to_dict(), status=status)
+
+    # Asynchrone : le corps est mis en tampon (disque au-delà de 8 Mo)
+    # puis indexé en arrière-plan
+    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
+    async for data in _request_chunks(request):
+        spool.write(data)
+    request.app.add_task(index_stream(job, _spool_chunks(spool)))
+    return response.json(
+        {**job.to_dict(), "status_url": f"/index/jobs/{job.id}"}, status=202
+    )
+
+
+@index_api.get("/index/jobs")
+async def list_jobs(request: Request) -> HTTPResponse:
+    return response.json({"jobs": [job.to_dict() for job in jobs.list()]})
+
+
+@index_api.get("/index/jobs/<job_id>")
+async def get_job(request: Request, job_id: str) -> HTTPResponse:
+    job = jobs.get(job_id)
+    if job is None:
+        return _error("job not found", 404, job_id=job_id)
+    return response.json(job.to_dict())
+
+
+@index_api.delete("/index")
+async def delete(request: Request) -> HTTPResponse:
+    """Supprime tous les chunks d'une source ou d'un document"""
+    filters = {key: request.args.get(key) for key in _DELETE_FILTERS if request.args.get(key)}
+    if len(filters) != 1:
+        return _error(f"exactly one of {', '.join(_DELETE_FILTERS)} is required", 400)
+
+    def _delete() -> int:
+        with _write_lock:
+            return get_vector_store().delete_where(filters)
+
+    deleted = await asyncio.get_running_loop().run_in_executor(None, _delete)
+    logger.info("Index delete", deleted=deleted, **filters)
+    return response.json({"deleted": deleted, **filters})
+
+
+@index_api.post("/search")
+async def search(request: Request) -> HTTPResponse:
+    """Recherche batch : un appel d'embedding pour toutes les requêtes"""
+    body = request.json or {}
+    queries = body.get("queries")
+    if queries is None and body.get("query"):
+        queries = [body["query"]]
+    if not isinstance(queries, list) or not queries:
+        return _error("'queries' must be a non-empty list", 400)
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        return _error("queries must be non-empty strings", 400)
+    if len(queries) > config.api.max_queries:
+        return _error(f"at most {config.api.max_queries} queries per request", 400)
+
+    try:
+        top_k = min(max(int(body.get("top_k", config.rag.top_k)), 1), 50)
+    except (TypeError, ValueError):
+        return _error("'top_k' must be an integer", 400)
+    where = body.get("filter") or None
+    if where is not None and not isinstance(where, dict):
+        return _error("'filter' must be an object", 400)
+
+    def _search() -> List[List[Any]]:
+        with metrics.timer("api_search_ms"):
+            return get_vector_store().search_many(queries, top_k, where)
+
+    try:
+        results = await asyncio.get_running_loop().run_in_executor(None, _search)
+    except CircuitOpenError as e:
+        return response.json(
+            {"error": "embedding service unavailable"}, status=503,
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+
+    return response.json({
+        "results": [
+            {
+                "query": query,
+                "matches": [
+                    {
+                        "id": result.id,
+                        "content": result.content,
+                        "metadata": result.metadata,
+                        "relevance": round(result.relevance, 4),
+                    }
+                    for result in matches
+                ],
+            }
+            for query, matches in zip(queries, results)
+        ]
+    })
+
+
+@index_api.get("/index/generations")
+async def list_generations(request: Request) -> HTTPResponse:
+    """Générations de la collection et dernier job de ré-embedding"""
+    store = get_vector_store()
+    job = get_reembedding_job()
+    return response.json({
+        "active": store.generation.id,
+        "generations": [generation.to_dict() for generation in store.generations.all()],
+        "job": job.to_dict() if job else None,
+    })
+
+
+@index_api.post("/index/generations")
+async def reembed(request: Request) -> HTTPResponse:
+    """Ré-vectorise la génération active dans une nouvelle génération, puis bascule"""
+    body = request.json or {}
+    if not isinstance(body, dict):
+        return _error("body must be a JSON object", 400)
+    try:
+        rate = body.get("rate_per_second")
+        job = start_reembedding(
+            get_vector_store(),
+            embedding_model=body.get("embedding_model"),
+            rate_per_second=float(rate) if rate is not None else None
+        )
+    except (TypeError, ValueError):
+        return _error("'rate_per_second' must be a number", 400)
+    except GenerationError as e:
+        return _error(str(e), 409)
+    return response.json(
+        {**job.to_dict(), "status_url": "/index/generations"}, status=202
+    )
+
+
+@index_api.post("/index/generations/<generation_id:int>/activate")
+async def activate_generation(request: Request, generation_id: int) -> HTTPResponse:
+    """Rollback : réactive une génération conservée"""
+    store = get_vector_store()
+    job = get_reembedding_job()
+    if job is not None and job.running:
+        return _error("a re-embedding job is running", 409)
+    generation = store.generations.get(generation_id)
+    if generation is None:
+        return _error(f"unknown generation {generation_id}", 404)
+    if generation.id == store.generation.id:
+        return response.json(generation.to_dict())
+    if generation.status != STATUS_RETIRED:
+        return _error(f"generation {generation_id} is {generation.status}", 409)
+
+    loop = asyncio.get_running_loop()
+    generation = await loop.run_in_executor(None, store.activate_generation, generation_id)
+    return response.json(generation.to_dict())
+
+
+@index_api.delete("/index/generations/job")
+async def cancel_reembedding(request: Request) -> HTTPResponse:
+    """Annule le ré-embedding en cours (la génération partielle est supprimée)"""
+    job = get_reembedding_job()
+    if job is None or not job.running:
+        return _error("no re-embedding job is running", 404)
+    job.cancel()
+    return response.json(job.to_dict(), status=202)
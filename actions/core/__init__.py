@@ -1,12 +1,24 @@
 # Core package
-from .embeddings import EmbeddingService, embed_text, embed_texts
-from .vector_store import VectorStore, vector_store
-from .rag_pipeline import RAGPipeline, rag_pipeline
-from .llm_client import LLMClient, llm_client
-
-__all__ = [
-    'EmbeddingService', 'embed_text', 'embed_texts',
-    'VectorStore', 'vector_store',
-    'RAGPipeline', 'rag_pipeline',
-    'LLMClient', 'llm_client'
-]
+# Exports chargés à la demande (PEP 562) : `import core.tickets` ne doit pas
+# importer le pipeline RAG, ChromaDB et OpenAI. Les alias vector_store,
+# rag_pipeline et llm_client portent le nom de leur sous-module : les
+# importer depuis celui-ci (from core.vector_store import vector_store).
+import importlib
+
+_EXPORTS = {
+    'EmbeddingService': 'embeddings', 'embed_text': 'embeddings', 'embed_texts': 'embeddings',
+    'VectorStore': 'vector_store',
+    'RAGPipeline': 'rag_pipeline',
+    'LLMClient': 'llm_client'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,301 @@
+# ============================================================================
+# ADMISSION - Contrôle d'admission des appels OpenAI (file équitable)
+# ============================================================================
+
+"""
+Contrôle d'admission devant les appels OpenAI des conversations
+
+Sans limite, une rafale de questions ouvre autant d'appels simultanés
+qu'il y a de threads : OpenAI répond 429 et les retries allongent toutes
+les réponses. Chaque appel (embedding ou génération) fait pour un
+utilisateur (sender_id du usage_scope) passe par l'AdmissionController :
+
+- au plus ADMISSION_MAX_CONCURRENT appels en cours ; au-delà, attente
+  dans une file bornée (ADMISSION_MAX_QUEUE) ;
+- un seau de jetons par utilisateur (ADMISSION_SENDER_RATE par seconde,
+  ADMISSION_SENDER_BURST d'avance) : un utilisateur trop bavard est
+  refusé sans prendre la place des autres ;
+- la file est servie par étiquette de fin croissante (self-clocked fair
+  queueing) : chaque utilisateur en attente reçoit une part des places
+  proportionnelle à son poids (ADMISSION_SENDER_WEIGHTS), quel que soit
+  le nombre de ses appels en attente ;
+- un appel est refusé dès son arrivée si l'attente estimée dépasse le
+  budget (deadline restante moins la durée d'un appel, au plus
+  ADMISSION_QUEUE_TIMEOUT_MS) plutôt que d'attendre pour rien.
+
+Un refus lève AdmissionRejected ; le pipeline RAG répond alors à
+l'utilisateur de réessayer, sans autre appel. Les appels sans utilisateur
+(ingestion, ré-embedding, API d'indexation) ne passent pas par la file.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.config import config
+from utils.deadline import Deadline
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+# Motifs de refus (label reason de admission_rejections)
+REASON_RATE = "rate_limited"  # Seau de l'utilisateur vide
+REASON_QUEUE_FULL = "queue_full"  # File pleine
+REASON_DEADLINE = "deadline"  # Attente estimée au-delà du budget
+REASON_TIMEOUT = "timeout"  # Pas de place libérée dans le budget
+
+# Durée d'un appel supposée avant les premières mesures (secondes)
+INITIAL_SERVICE_S = 1.0
+# Poids d'une nouvelle mesure dans la moyenne mobile de la durée d'un appel
+SERVICE_EWMA_ALPHA = 0.1
+
+
+class AdmissionRejected(Exception):
+    """Appel refusé : serveur saturé ou utilisateur au-delà de son débit"""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Appel OpenAI refusé ({reason}, réessai dans {retry_after:.1f}s)")
+
+
+class _Waiter:
+    """Appel en attente d'une place"""
+
+    __slots__ = ("event", "granted", "cancelled")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class AdmissionController:
+    """
+    Limite de concurrence, file équitable et débit par utilisateur
+
+    Une place libérée par release() est transmise directement au premier
+    appel de la file (plus petite étiquette de fin) : in_flight ne
+    redescend que lorsque la file est vide.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout_ms: Optional[float] = None,
+        sender_rate: Optional[float] = None,
+        sender_burst: Optional[int] = None,
+        sender_weights: Optional[Dict[str, float]] = None,
+        max_senders: Optional[int] = None
+    ):
+        """
+        Initialise le contrôleur
+
+        Args:
+            max_concurrent: Appels simultanés maximum
+            max_queue: Appels en attente maximum
+            queue_timeout_ms: Attente maximum dans la file
+            sender_rate: Jetons rechargés par seconde et par utilisateur (0 = sans limite)
+            sender_burst: Capacité du seau d'un utilisateur
+            sender_weights: Poids par sender_id (défaut 1)
+            max_senders: Seaux conservés (les moins récents sont oubliés)
+        """
+        cfg = config.admission
+        self.max_concurrent = max(1, max_concurrent if max_concurrent is not None else cfg.max_concurrent)
+        self.max_queue = max(0, max_queue if max_queue is not None else cfg.max_queue)
+        self.queue_timeout = (queue_timeout_ms if queue_timeout_ms is not None else cfg.queue_timeout_ms) / 1000
+        self.sender_rate = sender_rate if sender_rate is not None else cfg.sender_rate
+        self.sender_burst = max(1, sender_burst if sender_burst is not None else cfg.sender_burst)
+        self.sender_weights = sender_weights if sender_weights is not None else cfg.sender_weights
+        self.max_senders = max_senders if max_senders is not None else cfg.max_senders
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # (étiquette de fin, ordre d'arrivée, appel) ; les appels abandonnés
+        # restent dans le tas jusqu'à leur tour (cancelled)
+        self._queue: List[Tuple[float, int, _Waiter]] = []
+        self._waiting = 0
+        self._arrivals = itertools.count()
+        # Temps virtuel : étiquette du dernier appel sorti de la file
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        # sender_id -> [jetons, instant de la dernière recharge]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._service_s = INITIAL_SERVICE_S
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    @contextmanager
+    def admit(self, sender_id: str, deadline: Optional[Deadline] = None) -> Iterator[float]:
+        """
+        Occupe une place pendant le bloc
+
+        Yields:
+            float: Attente dans la file (secondes)
+
+        Raises:
+            AdmissionRejected: Si l'appel est refusé
+        """
+        waited = self.acquire(sender_id, deadline)
+        start_time = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(time.perf_counter() - start_time)
+
+    def acquire(self, sender_id: str, deadline: Optional[Deadline] = None) -> float:
+        """
+        Obtient une place, immédiatement ou après attente dans la file
+
+        Args:
+            sender_id: Utilisateur à l'origine de l'appel
+            deadline: Deadline de la requête (borne l'attente)
+
+        Returns:
+            float: Attente dans la file (secondes)
+
+        Raises:
+            AdmissionRejected: Seau vide, file pleine ou attente hors budget
+        """
+        start_time = time.monotonic()
+        waiter = None
+        with self._lock:
+            bucket = self._bucket(sender_id, start_time)
+            if bucket[0] < 1:
+                reason, retry_after = REASON_RATE, (1 - bucket[0]) / self.sender_rate
+            elif self._in_flight < self.max_concurrent and not self._waiting:
+                bucket[0] -= 1
+                self._in_flight += 1
+                self.admitted += 1
+                reason = None
+            elif self._waiting >= self.max_queue:
+                reason, retry_after = REASON_QUEUE_FULL, self._service_s
+            else:
+                budget = self.queue_timeout
+                if deadline is not None:
+                    budget = min(budget, deadline.remaining() - self._service_s)
+                weight = self.sender_weights.get(sender_id, 1.0)
+                finish = max(self._virtual_time, self._last_finish.get(sender_id, 0.0)) + 1 / weight
+                ahead = sum(1 for tag, _, other in self._queue if tag <= finish and not other.cancelled)
+                # Places libérées au rythme de max_concurrent appels par durée d'appel
+                estimated = (ahead + 1) / self.max_concurrent * self._service_s
+                if estimated > budget:
+                    reason, retry_after = REASON_DEADLINE, estimated
+                else:
+                    bucket[0] -= 1
+                    self._last_finish[sender_id] = finish
+                    waiter = _Waiter()
+                    heapq.heappush(self._queue, (finish, next(self._arrivals), waiter))
+                    self._waiting += 1
+                    reason = None
+            self._publish_gauges()
+
+        if reason is None and waiter is None:
+            metrics.increment("admission_admitted", path="immediate")
+            metrics.observe("admission_wait_ms", 0.0)
+            return 0.0
+        if reason is not None:
+            self._reject(reason, retry_after, sender_id)
+
+        waiter.event.wait(budget)
+        waited = time.monotonic() - start_time
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                self._waiting -= 1
+                # Appel jamais parti : le jeton est rendu à l'utilisateur
+                bucket[0] = min(float(self.sender_burst), bucket[0] + 1)
+                self._publish_gauges()
+        if not waiter.granted:
+            self._reject(REASON_TIMEOUT, self._service_s, sender_id)
+        metrics.increment("admission_admitted", path="queued")
+        metrics.observe("admission_wait_ms", waited * 1000)
+        return waited
+
+    def release(self, service_s: float = 0.0) -> None:
+        """Libère une place (transmise au premier appel de la file)"""
+        with self._lock:
+            if service_s > 0:
+                self._service_s += SERVICE_EWMA_ALPHA * (service_s - self._service_s)
+            while self._queue:
+                finish, _, waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                self._virtual_time = finish
+                self._waiting -= 1
+                self.admitted += 1
+                waiter.granted = True
+                waiter.event.set()
+                break
+            else:
+                self._in_flight -= 1
+                # Fin de la période chargée : les historiques ne servent plus
+                self._last_finish.clear()
+            self._publish_gauges()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queued": self._waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "service_ms": round(self._service_s * 1000, 1),
+                "senders": len(self._buckets),
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "wait_p95_ms": metrics.percentile("admission_wait_ms", 95),
+            }
+
+    def _bucket(self, sender_id: str, now: float) -> List[float]:
+        """Seau de l'utilisateur, rechargé jusqu'à maintenant (lock détenu)"""
+        bucket = self._buckets.get(sender_id)
+        if bucket is None:
+            bucket = self._buckets[sender_id] = [float(self.sender_burst), now]
+            while len(self._buckets) > self.max_senders:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(sender_id)
+        if self.sender_rate <= 0:
+            bucket[0] = float(self.sender_burst)
+        else:
+            bucket[0] = min(float(self.sender_burst), bucket[0] + (now - bucket[1]) * self.sender_rate)
+        bucket[1] = now
+        return bucket
+
+    def _publish_gauges(self) -> None:
+        metrics.set_gauge("admission_in_flight", self._in_flight)
+        metrics.set_gauge("admission_queue_depth", self._waiting)
+
+    def _reject(self, reason: str, retry_after: float, sender_id: str) -> None:
+        with self._lock:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        metrics.increment("admission_rejections", reason=reason)
+        logger.warning(
+            "OpenAI call shed by admission control",
+            reason=reason,
+            sender_id=sender_id,
+            retry_after_s=round(retry_after, 2)
+        )
+        raise AdmissionRejected(reason, retry_after)
+
+
+_admission_controller: Optional[AdmissionController] = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """Contrôleur d'admission du processus (None si désactivé)"""
+    global _admission_controller
+    if not config.admission.enabled:
+        return None
+    if _admission_controller is None:
+        with _admission_controller_lock:
+            if _admission_controller is None:
+                _admission_controller = AdmissionController()
+    return _admission_controller
@@ -0,0 +1,522 @@
+# ============================================================================
+# CHUNKING - Stratégies de découpage des documents
+# ============================================================================
+
+"""
+Découpage des documents en chunks, en flux et en temps linéaire
+
+Stratégies :
+- characters : fenêtres de N caractères, coupure à la dernière phrase
+- tokens     : fenêtres de N tokens exactement (tokenizer des embeddings)
+- sentence   : phrases et paragraphes regroupés jusqu'à un budget de tokens
+- markdown   : comme sentence, sans jamais traverser un titre ; le chemin
+               des titres est conservé dans le chunk (section)
+- auto       : markdown pour les .md, sentence sinon
+
+Toutes les stratégies consomment un flux de (page, texte) et ne gardent
+en mémoire que le texte non encore découpé.
+"""
+
+import abc
+import re
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from utils.config import config
+from core.prompts import CHARS_PER_TOKEN, TokenCounter
+
+
+# (numéro de page ou None, texte)
+Page = Tuple[Optional[int], str]
+
+STRATEGIES = ("auto", "characters", "tokens", "sentence", "markdown")
+
+# Fin de phrase (ponctuation + fermants + espaces) ou ligne vide
+_BOUNDARY = re.compile(
+    r"(?P<para>\n[ \t]*\n\s*)|(?P<end>[.!?…]+[»\"”’)\]]*)(?P<space>\s+)"
+)
+_BLANK_LINE = re.compile(r"\n[ \t]*\n")
+_LAST_WORD = re.compile(r"(\w+)$")
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+# Une phrase commence par une majuscule, un chiffre ou un signe ouvrant
+_SENTENCE_OPENERS = "«\"“'‘([-–—•*"
+
+# Abréviations suivies d'un point qui ne terminent pas la phrase
+ABBREVIATIONS = frozenset({
+    "m", "mm", "mme", "mmes", "mlle", "mlles", "dr", "pr", "me", "st", "ste",
+    "etc", "cf", "p", "pp", "art", "al", "ex", "env", "vol", "chap", "fig",
+    "av", "bd", "no", "n°", "tél", "tel", "min", "max", "réf", "ref", "vs",
+})
+
+# Un chunk se termine de préférence en fin de paragraphe s'il est assez rempli
+PARAGRAPH_FILL_RATIO = 0.6
+
+
+@dataclass
+class Chunk:
+    """Chunk découpé, avec sa position dans le document"""
+    text: str
+    token_count: int
+    page: Optional[int] = None
+    page_end: Optional[int] = None
+    section: Optional[str] = None
+
+
+def _page_lookup(offsets: List[int], numbers: List[Optional[int]]) -> Callable[[int], Optional[int]]:
+    """Page contenant une position, d'après les positions de début de page"""
+    def page_at(offset: int) -> Optional[int]:
+        index = bisect_right(offsets, offset) - 1
+        return numbers[index] if index >= 0 else None
+    return page_at
+
+
+def iter_chunks(
+    pages: Iterable[Page],
+    chunk_size: int = 1000,
+    overlap: int = 200
+) -> Iterator[Tuple[str, Optional[int], Optional[int]]]:
+    """
+    Découpe un flux de pages en chunks de caractères avec overlap
+
+    Seul le texte non encore découpé est conservé (au plus un chunk
+    plus la page courante) : la mémoire ne dépend pas de la taille du fichier.
+
+    Args:
+        pages: Flux de (numéro de page, texte)
+        chunk_size: Taille des chunks (caractères)
+        overlap: Recouvrement entre chunks
+
+    Yields:
+        Tuple (chunk, première page, dernière page)
+    """
+    buffer = ""
+    start = 0
+    # Offsets de début de page dans le buffer et numéros correspondants
+    page_offsets: List[int] = []
+    page_numbers: List[Optional[int]] = []
+
+    def cut(final: bool):
+        nonlocal start
+        page_at = _page_lookup(page_offsets, page_numbers)
+        while start < len(buffer) and (final or len(buffer) - start > chunk_size):
+            end = min(start + chunk_size, len(buffer))
+            chunk = buffer[start:end]
+
+            # Essayer de couper à une phrase
+            if end < len(buffer):
+                last_period = chunk.rfind('.')
+                if last_period > chunk_size // 2:
+                    end = start + last_period + 1
+                    chunk = buffer[start:end]
+
+            if chunk.strip():
+                yield chunk.strip(), page_at(start), page_at(end - 1)
+
+            # Dernier chunk : reculer de l'overlap relancerait la même fin de texte
+            if end >= len(buffer):
+                start = len(buffer)
+                break
+            start = max(end - overlap, start + 1)
+
+    for page_number, text in pages:
+        page_offsets.append(len(buffer))
+        page_numbers.append(page_number)
+        buffer += text + "\n" if page_number is not None else text
+
+        yield from cut(final=False)
+
+        # Oublier le texte déjà découpé
+        if start > 0:
+            buffer = buffer[start:]
+            keep = max(0, bisect_right(page_offsets, start) - 1)
+            page_offsets = [max(0, offset - start) for offset in page_offsets[keep:]]
+            page_numbers = page_numbers[keep:]
+            start = 0
+
+    yield from cut(final=True)
+
+
+class Chunker(abc.ABC):
+    """Stratégie de découpage : flux de pages → flux de chunks"""
+
+    name = "base"
+
+    def __init__(self, counter: TokenCounter):
+        self.counter = counter
+
+    @abc.abstractmethod
+    def split(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        """Découpe un flux de (page, texte) en chunks, au fil de la lecture"""
+
+    def split_text(self, text: str) -> List[Chunk]:
+        """Découpe un texte complet"""
+        return list(self.split([(None, text)]))
+
+
+class CharacterChunker(Chunker):
+    """Fenêtres de caractères (découpage historique)"""
+
+    name = "characters"
+
+    def __init__(self, counter: TokenCounter, chunk_size: int, chunk_overlap: int):
+        super().__init__(counter)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        for text, page, page_end in iter_chunks(pages, self.chunk_size, self.chunk_overlap):
+            yield Chunk(text, self.counter.count(text), page, page_end)
+
+
+class TokenChunker(Chunker):
+    """Fenêtres d'exactement max_tokens tokens"""
+
+    name = "tokens"
+
+    def __init__(self, counter: TokenCounter, max_tokens: int, overlap_tokens: int):
+        super().__init__(counter)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens - 1)
+
+    def split(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        if not self.counter.exact:
+            # Sans tokenizer : fenêtres de caractères équivalentes (l'estimation
+            # compte un token de plus que len // CHARS_PER_TOKEN)
+            yield from CharacterChunker(
+                self.counter,
+                (self.max_tokens - 1) * CHARS_PER_TOKEN,
+                self.overlap_tokens * CHARS_PER_TOKEN
+            ).split(pages)
+            return
+
+        tokens: List[int] = []
+        start = 0
+        token_offsets: List[int] = []
+        token_pages: List[Optional[int]] = []
+        # Texte après le dernier espace : encodé avec la suite pour ne pas couper un mot
+        carry = ""
+        max_carry = self.max_tokens * CHARS_PER_TOKEN * 4
+        step = self.max_tokens - self.overlap_tokens
+
+        def windows(final: bool):
+            nonlocal start
+            page_at = _page_lookup(token_offsets, token_pages)
+            while start < len(tokens) and (final or len(tokens) - start > self.max_tokens):
+                end = min(start + self.max_tokens, len(tokens))
+                text = self.counter.decode(tokens[start:end]).strip()
+                if text:
+                    yield Chunk(text, end - start, page_at(start), page_at(end - 1))
+                if end >= len(tokens):
+                    start = len(tokens)
+                    break
+                start += step
+
+        for page_number, text in pages:
+            carry += text + "\n" if page_number is not None else text
+            cut = max(carry.rfind(" "), carry.rfind("\n"))
+            if cut < 0 and len(carry) < max_carry:
+                continue
+            head, carry = (carry[:cut + 1], carry[cut + 1:]) if cut >= 0 else (carry, "")
+
+            token_offsets.append(len(tokens))
+            token_pages.append(page_number)
+            tokens.extend(self.counter.encode(head))
+
+            yield from windows(final=False)
+
+            if start > 0:
+                tokens = tokens[start:]
+                keep = max(0, bisect_right(token_offsets, start) - 1)
+                token_offsets = [max(0, offset - start) for offset in token_offsets[keep:]]
+                token_pages = token_pages[keep:]
+                start = 0
+
+        if carry:
+            token_offsets.append(len(tokens))
+            token_pages.append(token_pages[-1] if token_pages else None)
+            tokens.extend(self.counter.encode(carry))
+        yield from windows(final=True)
+
+
+class _SentenceSplitter:
+    """
+    Découpe un flux de texte en phrases (règles du français)
+
+    Une phrase se termine par . ! ? … suivis d'un espace puis d'une
+    majuscule, d'un chiffre ou d'un signe ouvrant, sauf après une
+    abréviation (M., Mme, p., etc.) ou une initiale. Une ligne vide
+    termine un paragraphe. Chaque morceau conserve ses espaces finaux :
+    leur concaténation redonne le texte d'origine.
+    """
+
+    def __init__(self, max_carry: int):
+        self.max_carry = max_carry
+        self.carry = ""
+        self.carry_page: Optional[int] = None
+
+    def feed(self, text: str, page: Optional[int]) -> Iterator[Tuple[str, Optional[int], Optional[int], bool]]:
+        """Yields (phrase, première page, dernière page, fin de paragraphe)"""
+        if not self.carry:
+            self.carry_page = page
+        data = self.carry + text
+        start = 0
+
+        for match in _BOUNDARY.finditer(data):
+            if match.group("para"):
+                paragraph = True
+            else:
+                # Fin de texte : la phrase suivante n'est pas encore connue
+                if match.end() >= len(data):
+                    break
+                if not self._is_sentence_end(data, match):
+                    continue
+                paragraph = bool(_BLANK_LINE.search(match.group("space")))
+            yield data[start:match.end()], self.carry_page, page, paragraph
+            start = match.end()
+            self.carry_page = page
+
+        self.carry = data[start:]
+        # Texte sans ponctuation : le packer le découpera en fenêtres
+        if len(self.carry) > self.max_carry:
+            yield from self.close()
+
+    def close(self) -> Iterator[Tuple[str, Optional[int], Optional[int], bool]]:
+        """Renvoie la dernière phrase en attente"""
+        if self.carry.strip():
+            yield self.carry, self.carry_page, self.carry_page, True
+        self.carry = ""
+
+    @staticmethod
+    def _is_sentence_end(data: str, match) -> bool:
+        if "\n" in match.group("space"):
+            return True
+        following = data[match.end()]
+        if not (following.isupper() or following.isdigit() or following in _SENTENCE_OPENERS):
+            return False
+        if match.group("end") == ".":
+            word = _LAST_WORD.search(data, max(0, match.start() - 20), match.start())
+            if word:
+                word = word.group(1)
+                if word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                    return False
+        return True
+
+
+class _Packer:
+    """Regroupe des phrases jusqu'au budget de tokens, avec overlap en phrases"""
+
+    def __init__(self, chunker: "SentenceChunker"):
+        self.chunker = chunker
+        self.counter = chunker.counter
+        self.max_tokens = chunker.max_tokens
+        self.overlap_tokens = chunker.overlap_tokens
+        self.section: Optional[str] = None
+        # (texte, tokens, première page, dernière page)
+        self.units: Deque[Tuple[str, int, Optional[int], Optional[int]]] = deque()
+        self.total = 0
+        # Phrases ajoutées depuis le dernier chunk (hors overlap)
+        self.fresh = False
+
+    def add(self, text: str, page: Optional[int], page_end: Optional[int],
+            paragraph_end: bool) -> Iterator[Chunk]:
+        tokens = self.counter.count(text)
+
+        if tokens > self.max_tokens:
+            # Phrase trop longue : fenêtres de tokens
+            yield from self.flush()
+            self.reset()
+            for chunk in self.chunker.window(text, page):
+                chunk.section = self.section
+                yield chunk
+            return
+
+        if self.fresh and self.total + tokens > self.max_tokens:
+            yield from self.emit()
+        while self.units and self.total + tokens > self.max_tokens:
+            self.total -= self.units.popleft()[1]
+
+        self.units.append((text, tokens, page, page_end))
+        self.total += tokens
+        self.fresh = True
+
+        if paragraph_end and self.total >= self.max_tokens * PARAGRAPH_FILL_RATIO:
+            yield from self.emit()
+
+    def emit(self) -> Iterator[Chunk]:
+        """Produit le chunk courant et garde les dernières phrases en overlap"""
+        text = "".join(unit[0] for unit in self.units).strip()
+        if text:
+            yield Chunk(
+                text=text,
+                token_count=self.counter.count(text),
+                page=self.units[0][2],
+                page_end=self.units[-1][3],
+                section=self.section
+            )
+        self.fresh = False
+
+        kept: Deque[Tuple[str, int, Optional[int], Optional[int]]] = deque()
+        kept_tokens = 0
+        while self.units and kept_tokens + self.units[-1][1] <= self.overlap_tokens:
+            unit = self.units.pop()
+            kept.appendleft(unit)
+            kept_tokens += unit[1]
+        self.units = kept
+        self.total = kept_tokens
+
+    def flush(self) -> Iterator[Chunk]:
+        """Produit le dernier chunk s'il contient des phrases nouvelles"""
+        if self.fresh:
+            yield from self.emit()
+
+    def reset(self) -> None:
+        self.units.clear()
+        self.total = 0
+        self.fresh = False
+
+
+class SentenceChunker(Chunker):
+    """Phrases et paragraphes regroupés jusqu'à max_tokens"""
+
+    name = "sentence"
+
+    def __init__(self, counter: TokenCounter, max_tokens: int, overlap_tokens: int):
+        super().__init__(counter)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens - 1)
+        # Au-delà, un texte sans ponctuation est découpé en fenêtres
+        self.max_carry = max_tokens * CHARS_PER_TOKEN * 4
+        self._windows = TokenChunker(counter, max_tokens, self.overlap_tokens)
+
+    def window(self, text: str, page: Optional[int]) -> Iterator[Chunk]:
+        """Découpe en fenêtres de tokens un texte plus long que le budget"""
+        return self._windows.split([(page, text)])
+
+    def split(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        splitter = _SentenceSplitter(self.max_carry)
+        packer = _Packer(self)
+        for page_number, text in pages:
+            if page_number is not None:
+                text += "\n"
+            for sentence in splitter.feed(text, page_number):
+                yield from packer.add(*sentence)
+        for sentence in splitter.close():
+            yield from packer.add(*sentence)
+        yield from packer.flush()
+
+
+class MarkdownChunker(SentenceChunker):
+    """Comme SentenceChunker, en coupant à chaque titre Markdown"""
+
+    name = "markdown"
+
+    def split(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        splitter = _SentenceSplitter(self.max_carry)
+        packer = _Packer(self)
+        headings: List[str] = []
+        in_fence = False
+        partial_line = ""
+
+        def feed(body: List[str], page: Optional[int]) -> Iterator[Chunk]:
+            if body:
+                for sentence in splitter.feed("".join(body), page):
+                    yield from packer.add(*sentence)
+
+        def new_section() -> Iterator[Chunk]:
+            for sentence in splitter.close():
+                yield from packer.add(*sentence)
+            yield from packer.flush()
+            packer.reset()
+
+        for page_number, text in pages:
+            lines = (partial_line + text).splitlines(keepends=True)
+            partial_line = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+            body: List[str] = []
+
+            for line in lines:
+                if _FENCE.match(line):
+                    in_fence = not in_fence
+                heading = None if in_fence else _HEADING.match(line)
+                if not heading:
+                    body.append(line)
+                    continue
+
+                yield from feed(body, page_number)
+                body = []
+                yield from new_section()
+
+                level = len(heading.group(1))
+                headings = headings[:level - 1] + [""] * (level - 1 - len(headings))
+                headings.append(heading.group(2).strip())
+                packer.section = " > ".join(title for title in headings if title)
+                # Le titre fait partie du premier chunk de la section
+                yield from packer.add(line, page_number, page_number, False)
+
+            yield from feed(body, page_number)
+
+        if partial_line:
+            for sentence in splitter.feed(partial_line, None):
+                yield from packer.add(*sentence)
+        yield from new_section()
+
+
+def create_chunker(
+    strategy: Optional[str] = None,
+    file_path: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None
+) -> Chunker:
+    """
+    Crée la stratégie de découpage demandée
+
+    Args:
+        strategy: auto, characters, tokens, sentence ou markdown (défaut : config)
+        file_path: Fichier à découper (choix de la stratégie auto)
+        chunk_size: Taille des chunks en caractères (characters)
+        chunk_overlap: Recouvrement en caractères (characters)
+        max_tokens: Budget de tokens par chunk (tokens, sentence, markdown)
+        overlap_tokens: Recouvrement en tokens
+
+    Returns:
+        Chunker: Stratégie prête à l'emploi
+    """
+    rag = config.rag
+    strategy = strategy or rag.chunk_strategy
+    if strategy == "auto":
+        is_markdown = bool(file_path) and file_path.lower().endswith(".md")
+        strategy = "markdown" if is_markdown else "sentence"
+
+    counter = get_token_counter()
+    max_tokens = max_tokens or rag.chunk_tokens
+    overlap_tokens = overlap_tokens if overlap_tokens is not None else rag.chunk_overlap_tokens
+
+    if strategy == "characters":
+        return CharacterChunker(
+            counter,
+            chunk_size or rag.chunk_size,
+            chunk_overlap if chunk_overlap is not None else rag.chunk_overlap
+        )
+    if strategy == "tokens":
+        return TokenChunker(counter, max_tokens, overlap_tokens)
+    if strategy == "sentence":
+        return SentenceChunker(counter, max_tokens, overlap_tokens)
+    if strategy == "markdown":
+        return MarkdownChunker(counter, max_tokens, overlap_tokens)
+    raise ValueError(f"Unknown chunking strategy: {strategy} (expected one of {STRATEGIES})")
+
+
+_token_counter: Optional[TokenCounter] = None
+
+
+def get_token_counter() -> TokenCounter:
+    """Compteur de tokens du modèle d'embeddings (instance par processus)"""
+    global _token_counter
+    if _token_counter is None:
+        _token_counter = TokenCounter(config.openai.embedding_model)
+    return _token_counter
@@ -0,0 +1,220 @@
+# ============================================================================
+# CIRCUIT BREAKER - Protection contre une dépendance lente ou en échec
+# ============================================================================
+
+"""
+Circuit breaker pour les appels OpenAI (LLM et embeddings)
+- CLOSED : les appels passent, taux d'erreur et de lenteur surveillés
+- OPEN : les appels échouent immédiatement (CircuitOpenError)
+- HALF_OPEN : quelques appels de test décident de la réouverture ou fermeture
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valeur de la jauge circuit_state{breaker} par état
+STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Appel refusé : le circuit est ouvert"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit '{name}' ouvert (réessai dans {retry_after:.1f}s)")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker à fenêtre glissante
+
+    Le circuit s'ouvre quand, sur les window_size derniers appels
+    (au moins min_calls), le taux d'échec dépasse failure_rate_threshold
+    ou le taux d'appels lents (> slow_call_ms) dépasse slow_call_rate_threshold.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: Optional[float] = None,
+        slow_call_ms: Optional[float] = None,
+        slow_call_rate_threshold: Optional[float] = None,
+        window_size: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        open_seconds: Optional[float] = None,
+        half_open_max_calls: Optional[int] = None
+    ):
+        """
+        Initialise le circuit breaker
+
+        Args:
+            name: Nom de la dépendance protégée (llm, embeddings)
+            failure_rate_threshold: Taux d'échec d'ouverture (0-1)
+            slow_call_ms: Seuil d'un appel lent en millisecondes
+            slow_call_rate_threshold: Taux d'appels lents d'ouverture (0-1)
+            window_size: Nombre d'appels de la fenêtre glissante
+            min_calls: Nombre minimum d'appels avant évaluation
+            open_seconds: Durée d'ouverture avant les appels de test
+            half_open_max_calls: Appels de test simultanés en HALF_OPEN
+        """
+        cfg = config.circuit_breaker
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold or cfg.failure_rate_threshold
+        self.slow_call_ms = slow_call_ms or cfg.slow_call_ms
+        self.slow_call_rate_threshold = slow_call_rate_threshold or cfg.slow_call_rate_threshold
+        self.window_size = window_size or cfg.window_size
+        self.min_calls = min_calls or cfg.min_calls
+        self.open_seconds = open_seconds or cfg.open_seconds
+        self.half_open_max_calls = half_open_max_calls or cfg.half_open_max_calls
+
+        self._lock = threading.Lock()
+        # (succès, lent) par appel
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=self.window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        metrics.set_gauge("circuit_state", STATE_GAUGE[CLOSED], breaker=name)
+
+    @property
+    def state(self) -> str:
+        """État courant (OPEN passe en HALF_OPEN une fois le délai écoulé)"""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def is_open(self) -> bool:
+        """True si les appels seraient refusés immédiatement"""
+        return self.state == OPEN
+
+    def allow(self) -> None:
+        """
+        Autorise un appel ou le refuse
+
+        Raises:
+            CircuitOpenError: Si le circuit est ouvert (ou HALF_OPEN saturé)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+
+            retry_after = max(0.0, self._opened_at + self.open_seconds - now)
+
+        metrics.increment("circuit_rejections", breaker=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self, duration_ms: float) -> None:
+        """Enregistre un appel réussi (éventuellement lent)"""
+        slow = duration_ms > self.slow_call_ms
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if slow:
+                    self._transition(OPEN)
+                    return
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._transition(CLOSED)
+                return
+            self._window.append((True, slow))
+            self._evaluate()
+
+    def record_failure(self) -> None:
+        """Enregistre un appel en échec"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+            self._window.append((False, False))
+            self._evaluate()
+
+    def stats(self) -> Dict[str, Any]:
+        """État et taux de la fenêtre courante"""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            calls = len(self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            slow = sum(1 for _, is_slow in self._window if is_slow)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "calls": calls,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "slow_rate": round(slow / calls, 3) if calls else 0.0
+            }
+
+    def _maybe_half_open(self, now: float) -> None:
+        """OPEN → HALF_OPEN après open_seconds (lock détenu)"""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _evaluate(self) -> None:
+        """Ouvre le circuit si les seuils sont dépassés (lock détenu)"""
+        calls = len(self._window)
+        if self._state != CLOSED or calls < self.min_calls:
+            return
+        failures = sum(1 for ok, _ in self._window if not ok)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        if failures / calls >= self.failure_rate_threshold or slow / calls >= self.slow_call_rate_threshold:
+            self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        """Change d'état (lock détenu)"""
+        previous = self._state
+        self._state = state
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            self._window.clear()
+
+        metrics.set_gauge("circuit_state", STATE_GAUGE[state], breaker=self.name)
+        metrics.increment("circuit_transitions", breaker=self.name, to=state)
+        logger.warning(f"Circuit '{self.name}': {previous} -> {state}")
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> Optional[CircuitBreaker]:
+    """
+    Récupère le circuit breaker d'une dépendance
+
+    Args:
+        name: Nom de la dépendance (llm, embeddings)
+
+    Returns:
+        CircuitBreaker ou None si les circuit breakers sont désactivés
+    """
+    if not config.circuit_breaker.enabled:
+        return None
+    with _circuit_breakers_lock:
+        if name not in _circuit_breakers:
+            _circuit_breakers[name] = CircuitBreaker(name)
+        return _circuit_breakers[name]
+
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """État de tous les circuit breakers créés"""
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,280 @@
+# ============================================================================
+# DOCUMENTS - Extraction et découpage des documents à indexer
+# ============================================================================
+
+"""
+Extraction de texte (PDF, TXT, MD) et préparation des documents à indexer
+Fonctions pures, importables par les workers du pool d'ingestion
+
+Les gros fichiers sont traités en flux : pages (ou blocs de texte)
+→ chunks (core.chunking) → documents, sans jamais charger le fichier
+complet en mémoire.
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import os
+
+from utils.logger import logger
+from core.chunking import Page, create_chunker, get_token_counter, iter_chunks
+from core.manifest import chunk_id
+
+try:
+    import pypdf
+    from pypdf import PdfReader
+except ImportError:
+    pypdf = None
+    logger.warning("pypdf not installed, PDF support disabled")
+
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+# Au-delà, pas de détection FAQ (elle nécessite le texte complet) : lecture en flux
+STREAMING_THRESHOLD_BYTES = 1024 * 1024
+# Taille des blocs lus dans les fichiers texte
+TEXT_BLOCK_CHARS = 64 * 1024
+
+# Format FAQ : "Q: ... R: ..." ou "Question : ... Réponse : ..."
+QA_PATTERN = re.compile(
+    r"^\s*(?:Q|Question)\s*[:\-]\s*(?P<question>.+?)\s*\n\s*"
+    r"(?:R|A|Réponse|Reponse|Answer)\s*[:\-]\s*(?P<answer>.+?)\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+QA_QUESTION_MARKER = re.compile(r"^\s*(?:Q|Question)\s*[:\-]", re.IGNORECASE | re.MULTILINE)
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list:
+    """Divise le texte en chunks de caractères avec overlap"""
+    return [chunk for chunk, _, _ in iter_chunks([(None, text)], chunk_size, overlap)]
+
+
+def extract_qa_answer(chunk: str):
+    """
+    Détecte un chunk FAQ contenant exactement une paire question/réponse
+
+    Returns:
+        tuple (question, answer) ou None si le chunk n'est pas au format Q/A
+    """
+    if len(QA_QUESTION_MARKER.findall(chunk)) != 1:
+        return None
+    match = QA_PATTERN.match(chunk)
+    if not match:
+        return None
+    return match.group("question").strip(), match.group("answer").strip()
+
+
+def split_qa_pairs(text: str) -> list:
+    """
+    Découpe un document FAQ en un chunk par paire question/réponse
+
+    Returns:
+        list: Chunks Q/A, ou liste vide si le document n'est pas une FAQ
+    """
+    starts = [m.start() for m in QA_QUESTION_MARKER.finditer(text)]
+    if len(starts) < 2:
+        return []
+
+    bounds = starts + [len(text)]
+    pairs = [text[bounds[i]:bounds[i + 1]].strip() for i in range(len(starts))]
+
+    # Le préambule éventuel est conservé comme chunk classique
+    preamble = text[:starts[0]].strip()
+    if not all(QA_PATTERN.match(pair) for pair in pairs):
+        return []
+    return ([preamble] if preamble else []) + pairs
+
+
+def iter_pdf_pages(file_path: str) -> Iterator[Page]:
+    """
+    Extrait le texte d'un PDF page par page (numéros à partir de 1)
+
+    Le fichier est ouvert une seule fois et lu à la demande : PdfReader
+    reçoit le descripteur (avec un chemin, pypdf chargerait tout le
+    fichier). pypdf garde en cache les objets déjà résolus : la mémoire
+    croît avec le nombre de pages extraites, elle n'est pas bornée.
+    """
+    if pypdf is None:
+        raise ImportError("pypdf is required for PDF processing")
+
+    with open(file_path, "rb") as f:
+        reader = PdfReader(f)
+        for index, page in enumerate(reader.pages):
+            yield index + 1, page.extract_text() or ""
+
+
+def iter_text_blocks(file_path: str) -> Iterator[Page]:
+    """Lit un fichier texte par blocs de TEXT_BLOCK_CHARS caractères"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            block = f.read(TEXT_BLOCK_CHARS)
+            if not block:
+                return
+            yield None, block
+
+
+def iter_pages(file_path: str) -> Iterator[Page]:
+    """Flux de (page, texte) d'un fichier supporté"""
+    suffix = Path(file_path).suffix.lower()
+
+    if suffix == '.pdf':
+        return iter_pdf_pages(file_path)
+    elif suffix in ['.txt', '.md']:
+        return iter_text_blocks(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {suffix}")
+
+
+def extract_pdf_text(file_path: str) -> str:
+    """Extrait le texte d'un PDF"""
+    return "".join(text + "\n" for _, text in iter_pdf_pages(file_path))
+
+
+def extract_text(file_path: str) -> str:
+    """Extrait le texte d'un fichier"""
+    path = Path(file_path)
+
+    if path.suffix.lower() == '.pdf':
+        return extract_pdf_text(file_path)
+    elif path.suffix.lower() in ['.txt', '.md']:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix}")
+
+
+def make_document(
+    file_path: str,
+    index: int,
+    chunk: str,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Prépare un document à indexer (id, contenu, métadonnées)
+
+    Args:
+        file_path: Chemin du fichier source
+        index: Position du chunk dans le fichier
+        chunk: Texte du chunk
+        metadata: Métadonnées supplémentaires (pages...)
+
+    Returns:
+        Dict: Document au format de VectorStore.add_documents
+    """
+    path = Path(file_path)
+    document_metadata = {
+        "source": path.name,
+        "chunk_index": index,
+        **(metadata or {})
+    }
+
+    # Marquer les réponses prêtes (fast path du pipeline RAG)
+    qa = extract_qa_answer(chunk)
+    if qa:
+        document_metadata["answer_type"] = "qa"
+        document_metadata["question"] = qa[0]
+        document_metadata["answer"] = qa[1]
+
+    return {
+        "id": chunk_id(file_path, index),
+        "content": chunk,
+        "metadata": document_metadata
+    }
+
+
+def build_documents(file_path: str, chunks: List[str]) -> List[Dict[str, Any]]:
+    """
+    Prépare les documents à indexer d'un fichier déjà découpé
+
+    Args:
+        file_path: Chemin du fichier source
+        chunks: Chunks du fichier dans l'ordre
+
+    Returns:
+        List[Dict]: Documents au format de VectorStore.add_documents
+    """
+    counter = get_token_counter()
+    return [
+        make_document(file_path, i, chunk, {
+            "total_chunks": len(chunks),
+            "token_count": counter.count(chunk)
+        })
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def iter_documents(
+    file_path: str,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    strategy: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Extrait et découpe un fichier en flux de documents
+
+    Les petits fichiers sont lus en entier pour détecter le format FAQ
+    (un chunk par paire Q/A) ; les autres sont découpés page par page.
+    Chaque chunk porte son nombre de tokens (token_count), les pages
+    d'origine pour les PDF (page, page_end) et le chemin des titres
+    pour le Markdown (section).
+
+    Args:
+        file_path: Chemin du fichier
+        chunk_size: Taille des chunks (caractères, stratégie characters)
+        chunk_overlap: Recouvrement entre chunks (caractères)
+        strategy: Stratégie de découpage (défaut : RAG_CHUNK_STRATEGY)
+
+    Yields:
+        Dict: Documents prêts à être vectorisés
+    """
+    chunker = create_chunker(
+        strategy, file_path=file_path, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    pages: Iterable[Page] = iter_pages(file_path)
+
+    if os.path.getsize(file_path) <= STREAMING_THRESHOLD_BYTES:
+        pages = list(pages)
+        qa_chunks = split_qa_pairs("".join(
+            text + "\n" if number is not None else text for number, text in pages
+        ))
+        if qa_chunks:
+            yield from build_documents(file_path, qa_chunks)
+            return
+
+    for index, chunk in enumerate(chunker.split(pages)):
+        metadata: Dict[str, Any] = {"token_count": chunk.token_count}
+        if chunk.page is not None:
+            metadata["page"] = chunk.page
+            metadata["page_end"] = chunk.page_end
+        if chunk.section:
+            metadata["section"] = chunk.section
+        yield make_document(file_path, index, chunk.text, metadata)
+
+
+def process_file(
+    file_path: str,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    strategy: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Extrait et découpe un fichier (tous les documents en mémoire)
+
+    Args:
+        file_path: Chemin du fichier
+        chunk_size: Taille des chunks (caractères, stratégie characters)
+        chunk_overlap: Recouvrement entre chunks (caractères)
+        strategy: Stratégie de découpage
+
+    Returns:
+        List[Dict]: Documents prêts à être vectorisés
+    """
+    return list(iter_documents(file_path, chunk_size, chunk_overlap, strategy))
+
+
+def find_documents(directory: str) -> List[str]:
+    """Liste les fichiers supportés d'un répertoire (récursif, ordre stable)"""
+    return sorted(
+        str(file_path) for file_path in Path(directory).glob("**/*")
+        if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
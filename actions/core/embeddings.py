@@ -7,17 +7,20 @@ Service d'embeddings utilisant l'API OpenAI
 Convertit le texte en vecteurs pour la recherche sémantique
 """
 
-import time
-from typing import List, Optional, Union
-from openai import OpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential
-
 import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
 
 from utils.config import config
+from utils.deadline import Deadline
 from utils.logger import logger
+from utils.metrics import metrics
+from utils.tracing import tracer
+from core.circuit_breaker import get_circuit_breaker
+from core.retry import call_openai
+from core.usage import get_usage_tracker
 
 
 class EmbeddingService:
@@ -28,17 +31,38 @@ class EmbeddingService:
     de haute qualité du texte
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 breaker_name: str = "embeddings"):
         """
         Initialise le service d'embeddings
         
         Args:
             api_key: Clé API OpenAI (optionnel, utilise config si non fourni)
+            model: Modèle d'embedding (défaut : OPENAI_EMBEDDING_MODEL)
+            breaker_name: Circuit breaker utilisé par ce service
         """
         self.api_key = api_key or config.openai.api_key
-        self.model = config.openai.embedding_model
-        self.client = OpenAI(api_key=self.api_key)
+        self.model = model or config.openai.embedding_model
+        # Import différé : openai coûte ~0,9 s au démarrage du serveur
+        from openai import OpenAI
+
+        # Retries gérés par core.retry (deadline + classification des erreurs)
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=config.openai.base_url,
+            timeout=config.openai.timeout,
+            max_retries=0
+        )
         self._dimension = 1536  # Dimension des embeddings ada-002
+        self.breaker = get_circuit_breaker(breaker_name)
+        
+        # Cache LRU des embeddings de requêtes : évite un appel pour une
+        # question répétée et permet une recherche vectorielle circuit ouvert
+        self.cache_size = config.openai.embedding_cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Table commune aux workers (mode multi-worker, voir core.shared_cache)
+        self._shared_cache = None
         
         logger.info(
             "EmbeddingService initialized",
@@ -51,16 +75,13 @@ class EmbeddingService:
         """Dimension des vecteurs d'embedding"""
         return self._dimension
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
-    def embed(self, text: str) -> List[float]:
+    def embed(self, text: str, deadline: Optional[Deadline] = None) -> List[float]:
         """
         Génère un embedding pour un texte donné
         
         Args:
             text: Texte à vectoriser
+            deadline: Deadline de la requête utilisateur
             
         Returns:
             List[float]: Vecteur d'embedding (1536 dimensions)
@@ -75,17 +96,31 @@ class EmbeddingService:
         # Limiter la taille du texte (max 8191 tokens pour ada-002)
         text = text[:8000]  # Approximation sécuritaire
         
+        cleaned = text.replace("\n", " ")
+        cached = self._cache_get(cleaned)
+        if cached is not None:
+            return cached
+        
         start_time = time.time()
         
         try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=text.replace("\n", " ")
-            )
+            with tracer.span("embedding.embed", model=self.model, text_length=len(cleaned)):
+                response = call_openai(
+                    "embed",
+                    lambda timeout: self.client.embeddings.create(
+                        model=self.model,
+                        input=cleaned,
+                        timeout=timeout
+                    ),
+                    deadline,
+                    self.breaker
+                )
             
             embedding = response.data[0].embedding
+            self._cache_put(cleaned, embedding)
             
             duration_ms = (time.time() - start_time) * 1000
+            self._record_usage("embed", response, duration_ms)
             logger.debug(
                 "Embedding generated",
                 text_length=len(text),
@@ -102,16 +137,17 @@ class EmbeddingService:
             )
             raise
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    def embed_batch(
+        self,
+        texts: List[str],
+        deadline: Optional[Deadline] = None
+    ) -> List[List[float]]:
         """
         Génère des embeddings pour plusieurs textes en batch
         
         Args:
             texts: Liste de textes à vectoriser
+            deadline: Deadline optionnelle
             
         Returns:
             List[List[float]]: Liste de vecteurs d'embedding
@@ -134,10 +170,17 @@ class EmbeddingService:
         start_time = time.time()
         
         try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=cleaned_texts
-            )
+            with tracer.span("embedding.embed_batch", model=self.model, count=len(cleaned_texts)):
+                response = call_openai(
+                    "embed_batch",
+                    lambda timeout: self.client.embeddings.create(
+                        model=self.model,
+                        input=cleaned_texts,
+                        timeout=timeout
+                    ),
+                    deadline,
+                    self.breaker
+                )
             
             # Trier par index pour garantir l'ordre
             embeddings = [None] * len(cleaned_texts)
@@ -145,6 +188,7 @@ class EmbeddingService:
                 embeddings[item.index] = item.embedding
             
             duration_ms = (time.time() - start_time) * 1000
+            self._record_usage("embed_batch", response, duration_ms)
             logger.info(
                 f"Batch embeddings generated: {len(embeddings)} vectors",
                 count=len(embeddings),
@@ -161,6 +205,70 @@ class EmbeddingService:
             )
             raise
     
+    def cache_stats(self) -> Dict[str, Any]:
+        """Taille du cache LRU (entrées et mémoire estimée des vecteurs et clés)"""
+        with self._cache_lock:
+            entries = len(self._cache)
+            key_bytes = sum(sys.getsizeof(text) for text in self._cache)
+            vector = next(iter(self._cache.values()), None)
+        # Liste Python : en-tête + un pointeur et un float (24 octets) par dimension
+        vector_bytes = sys.getsizeof(vector) + 24 * len(vector) if vector else 0
+        return {
+            "model": self.model,
+            "entries": entries,
+            "capacity": self.cache_size,
+            "approx_kb": round((key_bytes + entries * vector_bytes) / 1024, 1),
+        }
+
+    def _record_usage(self, operation: str, response, duration_ms: float) -> None:
+        """Transmet les tokens consommés (usage de la réponse) au suivi de coût"""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            get_usage_tracker().record(operation, self.model, usage.prompt_tokens, 0, duration_ms)
+
+    def _shared(self, dimension: Optional[int] = None):
+        """Cache partagé entre processus (None hors mode multi-worker)"""
+        if self._shared_cache is None and config.shared_index.enabled:
+            from core.shared_cache import get_shared_embedding_cache
+            self._shared_cache = get_shared_embedding_cache(self.model, dimension)
+        return self._shared_cache
+
+    def _cache_get(self, text: str) -> Optional[List[float]]:
+        """Embedding en cache pour ce texte (None si absent)"""
+        embedding = None
+        if self.cache_size > 0:
+            with self._cache_lock:
+                embedding = self._cache.get(text)
+                if embedding is not None:
+                    self._cache.move_to_end(text)
+            if embedding is not None:
+                metrics.increment("embedding_cache", result="hit")
+                return embedding
+        shared = self._shared()
+        if shared is not None:
+            embedding = shared.get(text)
+            if embedding is not None:
+                metrics.increment("embedding_cache", result="shared_hit")
+                self._cache_put(text, embedding, shared=False)
+                return embedding
+        if self.cache_size > 0 or shared is not None:
+            metrics.increment("embedding_cache", result="miss")
+        return None
+    
+    def _cache_put(self, text: str, embedding: List[float], shared: bool = True) -> None:
+        """Ajoute un embedding au cache (éviction LRU) et au cache partagé"""
+        if shared:
+            shared_cache = self._shared(len(embedding))
+            if shared_cache is not None:
+                shared_cache.put(text, embedding)
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[text] = embedding
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
     def embed_chunks(
         self, 
         chunks: List[str],
@@ -223,19 +331,41 @@ class EmbeddingService:
 
 # Instance globale du service
 _embedding_service: Optional[EmbeddingService] = None
+# Services des autres modèles (générations de collection)
+_model_services: Dict[str, EmbeddingService] = {}
+_model_services_lock = threading.Lock()
 
 
-def get_embedding_service() -> EmbeddingService:
+def embedding_cache_stats() -> List[Dict[str, Any]]:
+    """Caches de tous les services d'embedding créés"""
+    with _model_services_lock:
+        services = list(_model_services.values())
+    if _embedding_service is not None and _embedding_service not in services:
+        services.insert(0, _embedding_service)
+    return [service.cache_stats() for service in services]
+
+
+def get_embedding_service(model: Optional[str] = None) -> EmbeddingService:
     """
     Récupère l'instance globale du service d'embeddings
     
+    Args:
+        model: Modèle d'embedding (défaut : OPENAI_EMBEDDING_MODEL)
+    
     Returns:
         EmbeddingService: Instance du service
     """
     global _embedding_service
-    if _embedding_service is None:
-        _embedding_service = EmbeddingService()
-    return _embedding_service
+    if model is None or model == config.openai.embedding_model:
+        if _embedding_service is None:
+            with _model_services_lock:
+                if _embedding_service is None:
+                    _embedding_service = EmbeddingService()
+        return _embedding_service
+    with _model_services_lock:
+        if model not in _model_services:
+            _model_services[model] = EmbeddingService(model=model)
+        return _model_services[model]
 
 
 def embed_text(text: str) -> List[float]:
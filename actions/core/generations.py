@@ -0,0 +1,389 @@
+# ============================================================================
+# GENERATIONS - Générations de collection et ré-embedding en arrière-plan
+# ============================================================================
+
+"""
+Générations de la collection ChromaDB
+
+Une génération est une collection physique associée au modèle d'embedding
+qui l'a produite. Le VectorStore lit la génération active ; un alias
+persistant (<collection>.generations.json) désigne laquelle.
+
+Changer de modèle d'embedding ne demande plus --clear + ré-ingestion :
+
+    1. une nouvelle génération est créée à côté de l'active
+    2. ReembeddingJob relit les chunks de l'active et les ré-vectorise
+       à débit limité (REEMBED_RATE), dans un thread d'arrière-plan
+    3. les écritures faites pendant la copie sont rejouées (rattrapage)
+    4. bascule atomique : le VectorStore lit la nouvelle génération
+
+La génération précédente est conservée pour un rollback
+(REEMBED_KEEP_GENERATIONS), les plus anciennes sont supprimées.
+"""
+
+import json
+import time
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+import os
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+from core.circuit_breaker import CLOSED, get_circuit_breaker
+from core.embeddings import EmbeddingService
+from core.usage import usage_scope
+
+
+STATUS_BUILDING = "building"
+STATUS_ACTIVE = "active"
+STATUS_RETIRED = "retired"
+STATUS_FAILED = "failed"
+
+# Rejeux de rattrapage avant la bascule finale (écritures bloquées)
+_MAX_CATCH_UP_ROUNDS = 10
+# Attente quand le circuit des embeddings de service n'est pas fermé
+_BUSY_BACKOFF_SECONDS = 1.0
+
+
+class GenerationError(Exception):
+    """Opération impossible sur une génération"""
+
+
+@dataclass
+class Generation:
+    """Collection physique et modèle d'embedding qui l'a produite"""
+    id: int
+    collection: str
+    embedding_model: str
+    status: str
+    created_at: float = field(default_factory=time.time)
+    activated_at: Optional[float] = None
+    count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class GenerationRegistry:
+    """
+    Alias persistant : générations connues et génération active
+
+    La génération 0 est la collection historique (CHROMA_COLLECTION) ;
+    les suivantes sont nommées <collection>_g<id>.
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str):
+        """
+        Charge (ou initialise) l'alias
+
+        Args:
+            persist_directory: Répertoire ChromaDB
+            collection_name: Nom logique de la collection
+        """
+        self.collection_name = collection_name
+        self.path = os.path.join(persist_directory, f"{collection_name}.generations.json")
+        self._lock = threading.Lock()
+        self._generations: Dict[int, Generation] = {}
+        self._active_id = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            # Collection existante avant les générations : modèle de la config
+            self._generations[0] = Generation(
+                id=0, collection=self.collection_name,
+                embedding_model=config.openai.embedding_model,
+                status=STATUS_ACTIVE, activated_at=time.time()
+            )
+            self._save()
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self._active_id = data["active"]
+        for item in data["generations"]:
+            generation = Generation(**item)
+            self._generations[generation.id] = generation
+
+    def _save(self) -> None:
+        """Écriture atomique (fichier temporaire + rename)"""
+        data = {
+            "collection": self.collection_name,
+            "active": self._active_id,
+            "generations": [g.to_dict() for g in sorted(self._generations.values(), key=lambda g: g.id)],
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def active(self) -> Generation:
+        with self._lock:
+            return self._generations[self._active_id]
+
+    def get(self, generation_id: int) -> Optional[Generation]:
+        with self._lock:
+            return self._generations.get(generation_id)
+
+    def all(self) -> List[Generation]:
+        with self._lock:
+            return sorted(self._generations.values(), key=lambda g: g.id)
+
+    def create(self, embedding_model: str) -> Generation:
+        """Nouvelle génération en construction"""
+        with self._lock:
+            generation_id = max(self._generations) + 1
+            generation = Generation(
+                id=generation_id,
+                collection=f"{self.collection_name}_g{generation_id}",
+                embedding_model=embedding_model,
+                status=STATUS_BUILDING
+            )
+            self._generations[generation_id] = generation
+            self._save()
+            return generation
+
+    def activate(self, generation_id: int, count: Optional[int] = None) -> Generation:
+        """Désigne la génération active ; l'ancienne est gardée pour rollback"""
+        with self._lock:
+            generation = self._generations[generation_id]
+            previous = self._generations[self._active_id]
+            if previous.id != generation_id:
+                previous.status = STATUS_RETIRED
+            generation.status = STATUS_ACTIVE
+            generation.activated_at = time.time()
+            if count is not None:
+                generation.count = count
+            self._active_id = generation_id
+            self._save()
+            return generation
+
+    def set_status(self, generation_id: int, status: str) -> None:
+        with self._lock:
+            self._generations[generation_id].status = status
+            self._save()
+
+    def remove(self, generation_id: int) -> Generation:
+        with self._lock:
+            if generation_id == self._active_id:
+                raise GenerationError("cannot remove the active generation")
+            generation = self._generations.pop(generation_id)
+            self._save()
+            return generation
+
+    def expired(self, keep: int) -> List[Generation]:
+        """Générations au-delà des `keep` plus récemment actives (active comprise)"""
+        with self._lock:
+            kept = sorted(
+                (g for g in self._generations.values() if g.status in (STATUS_ACTIVE, STATUS_RETIRED)),
+                key=lambda g: (g.id == self._active_id, g.activated_at or 0),
+                reverse=True
+            )[:keep]
+            kept_ids = {g.id for g in kept} | {self._active_id}
+            return [
+                g for g in self._generations.values()
+                if g.id not in kept_ids and g.status != STATUS_BUILDING
+            ]
+
+
+class ReembeddingJob:
+    """
+    Ré-vectorise la génération active dans une nouvelle génération, puis bascule
+
+    Les lectures ne sont jamais bloquées ; les écritures le sont uniquement
+    pendant le dernier rejeu (au plus un batch) et la bascule.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        embedding_model: Optional[str] = None,
+        rate_per_second: Optional[float] = None,
+        batch_size: Optional[int] = None
+    ):
+        """
+        Prépare le job
+
+        Args:
+            vector_store: VectorStore à migrer
+            embedding_model: Modèle cible (défaut : OPENAI_EMBEDDING_MODEL)
+            rate_per_second: Chunks par seconde (défaut : REEMBED_RATE)
+            batch_size: Chunks par appel d'embedding (défaut : REEMBED_BATCH_SIZE)
+        """
+        cfg = config.reembedding
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model or config.openai.embedding_model
+        self.rate_per_second = cfg.rate_per_second if rate_per_second is None else rate_per_second
+        self.batch_size = batch_size or cfg.batch_size
+
+        self.status = "queued"  # queued, copying, catching_up, done, failed, cancelled
+        self.generation: Optional[Generation] = None
+        self.total = 0
+        self.copied = 0
+        self.replayed = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Breaker séparé : une panne du job n'ouvre pas le circuit du service
+        self.embedding_service = EmbeddingService(
+            model=self.embedding_model, breaker_name="embeddings_reembed"
+        )
+        self._serving_breaker = get_circuit_breaker("embeddings")
+
+    @property
+    def running(self) -> bool:
+        return self.status in ("queued", "copying", "catching_up")
+
+    def start(self) -> "ReembeddingJob":
+        """Lance le job dans un thread d'arrière-plan"""
+        self._thread = threading.Thread(target=self._run_scoped, name="reembedding", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def _run_scoped(self) -> None:
+        with usage_scope(stage="reembedding"):
+            self.run()
+
+    def run(self) -> "ReembeddingJob":
+        """Copie, rattrapage, bascule (bloquant)"""
+        store = self.vector_store
+        self.started_at = time.time()
+        self.generation = store.generations.create(self.embedding_model)
+        target = store.open_collection(self.generation.collection)
+        source = store.collection
+        store.track_changes()
+        logger.info(
+            "Re-embedding started",
+            generation=self.generation.id,
+            source=source.name,
+            embedding_model=self.embedding_model,
+            rate_per_second=self.rate_per_second
+        )
+        try:
+            self.status = "copying"
+            ids = source.get(include=[])["ids"]
+            self.total = len(ids)
+            for start in range(0, len(ids), self.batch_size):
+                self._throttle()
+                self.copied += self._copy(source, target, ids[start:start + self.batch_size])
+
+            self.status = "catching_up"
+            for _ in range(_MAX_CATCH_UP_ROUNDS):
+                changed = store.drain_changes()
+                if len(changed) <= self.batch_size:
+                    store.restore_changes(changed)
+                    break
+                self.replayed += self._copy(source, target, sorted(changed))
+
+            # Dernier rejeu et bascule sans écriture concurrente
+            with store.write_lock:
+                self.replayed += self._copy(source, target, sorted(store.drain_changes()))
+                self._check_cancelled()
+                store.stop_tracking()
+                store.activate_generation(self.generation.id)
+            self.status = "done"
+            metrics.increment("reembedding_jobs", result="done")
+        except Exception as e:
+            store.stop_tracking()
+            self.status = "cancelled" if self._cancel.is_set() else "failed"
+            self.error = str(e)
+            store.drop_generation(self.generation.id, force=True)
+            metrics.increment("reembedding_jobs", result=self.status)
+            logger.error(f"Re-embedding {self.status}: {e}", generation=self.generation.id)
+        finally:
+            self.finished_at = time.time()
+        if self.status == "done":
+            logger.info(
+                "Re-embedding done",
+                generation=self.generation.id,
+                copied=self.copied,
+                replayed=self.replayed,
+                duration_s=round(self.finished_at - self.started_at, 1)
+            )
+        return self
+
+    def _copy(self, source, target, ids: List[str]) -> int:
+        """Ré-vectorise des chunks de la source ; supprime ceux qui n'y sont plus"""
+        if not ids:
+            return 0
+        self._check_cancelled()
+        result = source.get(ids=ids, include=["documents", "metadatas"])
+        missing = list(set(ids) - set(result["ids"]))
+        if missing:
+            target.delete(ids=missing)
+        if not result["ids"]:
+            return 0
+        embeddings = self.embedding_service.embed_batch(result["documents"])
+        target.upsert(
+            ids=result["ids"],
+            embeddings=embeddings,
+            documents=result["documents"],
+            metadatas=[metadata or {} for metadata in result["metadatas"]]
+        )
+        metrics.increment("reembedded_chunks", value=len(result["ids"]))
+        return len(result["ids"])
+
+    def _throttle(self) -> None:
+        """Débit limité ; pause tant que les embeddings du service sont en difficulté"""
+        while self._serving_breaker is not None and self._serving_breaker.state != CLOSED:
+            self._check_cancelled()
+            time.sleep(_BUSY_BACKOFF_SECONDS)
+        if self.rate_per_second <= 0:
+            return
+        ahead = self.copied / self.rate_per_second - (time.time() - self.started_at)
+        if ahead > 0:
+            self._cancel.wait(ahead)
+        self._check_cancelled()
+
+    def _check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise GenerationError("cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "status": self.status,
+            "generation": self.generation.id if self.generation else None,
+            "embedding_model": self.embedding_model,
+            "total": self.total,
+            "copied": self.copied,
+            "replayed": self.replayed,
+            "rate_per_second": self.rate_per_second,
+            "error": self.error,
+            "duration_s": round(end - self.started_at, 1) if self.started_at else 0,
+        }
+
+
+# Job courant (un seul à la fois par processus)
+_job: Optional[ReembeddingJob] = None
+_job_lock = threading.Lock()
+
+
+def start_reembedding(vector_store, **kwargs: Any) -> ReembeddingJob:
+    """
+    Lance un ré-embedding en arrière-plan
+
+    Raises:
+        GenerationError: Si un job est déjà en cours
+    """
+    global _job
+    with _job_lock:
+        if _job is not None and _job.running:
+            raise GenerationError("a re-embedding job is already running")
+        _job = ReembeddingJob(vector_store, **kwargs).start()
+        return _job
+
+
+def get_reembedding_job() -> Optional[ReembeddingJob]:
+    """Job en cours ou dernier job terminé"""
+    return _job
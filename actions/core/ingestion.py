@@ -0,0 +1,499 @@
+# ============================================================================
+# INGESTION - Pipeline parallèle d'indexation des documents
+# ============================================================================
+
+"""
+Ingestion pipelinée des documents dans le vector store
+
+    fichiers ──▶ [processus]  extraction + découpage en flux (CPU)
+             ──▶ file bornée ──▶ [threads] embeddings par batch (réseau)
+             ──▶ file bornée ──▶ [writer]  écriture ChromaDB par batch
+
+Les workers d'extraction envoient les chunks par batch dès qu'ils sont
+découpés : un fichier n'est jamais chargé en entier. Les files bornées
+propagent la contre-pression jusqu'à la lecture des pages.
+
+Avec un manifeste (core.manifest), chaque batch écrit est enregistré :
+une ingestion interrompue reprend sans re-vectoriser les chunks écrits
+et les fichiers inchangés sont ignorés.
+"""
+
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+from core.documents import iter_documents
+from core.manifest import IngestionManifest
+from core.usage import usage_scope
+
+
+# Fin de flux entre deux étapes
+_DONE = None
+
+# (chemin du fichier, document) : le chemin suit le chunk jusqu'à l'écriture
+Batch = List[Tuple[str, Dict[str, Any]]]
+
+# Délai d'attente des résultats avant de vérifier que les workers sont vivants
+_WORKER_POLL_SECONDS = 1.0
+
+# Workers d'extraction démarrés par spawn : un fork hériterait des locks
+# tenus par les threads du pipeline (embeddings, writer, logs, usage)
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _extract_worker(tasks, results, chunk_size: int, chunk_overlap: int,
+                    strategy: Optional[str], batch_size: int) -> None:
+    """
+    Worker d'extraction : découpe les fichiers reçus et envoie les chunks par batch
+
+    Tâches reçues : (fichier, ids des chunks déjà écrits à ignorer).
+    Messages envoyés : ("start", fichier, pid), ("chunks", fichier, documents),
+    ("done", fichier, (chunks envoyés, chunks ignorés)), ("error", fichier, message).
+    """
+    pid = os.getpid()
+    while True:
+        task = tasks.get()
+        if task is _DONE:
+            return
+        file_path, skip_ids = task
+        results.put(("start", file_path, pid))
+        count = 0
+        skipped = 0
+        batch: List[Dict[str, Any]] = []
+        try:
+            for document in iter_documents(file_path, chunk_size, chunk_overlap, strategy):
+                if not document["content"].strip():
+                    continue
+                if skip_ids and document["id"] in skip_ids:
+                    skipped += 1
+                    continue
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    # put() bloque quand le pipeline est en retard
+                    results.put(("chunks", file_path, batch))
+                    count += len(batch)
+                    batch = []
+            if batch:
+                results.put(("chunks", file_path, batch))
+                count += len(batch)
+        except Exception as e:
+            results.put(("error", file_path, f"extraction: {e}"))
+            continue
+        results.put(("done", file_path, (count, skipped)))
+
+
+@dataclass
+class IngestionStats:
+    """Compteurs et débits d'une ingestion"""
+    files_total: int = 0
+    files_done: int = 0
+    files_unchanged: int = 0
+    chunks: int = 0
+    chunks_resumed: int = 0
+    embeddings: int = 0
+    written: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.monotonic() - self.started_at, 1e-6)
+
+    def rates(self) -> Dict[str, float]:
+        """Débits depuis le démarrage"""
+        return {
+            "files_per_s": round(self.files_done / self.elapsed, 2),
+            "chunks_per_s": round(self.chunks / self.elapsed, 2),
+            "embeddings_per_s": round(self.embeddings / self.elapsed, 2),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "files_failed": len(self.failed),
+            "files_unchanged": self.files_unchanged,
+            "chunks": self.chunks,
+            "chunks_resumed": self.chunks_resumed,
+            "embeddings": self.embeddings,
+            "written": self.written,
+            "elapsed_s": round(self.elapsed, 2),
+            **self.rates(),
+        }
+
+
+class IngestionPipeline:
+    """
+    Ingestion parallèle : extraction multi-processus, embeddings concurrents,
+    écriture par batch dans le vector store
+    """
+
+    def __init__(
+        self,
+        vector_store=None,
+        embedding_service=None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        strategy: Optional[str] = None,
+        extract_workers: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        manifest: Optional[IngestionManifest] = None,
+        progress_interval: float = 5.0
+    ):
+        """
+        Initialise le pipeline
+
+        Args:
+            vector_store: Vector store cible (défaut : instance globale)
+            embedding_service: Service d'embeddings (défaut : celui de la
+                génération active du vector store, relu à chaque batch)
+            chunk_size: Taille des chunks
+            chunk_overlap: Recouvrement entre chunks
+            strategy: Stratégie de découpage (défaut : RAG_CHUNK_STRATEGY)
+            extract_workers: Processus d'extraction (défaut : nombre de CPU)
+            embed_workers: Threads d'embedding
+            batch_size: Chunks par appel d'embedding et par écriture
+            queue_size: Batches en attente entre deux étapes
+            manifest: Manifeste pour la reprise et l'ingestion incrémentale
+            progress_interval: Intervalle des logs de progression (secondes)
+        """
+        if vector_store is None:
+            from core.vector_store import get_vector_store
+            vector_store = get_vector_store()
+        self.vector_store = vector_store
+        self.embedding_service = embedding_service
+
+        cfg = config.ingestion
+        self.chunk_size = chunk_size or config.rag.chunk_size
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else config.rag.chunk_overlap
+        self.strategy = strategy or config.rag.chunk_strategy
+        self.extract_workers = extract_workers or cfg.extract_workers or os.cpu_count() or 1
+        self.embed_workers = embed_workers or cfg.embed_workers
+        self.batch_size = batch_size or cfg.batch_size
+        self.queue_size = queue_size or cfg.queue_size
+        self.manifest = manifest
+        self.progress_interval = progress_interval
+
+        self.stats = IngestionStats()
+        self._lock = threading.Lock()
+        # Chunks restant à écrire par fichier (fichier terminé à 0)
+        self._pending: Dict[str, int] = {}
+        # Fichiers dont tous les chunks ont été découpés
+        self._extracted: Set[str] = set()
+
+    def run(self, files: List[str], force: bool = False,
+            retry_failed: bool = True) -> IngestionStats:
+        """
+        Ingère une liste de fichiers
+
+        Args:
+            files: Chemins des fichiers à ingérer
+            force: Retraiter aussi les fichiers inchangés (avec manifeste)
+            retry_failed: Reprendre les fichiers en échec inchangés (avec manifeste)
+
+        Returns:
+            IngestionStats: Compteurs, débits et fichiers en échec
+        """
+        skip_ids: Dict[str, Set[str]] = {}
+        unchanged = 0
+        if self.manifest is not None:
+            plan = self.manifest.plan(files, force=force, retry_failed=retry_failed)
+            if plan.stale_ids:
+                # Chunks de l'ancienne version des fichiers modifiés
+                self.vector_store.delete_documents(plan.stale_ids)
+            logger.info(
+                "Ingestion plan",
+                new=plan.new,
+                changed=plan.changed,
+                resumed=plan.resumed,
+                unchanged=plan.unchanged,
+                stale_chunks=len(plan.stale_ids)
+            )
+            files, skip_ids, unchanged = plan.to_ingest, plan.skip_ids, plan.unchanged
+
+        self.stats = IngestionStats(files_total=len(files), files_unchanged=unchanged)
+        self._pending = {}
+        self._extracted = set()
+        if not files:
+            logger.info("Ingestion complete: nothing to do", files_unchanged=unchanged)
+            return self.stats
+
+        embed_queue: "queue.Queue[Optional[Batch]]" = queue.Queue(maxsize=self.queue_size)
+        write_queue: "queue.Queue[Optional[Tuple[Batch, List[List[float]]]]]" = queue.Queue(
+            maxsize=self.queue_size
+        )
+
+        embedders = [
+            threading.Thread(
+                target=self._embed_loop, args=(embed_queue, write_queue),
+                name=f"ingest-embed-{i}", daemon=True
+            )
+            for i in range(self.embed_workers)
+        ]
+        writer = threading.Thread(
+            target=self._write_loop, args=(write_queue,), name="ingest-writer", daemon=True
+        )
+        stop_progress = threading.Event()
+        progress = threading.Thread(
+            target=self._progress_loop, args=(stop_progress, embed_queue, write_queue),
+            name="ingest-progress", daemon=True
+        )
+
+        logger.info(
+            "Ingestion started",
+            files=len(files),
+            extract_workers=self.extract_workers,
+            embed_workers=self.embed_workers,
+            batch_size=self.batch_size,
+            strategy=self.strategy
+        )
+
+        for thread in embedders + [writer, progress]:
+            thread.start()
+
+        try:
+            self._extract(files, skip_ids, embed_queue)
+        finally:
+            for _ in embedders:
+                embed_queue.put(_DONE)
+            for thread in embedders:
+                thread.join()
+            write_queue.put(_DONE)
+            writer.join()
+            stop_progress.set()
+            progress.join()
+
+        logger.info("Ingestion complete", **self.stats.to_dict())
+        for file_path, error in self.stats.failed.items():
+            logger.error(f"Ingestion failed: {file_path}", error=error)
+        return self.stats
+
+    # ------------------------------------------------------------------
+    # Étape 1 : extraction + découpage (processus)
+    # ------------------------------------------------------------------
+
+    def _extract(self, files: List[str], skip_ids: Dict[str, Set[str]],
+                 embed_queue: "queue.Queue") -> None:
+        """Distribue les fichiers aux workers et relaie leurs batches de chunks"""
+        tasks = _MP_CONTEXT.Queue()
+        # File bornée : les workers s'arrêtent de lire quand le pipeline sature
+        results = _MP_CONTEXT.Queue(maxsize=self.queue_size)
+        workers = [
+            _MP_CONTEXT.Process(
+                target=_extract_worker,
+                args=(
+                    tasks, results, self.chunk_size, self.chunk_overlap,
+                    self.strategy, self.batch_size
+                ),
+                name=f"ingest-extract-{i}",
+                daemon=True
+            )
+            for i in range(min(self.extract_workers, max(len(files), 1)))
+        ]
+        for file_path in files:
+            tasks.put((file_path, skip_ids.get(file_path)))
+        for _ in workers:
+            tasks.put(_DONE)
+        for worker in workers:
+            worker.start()
+
+        remaining = set(files)
+        # Fichier en cours par worker, pour détecter les workers morts
+        current: Dict[int, str] = {}
+        try:
+            while remaining:
+                try:
+                    kind, file_path, payload = results.get(timeout=_WORKER_POLL_SECONDS)
+                except queue.Empty:
+                    self._reap_workers(workers, current, remaining)
+                    continue
+
+                if kind == "start":
+                    current[payload] = file_path
+                    if self.manifest is not None:
+                        self.manifest.begin(file_path)
+                    with self._lock:
+                        self._pending[file_path] = 0
+                elif kind == "chunks":
+                    batch = [(file_path, document) for document in payload]
+                    with self._lock:
+                        self.stats.chunks += len(batch)
+                        if file_path in self._pending:
+                            self._pending[file_path] += len(batch)
+                    embed_queue.put(batch)
+                elif kind == "done":
+                    remaining.discard(file_path)
+                    with self._lock:
+                        self.stats.chunks_resumed += payload[1]
+                    self._extraction_done(file_path)
+                elif kind == "error":
+                    remaining.discard(file_path)
+                    self._fail(file_path, payload)
+        finally:
+            for worker in workers:
+                worker.join(timeout=_WORKER_POLL_SECONDS)
+                if worker.is_alive():
+                    worker.terminate()
+
+    def _reap_workers(self, workers: List[Any], current: Dict[int, str],
+                      remaining: Set[str]) -> None:
+        """Met en échec les fichiers des workers morts (mémoire, signal...)"""
+        for worker in workers:
+            if worker.is_alive() or worker.pid not in current:
+                continue
+            file_path = current.pop(worker.pid)
+            if file_path in remaining:
+                remaining.discard(file_path)
+                self._fail(file_path, f"extraction: worker exited with code {worker.exitcode}")
+
+        if remaining and not any(worker.is_alive() for worker in workers):
+            for file_path in list(remaining):
+                self._fail(file_path, "extraction: no worker left")
+            remaining.clear()
+
+    # ------------------------------------------------------------------
+    # Étape 2 : embeddings (threads, I/O réseau)
+    # ------------------------------------------------------------------
+
+    def _embed_loop(self, embed_queue: "queue.Queue", write_queue: "queue.Queue") -> None:
+        while True:
+            batch = embed_queue.get()
+            if batch is _DONE:
+                return
+            batch = self._skip_failed(batch)
+            if not batch:
+                continue
+            service = self.embedding_service or self.vector_store.embedding_service
+            try:
+                with metrics.timer("ingest_embed_batch_ms"), usage_scope(stage="ingestion"):
+                    embeddings = service.embed_batch(
+                        [document["content"] for _, document in batch]
+                    )
+            except Exception as e:
+                self._fail_batch(batch, f"embedding: {e}")
+                continue
+            with self._lock:
+                self.stats.embeddings += len(embeddings)
+            write_queue.put((batch, embeddings, service.model))
+
+    # ------------------------------------------------------------------
+    # Étape 3 : écriture (un seul thread, ChromaDB)
+    # ------------------------------------------------------------------
+
+    def _write_loop(self, write_queue: "queue.Queue") -> None:
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                return
+            batch, embeddings, model = item
+            try:
+                with metrics.timer("ingest_write_batch_ms"):
+                    self.vector_store.add_documents(
+                        [document for _, document in batch],
+                        embeddings=embeddings,
+                        embedding_model=model
+                    )
+            except Exception as e:
+                self._fail_batch(batch, f"write: {e}")
+                continue
+            self._committed(batch)
+
+    # ------------------------------------------------------------------
+    # Suivi par fichier
+    # ------------------------------------------------------------------
+
+    def _committed(self, batch: Batch) -> None:
+        """Met à jour les compteurs après l'écriture d'un batch"""
+        if self.manifest is not None:
+            batch_ids: Dict[str, List[str]] = {}
+            for file_path, document in batch:
+                batch_ids.setdefault(file_path, []).append(document["id"])
+            self.manifest.checkpoint(batch_ids)
+
+        completed = []
+        with self._lock:
+            self.stats.written += len(batch)
+            for file_path, _ in batch:
+                if file_path in self._pending:
+                    self._pending[file_path] -= 1
+                    if self._pending[file_path] == 0 and file_path in self._extracted:
+                        completed.append(file_path)
+        for file_path in completed:
+            self._file_done(file_path)
+
+    def _extraction_done(self, file_path: str) -> None:
+        """Fin du découpage d'un fichier : terminé si tout est déjà écrit"""
+        with self._lock:
+            if file_path not in self._pending:
+                # Fichier déjà en échec
+                return
+            self._extracted.add(file_path)
+            completed = self._pending[file_path] == 0
+        if completed:
+            self._file_done(file_path)
+
+    def _file_done(self, file_path: str) -> None:
+        with self._lock:
+            self._pending.pop(file_path, None)
+            self._extracted.discard(file_path)
+            self.stats.files_done += 1
+        if self.manifest is not None:
+            self.manifest.complete(file_path)
+        metrics.increment("ingest_files", status="done")
+
+    def _fail(self, file_path: str, error: str) -> None:
+        with self._lock:
+            if file_path in self.stats.failed:
+                return
+            self.stats.failed[file_path] = error
+            self._pending.pop(file_path, None)
+            self._extracted.discard(file_path)
+        if self.manifest is not None:
+            self.manifest.fail(file_path, error)
+        metrics.increment("ingest_files", status="failed")
+
+    def _fail_batch(self, batch: Batch, error: str) -> None:
+        for file_path in {file_path for file_path, _ in batch}:
+            self._fail(file_path, error)
+
+    def _skip_failed(self, batch: Batch) -> Batch:
+        """Retire les chunks des fichiers déjà en échec"""
+        with self._lock:
+            failed: Set[str] = set(self.stats.failed)
+        return [item for item in batch if item[0] not in failed]
+
+    def _progress_loop(self, stop: threading.Event, embed_queue: "queue.Queue",
+                       write_queue: "queue.Queue") -> None:
+        while not stop.wait(self.progress_interval):
+            with self._lock:
+                snapshot = self.stats.to_dict()
+            logger.info(
+                f"Ingestion progress: {snapshot['files_done']}/{snapshot['files_total']} files",
+                embed_queue=embed_queue.qsize(),
+                write_queue=write_queue.qsize(),
+                **snapshot
+            )
+
+
+def ingest_files(files: List[str], vector_store=None, **kwargs: Any) -> IngestionStats:
+    """
+    Fonction utilitaire : ingère des fichiers avec le pipeline parallèle
+
+    Args:
+        files: Chemins des fichiers
+        vector_store: Vector store cible (défaut : instance globale)
+        **kwargs: Options de IngestionPipeline
+
+    Returns:
+        IngestionStats: Résultat de l'ingestion
+    """
+    return IngestionPipeline(vector_store=vector_store, **kwargs).run(files)
@@ -8,16 +8,17 @@ Gère les appels à GPT-4 pour la génération de réponses
 """
 
 import time
+import threading
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential
-
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.config import config
+from utils.deadline import Deadline
 from utils.logger import logger
+from utils.tracing import tracer
+from core.circuit_breaker import get_circuit_breaker
+from core.usage import get_usage_tracker
+from core.retry import call_openai
+from core.prompts import get_prompt_registry
 
 
 class LLMClient:
@@ -28,23 +29,52 @@ class LLMClient:
         self.model = config.openai.model
         self.max_tokens = config.openai.max_tokens
         self.temperature = config.openai.temperature
-        self.client = OpenAI(api_key=self.api_key)
+        # Import différé (voir EmbeddingService)
+        from openai import OpenAI
+
+        # Retries gérés par core.retry (deadline + classification des erreurs)
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=config.openai.base_url,
+            timeout=config.openai.timeout,
+            max_retries=0
+        )
+        self.breaker = get_circuit_breaker("llm")
+        # Templates chargés et pré-compilés une fois au démarrage
+        self.prompts = get_prompt_registry()
         logger.info("LLMClient initialized", model=self.model)
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def generate(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None, 
-                 temperature: Optional[float] = None, stop: Optional[List[str]] = None) -> str:
+                 temperature: Optional[float] = None, stop: Optional[List[str]] = None,
+                 model: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
         start_time = time.time()
+        model = model or self.model
         try:
-            response = self.client.chat.completions.create(
-                model=self.model, messages=messages,
-                max_tokens=max_tokens or self.max_tokens,
-                temperature=temperature if temperature is not None else self.temperature,
-                stop=stop
-            )
+            with tracer.span("llm.generate", model=model, max_tokens=max_tokens or self.max_tokens) as span:
+                response = call_openai(
+                    "chat",
+                    lambda timeout: self.client.chat.completions.create(
+                        model=model, messages=messages,
+                        max_tokens=max_tokens or self.max_tokens,
+                        temperature=temperature if temperature is not None else self.temperature,
+                        stop=stop, timeout=timeout
+                    ),
+                    deadline,
+                    self.breaker
+                )
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    span.set(
+                        prompt_tokens=usage.prompt_tokens,
+                        completion_tokens=usage.completion_tokens
+                    )
             content = response.choices[0].message.content
             duration_ms = (time.time() - start_time) * 1000
-            logger.info("LLM response generated", model=self.model, duration_ms=round(duration_ms, 2))
+            if usage is not None:
+                get_usage_tracker().record(
+                    "chat", model, usage.prompt_tokens, usage.completion_tokens, duration_ms
+                )
+            logger.info("LLM response generated", model=model, duration_ms=round(duration_ms, 2))
             return content or ""
         except Exception as e:
             logger.error(f"Erreur LLM: {str(e)}", exc_info=True)
@@ -61,25 +91,23 @@ class LLMClient:
         return self.generate(messages, **kwargs)
     
     def generate_with_context(self, query: str, context: str, 
-                               system_prompt: Optional[str] = None) -> str:
-        default_system = """Tu es un assistant Sofrecom. Réponds UNIQUEMENT avec le contexte fourni.
-Si l'info n'est pas dans le contexte, dis: "Je n'ai pas trouvé cette information."
-Règles: français, concis, précis, ne jamais inventer."""
-        
-        user_msg = f"CONTEXTE:\n{context}\n\nQUESTION: {query}\n\nRéponds en utilisant le contexte."
-        messages = [
-            {"role": "system", "content": system_prompt or default_system},
-            {"role": "user", "content": user_msg}
-        ]
-        return self.generate(messages)
+                               system_prompt: Optional[str] = None,
+                               model: Optional[str] = None,
+                               max_tokens: Optional[int] = None,
+                               deadline: Optional[Deadline] = None) -> str:
+        messages = self.prompts.build_rag_messages(query, context, system_prompt)
+        return self.generate(messages, max_tokens=max_tokens, model=model, deadline=deadline)
 
 
 _llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
 
 def get_llm_client() -> LLMClient:
     global _llm_client
     if _llm_client is None:
-        _llm_client = LLMClient()
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient()
     return _llm_client
 
 llm_client = get_llm_client
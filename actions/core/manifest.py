@@ -0,0 +1,297 @@
+# ============================================================================
+# MANIFEST - État persistant de l'ingestion par fichier
+# ============================================================================
+
+"""
+Manifeste d'ingestion (SQLite) : un enregistrement par fichier source
+
+    chemin, taille, mtime, hash du contenu, ids des chunks écrits, statut
+
+Le pipeline y enregistre chaque batch écrit (checkpoint). Une ingestion
+interrompue reprend là où elle s'est arrêtée : les fichiers inchangés sont
+ignorés, les chunks déjà écrits ne sont pas re-vectorisés, et seuls les
+fichiers en échec ou modifiés sont retraités.
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+import os
+
+from utils.config import config
+
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_HASH_BLOCK_BYTES = 1024 * 1024
+# Caractères du hash de chemin dans les ids de chunks
+_CHUNK_ID_HASH_CHARS = 10
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        sha256 TEXT NOT NULL,
+        status TEXT NOT NULL,
+        error TEXT,
+        updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chunks (
+        path TEXT NOT NULL,
+        chunk_id TEXT NOT NULL,
+        PRIMARY KEY (path, chunk_id)
+    )
+    """,
+)
+
+
+@dataclass
+class FileState:
+    """État d'un fichier dans le manifeste"""
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    status: str
+    chunk_ids: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestionPlan:
+    """Fichiers à (re)traiter et chunks obsolètes à supprimer"""
+    to_ingest: List[str] = field(default_factory=list)
+    # Chunks déjà écrits à ne pas re-vectoriser (reprise)
+    skip_ids: Dict[str, Set[str]] = field(default_factory=dict)
+    # Chunks d'une version précédente du fichier
+    stale_ids: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    new: int = 0
+    changed: int = 0
+    resumed: int = 0
+
+
+def file_sha256(file_path: str) -> str:
+    """Hash SHA-256 du contenu d'un fichier (lecture par blocs)"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_key(file_path: str) -> str:
+    """Clé d'un fichier dans le manifeste (chemin absolu)"""
+    return os.path.abspath(file_path)
+
+
+def chunk_id(file_path: str, index: int) -> str:
+    """
+    Id d'un chunk : nom du fichier, hash court de sa clé de manifeste, position
+
+    Deux fichiers de même nom dans des dossiers différents n'écrivent pas
+    sur les mêmes ids.
+    """
+    digest = hashlib.sha256(manifest_key(file_path).encode("utf-8")).hexdigest()
+    return f"{Path(file_path).stem}_{digest[:_CHUNK_ID_HASH_CHARS]}_{index}"
+
+
+class IngestionManifest:
+    """
+    Manifeste d'ingestion partagé entre le thread principal et le writer
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Ouvre (ou crée) le manifeste
+
+        Args:
+            path: Fichier SQLite (défaut : INGEST_MANIFEST_PATH)
+        """
+        self.path = path or config.ingestion.manifest_path
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        # (taille, mtime, hash, repartir de zéro) des fichiers planifiés
+        self._fingerprints: Dict[str, tuple] = {}
+
+    def get(self, file_path: str) -> Optional[FileState]:
+        """État enregistré d'un fichier"""
+        key = self._key(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, mtime, sha256, status, error FROM files WHERE path = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            chunk_ids = [
+                chunk_id for (chunk_id,) in
+                self._conn.execute("SELECT chunk_id FROM chunks WHERE path = ?", (key,))
+            ]
+        return FileState(
+            path=row[0], size=row[1], mtime=row[2], sha256=row[3],
+            status=row[4], chunk_ids=chunk_ids, error=row[5]
+        )
+
+    def all(self) -> List[FileState]:
+        """Tous les fichiers enregistrés"""
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute("SELECT path FROM files ORDER BY path")]
+        return [state for state in map(self.get, paths) if state is not None]
+
+    def plan(self, files: Iterable[str], force: bool = False,
+             retry_failed: bool = True) -> IngestionPlan:
+        """
+        Compare les fichiers au manifeste
+
+        Taille et mtime identiques → inchangé sans relire le fichier ;
+        sinon le hash décide (un simple touch ne relance pas l'ingestion).
+
+        Args:
+            files: Fichiers candidats
+            force: Tout retraiter, sans reprise
+            retry_failed: Reprendre les fichiers en échec même s'ils n'ont pas changé
+
+        Returns:
+            IngestionPlan: Fichiers à traiter, chunks à ignorer ou à supprimer
+        """
+        settled = {STATUS_DONE} if retry_failed else {STATUS_DONE, STATUS_FAILED}
+        plan = IngestionPlan()
+        for file_path in files:
+            stat = os.stat(file_path)
+            state = self.get(file_path)
+
+            if (state and not force and state.status in settled
+                    and state.size == stat.st_size and state.mtime == stat.st_mtime):
+                plan.unchanged += 1
+                continue
+
+            sha256 = file_sha256(file_path)
+            reset = state is not None and (force or state.sha256 != sha256)
+            self._fingerprints[self._key(file_path)] = (stat.st_size, stat.st_mtime, sha256, reset)
+
+            if state is None:
+                plan.new += 1
+            elif reset:
+                plan.changed += 1
+                plan.stale_ids.extend(state.chunk_ids)
+            elif state.status == STATUS_DONE:
+                # Seul le mtime a changé
+                self._touch(file_path, stat.st_size, stat.st_mtime)
+                plan.unchanged += 1
+                continue
+            else:
+                # Même contenu, ingestion interrompue ou en échec : reprise
+                plan.resumed += 1
+                plan.skip_ids[file_path] = set(state.chunk_ids)
+
+            plan.to_ingest.append(file_path)
+        return plan
+
+    def missing(self, root: str, files: Iterable[str]) -> List[FileState]:
+        """Fichiers enregistrés sous `root` qui n'existent plus"""
+        root_key = self._key(root).rstrip(os.sep) + os.sep
+        present = {self._key(file_path) for file_path in files}
+        return [
+            state for state in self.all()
+            if state.path.startswith(root_key) and state.path not in present
+        ]
+
+    # ------------------------------------------------------------------
+    # Mises à jour (appelées par le pipeline)
+    # ------------------------------------------------------------------
+
+    def begin(self, file_path: str) -> None:
+        """Début (ou reprise) du traitement d'un fichier"""
+        key = self._key(file_path)
+        fingerprint = self._fingerprints.pop(key, None)
+        if fingerprint is None:
+            stat = os.stat(file_path)
+            fingerprint = (stat.st_size, stat.st_mtime, file_sha256(file_path), False)
+        size, mtime, sha256, reset = fingerprint
+
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM files WHERE path = ?", (key,)).fetchone()
+            if reset or (row is not None and row[0] != sha256):
+                # Les chunks de l'ancien contenu ont été supprimés par l'appelant
+                self._conn.execute("DELETE FROM chunks WHERE path = ?", (key,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(path, size, mtime, sha256, status, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, NULL, ?)",
+                (key, size, mtime, sha256, STATUS_IN_PROGRESS, time.time())
+            )
+            self._conn.commit()
+
+    def checkpoint(self, batch_ids: Dict[str, List[str]]) -> None:
+        """Enregistre les chunks d'un batch écrit dans le vector store"""
+        with self._lock:
+            for file_path, ids in batch_ids.items():
+                key = self._key(file_path)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO chunks (path, chunk_id) VALUES (?, ?)",
+                    [(key, chunk_id) for chunk_id in ids]
+                )
+                self._conn.execute(
+                    "UPDATE files SET updated_at = ? WHERE path = ?", (time.time(), key)
+                )
+            self._conn.commit()
+
+    def complete(self, file_path: str) -> None:
+        self._set_status(file_path, STATUS_DONE, None)
+
+    def fail(self, file_path: str, error: str) -> None:
+        self._set_status(file_path, STATUS_FAILED, error)
+
+    def remove(self, file_path: str) -> None:
+        key = self._key(file_path)
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE path = ?", (key,))
+            self._conn.execute("DELETE FROM files WHERE path = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _set_status(self, file_path: str, status: str, error: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET status = ?, error = ?, updated_at = ? WHERE path = ?",
+                (status, error, time.time(), self._key(file_path))
+            )
+            self._conn.commit()
+
+    def _touch(self, file_path: str, size: int, mtime: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET size = ?, mtime = ?, updated_at = ? WHERE path = ?",
+                (size, mtime, time.time(), self._key(file_path))
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return manifest_key(file_path)
+
+    def summary(self) -> Dict[str, int]:
+        """Nombre de fichiers par statut"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
@@ -0,0 +1,174 @@
+# ============================================================================
+# MODEL ROUTER - Routage des requêtes entre modèles LLM
+# ============================================================================
+
+"""
+Routage LLM par complexité et budget de latence
+Choisit entre un modèle rapide/économique et le modèle puissant
+selon la taille du contexte, le nombre de sources distinctes,
+la longueur de la question et le budget de latence restant
+"""
+
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+# Réponse du LLM quand le contexte ne contient pas l'information
+NOT_FOUND_SENTINEL = "je n'ai pas trouvé"
+
+FAST_TIER = "fast"
+STRONG_TIER = "strong"
+
+# Raison de routage quand le budget tokens de l'utilisateur est dépassé
+BUDGET_REASON = "token_budget"
+
+
+@dataclass
+class ModelTier:
+    """Niveau de modèle LLM"""
+    name: str
+    model: str
+    max_tokens: int
+
+
+@dataclass
+class RoutingDecision:
+    """Décision de routage pour une requête"""
+    tier: ModelTier
+    reason: str
+    context_tokens: int
+    num_sources: int
+    query_words: int
+
+
+class ModelRouter:
+    """
+    Routeur entre le modèle rapide et le modèle puissant
+
+    Règles (dans l'ordre) :
+    0. Budget tokens de l'utilisateur dépassé → modèle rapide, sans escalade
+    1. Routage désactivé → modèle puissant
+    2. Budget de latence inférieur au p95 du modèle puissant → modèle rapide
+    3. Contexte, sources et question sous les seuils → modèle rapide
+    4. Sinon → modèle puissant
+    """
+
+    def __init__(self):
+        self.enabled = config.routing.enabled
+        self.fast = ModelTier(
+            name=FAST_TIER,
+            model=config.routing.fast_model,
+            max_tokens=config.routing.fast_max_tokens
+        )
+        self.strong = ModelTier(
+            name=STRONG_TIER,
+            model=config.openai.model,
+            max_tokens=config.openai.max_tokens
+        )
+        self.max_context_tokens = config.routing.fast_max_context_tokens
+        self.max_sources = config.routing.fast_max_sources
+        self.max_query_words = config.routing.fast_max_query_words
+        self.escalate_on_not_found = config.routing.escalate_on_not_found
+
+        logger.info(
+            "ModelRouter initialized",
+            enabled=self.enabled,
+            fast_model=self.fast.model,
+            strong_model=self.strong.model
+        )
+
+    def route(
+        self,
+        query: str,
+        context_tokens: int,
+        results: Optional[List[Any]] = None,
+        latency_budget_ms: Optional[float] = None,
+        over_budget: bool = False
+    ) -> RoutingDecision:
+        """
+        Choisit le modèle pour une requête
+
+        Args:
+            query: Question de l'utilisateur
+            context_tokens: Taille du contexte en tokens
+            results: Résultats de recherche utilisés pour le contexte
+            latency_budget_ms: Budget de latence restant (None = illimité)
+            over_budget: Budget tokens journalier de l'utilisateur dépassé
+
+        Returns:
+            RoutingDecision: Niveau choisi et raison
+        """
+        num_sources = len({r.metadata.get("source", r.id) for r in results or []})
+        query_words = len(query.split())
+
+        def decide(tier: ModelTier, reason: str) -> RoutingDecision:
+            metrics.increment("llm_route", tier=tier.name, reason=reason)
+            return RoutingDecision(
+                tier=tier,
+                reason=reason,
+                context_tokens=context_tokens,
+                num_sources=num_sources,
+                query_words=query_words
+            )
+
+        if over_budget:
+            return decide(self.fast, BUDGET_REASON)
+
+        if not self.enabled:
+            return decide(self.strong, "routing_disabled")
+
+        if latency_budget_ms is not None:
+            strong_p95 = metrics.percentile("llm_tier_ms", 95, tier=STRONG_TIER)
+            if strong_p95 is not None and latency_budget_ms < strong_p95:
+                return decide(self.fast, "latency_budget")
+
+        if context_tokens > self.max_context_tokens:
+            return decide(self.strong, "context_size")
+        if num_sources > self.max_sources:
+            return decide(self.strong, "multi_source")
+        if query_words > self.max_query_words:
+            return decide(self.strong, "query_length")
+
+        return decide(self.fast, "simple_query")
+
+    def should_escalate(
+        self,
+        answer: str,
+        decision: RoutingDecision,
+        latency_budget_ms: Optional[float] = None
+    ) -> bool:
+        """
+        Indique si la réponse du modèle rapide doit être relancée sur le modèle puissant
+
+        Args:
+            answer: Réponse du modèle rapide
+            decision: Décision de routage initiale
+            latency_budget_ms: Budget de latence restant
+
+        Returns:
+            bool: True si l'escalade est nécessaire et possible
+        """
+        if not self.escalate_on_not_found or decision.tier.name != FAST_TIER:
+            return False
+        if decision.reason == BUDGET_REASON:
+            return False
+        normalized = (answer or "").lower().replace("\u2019", "'")
+        if NOT_FOUND_SENTINEL not in normalized:
+            return False
+        if latency_budget_ms is not None and latency_budget_ms <= 0:
+            return False
+        return True
+
+
+_model_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
@@ -0,0 +1,339 @@
+# ============================================================================
+# PERSISTENCE - Écriture asynchrone et groupée dans MongoDB
+# ============================================================================
+
+"""
+Persistance des conversations, analytics et tickets
+
+Les actions ne parlent jamais directement à MongoDB : elles déposent des
+opérations (InsertOne, UpdateOne) dans une file bornée, vidée par un thread
+dédié en un bulk_write par collection dès que write_batch_size opérations
+sont en attente ou que write_flush_interval_ms est écoulé.
+
+    get_mongo_writer().insert(config.mongodb.tickets_collection, {...})
+
+Le client MongoDB est partagé par le processus (pool de connexions) ; les
+index sont créés à la première écriture dans chaque collection. File
+pleine ou MongoDB indisponible trop longtemps : les opérations sont
+abandonnées et comptées (mongo_ops_dropped), jamais attendues par l'action.
+"""
+
+import time
+import queue
+import atexit
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import os
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+# Fin de la file du thread d'écriture
+_STOP = object()
+# Tentatives d'écriture d'un batch quand MongoDB est injoignable
+MAX_WRITE_ATTEMPTS = 4
+MAX_RETRY_BACKOFF_SECONDS = 10.0
+
+
+def _indexes() -> Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]]:
+    """Index par collection : (clés, options)"""
+    mongo = config.mongodb
+    return {
+        mongo.conversations_collection: [
+            ([("conversation_id", 1)], {"unique": True}),
+            ([("sender_id", 1), ("createdAt", -1)], {}),
+            ([("createdAt", -1)], {}),
+        ],
+        mongo.analytics_collection: [
+            ([("type", 1), ("createdAt", -1)], {}),
+            ([("sender_id", 1), ("createdAt", -1)], {}),
+            # Upserts du suivi de consommation (core/usage.py)
+            ([("type", 1), ("date", 1), ("sender_id", 1)], {}),
+            ([("conversation_id", 1), ("message_index", 1)], {"sparse": True}),
+        ],
+        mongo.tickets_collection: [
+            ([("ticket_id", 1)], {"unique": True}),
+            ([("sender_id", 1), ("createdAt", -1)], {}),
+            ([("status", 1), ("createdAt", -1)], {}),
+        ],
+    }
+
+
+_mongo_client = None
+_mongo_client_lock = threading.Lock()
+
+
+def get_mongo_client():
+    """
+    Client MongoDB partagé du processus
+
+    pymongo gère un pool de connexions (MONGODB_MAX_POOL_SIZE) utilisable
+    depuis plusieurs threads : un seul client pour le writer et le suivi
+    de consommation.
+    """
+    global _mongo_client
+    if _mongo_client is None:
+        with _mongo_client_lock:
+            if _mongo_client is None:
+                from pymongo import MongoClient
+
+                _mongo_client = MongoClient(
+                    config.mongodb.uri,
+                    maxPoolSize=config.mongodb.max_pool_size,
+                    serverSelectionTimeoutMS=config.mongodb.timeout_ms,
+                    connectTimeoutMS=config.mongodb.timeout_ms,
+                    retryWrites=True
+                )
+    return _mongo_client
+
+
+def get_collection(name: str):
+    """Collection de la base configurée (client partagé)"""
+    return get_mongo_client()[config.mongodb.database][name]
+
+
+def ensure_indexes(name: str, target=None) -> None:
+    """
+    Crée les index de la collection (sans effet s'ils existent déjà)
+
+    Args:
+        name: Nom de la collection
+        target: Collection pymongo (défaut : client partagé)
+    """
+    from pymongo import IndexModel
+    from pymongo.errors import OperationFailure
+
+    models = [IndexModel(keys, **options) for keys, options in _indexes().get(name, [])]
+    if not models:
+        return
+    try:
+        (target if target is not None else get_collection(name)).create_indexes(models)
+        logger.info("MongoDB indexes ensured", collection=name, indexes=len(models))
+    except OperationFailure as e:
+        # Index existant avec d'autres options : les écritures passent quand même
+        logger.warning(f"MongoDB index creation failed: {str(e)}", collection=name)
+
+
+def _reset_client_after_fork() -> None:
+    # Un client pymongo ne se partage pas entre processus
+    global _mongo_client, _mongo_client_lock
+    _mongo_client = None
+    _mongo_client_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+
+class MongoWriter:
+    """
+    Writer MongoDB non bloquant : file bornée vidée par bulk_write
+
+    insert() et upsert() ne font que déposer l'opération ; le thread
+    "mongo-writer" regroupe tout ce qui arrive pendant flush_interval (au
+    plus batch_size opérations) et écrit chaque collection en un appel
+    non ordonné.
+    """
+
+    def __init__(self, collection_factory=None):
+        """
+        Args:
+            collection_factory: Nom -> collection (défaut : client partagé)
+        """
+        cfg = config.mongodb
+        self.enabled = cfg.writer_enabled
+        self.batch_size = max(1, cfg.write_batch_size)
+        self.flush_interval = cfg.write_flush_interval_ms / 1000
+        self.queue: "queue.Queue" = queue.Queue(cfg.write_queue_size)
+        self._collection_factory = collection_factory or get_collection
+        self._indexed: set = set()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.dropped = 0
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def insert(self, collection: str, document: Dict[str, Any]) -> bool:
+        """
+        Insère un document (écriture différée)
+
+        Returns:
+            bool: False si l'opération est abandonnée (writer désactivé, file pleine)
+        """
+        from pymongo import InsertOne
+
+        return self.submit(collection, InsertOne(document))
+
+    def upsert(self, collection: str, filter: Dict[str, Any], update: Dict[str, Any]) -> bool:
+        """Met à jour ou crée le document du filtre (opérateurs $set, $inc...)"""
+        from pymongo import UpdateOne
+
+        return self.submit(collection, UpdateOne(filter, update, upsert=True))
+
+    def submit(self, collection: str, operation: Any) -> bool:
+        """Dépose une opération pymongo (InsertOne, UpdateOne, DeleteOne...)"""
+        if not self.enabled:
+            return False
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait((collection, operation))
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("mongo_ops_dropped", collection=collection, reason="queue_full")
+            return False
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Attend l'écriture des opérations en attente
+
+        Returns:
+            bool: True si la file est vide avant le délai
+        """
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline or self._thread is None:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "written": self.written,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "dropped": self.dropped,
+        }
+
+    def close(self) -> None:
+        """Écrit les opérations en attente puis arrête le thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._closing.set()
+        try:
+            self.queue.put(_STOP, timeout=1)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=5)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mongo-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                self.queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            # Regroupe ce qui arrive jusqu'au seuil de taille ou de temps
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 and not self._closing.is_set() \
+                        else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self.queue.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            metrics.set_gauge("mongo_write_queue", self.queue.qsize())
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple[str, Any]]) -> None:
+        from pymongo.errors import BulkWriteError, PyMongoError
+
+        by_collection: "OrderedDict[str, List[Any]]" = OrderedDict()
+        for collection, operation in batch:
+            by_collection.setdefault(collection, []).append(operation)
+
+        for collection, operations in by_collection.items():
+            for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+                try:
+                    target = self._collection_factory(collection)
+                    self._ensure_indexes(collection, target)
+                    with metrics.timer("mongo_write_ms", collection=collection):
+                        target.bulk_write(operations, ordered=False)
+                    self._count(collection, len(operations))
+                    break
+                except BulkWriteError as e:
+                    # Écriture partielle (doublon de clé unique...) : pas de nouvel essai
+                    errors = e.details.get("writeErrors", [])
+                    self._count(collection, len(operations) - len(errors))
+                    self.write_errors += len(errors)
+                    metrics.increment("mongo_write_errors", len(errors), collection=collection)
+                    logger.warning(
+                        "MongoDB bulk write partially failed",
+                        collection=collection,
+                        errors=len(errors),
+                        first_error=errors[0].get("errmsg") if errors else None
+                    )
+                    break
+                except PyMongoError as e:
+                    if attempt == MAX_WRITE_ATTEMPTS or self._closing.is_set():
+                        self.dropped += len(operations)
+                        metrics.increment("mongo_ops_dropped", len(operations),
+                                          collection=collection, reason="write_failed")
+                        logger.error(
+                            f"MongoDB write failed: {str(e)}",
+                            collection=collection,
+                            operations=len(operations),
+                            attempts=attempt
+                        )
+                        break
+                    # La file continue de se remplir (et d'abandonner) pendant l'attente
+                    self._closing.wait(min(0.5 * 2 ** attempt, MAX_RETRY_BACKOFF_SECONDS))
+
+    def _count(self, collection: str, written: int) -> None:
+        self.written += written
+        self.batches += 1
+        metrics.increment("mongo_writes", written, collection=collection)
+        metrics.observe("mongo_write_batch", written, collection=collection)
+
+    def _ensure_indexes(self, collection: str, target) -> None:
+        if collection not in self._indexed:
+            ensure_indexes(collection, target)
+            self._indexed.add(collection)
+
+    def _after_fork(self) -> None:
+        # Opérations du parent écrites par le parent
+        self.queue = queue.Queue(self.queue.maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._indexed = set()
+
+
+_mongo_writer: Optional[MongoWriter] = None
+_mongo_writer_lock = threading.Lock()
+
+
+def get_mongo_writer() -> MongoWriter:
+    global _mongo_writer
+    if _mongo_writer is None:
+        with _mongo_writer_lock:
+            if _mongo_writer is None:
+                _mongo_writer = MongoWriter()
+    return _mongo_writer
@@ -0,0 +1,245 @@
+# ============================================================================
+# PROMPTS - Registre des templates de prompts
+# ============================================================================
+
+"""
+Registre des templates de prompts (prompts/*.txt)
+Charge et pré-compile les templates une seule fois au démarrage et
+assemble les messages avec tout le contenu statique en tête et le
+contexte/la question en fin, pour que le cache de préfixe du
+fournisseur (prompt caching) s'applique d'une requête à l'autre
+"""
+
+import string
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+SYSTEM_PROMPT = "system_prompt"
+RAG_TEMPLATE = "rag_template"
+
+# Estimation sans tiktoken
+CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """Comptage de tokens (tiktoken si disponible, estimation sinon)"""
+
+    def __init__(self, model: Optional[str] = None):
+        self._encoding = None
+        # Import différé : tiktoken n'est utile qu'au premier prompt
+        try:
+            import tiktoken
+        except ImportError:
+            tiktoken = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model or config.openai.model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+
+    @property
+    def exact(self) -> bool:
+        """Comptage exact (tiktoken) ou estimation"""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """Nombre de tokens d'un texte"""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        # Approximation : ~4 caractères par token
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    def encode(self, text: str) -> List[int]:
+        """Tokens d'un texte (nécessite tiktoken)"""
+        if self._encoding is None:
+            raise RuntimeError("tiktoken is required to encode tokens")
+        return self._encoding.encode(text)
+
+    def decode(self, tokens: List[int]) -> str:
+        """Texte d'une suite de tokens (nécessite tiktoken)"""
+        if self._encoding is None:
+            raise RuntimeError("tiktoken is required to decode tokens")
+        return self._encoding.decode(tokens)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Tronque un texte à max_tokens tokens"""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            return self._encoding.decode(tokens[:max_tokens])
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+@dataclass
+class PromptTemplate:
+    """
+    Template pré-compilé
+
+    Le texte est découpé une fois en segments (littéral, champ) ;
+    le rendu n'est plus qu'une concaténation.
+    """
+    name: str
+    text: str
+    segments: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+    fields: List[str] = field(default_factory=list)
+    static_tokens: int = 0
+
+    @classmethod
+    def compile(cls, name: str, text: str, counter: TokenCounter) -> "PromptTemplate":
+        """Parse le template et compte les tokens de sa partie statique"""
+        segments = []
+        fields = []
+        for literal, field_name, _, _ in string.Formatter().parse(text):
+            segments.append((literal, field_name))
+            if field_name is not None:
+                fields.append(field_name)
+
+        static_text = "".join(literal for literal, _ in segments)
+        return cls(
+            name=name,
+            text=text,
+            segments=segments,
+            fields=fields,
+            static_tokens=counter.count(static_text)
+        )
+
+    @property
+    def static_prefix(self) -> str:
+        """Texte littéral précédant le premier champ variable"""
+        return self.segments[0][0] if self.segments else ""
+
+    def render(self, **values: str) -> str:
+        """Rend le template avec les valeurs fournies"""
+        missing = [f for f in self.fields if f not in values]
+        if missing:
+            raise KeyError(f"Champs manquants pour le template {self.name}: {missing}")
+
+        parts = []
+        for literal, field_name in self.segments:
+            parts.append(literal)
+            if field_name is not None:
+                parts.append(str(values[field_name]))
+        return "".join(parts)
+
+
+class PromptRegistry:
+    """
+    Registre des templates de prompts
+
+    Ordre des messages pour le prompt caching :
+    1. system : system_prompt.txt (100% statique)
+    2. user : instructions statiques du template, puis contexte, puis question
+    """
+
+    def __init__(
+        self,
+        prompts_dir: Optional[str] = None,
+        max_context_tokens: Optional[int] = None
+    ):
+        """
+        Initialise le registre et charge les templates
+
+        Args:
+            prompts_dir: Répertoire des fichiers .txt
+            max_context_tokens: Plafond de tokens pour le contexte injecté
+        """
+        self.prompts_dir = Path(prompts_dir or config.prompts.prompts_dir)
+        self.max_context_tokens = max_context_tokens or config.prompts.max_context_tokens
+        self.counter = TokenCounter()
+        self._templates: Dict[str, PromptTemplate] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Charge et pré-compile tous les templates du répertoire"""
+        templates = {}
+        for path in sorted(self.prompts_dir.glob("*.txt")):
+            text = path.read_text(encoding="utf-8").strip()
+            templates[path.stem] = PromptTemplate.compile(path.stem, text, self.counter)
+
+        self._templates = templates
+        logger.info(
+            "PromptRegistry loaded",
+            prompts_dir=str(self.prompts_dir),
+            templates={name: t.static_tokens for name, t in templates.items()},
+            tokenizer="tiktoken" if self.counter.exact else "estimate"
+        )
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        Récupère un template par nom (nom de fichier sans extension)
+
+        Raises:
+            KeyError: Si le template n'existe pas
+        """
+        if name not in self._templates:
+            raise KeyError(f"Template de prompt inconnu: {name}")
+        return self._templates[name]
+
+    def names(self) -> List[str]:
+        """Liste des templates chargés"""
+        return list(self._templates)
+
+    def build_rag_messages(
+        self,
+        query: str,
+        context: str,
+        system_prompt: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Assemble les messages RAG (statique d'abord, variable en dernier)
+
+        Args:
+            query: Question de l'utilisateur
+            context: Contexte documentaire
+            system_prompt: Prompt système personnalisé (remplace le fichier)
+
+        Returns:
+            List[Dict]: Messages pour l'API chat
+        """
+        system = system_prompt or self.get(SYSTEM_PROMPT).text
+        template = self.get(RAG_TEMPLATE)
+
+        context_tokens = self.counter.count(context)
+        if context_tokens > self.max_context_tokens:
+            context = self.counter.truncate(context, self.max_context_tokens)
+            metrics.increment("prompt_context_truncated")
+            logger.warning(
+                "Prompt context truncated",
+                context_tokens=context_tokens,
+                max_context_tokens=self.max_context_tokens
+            )
+            context_tokens = self.counter.count(context)
+
+        sections = {
+            "system": self.counter.count(system) if system_prompt else self.get(SYSTEM_PROMPT).static_tokens,
+            "instructions": template.static_tokens,
+            "context": context_tokens,
+            "question": self.counter.count(query)
+        }
+        for section, tokens in sections.items():
+            metrics.observe("prompt_tokens", tokens, section=section)
+        logger.debug("Prompt assembled", **sections)
+
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": template.render(context=context, query=query)}
+        ]
+
+
+_prompt_registry: Optional[PromptRegistry] = None
+
+
+def get_prompt_registry() -> PromptRegistry:
+    global _prompt_registry
+    if _prompt_registry is None:
+        _prompt_registry = PromptRegistry()
+    return _prompt_registry
@@ -4,18 +4,25 @@
 
 """Pipeline RAG combinant recherche vectorielle et génération LLM"""
 
+import json
 import time
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
-
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, replace
 
 from utils.config import config
+from utils.deadline import Deadline
 from utils.logger import logger
+from utils.metrics import metrics
+from utils.tracing import tracer
+from core.admission import AdmissionRejected
+from core.circuit_breaker import CircuitOpenError
 from core.vector_store import VectorStore, SearchResult, get_vector_store
 from core.llm_client import LLMClient, get_llm_client
+from core.model_router import ModelTier, get_model_router
+from core.single_flight import SingleFlight
+from core.speculative import normalize_query
+from core.usage import BUDGET_SOFT, TokenBudgetExceeded, get_usage_tracker, usage_scope
 
 
 @dataclass
@@ -27,6 +34,11 @@ class RAGResponse:
     query: str
     context_used: str
     duration_ms: float
+    fast_path: bool = False
+    shared: bool = False  # Résultat partagé avec une requête identique en cours
+    model: Optional[str] = None  # Modèle LLM ayant produit la réponse
+    degraded: bool = False  # Réponse sans LLM ni embeddings (circuit ouvert)
+    shed: bool = False  # Refusée par le contrôle d'admission (serveur saturé)
 
 
 class RAGPipeline:
@@ -35,23 +47,61 @@ class RAGPipeline:
     1. Recherche vectorielle des documents pertinents
     2. Construction du contexte
     3. Génération de réponse via LLM
+    
+    Quand un circuit OpenAI est ouvert, le pipeline reste disponible :
+    recherche lexicale sans embeddings et/ou réponse composée des
+    extraits les plus pertinents, sans LLM. Quand le contrôle d'admission
+    refuse un appel (serveur saturé), la requête s'arrête aussitôt sur un
+    message invitant à réessayer.
     """
     
+    BUSY_ANSWER = ("Je reçois beaucoup de demandes en ce moment. "
+                   "Pouvez-vous réessayer dans quelques instants ?")
+    
     def __init__(self):
         self.vector_store = get_vector_store()
         self.llm_client = get_llm_client()
+        self.model_router = get_model_router()
         self.top_k = config.rag.top_k
         self.min_relevance = config.rag.min_relevance_score
-        logger.info("RAGPipeline initialized", top_k=self.top_k)
-    
-    def retrieve(self, query: str, top_k: Optional[int] = None) -> List[SearchResult]:
-        """Recherche les documents pertinents"""
-        return self.vector_store.search(
-            query=query,
-            top_k=top_k or self.top_k,
-            min_relevance=self.min_relevance
+        self.fast_path_enabled = config.rag.fast_path_enabled
+        self.fast_path_threshold = config.rag.fast_path_threshold
+        self.single_flight = SingleFlight() if config.rag.single_flight_enabled else None
+        logger.info(
+            "RAGPipeline initialized",
+            top_k=self.top_k,
+            fast_path=self.fast_path_enabled,
+            fast_path_threshold=self.fast_path_threshold
         )
     
+    def retrieve(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[SearchResult]:
+        """Recherche les documents pertinents (lexicale si les embeddings sont indisponibles)"""
+        with tracer.span("rag.retrieve", top_k=top_k or self.top_k) as span, \
+                usage_scope(stage="retrieval"):
+            try:
+                results = self.vector_store.search(
+                    query=query,
+                    top_k=top_k or self.top_k,
+                    filter_metadata=filter_metadata,
+                    min_relevance=self.min_relevance,
+                    deadline=deadline
+                )
+            except CircuitOpenError as e:
+                metrics.increment("rag_degraded", stage="retrieval")
+                logger.warning(f"Embeddings indisponibles, recherche lexicale: {str(e)}")
+                span.event("lexical_fallback", reason=str(e))
+                results = self.vector_store.lexical_search(
+                    query, top_k=top_k or self.top_k, filter_metadata=filter_metadata
+                )
+            span.set(num_results=len(results))
+            return results
+    
     def build_context(self, results: List[SearchResult], max_length: int = 4000) -> str:
         """Construit le contexte à partir des résultats"""
         if not results:
@@ -72,29 +122,324 @@ class RAGPipeline:
         
         return "\n---\n".join(context_parts)
     
-    def generate_response(self, query: str, context: str) -> str:
+    def fast_path_answer(self, results: List[SearchResult]) -> Optional[str]:
+        """
+        Réponse directe sans LLM si le meilleur résultat est une réponse prête
+
+        Un chunk est une réponse prête s'il a été marqué à l'ingestion
+        (metadata answer_type="qa" avec le texte de la réponse dans "answer")
+
+        Args:
+            results: Résultats de recherche ordonnés par pertinence
+
+        Returns:
+            str ou None si le fast path ne s'applique pas
+        """
+        if not self.fast_path_enabled or not results:
+            return None
+
+        top = results[0]
+        # Un recouvrement de mots-clés ne garantit pas que la FAQ répond à la question
+        if top.lexical:
+            return None
+        if top.relevance < self.fast_path_threshold:
+            return None
+        if top.metadata.get("answer_type") != "qa":
+            return None
+
+        answer = (top.metadata.get("answer") or "").strip()
+        return answer or None
+
+    def degraded_answer(self, results: List[SearchResult], max_excerpts: int = 2,
+                        excerpt_length: int = 400) -> str:
+        """
+        Réponse sans LLM : extraits des documents les plus pertinents
+        
+        Args:
+            results: Résultats de recherche ordonnés par pertinence
+            max_excerpts: Nombre d'extraits cités
+            excerpt_length: Longueur maximum d'un extrait (caractères)
+            
+        Returns:
+            str: Réponse à envoyer à l'utilisateur
+        """
+        if not results:
+            return ("Notre assistant est momentanément indisponible et je n'ai pas trouvé "
+                    "de passage correspondant. Souhaitez-vous parler à un conseiller ?")
+        
+        parts = ["Notre assistant est momentanément indisponible. Voici les passages "
+                 "de notre documentation les plus proches de votre question :"]
+        for result in results[:max_excerpts]:
+            source = result.metadata.get("source", "Document")
+            excerpt = (result.metadata.get("answer") or result.content).strip()
+            if len(excerpt) > excerpt_length:
+                excerpt = excerpt[:excerpt_length].rsplit(" ", 1)[0] + "…"
+            parts.append(f"📄 {source}\n{excerpt}")
+        return "\n\n".join(parts)
+    
+    def generate_response(
+        self,
+        query: str,
+        context: str,
+        results: Optional[List[SearchResult]] = None,
+        latency_budget_ms: Optional[float] = None,
+        deadline: Optional[Deadline] = None
+    ) -> str:
         """Génère une réponse avec le LLM"""
+        return self.route_and_generate(query, context, results, latency_budget_ms, deadline)[0]
+    
+    def route_and_generate(
+        self,
+        query: str,
+        context: str,
+        results: Optional[List[SearchResult]] = None,
+        latency_budget_ms: Optional[float] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Génère une réponse sur le modèle choisi par le routeur
+        
+        Le modèle rapide est relancé sur le modèle puissant s'il répond
+        "Je n'ai pas trouvé" (escalade configurable). Budget tokens de
+        l'utilisateur dépassé : modèle rapide, sans escalade.
+        
+        Args:
+            query: Question de l'utilisateur
+            context: Contexte documentaire
+            results: Résultats ayant servi au contexte
+            latency_budget_ms: Budget de latence restant (par défaut : deadline)
+            deadline: Deadline de la requête utilisateur
+            
+        Returns:
+            Tuple (réponse, modèle utilisé)
+        
+        Raises:
+            TokenBudgetExceeded: Si le budget dur de l'utilisateur est épuisé
+        """
         if not context:
-            return "Je n'ai pas trouvé d'information pertinente. Souhaitez-vous parler à un conseiller ?"
-        return self.llm_client.generate_with_context(query, context)
+            return "Je n'ai pas trouvé d'information pertinente. Souhaitez-vous parler à un conseiller ?", None
+        
+        start_time = time.time()
+        if latency_budget_ms is None and deadline is not None:
+            latency_budget_ms = deadline.remaining_ms()
+        over_budget = get_usage_tracker().check_budget() == BUDGET_SOFT
+        context_tokens = self.llm_client.prompts.counter.count(context)
+        decision = self.model_router.route(
+            query, context_tokens, results, latency_budget_ms, over_budget=over_budget
+        )
+        
+        tier = decision.tier
+        answer = self._generate_with_tier(query, context, tier, deadline)
+        
+        escalated = False
+        remaining_ms = None
+        if latency_budget_ms is not None:
+            remaining_ms = latency_budget_ms - (time.time() - start_time) * 1000
+        if self.model_router.should_escalate(answer, decision, remaining_ms):
+            escalated = True
+            metrics.increment("llm_escalations")
+            tier = self.model_router.strong
+            answer = self._generate_with_tier(query, context, tier, deadline)
+        
+        logger.info(
+            "LLM routing decision",
+            tier=tier.name,
+            model=tier.model,
+            reason=decision.reason,
+            escalated=escalated,
+            context_tokens=decision.context_tokens,
+            num_sources=decision.num_sources,
+            duration_ms=round((time.time() - start_time) * 1000, 2)
+        )
+        return answer, tier.model
     
-    def query(self, user_query: str, top_k: Optional[int] = None) -> RAGResponse:
-        """Exécute le pipeline RAG complet"""
+    def _generate_with_tier(
+        self,
+        query: str,
+        context: str,
+        tier: ModelTier,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """Appelle le LLM sur un niveau de modèle et mesure sa latence"""
+        with metrics.timer("rag_generation_ms"), metrics.timer("llm_tier_ms", tier=tier.name), \
+                tracer.span("rag.generate", tier=tier.name, model=tier.model), \
+                usage_scope(stage="generation"):
+            return self.llm_client.generate_with_context(
+                query, context, model=tier.model, max_tokens=tier.max_tokens,
+                deadline=deadline
+            )
+    
+    def query(
+        self,
+        user_query: str,
+        top_k: Optional[int] = None,
+        results: Optional[List[SearchResult]] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        latency_budget_ms: Optional[float] = None,
+        deadline: Optional[Deadline] = None
+    ) -> RAGResponse:
+        """
+        Exécute le pipeline RAG complet
+        
+        Les requêtes identiques concurrentes (même question normalisée,
+        même filtre, même état de budget tokens) partagent une seule
+        exécution du pipeline. Un refus du contrôle d'admission n'est pas
+        partagé : chaque suiveur refait sa propre tentative.
+        
+        Args:
+            user_query: Question de l'utilisateur
+            top_k: Nombre de documents à récupérer
+            results: Résultats déjà récupérés (retrieval spéculatif)
+            filter_metadata: Filtre sur les métadonnées des documents
+            latency_budget_ms: Budget de latence de la requête (routage LLM)
+            deadline: Deadline propagée jusqu'aux appels OpenAI
+        """
+        if self.single_flight is None:
+            return self._execute(
+                user_query, top_k, results, filter_metadata, latency_budget_ms, deadline
+            )
+        
         start_time = time.time()
+        key = (
+            normalize_query(user_query),
+            top_k or self.top_k,
+            json.dumps(filter_metadata, sort_keys=True, default=str) if filter_metadata else None,
+            # Le leader route selon son propre budget : seuls les appelants
+            # dans le même état de budget partagent sa réponse
+            get_usage_tracker().budget_state()
+        )
+        
+        with tracer.span("rag.single_flight") as span:
+            response, shared = self.single_flight.do(
+                key,
+                lambda: self._execute(
+                    user_query, top_k, results, filter_metadata, latency_budget_ms, deadline
+                ),
+                timeout=deadline.remaining() if deadline is not None else None
+            )
+            span.set(shared=shared)
         
-        # 1. Retrieve
-        results = self.retrieve(user_query, top_k)
+        if not shared:
+            metrics.increment("rag_single_flight_executions")
+            return response
         
-        # 2. Build context
-        context = self.build_context(results)
+        if response.shed:
+            # Refus propre au leader (son débit, son délai) : cet appelant
+            # tente sa propre admission plutôt que de partager le refus
+            metrics.increment("rag_single_flight_shed_retries")
+            return self._execute(
+                user_query, top_k, results, filter_metadata, latency_budget_ms, deadline
+            )
         
-        # 3. Generate
-        answer = self.generate_response(user_query, context)
+        # Latence propre à chaque appelant, pas celle du leader
+        duration_ms = (time.time() - start_time) * 1000
+        metrics.increment("rag_single_flight_shared")
+        logger.info(
+            "RAG query coalesced with in-flight request",
+            query=user_query[:100],
+            duration_ms=round(duration_ms, 2)
+        )
+        return replace(response, query=user_query, duration_ms=duration_ms, shared=True)
+    
+    def _execute(
+        self,
+        user_query: str,
+        top_k: Optional[int] = None,
+        results: Optional[List[SearchResult]] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        latency_budget_ms: Optional[float] = None,
+        deadline: Optional[Deadline] = None
+    ) -> RAGResponse:
+        """Exécute une instance du pipeline dans un span rag.query"""
+        start_time = time.time()
+        with tracer.span("rag.query", speculative=results is not None) as span:
+            try:
+                response = self._run(
+                    user_query, top_k, results, filter_metadata, latency_budget_ms, deadline
+                )
+            except AdmissionRejected as e:
+                # Saturé : répondre vite plutôt qu'attendre une place hors délai
+                metrics.increment("rag_shed", reason=e.reason)
+                span.event("shed", reason=e.reason)
+                response = RAGResponse(
+                    answer=self.BUSY_ANSWER, sources=[], confidence=0.0, query=user_query,
+                    context_used="", duration_ms=(time.time() - start_time) * 1000,
+                    degraded=True, shed=True
+                )
+            span.set(
+                fast_path=response.fast_path, degraded=response.degraded,
+                model=response.model, num_results=len(response.sources)
+            )
+            return response
+    
+    def _run(
+        self,
+        user_query: str,
+        top_k: Optional[int] = None,
+        results: Optional[List[SearchResult]] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        latency_budget_ms: Optional[float] = None,
+        deadline: Optional[Deadline] = None
+    ) -> RAGResponse:
+        """Exécute une instance du pipeline (retrieve, fast path ou LLM)"""
+        start_time = time.time()
+        
+        # 1. Retrieve (sauf si déjà fait en spéculatif)
+        if results is None:
+            results = self.retrieve(user_query, top_k, filter_metadata, deadline)
+        
+        # 2. Fast path : réponse FAQ prête, pas d'appel LLM
+        answer = self.fast_path_answer(results)
+        fast_path = answer is not None
+        degraded = any(r.lexical for r in results)
+        model = None
+        
+        if fast_path:
+            context = results[0].content
+            saved_ms = metrics.mean("rag_generation_ms") or 0.0
+            metrics.increment("rag_fast_path_hits")
+            metrics.increment("rag_fast_path_saved_ms", saved_ms)
+            logger.info(
+                "RAG fast path answer",
+                source_id=results[0].id,
+                relevance=round(results[0].relevance, 3),
+                estimated_saved_ms=round(saved_ms, 2)
+            )
+        else:
+            if results:
+                metrics.increment("rag_fast_path_misses")
+            
+            # 3. Build context
+            with tracer.span("rag.build_context", num_results=len(results)):
+                context = self.build_context(results)
+            
+            # 4. Generate (modèle choisi par le routeur)
+            remaining_ms = None
+            if latency_budget_ms is not None:
+                remaining_ms = latency_budget_ms - (time.time() - start_time) * 1000
+            try:
+                answer, model = self.route_and_generate(
+                    user_query, context, results, remaining_ms, deadline
+                )
+            except CircuitOpenError as e:
+                # 4b. LLM indisponible : extraits des documents retrouvés
+                degraded = True
+                metrics.increment("rag_degraded", stage="generation")
+                logger.warning(f"LLM indisponible, réponse dégradée: {str(e)}")
+                answer = self.degraded_answer(results)
+            except TokenBudgetExceeded as e:
+                # 4c. Budget journalier épuisé : extraits, sans appel LLM
+                degraded = True
+                metrics.increment("rag_degraded", stage="budget")
+                logger.warning(str(e), sender_id=e.sender_id)
+                answer = self.degraded_answer(results)
         
         # Calculer la confiance moyenne
         avg_confidence = sum(r.relevance for r in results) / len(results) if results else 0
         
         duration_ms = (time.time() - start_time) * 1000
+        path = "fast" if fast_path else "degraded" if degraded else "llm"
+        metrics.observe("rag_query_ms", duration_ms, path=path)
         
         sources = [{"id": r.id, "source": r.metadata.get("source", "Unknown"), 
                     "relevance": r.relevance} for r in results]
@@ -107,16 +452,21 @@ class RAGPipeline:
         
         return RAGResponse(
             answer=answer, sources=sources, confidence=avg_confidence,
-            query=user_query, context_used=context[:500], duration_ms=duration_ms
+            query=user_query, context_used=context[:500], duration_ms=duration_ms,
+            fast_path=fast_path, model=model, degraded=degraded
         )
 
 
 _rag_pipeline: Optional[RAGPipeline] = None
+_rag_pipeline_lock = threading.Lock()
 
 def get_rag_pipeline() -> RAGPipeline:
     global _rag_pipeline
     if _rag_pipeline is None:
-        _rag_pipeline = RAGPipeline()
+        # Les actions appellent le pipeline depuis plusieurs threads
+        with _rag_pipeline_lock:
+            if _rag_pipeline is None:
+                _rag_pipeline = RAGPipeline()
     return _rag_pipeline
 
 rag_pipeline = get_rag_pipeline
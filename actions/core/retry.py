@@ -0,0 +1,315 @@
+# ============================================================================
+# RETRY - Appels OpenAI avec deadline, classification d'erreurs et hedging
+# ============================================================================
+
+"""
+Politique d'appel des API OpenAI
+- Retries limités par le nombre de tentatives ET par la deadline restante
+- Erreurs non-retryables (requête invalide, auth...) remontées immédiatement
+- Timeout par tentative borné par la deadline
+- Requête "hedgée" optionnelle quand la première dépasse son p95
+- Circuit breaker optionnel : refus immédiat quand la dépendance est en panne
+- Contrôle d'admission des appels faits pour un utilisateur (core/admission.py)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Optional, TypeVar
+
+from utils.config import config
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.tracing import current_span, tracer, wrap
+
+from core.admission import get_admission_controller
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.usage import current_scope, get_usage_tracker
+
+if TYPE_CHECKING:
+    from tenacity import RetryCallState
+
+
+T = TypeVar("T")
+
+# Nombre minimum d'échantillons avant d'utiliser le p95 observé pour le hedging
+HEDGE_MIN_SAMPLES = 20
+
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Indique si une erreur justifie une nouvelle tentative
+
+    Retryables : timeouts, erreurs réseau, 408/409/429 et 5xx.
+    Tout le reste (ValueError, 400, 401, 403, 404, 422, deadline...) est définitif.
+    """
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    # openai est déjà chargé par le client qui a levé l'erreur
+    import openai
+
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in _RETRYABLE_STATUS or exc.status_code >= 500
+    return False
+
+
+class stop_when_budget_exhausted:
+    """Arrête les retries quand la deadline ne laisse plus la place à une tentative"""
+
+    def __init__(self, deadline: Optional[Deadline], wait_strategy, min_attempt_s: float):
+        self.deadline = deadline
+        self.wait_strategy = wait_strategy
+        self.min_attempt_s = min_attempt_s
+
+    def __call__(self, retry_state: "RetryCallState") -> bool:
+        if self.deadline is None:
+            return False
+        next_wait = self.wait_strategy(retry_state)
+        return self.deadline.remaining() < next_wait + self.min_attempt_s
+
+
+class stop_when_circuit_open:
+    """Arrête les retries dès que le circuit de la dépendance s'ouvre"""
+
+    def __init__(self, breaker: Optional[CircuitBreaker]):
+        self.breaker = breaker
+
+    def __call__(self, retry_state: "RetryCallState") -> bool:
+        return self.breaker is not None and self.breaker.is_open()
+
+
+def _min_attempt_s(operation: str) -> float:
+    """Durée minimale réaliste d'une tentative (config ou p50 observé)"""
+    observed = metrics.percentile("openai_attempt_ms", 50, operation=operation) or 0.0
+    return max(config.openai.min_attempt_ms, observed) / 1000
+
+
+def _log_retry(operation: str):
+    def before_sleep(retry_state: "RetryCallState") -> None:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        metrics.increment("openai_retries", operation=operation)
+        span = current_span()
+        if span is not None:
+            span.event(
+                "retry",
+                attempt=retry_state.attempt_number,
+                error=type(exc).__name__ if exc else None
+            )
+        logger.warning(
+            f"OpenAI {operation} retry",
+            attempt=retry_state.attempt_number,
+            error=type(exc).__name__ if exc else None,
+            next_wait_s=round(retry_state.next_action.sleep, 2) if retry_state.next_action else None
+        )
+    return before_sleep
+
+
+def _hedge_delay_s(operation: str) -> Optional[float]:
+    """Délai avant la requête de couverture (p95 observé), None si inconnu"""
+    p95_ms = metrics.percentile("openai_attempt_ms", 95, operation=operation)
+    if p95_ms is None:
+        return None
+    if metrics.counter("openai_attempts", operation=operation) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(config.openai.hedge_min_ms, p95_ms) / 1000
+
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                # Requête principale + couverture par appel admis : un appel
+                # n'attend pas le pool
+                max_workers = config.openai.hedge_max_workers or 2 * config.admission.max_concurrent
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=max(2, max_workers), thread_name_prefix="openai-hedge"
+                )
+    return _hedge_executor
+
+
+def _reset_hedge_executor() -> None:
+    """Les threads du parent n'existent pas dans un worker forké"""
+    global _hedge_executor, _hedge_executor_lock
+    _hedge_executor = None
+    _hedge_executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_hedge_executor)
+
+
+def _record_losing_hedge(operation: str, future: Future) -> None:
+    """Compte les tokens de la réponse non utilisée (facturés quand même)"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    response = future.result()
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    metrics.increment("openai_hedge_wasted", operation=operation)
+    get_usage_tracker().record(
+        operation,
+        getattr(response, "model", None) or "-",
+        usage.prompt_tokens,
+        getattr(usage, "completion_tokens", 0) or 0
+    )
+
+
+def _hedged(operation: str, fn: Callable[[float], T], timeout: float) -> T:
+    """
+    Exécute fn et lance une seconde requête identique si la première
+    dépasse son p95 ; la première réponse réussie l'emporte
+
+    La requête perdante est abandonnée (annulée si elle attend encore le
+    pool) ; les tokens de sa réponse sont comptés dans le suivi de
+    consommation.
+    """
+    delay = _hedge_delay_s(operation)
+    if delay is None or delay >= timeout:
+        return fn(timeout)
+
+    executor = _get_hedge_executor()
+    start_time = time.monotonic()
+    # wrap : contexte de l'appelant (trace, usage_scope) dans le pool
+    pending = {executor.submit(wrap(fn), timeout)}
+    done, pending = wait(pending, timeout=delay)
+
+    if not done:
+        metrics.increment("openai_hedges", operation=operation)
+        remaining = max(0.0, timeout - (time.monotonic() - start_time))
+        pending.add(executor.submit(wrap(fn), remaining))
+
+    last_error: Optional[BaseException] = None
+    while True:
+        winner = next((future for future in done if future.exception() is None), None)
+        if winner is not None:
+            for loser in (done | pending) - {winner}:
+                loser.cancel()
+                loser.add_done_callback(wrap(lambda future: _record_losing_hedge(operation, future)))
+            return winner.result()
+        for future in done:
+            last_error = future.exception()
+        if not pending:
+            raise last_error
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+
+def _attempt(
+    operation: str,
+    fn: Callable[[float], T],
+    deadline: Optional[Deadline],
+    breaker: Optional[CircuitBreaker]
+) -> T:
+    """Une tentative avec timeout borné par la deadline"""
+    timeout = float(config.openai.timeout)
+    if deadline is not None:
+        deadline.check(operation)
+        timeout = deadline.cap(timeout)
+    if breaker is not None:
+        breaker.allow()
+
+    metrics.increment("openai_attempts", operation=operation)
+    start_time = time.perf_counter()
+    try:
+        with tracer.span(f"openai.{operation}", timeout_s=round(timeout, 3)):
+            if config.openai.hedge_enabled:
+                result = _hedged(operation, fn, timeout)
+            else:
+                result = fn(timeout)
+    except Exception as e:
+        retryable = is_retryable(e)
+        metrics.increment(
+            "openai_errors",
+            operation=operation,
+            kind="retryable" if retryable else "fatal"
+        )
+        if breaker is not None:
+            # Une requête invalide (400, 401...) ne dit rien de la santé du service
+            if retryable:
+                breaker.record_failure()
+            else:
+                breaker.record_success((time.perf_counter() - start_time) * 1000)
+        raise
+    finally:
+        metrics.observe("openai_attempt_ms", (time.perf_counter() - start_time) * 1000, operation=operation)
+
+    if breaker is not None:
+        breaker.record_success((time.perf_counter() - start_time) * 1000)
+    return result
+
+
+def call_openai(
+    operation: str,
+    fn: Callable[[float], T],
+    deadline: Optional[Deadline] = None,
+    breaker: Optional[CircuitBreaker] = None
+) -> T:
+    """
+    Appelle une API OpenAI avec la politique de retry
+
+    Args:
+        operation: Nom de l'opération (embed, embed_batch, chat...)
+        fn: Fonction recevant le timeout (secondes) de la tentative
+        deadline: Deadline de la requête utilisateur (None = pas de limite)
+        breaker: Circuit breaker de la dépendance (None = pas de protection)
+
+    Returns:
+        Le résultat de fn
+
+    Raises:
+        AdmissionRejected: Si le contrôle d'admission refuse l'appel
+        DeadlineExceeded: Si le budget est épuisé avant une tentative
+        CircuitOpenError: Si le circuit de la dépendance est ouvert
+        Exception: La dernière erreur si toutes les tentatives échouent
+    """
+    controller = get_admission_controller()
+    sender_id = current_scope().get("sender_id")
+    if controller is None or not sender_id:
+        return _call_with_retries(operation, fn, deadline, breaker)
+    # Une place pour l'appel et ses retries : une rafale de 429 ne
+    # multiplie pas les requêtes en cours
+    with controller.admit(sender_id, deadline):
+        return _call_with_retries(operation, fn, deadline, breaker)
+
+
+def _call_with_retries(
+    operation: str,
+    fn: Callable[[float], T],
+    deadline: Optional[Deadline],
+    breaker: Optional[CircuitBreaker]
+) -> T:
+    """Tentatives successives selon la politique de retry"""
+    from tenacity import Retrying, retry_if_exception, stop_after_attempt, stop_any, wait_exponential
+
+    wait_strategy = wait_exponential(multiplier=1, min=1, max=10)
+    retrying = Retrying(
+        stop=stop_any(
+            stop_after_attempt(config.openai.max_retries),
+            stop_when_budget_exhausted(deadline, wait_strategy, _min_attempt_s(operation)),
+            stop_when_circuit_open(breaker)
+        ),
+        wait=wait_strategy,
+        retry=retry_if_exception(is_retryable),
+        before_sleep=_log_retry(operation),
+        reraise=True
+    )
+
+    try:
+        for attempt in retrying:
+            with attempt:
+                return _attempt(operation, fn, deadline, breaker)
+    except Exception as e:
+        # L'appel qui a ouvert le circuit bascule lui aussi en mode dégradé
+        if breaker is not None and is_retryable(e) and breaker.is_open():
+            raise CircuitOpenError(breaker.name, breaker.open_seconds) from e
+        raise
@@ -0,0 +1,217 @@
+# ============================================================================
+# SHARED CACHE - Cache d'embeddings partagé entre processus (mmap)
+# ============================================================================
+
+"""
+Cache d'embeddings de requêtes partagé par les workers
+
+Le cache LRU d'EmbeddingService est propre à chaque processus : avec N
+workers, une question fréquente est vectorisée (et payée) N fois et gardée
+en N copies. En mode multi-worker, chaque service d'embedding dispose en
+plus d'une table de taille fixe dans un fichier mappé, commune à tous les
+processus et conservée entre deux redémarrages :
+
+    en-tête (32 octets) : magic, version, dimension, nombre d'entrées
+    entrée : séquence (u64) | clé blake2b du texte (16 octets) | vecteur float32
+
+Une entrée est choisie par le hash du texte (une entrée remplace la
+précédente, sans LRU). Les lectures sont sans verrou : la séquence est
+impaire pendant une écriture et comparée avant/après la copie (seqlock).
+Les écritures (échecs du cache, donc rares) sont sérialisées entre
+processus par un verrou fcntl.
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.config import config
+from utils.logger import logger
+
+
+MAGIC = b"EMBCACHE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIII12x")
+SEQUENCE = struct.Struct("<Q")
+KEY_SIZE = 16
+# Copies relues avant d'abandonner une entrée en cours d'écriture
+READ_ATTEMPTS = 3
+
+
+class SharedEmbeddingCache:
+    """Table d'embeddings dans un fichier mappé, commune aux processus"""
+
+    def __init__(self, path: Path, dimension: int, slots: int):
+        """
+        Ouvre (ou crée) la table
+
+        Args:
+            path: Fichier de la table (un par modèle d'embedding)
+            dimension: Dimension des vecteurs
+            slots: Nombre d'entrées (taille fixe)
+        """
+        self.path = path
+        self.dimension = dimension
+        self.slots = slots
+        self.slot_size = SEQUENCE.size + KEY_SIZE + 4 * dimension
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._local_lock = threading.Lock()
+        self._lock_path = path.with_name(path.name + ".lock")
+        self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._mm = self._open()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Embedding du texte (None si absent ou en cours d'écriture)"""
+        key = self._key(text)
+        offset = self._offset(key)
+        vector_offset = offset + SEQUENCE.size + KEY_SIZE
+        for _ in range(READ_ATTEMPTS):
+            (before,) = SEQUENCE.unpack_from(self._mm, offset)
+            if before & 1:
+                continue
+            if before == 0 or self._mm[offset + SEQUENCE.size:vector_offset] != key:
+                self.misses += 1
+                return None
+            vector = array("f")
+            vector.frombytes(self._mm[vector_offset:offset + self.slot_size])
+            (after,) = SEQUENCE.unpack_from(self._mm, offset)
+            if before == after:
+                self.hits += 1
+                return vector.tolist()
+        self.misses += 1
+        return None
+
+    def put(self, text: str, embedding: List[float]) -> None:
+        """Enregistre un embedding (remplace l'entrée du même emplacement)"""
+        if len(embedding) != self.dimension:
+            return
+        import fcntl
+
+        key = self._key(text)
+        offset = self._offset(key)
+        payload = key + array("f", embedding).tobytes()
+        with self._local_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                (sequence,) = SEQUENCE.unpack_from(self._mm, offset)
+                SEQUENCE.pack_into(self._mm, offset, sequence + 1)
+                self._mm[offset + SEQUENCE.size:offset + self.slot_size] = payload
+                SEQUENCE.pack_into(self._mm, offset, sequence + 2)
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        self.writes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "slots": self.slots,
+            "size_mb": round((HEADER.size + self.slots * self.slot_size) / 1024 / 1024, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+        }
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+    def _offset(self, key: bytes) -> int:
+        return HEADER.size + (int.from_bytes(key[:8], "little") % self.slots) * self.slot_size
+
+    def _open(self) -> mmap.mmap:
+        import fcntl
+
+        size = HEADER.size + self.slots * self.slot_size
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            if not self._valid():
+                # Fichier créé à part puis renommé : jamais visible à moitié écrit
+                staging = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+                with open(staging, "wb") as f:
+                    f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.dimension, self.slots))
+                    f.truncate(size)
+                os.replace(staging, self.path)
+            fd = os.open(self.path, os.O_RDWR)
+            try:
+                return mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _valid(self) -> bool:
+        """Table existante au bon format (sinon recréée, vide)"""
+        return _stored_dimension(self.path, self.slots) == self.dimension
+
+    def _after_fork(self) -> None:
+        # flock appartient à la description de fichier : une par processus
+        self._local_lock = threading.Lock()
+        self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def _stored_dimension(path: Path, slots: int) -> Optional[int]:
+    """Dimension d'une table existante au format attendu (None sinon)"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) != HEADER.size:
+        return None
+    magic, version, dimension, stored_slots = HEADER.unpack(header)
+    if (magic, version, stored_slots) != (MAGIC, FORMAT_VERSION, slots):
+        return None
+    return dimension
+
+
+_caches: Dict[str, SharedEmbeddingCache] = {}
+_disabled: set = set()
+_caches_lock = threading.Lock()
+
+
+def get_shared_embedding_cache(model: str, dimension: Optional[int] = None) -> Optional[SharedEmbeddingCache]:
+    """
+    Table partagée d'un modèle d'embedding
+
+    Args:
+        model: Modèle d'embedding
+        dimension: Dimension des vecteurs (défaut : celle de la table existante)
+
+    Returns:
+        SharedEmbeddingCache ou None (désactivé, table absente sans
+        dimension connue, erreur d'ouverture)
+    """
+    cfg = config.shared_index
+    if not cfg.enabled or cfg.embedding_cache_slots <= 0:
+        return None
+    with _caches_lock:
+        cache = _caches.get(model)
+        if cache is not None or model in _disabled:
+            return cache
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model)
+        path = Path(cfg.directory) / f"embeddings.{name}.cache"
+        dimension = dimension or _stored_dimension(path, cfg.embedding_cache_slots)
+        if dimension is None:
+            # Premier embedding de ce modèle pas encore calculé
+            return None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            cache = SharedEmbeddingCache(path, dimension, cfg.embedding_cache_slots)
+        except (OSError, ImportError) as e:
+            logger.warning(f"Shared embedding cache disabled: {str(e)}", model=model)
+            _disabled.add(model)
+            return None
+        _caches[model] = cache
+        return cache
+
+
+def shared_embedding_cache_stats() -> List[Dict[str, Any]]:
+    with _caches_lock:
+        return [{"model": model, **cache.stats()} for model, cache in _caches.items()]
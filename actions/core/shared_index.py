@@ -0,0 +1,644 @@
+# ============================================================================
+# SHARED INDEX - Index vectoriel partagé entre workers (fichiers mappés)
+# ============================================================================
+
+"""
+Index en lecture seule partagé par les workers du serveur d'actions
+
+En mode multi-worker (SHARED_INDEX_ENABLED, ACTION_SERVER_SANIC_WORKERS > 1),
+un seul processus ouvre ChromaDB : le writer, qui sert l'API d'indexation.
+Après chaque série d'écritures, il publie un instantané de la génération
+active :
+
+    <SHARED_INDEX_DIR>/<collection>/v<N>/
+        manifest.json   génération, dimension, distance, nombre de chunks
+        vectors.f32     vecteurs float32 (N x dimension)
+        norms.f32       norme de chaque vecteur
+        records.bin     {"id", "document", "metadata"} en JSON, à la suite
+        offsets.u64     début de chaque enregistrement (N + 1 entrées)
+    <SHARED_INDEX_DIR>/<collection>/CURRENT   version publiée
+
+Les workers mappent ces fichiers en lecture seule : les pages sont celles
+du cache disque du système, partagées par tous les processus, au lieu d'une
+copie de l'index par worker. Chaque worker relit CURRENT au plus toutes les
+SHARED_INDEX_REMAP_INTERVAL_MS et mappe la nouvelle version ; une recherche
+en cours termine sur l'instantané qu'elle a commencé.
+
+SnapshotCollection expose la partie lecture de l'API d'une collection
+ChromaDB (query, get, count) : SharedVectorStore réutilise tel quel le code
+de recherche de VectorStore.
+"""
+
+import os
+import json
+import mmap
+import time
+import atexit
+import shutil
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+from core.embeddings import get_embedding_service
+from core.generations import STATUS_ACTIVE, Generation
+from core.vector_store import VectorStore, _ActiveGeneration
+
+
+# Rôle du processus, transmis aux workers par l'environnement (fork ou spawn)
+ROLE_ENV = "SHARED_INDEX_ROLE"
+ROLE_WRITER = "writer"
+ROLE_READER = "reader"
+
+POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+# Battement du writer : {"pid", "at"} réécrit toutes les HEARTBEAT_SECONDS
+HEARTBEAT_FILE = "WRITER"
+HEARTBEAT_SECONDS = 5.0
+# Battements manqués avant de considérer le writer arrêté
+HEARTBEAT_MISSED = 3
+
+
+class ReadOnlyIndexError(Exception):
+    """Écriture refusée : les workers lisent un instantané de l'index"""
+
+
+def is_reader() -> bool:
+    """Processus worker : recherche dans l'instantané, sans ChromaDB"""
+    return config.shared_index.enabled and os.environ.get(ROLE_ENV) == ROLE_READER
+
+
+def is_writer() -> bool:
+    """Processus d'indexation : seul à ouvrir ChromaDB, publie les instantanés"""
+    return config.shared_index.enabled and os.environ.get(ROLE_ENV) == ROLE_WRITER
+
+
+def _read_only(*args, **kwargs):
+    raise ReadOnlyIndexError(
+        f"index writes go through the writer process (port {config.shared_index.writer_port})"
+    )
+
+
+def index_root(collection_name: Optional[str] = None) -> Path:
+    return Path(config.shared_index.directory) / (collection_name or config.chromadb.collection_name)
+
+
+def current_version(root: Path) -> Optional[str]:
+    """Version publiée (None si aucun instantané)"""
+    try:
+        return (root / POINTER_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# ----------------------------------------------------------------------
+# Filtres de métadonnées (sous-ensemble de la syntaxe where de ChromaDB)
+# ----------------------------------------------------------------------
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+}
+
+
+def matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Indique si des métadonnées vérifient un filtre where ChromaDB"""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                compare = _OPERATORS.get(operator)
+                if compare is None:
+                    raise ValueError(f"unsupported where operator: {operator}")
+                if not compare(value, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _matches_document(document: str, where_document: Optional[Dict[str, Any]]) -> bool:
+    if not where_document:
+        return True
+    if "$contains" in where_document:
+        return where_document["$contains"] in document
+    if "$not_contains" in where_document:
+        return where_document["$not_contains"] not in document
+    raise ValueError(f"unsupported where_document filter: {where_document}")
+
+
+# ----------------------------------------------------------------------
+# Instantané mappé (workers)
+# ----------------------------------------------------------------------
+
+class Snapshot:
+    """Version publiée de l'index, mappée en lecture seule"""
+
+    def __init__(self, path: Path):
+        import numpy as np
+
+        self.path = path
+        self.version = path.name
+        with open(path / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.generation = Generation(**manifest["generation"])
+        self.dimension = manifest["dimension"]
+        self.distance = manifest["distance"]
+        self.count = manifest["count"]
+        self.published_at = manifest["published_at"]
+
+        if self.count:
+            self.vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r",
+                                     shape=(self.count, self.dimension))
+            self.norms = np.memmap(path / "norms.f32", dtype=np.float32, mode="r", shape=(self.count,))
+            self.offsets = np.memmap(path / "offsets.u64", dtype=np.uint64, mode="r", shape=(self.count + 1,))
+            with open(path / "records.bin", "rb") as f:
+                self.records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.vectors = np.zeros((0, self.dimension), dtype=np.float32)
+            self.norms = np.zeros(0, dtype=np.float32)
+            self.offsets = np.zeros(1, dtype=np.uint64)
+            self.records = b""
+
+    def record(self, index: int) -> Dict[str, Any]:
+        return json.loads(self.records[int(self.offsets[index]):int(self.offsets[index + 1])])
+
+    def distances(self, embedding: List[float]):
+        """Distances de tous les vecteurs à une requête (mêmes formules que ChromaDB)"""
+        import numpy as np
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape != (self.dimension,):
+            raise ValueError(
+                f"query dimension {query.shape[-1]} does not match index dimension {self.dimension}"
+            )
+        # Produit matrice-vecteur sur les pages mappées (BLAS, GIL relâché)
+        dots = self.vectors @ query
+        if self.distance == "l2":
+            return self.norms * self.norms - 2 * dots + float(query @ query)
+        if self.distance == "ip":
+            return 1.0 - dots
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        return 1.0 - dots / (np.maximum(self.norms, 1e-12) * query_norm)
+
+
+class SnapshotCollection:
+    """Collection en lecture seule adossée à un instantané (API ChromaDB)"""
+
+    def __init__(self, snapshot: Optional[Snapshot]):
+        self.snapshot = snapshot
+
+    def count(self) -> int:
+        return self.snapshot.count if self.snapshot is not None else 0
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        import numpy as np
+
+        results: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for embedding in query_embeddings:
+            ids, documents, metadatas, distances = [], [], [], []
+            if self.count() and n_results > 0:
+                scores = self.snapshot.distances(embedding)
+                if where:
+                    # Parcours par distance croissante jusqu'à n_results correspondances
+                    order = np.argsort(scores, kind="stable")
+                else:
+                    k = min(n_results, len(scores))
+                    order = np.argpartition(scores, k - 1)[:k]
+                    order = order[np.argsort(scores[order], kind="stable")]
+                for index in order:
+                    record = self.snapshot.record(int(index))
+                    metadata = record.get("metadata") or {}
+                    if where and not matches(metadata, where):
+                        continue
+                    ids.append(record["id"])
+                    documents.append(record["document"])
+                    metadatas.append(metadata)
+                    distances.append(float(scores[index]))
+                    if len(ids) >= n_results:
+                        break
+            results["ids"].append(ids)
+            results["documents"].append(documents)
+            results["metadatas"].append(metadatas)
+            results["distances"].append(distances)
+        return results
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Parcours séquentiel des enregistrements (filtres, recherche lexicale)"""
+        wanted = set(ids) if ids is not None else None
+        results: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": []}
+        skipped = 0
+        for index in range(self.count()):
+            record = self.snapshot.record(index)
+            metadata = record.get("metadata") or {}
+            if wanted is not None and record["id"] not in wanted:
+                continue
+            if not matches(metadata, where) or not _matches_document(record["document"], where_document):
+                continue
+            if offset and skipped < offset:
+                skipped += 1
+                continue
+            results["ids"].append(record["id"])
+            results["documents"].append(record["document"])
+            results["metadatas"].append(metadata)
+            if limit is not None and len(results["ids"]) >= limit:
+                break
+        return results
+
+    add = upsert = update = delete = _read_only
+
+
+class SharedIndex:
+    """Instantané courant d'une collection, remappé quand CURRENT change"""
+
+    def __init__(self, root: Path, remap_interval: Optional[float] = None):
+        self.root = root
+        self.remap_interval = (
+            config.shared_index.remap_interval_ms / 1000 if remap_interval is None else remap_interval
+        )
+        self._snapshot: Optional[Snapshot] = None
+        self._pointer_state: Optional[tuple] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self.remaps = 0
+        self.errors = 0
+
+    def current(self) -> Optional[Snapshot]:
+        """Instantané à utiliser pour une recherche (None avant la première publication)"""
+        if time.monotonic() - self._checked_at >= self.remap_interval:
+            # Un seul thread vérifie ; les autres continuent sur l'instantané courant
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._refresh()
+                finally:
+                    self._lock.release()
+        return self._snapshot
+
+    def _refresh(self) -> None:
+        self._checked_at = time.monotonic()
+        try:
+            stat = os.stat(self.root / POINTER_FILE)
+        except FileNotFoundError:
+            return
+        # CURRENT est remplacé par os.replace : nouvel inode à chaque publication
+        state = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if state == self._pointer_state:
+            return
+        version = current_version(self.root)
+        if version is None or (self._snapshot is not None and self._snapshot.version == version):
+            self._pointer_state = state
+            return
+        try:
+            snapshot = Snapshot(self.root / version)
+        except (OSError, ValueError, KeyError) as e:
+            # Version supprimée entre-temps : nouvel essai au prochain intervalle
+            self.errors += 1
+            logger.warning(f"Shared index remap failed: {str(e)}", version=version)
+            return
+        previous = self._snapshot
+        self._snapshot = snapshot
+        self._pointer_state = state
+        self.remaps += 1
+        metrics.increment("shared_index_remaps")
+        metrics.set_gauge("shared_index_chunks", snapshot.count)
+        logger.info(
+            "Shared index mapped",
+            version=version,
+            previous=previous.version if previous is not None else None,
+            generation=snapshot.generation.id,
+            chunks=snapshot.count,
+            lag_s=round(time.time() - snapshot.published_at, 2)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot is not None else None,
+            "generation": snapshot.generation.id if snapshot is not None else None,
+            "chunks": snapshot.count if snapshot is not None else 0,
+            "published_at": snapshot.published_at if snapshot is not None else None,
+            "remaps": self.remaps,
+            "errors": self.errors,
+        }
+
+
+class SharedVectorStore(VectorStore):
+    """
+    VectorStore des workers : recherches sur l'instantané mappé
+
+    Même interface de lecture que VectorStore (search, search_many,
+    lexical_search, count...) ; les écritures lèvent ReadOnlyIndexError.
+    """
+
+    def __init__(self, persist_directory: Optional[str] = None, collection_name: Optional[str] = None):
+        self.persist_directory = persist_directory or config.chromadb.persist_directory
+        self.collection_name = collection_name or config.chromadb.collection_name
+        self.shared = SharedIndex(index_root(self.collection_name))
+        self.publisher = None
+        self.write_lock = threading.RLock()
+        self._changed = None
+        self._view: Optional[_ActiveGeneration] = None
+        self._view_snapshot: Optional[Snapshot] = None
+        # Avant la première publication : collection vide, modèle configuré
+        self._pending = Generation(0, self.collection_name, config.openai.embedding_model, STATUS_ACTIVE)
+
+        snapshot = self.shared.current()
+        logger.info(
+            "SharedVectorStore initialized",
+            directory=str(self.shared.root),
+            version=snapshot.version if snapshot is not None else None,
+            document_count=self.count()
+        )
+
+    @property
+    def _active(self) -> _ActiveGeneration:
+        snapshot = self.shared.current()
+        view = self._view
+        if view is None or snapshot is not self._view_snapshot:
+            generation = snapshot.generation if snapshot is not None else self._pending
+            view = _ActiveGeneration(
+                generation=generation,
+                collection=SnapshotCollection(snapshot),
+                embedding_service=get_embedding_service(generation.embedding_model)
+            )
+            self._view, self._view_snapshot = view, snapshot
+        return view
+
+    open_collection = persist = delete_all = activate_generation = drop_generation = _read_only
+
+
+# ----------------------------------------------------------------------
+# Publication des instantanés (writer)
+# ----------------------------------------------------------------------
+
+def _write_snapshot(collection, directory: Path, page_size: int) -> Dict[str, int]:
+    """Exporte une collection ChromaDB page par page dans `directory`"""
+    import numpy as np
+
+    count = 0
+    dimension = 0
+    offsets = [0]
+    with open(directory / "vectors.f32", "wb") as vectors_file, \
+            open(directory / "norms.f32", "wb") as norms_file, \
+            open(directory / "records.bin", "wb") as records_file:
+        while True:
+            page = collection.get(
+                limit=page_size,
+                offset=count,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            ids = page["ids"]
+            if not ids:
+                break
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            dimension = vectors.shape[1]
+            vectors.tofile(vectors_file)
+            np.linalg.norm(vectors, axis=1).astype(np.float32).tofile(norms_file)
+            metadatas = page.get("metadatas") or [None] * len(ids)
+            for doc_id, document, metadata in zip(ids, page["documents"], metadatas):
+                record = json.dumps(
+                    {"id": doc_id, "document": document, "metadata": metadata or {}},
+                    ensure_ascii=False, separators=(",", ":")
+                ).encode("utf-8")
+                records_file.write(record)
+                offsets.append(offsets[-1] + len(record))
+            count += len(ids)
+            if len(ids) < page_size:
+                break
+    np.asarray(offsets, dtype=np.uint64).tofile(directory / "offsets.u64")
+    return {"count": count, "dimension": dimension}
+
+
+class SnapshotPublisher:
+    """
+    Republie l'instantané de la génération active après des écritures
+
+    mark_dirty() est appelé par VectorStore à chaque écriture ; le thread
+    "index-publisher" attend publish_delay pour regrouper une ingestion en
+    une seule publication.
+    """
+
+    def __init__(self, store: VectorStore, root: Optional[Path] = None):
+        cfg = config.shared_index
+        self.store = store
+        self.root = root or index_root(store.collection_name)
+        self.delay = cfg.publish_delay_ms / 1000
+        self.keep_versions = max(1, cfg.keep_versions)
+        self.page_size = max(1, cfg.page_size)
+        self._dirty = threading.Event()
+        # _lock : une publication à la fois ; _thread_lock : démarrage du thread
+        # (appelé sous write_lock, ne doit pas attendre une publication)
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.published = 0
+        self.errors = 0
+        self.version: Optional[str] = current_version(self.root)
+        self.last_duration_ms: Optional[float] = None
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def mark_dirty(self) -> None:
+        self._dirty.set()
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="index-publisher", daemon=True)
+                    self._thread.start()
+
+    def publish(self) -> str:
+        """
+        Exporte la génération active et la rend visible aux workers
+
+        Returns:
+            str: Version publiée
+        """
+        with self._lock:
+            started = time.perf_counter()
+            self.root.mkdir(parents=True, exist_ok=True)
+            version = f"v{self._next_version()}"
+            staging = self.root / f".{version}.tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir()
+            try:
+                # Écritures bloquées pendant l'export : instantané cohérent
+                with self.store.write_lock:
+                    active = self.store._active
+                    exported = _write_snapshot(active.collection, staging, self.page_size)
+                manifest = {
+                    "version": version,
+                    "generation": replace(active.generation, count=exported["count"]).to_dict(),
+                    "dimension": exported["dimension"],
+                    "distance": config.chromadb.distance_function,
+                    "count": exported["count"],
+                    "published_at": time.time(),
+                }
+                with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f)
+                os.rename(staging, self.root / version)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+            pointer = self.root / f".{POINTER_FILE}.tmp"
+            pointer.write_text(version)
+            os.replace(pointer, self.root / POINTER_FILE)
+            self._cleanup(version)
+
+            self.version = version
+            self.published += 1
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            metrics.observe("shared_index_publish_ms", self.last_duration_ms)
+            logger.info(
+                "Shared index published",
+                version=version,
+                generation=manifest["generation"]["id"],
+                chunks=exported["count"],
+                duration_ms=self.last_duration_ms
+            )
+            return version
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "published": self.published,
+            "errors": self.errors,
+            "pending": self._dirty.is_set(),
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+    def close(self) -> None:
+        """Publie les écritures en attente (fin d'une ingestion en ligne de commande)"""
+        if self._dirty.is_set():
+            self._dirty.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"Shared index publish failed: {str(e)}")
+
+    def _run(self) -> None:
+        while True:
+            self._dirty.wait()
+            # Regroupe les écritures d'une même ingestion
+            time.sleep(self.delay)
+            self._dirty.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                self.errors += 1
+                metrics.increment("shared_index_publish_errors")
+                logger.error(f"Shared index publish failed: {str(e)}", exc_info=True)
+
+    def _versions(self) -> List[int]:
+        versions = []
+        for entry in self.root.iterdir():
+            if entry.is_dir() and entry.name.startswith("v") and entry.name[1:].isdigit():
+                versions.append(int(entry.name[1:]))
+        return sorted(versions)
+
+    def _next_version(self) -> int:
+        versions = self._versions()
+        return versions[-1] + 1 if versions else 1
+
+    def _cleanup(self, current: str) -> None:
+        # Un worker qui mappe encore une version supprimée la garde lisible
+        # jusqu'à son remap (fichiers supprimés mais mappés)
+        for number in self._versions()[:-self.keep_versions]:
+            if f"v{number}" != current:
+                shutil.rmtree(self.root / f"v{number}", ignore_errors=True)
+
+    def _after_fork(self) -> None:
+        self._dirty = threading.Event()
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+
+
+def _beat(root: Path) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    staging = root / f".{HEARTBEAT_FILE}.tmp"
+    staging.write_text(json.dumps({"pid": os.getpid(), "at": time.time()}))
+    os.replace(staging, root / HEARTBEAT_FILE)
+
+
+def start_heartbeat(collection_name: Optional[str] = None) -> None:
+    """Battement du writer, lu par les workers pour /health"""
+    root = index_root(collection_name)
+
+    def run() -> None:
+        while True:
+            try:
+                _beat(root)
+            except OSError as e:
+                logger.warning(f"Index writer heartbeat failed: {str(e)}")
+            time.sleep(HEARTBEAT_SECONDS)
+
+    threading.Thread(target=run, name="index-writer-heartbeat", daemon=True).start()
+
+
+def writer_health(collection_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    État du writer vu d'un worker (battement et version publiée)
+
+    Returns:
+        Dict: alive, pid, heartbeat_age_s, version
+    """
+    root = index_root(collection_name)
+    try:
+        beat = json.loads((root / HEARTBEAT_FILE).read_text())
+    except (OSError, ValueError):
+        beat = None
+    age = time.time() - beat["at"] if beat else None
+    return {
+        "alive": age is not None and age < HEARTBEAT_SECONDS * HEARTBEAT_MISSED,
+        "pid": beat["pid"] if beat else None,
+        "heartbeat_age_s": round(age, 1) if age is not None else None,
+        "version": current_version(root),
+    }
+
+
+def wait_for_snapshot(collection_name: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+    """
+    Attend la première publication (démarrage des workers)
+
+    Returns:
+        bool: True si un instantané est disponible
+    """
+    root = index_root(collection_name)
+    deadline = time.monotonic() + (config.shared_index.startup_timeout_seconds if timeout is None else timeout)
+    while current_version(root) is None:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.2)
+    return True
@@ -0,0 +1,96 @@
+# ============================================================================
+# SINGLE FLIGHT - Déduplication des exécutions identiques en cours
+# ============================================================================
+
+"""
+Coalescence "single-flight"
+Quand plusieurs requêtes identiques arrivent en même temps, une seule
+exécution a lieu ; les autres attendent et partagent son résultat
+(ou son exception)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """Exécution en cours partagée par un leader et ses suiveurs"""
+
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Groupe d'exécutions dédupliquées par clé
+
+    Le premier appelant d'une clé (leader) exécute la fonction ;
+    les appelants concurrents de la même clé attendent sa fin.
+    La clé est libérée dès la fin de l'exécution : les appels
+    suivants relancent une exécution neuve (pas de cache).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Exécute fn une seule fois pour tous les appels concurrents de key
+
+        Args:
+            key: Clé de déduplication
+            fn: Fonction à exécuter (sans argument)
+            timeout: Attente maximale d'un suiveur en secondes
+
+        Returns:
+            Tuple (résultat, partagé) : partagé=True pour les suiveurs
+
+        Raises:
+            TimeoutError: Si un suiveur dépasse timeout
+            Exception: L'exception levée par fn, propagée à tous les appelants
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        if not call.event.wait(timeout):
+            raise TimeoutError("Délai dépassé en attente d'une requête identique en cours")
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def in_flight(self) -> int:
+        """Nombre de clés en cours d'exécution"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,172 @@
+# ============================================================================
+# SPECULATIVE RETRIEVAL - Recherche anticipée avant le follow-up RAG
+# ============================================================================
+
+"""
+Retrieval spéculatif
+Le router lance l'embedding + la recherche vectorielle en arrière-plan
+dès qu'il détecte une faible confiance NLU ; ActionRAGQuery récupère
+ensuite le résultat (terminé ou en cours) au lieu de repartir de zéro
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from utils.config import config
+from utils.deadline import Deadline
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.tracing import tracer, wrap
+
+
+def normalize_query(text: str) -> str:
+    """Normalise un message pour servir de clé (casse, espaces)"""
+    return " ".join((text or "").lower().split())
+
+
+class SpeculativeRetriever:
+    """
+    Cache court des recherches spéculatives
+
+    Les entrées sont indexées par (sender_id, message normalisé) et
+    expirent après ttl_seconds. Les spéculations abandonnées ne sont
+    jamais attendues : leur résultat est simplement écarté à l'expiration.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_workers: int = 4,
+        max_entries: int = 512
+    ):
+        """
+        Initialise le retriever spéculatif
+
+        Args:
+            ttl_seconds: Durée de vie d'une spéculation
+            max_workers: Nombre de threads de recherche
+            max_entries: Nombre maximum de spéculations en cache
+        """
+        self.ttl_seconds = ttl_seconds or config.rag.speculative_ttl_seconds
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="speculative"
+        )
+        self._lock = threading.Lock()
+        # Ordre d'insertion = ordre d'expiration (purge en O(expirés))
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Future]]" = OrderedDict()
+
+    def _purge(self, now: float) -> None:
+        """Retire les entrées expirées et l'excédent (lock détenu)"""
+        while self._entries:
+            key, (created_at, future) = next(iter(self._entries.items()))
+            if now - created_at < self.ttl_seconds and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+            future.cancel()
+            metrics.increment("rag_speculative_expired")
+
+    def start(self, sender_id: str, text: str) -> bool:
+        """
+        Lance une recherche spéculative en arrière-plan
+
+        Args:
+            sender_id: ID de l'utilisateur
+            text: Message utilisateur
+
+        Returns:
+            bool: True si une nouvelle spéculation a été lancée
+        """
+        query = normalize_query(text)
+        if not query:
+            return False
+
+        key = (sender_id, query)
+        now = time.monotonic()
+
+        with self._lock:
+            self._purge(now)
+            if key in self._entries:
+                return False
+            future = self._executor.submit(wrap(self._retrieve), text)
+            self._entries[key] = (now, future)
+
+        metrics.increment("rag_speculative_started")
+        logger.debug("Speculative retrieval started", sender_id=sender_id)
+        return True
+
+    def take(
+        self,
+        sender_id: str,
+        text: str,
+        timeout: Optional[float] = None
+    ) -> Optional[List]:
+        """
+        Récupère (et retire du cache) le résultat d'une spéculation
+
+        Une spéculation encore en cours est attendue : elle a déjà
+        une avance sur une recherche qui repartirait de zéro.
+
+        Args:
+            sender_id: ID de l'utilisateur
+            text: Message utilisateur
+            timeout: Attente maximale en secondes pour une recherche en cours
+
+        Returns:
+            List[SearchResult] ou None si aucune spéculation exploitable
+        """
+        key = (sender_id, normalize_query(text))
+
+        with self._lock:
+            self._purge(time.monotonic())
+            entry = self._entries.pop(key, None)
+
+        if entry is None:
+            metrics.increment("rag_speculative_misses")
+            return None
+
+        _, future = entry
+        was_done = future.done()
+
+        try:
+            with tracer.span("rag.speculative_take", done=was_done):
+                results = future.result(
+                    timeout=timeout if timeout is not None else config.openai.timeout
+                )
+        except Exception as e:
+            metrics.increment("rag_speculative_errors")
+            logger.warning(f"Speculative retrieval unusable: {str(e)}", sender_id=sender_id)
+            return None
+
+        metrics.increment("rag_speculative_hits", state="done" if was_done else "in_flight")
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @staticmethod
+    def _retrieve(text: str) -> List:
+        """Exécute la recherche avec les paramètres par défaut du pipeline"""
+        from core.rag_pipeline import get_rag_pipeline
+
+        deadline = Deadline.after_ms(config.rag.request_deadline_ms)
+        with metrics.timer("rag_speculative_retrieve_ms"), tracer.span("rag.speculative_retrieve"):
+            return get_rag_pipeline().retrieve(text, deadline=deadline)
+
+
+_speculative_retriever: Optional[SpeculativeRetriever] = None
+_speculative_retriever_lock = threading.Lock()
+
+
+def get_speculative_retriever() -> SpeculativeRetriever:
+    global _speculative_retriever
+    if _speculative_retriever is None:
+        with _speculative_retriever_lock:
+            if _speculative_retriever is None:
+                _speculative_retriever = SpeculativeRetriever()
+    return _speculative_retriever
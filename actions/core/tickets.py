@@ -0,0 +1,349 @@
+# ============================================================================
+# TICKETS - Stockage des tickets support et cache des statuts
+# ============================================================================
+
+"""
+Stockage des tickets (support, rappels)
+
+- MongoTicketStore : collection tickets (index unique sur ticket_id). La
+  création est un insert_one confirmé (le numéro n'est annoncé qu'une fois
+  le ticket écrit) ; le changement de statut passe par le writer
+  asynchrone (core/persistence.py) ; la lecture est un find_one sur
+  l'index unique.
+- InMemoryTicketStore : dictionnaire local, pour les tests et benchmarks.
+
+Les deux partagent un cache LRU à TTL devant la lecture : un statut est
+servi depuis la mémoire pendant cache_ttl_seconds, un numéro inconnu
+pendant negative_ttl_seconds. Un ticket créé par ce processus est en
+cache dès son écriture.
+"""
+
+import abc
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+# Statuts d'un ticket et libellés affichés à l'utilisateur
+STATUS_OPEN = "open"
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_WAITING_CUSTOMER = "waiting_customer"
+STATUS_RESOLVED = "resolved"
+STATUS_CLOSED = "closed"
+
+STATUS_LABELS = {
+    STATUS_OPEN: "Ouvert, en attente de prise en charge",
+    STATUS_IN_PROGRESS: "En cours de traitement",
+    STATUS_WAITING_CUSTOMER: "En attente de votre retour",
+    STATUS_RESOLVED: "Résolu",
+    STATUS_CLOSED: "Fermé",
+}
+
+# Alphabet de Crockford : pas de I, L, O, U (lecture et saisie orales)
+_ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ID_LENGTH = 8  # 40 bits : collisions négligeables jusqu'à des dizaines de millions
+_ID_ALIASES = str.maketrans({"O": "0", "I": "1", "L": "1"})
+
+# Champs lus pour un statut (le document complet n'est pas transféré)
+_LOOKUP_PROJECTION = {
+    "_id": 0, "ticket_id": 1, "type": 1, "status": 1, "sender_id": 1,
+    "createdAt": 1, "updatedAt": 1,
+}
+
+
+def new_ticket_id(prefix: str = "TKT") -> str:
+    """Numéro de ticket aléatoire, ex. TKT-7K2M9QXD"""
+    return f"{prefix}-" + "".join(secrets.choice(_ID_ALPHABET) for _ in range(_ID_LENGTH))
+
+
+def normalize_ticket_id(value: str) -> str:
+    """Numéro saisi par l'utilisateur -> numéro stocké (" tkt-7k2m 9qxd" -> "TKT-7K2M9QXD")"""
+    value = "".join(value.split()).upper()
+    prefix, sep, rest = value.partition("-")
+    if not sep:
+        return value
+    return f"{prefix}-{rest.replace('-', '').translate(_ID_ALIASES)}"
+
+
+@dataclass
+class Ticket:
+    """Ticket support ou demande de rappel"""
+    ticket_id: str
+    type: str
+    status: str
+    sender_id: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def status_label(self) -> str:
+        return STATUS_LABELS.get(self.status, self.status)
+
+    def to_document(self) -> Dict[str, Any]:
+        """Document MongoDB (champs métier à plat, dates createdAt/updatedAt)"""
+        return {
+            "ticket_id": self.ticket_id,
+            "type": self.type,
+            "status": self.status,
+            "sender_id": self.sender_id,
+            **self.fields,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "Ticket":
+        known = {"_id", "ticket_id", "type", "status", "sender_id", "createdAt", "updatedAt"}
+        return cls(
+            ticket_id=document["ticket_id"],
+            type=document.get("type", "support"),
+            status=document.get("status", STATUS_OPEN),
+            sender_id=document.get("sender_id"),
+            created_at=document.get("createdAt") or datetime.now(timezone.utc),
+            updated_at=document.get("updatedAt") or document.get("createdAt") or datetime.now(timezone.utc),
+            fields={key: value for key, value in document.items() if key not in known},
+        )
+
+
+class TicketCache:
+    """Cache LRU à TTL des tickets (None : numéro inconnu)"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, negative_ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Ticket]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ticket_id: str) -> Tuple[bool, Optional[Ticket]]:
+        """(trouvé en cache, ticket) ; un ticket None en cache est un numéro inconnu"""
+        with self._lock:
+            entry = self._entries.get(ticket_id)
+            if entry is None:
+                return False, None
+            expires_at, ticket = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[ticket_id]
+                return False, None
+            self._entries.move_to_end(ticket_id)
+            return True, ticket
+
+    def put(self, ticket_id: str, ticket: Optional[Ticket]) -> None:
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl_seconds if ticket is not None else self.negative_ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[ticket_id] = (time.monotonic() + ttl, ticket)
+            self._entries.move_to_end(ticket_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ticket_id: str) -> None:
+        with self._lock:
+            self._entries.pop(ticket_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TicketStore(abc.ABC):
+    """Stockage des tickets : création, lecture read-through, changement de statut"""
+
+    name = "base"
+
+    def __init__(self, cache: Optional[TicketCache] = None):
+        cfg = config.tickets
+        self.cache = cache or TicketCache(cfg.cache_size, cfg.cache_ttl_seconds, cfg.negative_ttl_seconds)
+
+    def create(self, ticket_type: str, sender_id: Optional[str] = None,
+               prefix: str = "TKT", **fields: Any) -> Ticket:
+        """
+        Crée un ticket ouvert (bloquant : écriture confirmée)
+
+        Args:
+            ticket_type: support, callback...
+            sender_id: Utilisateur Rasa
+            prefix: Préfixe du numéro (TKT, CB)
+            **fields: Champs métier (user_name, user_email, user_phone...)
+
+        Raises:
+            Exception: Si le ticket n'a pas pu être écrit
+        """
+        ticket = Ticket(new_ticket_id(prefix), ticket_type, STATUS_OPEN, sender_id, fields=fields)
+        self._insert(ticket)
+        self.cache.put(ticket.ticket_id, ticket)
+        metrics.increment("tickets_created", type=ticket_type, store=self.name)
+        return ticket
+
+    def get_cached(self, ticket_id: str) -> Tuple[bool, Optional[Ticket]]:
+        """Lecture en cache seulement : (trouvé en cache, ticket), sans I/O"""
+        hit, ticket = self.cache.get(normalize_ticket_id(ticket_id))
+        metrics.increment("ticket_cache", result="hit" if hit else "miss")
+        return hit, ticket
+
+    def fetch(self, ticket_id: str) -> Optional[Ticket]:
+        """Lecture dans le stockage (bloquante), résultat mis en cache"""
+        ticket_id = normalize_ticket_id(ticket_id)
+        with metrics.timer("ticket_lookup_ms", store=self.name):
+            ticket = self._find(ticket_id)
+        self.cache.put(ticket_id, ticket)
+        return ticket
+
+    def get(self, ticket_id: str) -> Optional[Ticket]:
+        """Ticket par numéro : cache, sinon stockage"""
+        hit, ticket = self.get_cached(ticket_id)
+        return ticket if hit else self.fetch(ticket_id)
+
+    def update_status(self, ticket_id: str, status: str) -> None:
+        """Change le statut (le cache de ce processus est mis à jour)"""
+        if status not in STATUS_LABELS:
+            raise ValueError(f"Statut de ticket inconnu: {status}")
+        ticket_id = normalize_ticket_id(ticket_id)
+        updated_at = datetime.now(timezone.utc)
+        self._update_status(ticket_id, status, updated_at)
+        # L'écriture MongoDB est différée : garder le nouveau statut en cache
+        hit, ticket = self.cache.get(ticket_id)
+        if hit and ticket is not None:
+            self.cache.put(ticket_id, replace(ticket, status=status, updated_at=updated_at))
+        else:
+            self.cache.invalidate(ticket_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"store": self.name, "cached": len(self.cache)}
+
+    @abc.abstractmethod
+    def _insert(self, ticket: Ticket) -> None:
+        """Écrit un nouveau ticket (lève une exception en cas d'échec)"""
+
+    @abc.abstractmethod
+    def _find(self, ticket_id: str) -> Optional[Ticket]:
+        """Ticket stocké sous ce numéro normalisé, None si inconnu"""
+
+    @abc.abstractmethod
+    def _update_status(self, ticket_id: str, status: str, updated_at: datetime) -> None:
+        """Enregistre le nouveau statut"""
+
+
+class InMemoryTicketStore(TicketStore):
+    """Tickets en mémoire du processus (tests, benchmarks)"""
+
+    name = "memory"
+
+    def __init__(self, cache: Optional[TicketCache] = None):
+        super().__init__(cache)
+        self._tickets: Dict[str, Ticket] = {}
+        self._lock = threading.Lock()
+
+    def _insert(self, ticket: Ticket) -> None:
+        with self._lock:
+            if ticket.ticket_id in self._tickets:
+                raise ValueError(f"Ticket déjà existant: {ticket.ticket_id}")
+            self._tickets[ticket.ticket_id] = ticket
+
+    def _find(self, ticket_id: str) -> Optional[Ticket]:
+        return self._tickets.get(ticket_id)
+
+    def _update_status(self, ticket_id: str, status: str, updated_at: datetime) -> None:
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is None:
+                raise KeyError(ticket_id)
+            ticket.status = status
+            ticket.updated_at = updated_at
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+
+class MongoTicketStore(TicketStore):
+    """
+    Tickets dans la collection MongoDB configurée
+
+    Création confirmée (insert_one), changements de statut via le writer
+    asynchrone ; lectures synchrones (find_one sur l'index unique
+    ticket_id, projection réduite, maxTimeMS). Le statut est
+    aussi modifié par le backend : la fraîcheur vue par le bot est bornée
+    par cache_ttl_seconds.
+    """
+
+    name = "mongodb"
+
+    def __init__(self, collection=None, writer=None, cache: Optional[TicketCache] = None):
+        """
+        Args:
+            collection: Collection pymongo (défaut : tickets de MongoDBConfig)
+            writer: MongoWriter (défaut : writer partagé)
+            cache: Cache des lectures (défaut : TicketConfig)
+        """
+        super().__init__(cache)
+        self.collection_name = config.mongodb.tickets_collection
+        self.timeout_ms = config.tickets.lookup_timeout_ms
+        self._collection = collection
+        self._writer = writer
+        self._indexed = False
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            from core.persistence import get_collection
+
+            self._collection = get_collection(self.collection_name)
+        if not self._indexed:
+            from core.persistence import ensure_indexes
+
+            ensure_indexes(self.collection_name, self._collection)
+            self._indexed = True
+        return self._collection
+
+    @property
+    def writer(self):
+        if self._writer is None:
+            from core.persistence import get_mongo_writer
+
+            self._writer = get_mongo_writer()
+        return self._writer
+
+    def _insert(self, ticket: Ticket) -> None:
+        self.collection.insert_one(ticket.to_document())
+
+    def _find(self, ticket_id: str) -> Optional[Ticket]:
+        document = self.collection.find_one(
+            {"ticket_id": ticket_id}, _LOOKUP_PROJECTION, max_time_ms=self.timeout_ms
+        )
+        return Ticket.from_document(document) if document else None
+
+    def _update_status(self, ticket_id: str, status: str, updated_at: datetime) -> None:
+        from pymongo import UpdateOne
+
+        self.writer.submit(self.collection_name, UpdateOne(
+            {"ticket_id": ticket_id}, {"$set": {"status": status, "updatedAt": updated_at}}
+        ))
+
+
+_ticket_store: Optional[TicketStore] = None
+_ticket_store_lock = threading.Lock()
+
+
+def get_ticket_store() -> TicketStore:
+    """Stockage des tickets configuré (TICKET_STORE)"""
+    global _ticket_store
+    if _ticket_store is None:
+        with _ticket_store_lock:
+            if _ticket_store is None:
+                if config.tickets.store == "memory":
+                    _ticket_store = InMemoryTicketStore()
+                else:
+                    _ticket_store = MongoTicketStore()
+                logger.info("Ticket store initialized", store=_ticket_store.name)
+    return _ticket_store
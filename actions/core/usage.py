@@ -0,0 +1,369 @@
+# ============================================================================
+# USAGE - Consommation de tokens et coût par conversation, intent et étape
+# ============================================================================
+
+"""
+Suivi de la consommation OpenAI
+
+Chaque appel (chat, embeddings) enregistre ses tokens et son coût estimé,
+agrégés en mémoire par jour, utilisateur, intent, modèle et étape du
+pipeline. Un thread écrit périodiquement les agrégats dans la collection
+analytics de MongoDB ($inc, un document par clé et par jour).
+
+L'attribution passe par un contexte (contextvars) posé par les actions :
+
+    with usage_scope(sender_id=tracker.sender_id, intent=intent):
+        ...
+
+Les budgets par utilisateur et par jour dégradent le pipeline : au-delà
+du budget, modèle rapide sans escalade ; au-delà du budget dur, réponse
+extractive sans appel LLM.
+"""
+
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+import os
+
+from utils.config import config
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+# Prix par défaut en USD par million de tokens (entrée, sortie)
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-ada-002": (0.10, 0.0),
+}
+
+# État du budget d'un utilisateur
+BUDGET_OK = "ok"
+BUDGET_SOFT = "soft"  # Modèle rapide uniquement
+BUDGET_HARD = "hard"  # Plus d'appel LLM
+
+# Type des documents dans la collection analytics
+ANALYTICS_TYPE = "token_usage"
+
+# Clés agrégées en attente au-delà desquelles les nouvelles sont abandonnées
+MAX_PENDING_KEYS = 50000
+
+# (jour, sender_id, intent, modèle, étape)
+UsageKey = Tuple[str, str, str, str, str]
+
+_scope: "contextvars.ContextVar[Dict[str, str]]" = contextvars.ContextVar("usage_scope", default={})
+
+
+class TokenBudgetExceeded(Exception):
+    """Budget dur de l'utilisateur épuisé : pas d'appel LLM"""
+
+    def __init__(self, sender_id: str, used: int, limit: int):
+        self.sender_id = sender_id
+        self.used = used
+        self.limit = limit
+        super().__init__(f"Budget tokens épuisé pour {sender_id} ({used}/{limit})")
+
+
+@contextmanager
+def usage_scope(**attributes: Optional[str]) -> Iterator[None]:
+    """
+    Attribue les appels OpenAI du bloc (sender_id, intent, stage)
+
+    Les attributs s'ajoutent à ceux du scope englobant. Le contexte suit
+    les coroutines ; pour un thread, passer par utils.tracing.wrap().
+    """
+    token = _scope.set({
+        **_scope.get(),
+        **{key: str(value) for key, value in attributes.items() if value is not None}
+    })
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> Dict[str, str]:
+    """Attributs du usage_scope courant (sender_id, intent, stage)"""
+    return _scope.get()
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class UsageTotals:
+    """Compteurs agrégés d'une clé"""
+
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens", "cost_usd", "duration_ms")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.duration_ms = 0.0
+
+    def add(self, other: "UsageTotals") -> None:
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cost_usd += other.cost_usd
+        self.duration_ms += other.duration_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "duration_ms": round(self.duration_ms, 2),
+        }
+
+
+class UsageTracker:
+    """
+    Agrégation en mémoire, écriture périodique dans MongoDB et budgets
+
+    Les budgets sont comptés par processus : avec plusieurs workers,
+    chacun applique la limite à sa part du trafic.
+    """
+
+    def __init__(self, collection=None):
+        """
+        Args:
+            collection: Collection MongoDB (défaut : analytics de MongoDBConfig)
+        """
+        cfg = config.usage
+        self.enabled = cfg.enabled
+        self.flush_interval = cfg.flush_interval_seconds
+        self.soft_limit = cfg.sender_daily_tokens
+        self.hard_limit = cfg.sender_daily_hard_tokens
+        self.prices = {**DEFAULT_PRICES, **cfg.prices}
+        self._collection = collection
+        self._pending: Dict[UsageKey, UsageTotals] = {}
+        self._daily: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.flushed = 0
+        self.flush_errors = 0
+        self.dropped = 0
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def price(self, model: str) -> Tuple[float, float]:
+        """Prix (entrée, sortie) du modèle : exact, sinon plus long préfixe"""
+        if model in self.prices:
+            return self.prices[model]
+        matches = [name for name in self.prices if model.startswith(name)]
+        return self.prices[max(matches, key=len)] if matches else (0.0, 0.0)
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+        prompt_price, completion_price = self.price(model)
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record(self, operation: str, model: str, prompt_tokens: int,
+               completion_tokens: int = 0, duration_ms: float = 0.0) -> None:
+        """
+        Enregistre la consommation d'un appel OpenAI
+
+        Args:
+            operation: Opération (chat, embed, embed_batch), étape par défaut
+            model: Modèle appelé
+            prompt_tokens: Tokens d'entrée (usage.prompt_tokens)
+            completion_tokens: Tokens générés
+            duration_ms: Durée de l'appel
+        """
+        if not self.enabled:
+            return
+        scope = _scope.get()
+        sender_id = scope.get("sender_id", "-")
+        stage = scope.get("stage", operation)
+        day = _today()
+        usage = UsageTotals()
+        usage.calls = 1
+        usage.prompt_tokens = prompt_tokens or 0
+        usage.completion_tokens = completion_tokens or 0
+        usage.cost_usd = self.cost(model, usage.prompt_tokens, usage.completion_tokens)
+        usage.duration_ms = duration_ms
+        total = usage.prompt_tokens + usage.completion_tokens
+
+        with self._lock:
+            self._merge((day, sender_id, scope.get("intent", "-"), model, stage), usage)
+            if sender_id != "-":
+                self._daily[(sender_id, day)] = self._daily.get((sender_id, day), 0) + total
+
+        metrics.increment("llm_tokens", total, model=model, stage=stage)
+        metrics.increment("llm_cost_usd", usage.cost_usd, model=model)
+        if self._thread is None:
+            self._start()
+
+    def used_today(self, sender_id: str) -> int:
+        """Tokens consommés aujourd'hui par l'utilisateur (ce processus)"""
+        return self._daily.get((sender_id, _today()), 0)
+
+    def budget_state(self, sender_id: Optional[str] = None) -> str:
+        """
+        État du budget journalier de l'utilisateur
+
+        Args:
+            sender_id: Utilisateur (défaut : celui du usage_scope courant)
+
+        Returns:
+            BUDGET_OK, BUDGET_SOFT ou BUDGET_HARD
+        """
+        if not (self.soft_limit or self.hard_limit):
+            return BUDGET_OK
+        sender_id = sender_id or _scope.get().get("sender_id")
+        if not sender_id:
+            return BUDGET_OK
+        used = self.used_today(sender_id)
+        if self.hard_limit and used >= self.hard_limit:
+            return BUDGET_HARD
+        if self.soft_limit and used >= self.soft_limit:
+            return BUDGET_SOFT
+        return BUDGET_OK
+
+    def check_budget(self, sender_id: Optional[str] = None) -> str:
+        """
+        Comme budget_state(), mais lève TokenBudgetExceeded au-delà du budget dur
+        """
+        state = self.budget_state(sender_id)
+        if state == BUDGET_HARD:
+            sender_id = sender_id or _scope.get().get("sender_id")
+            metrics.increment("llm_budget_exceeded", limit="hard")
+            raise TokenBudgetExceeded(sender_id, self.used_today(sender_id), self.hard_limit)
+        if state == BUDGET_SOFT:
+            metrics.increment("llm_budget_exceeded", limit="soft")
+        return state
+
+    def flush(self) -> int:
+        """
+        Écrit les agrégats en attente dans MongoDB
+
+        En cas d'échec, les agrégats sont remis en attente pour le flush suivant.
+
+        Returns:
+            int: Nombre de documents mis à jour
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            today = _today()
+            self._daily = {key: used for key, used in self._daily.items() if key[1] == today}
+        if not pending:
+            return 0
+
+        try:
+            from pymongo import UpdateOne
+
+            now = datetime.now(timezone.utc)
+            operations = []
+            for (day, sender_id, intent, model, stage), usage in pending.items():
+                totals = usage.to_dict()
+                operations.append(UpdateOne(
+                    {"type": ANALYTICS_TYPE, "date": day, "sender_id": sender_id,
+                     "intent": intent, "model": model, "stage": stage},
+                    {
+                        "$inc": totals,
+                        "$set": {"updatedAt": now},
+                        "$setOnInsert": {
+                            "createdAt": datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+                        },
+                    },
+                    upsert=True
+                ))
+            self._get_collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            self.flush_errors += 1
+            metrics.increment("usage_flush_errors")
+            logger.warning(f"Token usage flush failed: {str(e)}", keys=len(pending))
+            with self._lock:
+                for key, usage in pending.items():
+                    self._merge(key, usage)
+            return 0
+
+        self.flushed += len(pending)
+        logger.debug("Token usage flushed", documents=len(pending))
+        return len(pending)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Agrégats en attente par modèle et étape (debug, admin)"""
+        totals: Dict[str, UsageTotals] = {}
+        with self._lock:
+            for (_, _, _, model, stage), usage in self._pending.items():
+                totals.setdefault(f"{model}/{stage}", UsageTotals()).add(usage)
+        return {key: usage.to_dict() for key, usage in totals.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "flush_errors": self.flush_errors,
+            "dropped": self.dropped,
+            "senders_today": len(self._daily),
+        }
+
+    def close(self) -> None:
+        """Arrête le thread et écrit les derniers agrégats"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+    def _merge(self, key: UsageKey, usage: UsageTotals) -> None:
+        # Lock détenu
+        totals = self._pending.get(key)
+        if totals is None:
+            if len(self._pending) >= MAX_PENDING_KEYS:
+                self.dropped += 1
+                metrics.increment("usage_records_dropped")
+                return
+            totals = self._pending[key] = UsageTotals()
+        totals.add(usage)
+
+    def _get_collection(self):
+        if self._collection is None:
+            from core.persistence import get_collection
+
+            self._collection = get_collection(config.mongodb.analytics_collection)
+        return self._collection
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="usage-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _after_fork(self) -> None:
+        # Agrégats du parent écrits par le parent ; client MongoDB non partageable
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+        self._collection = None
+
+
+_usage_tracker: Optional[UsageTracker] = None
+_usage_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    global _usage_tracker
+    if _usage_tracker is None:
+        with _usage_tracker_lock:
+            if _usage_tracker is None:
+                _usage_tracker = UsageTracker()
+    return _usage_tracker
@@ -5,21 +5,37 @@
 """
 Module de gestion du Vector Store avec ChromaDB
 Stocke et recherche les documents par similarité sémantique
+
+Les lectures et écritures portent sur la génération active de la
+collection (core.generations) : un ré-embedding bascule vers une nouvelle
+génération sans interrompre la recherche.
 """
 
 import os
+import re
 import time
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
-import chromadb
-from chromadb.config import Settings
-
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.config import config
+from utils.deadline import Deadline, DeadlineExceeded
 from utils.logger import logger
-from core.embeddings import get_embedding_service
+from utils.tracing import tracer
+from core.admission import AdmissionRejected
+from core.circuit_breaker import CircuitOpenError
+from core.embeddings import EmbeddingService, get_embedding_service
+from core.generations import (
+    STATUS_ACTIVE,
+    STATUS_BUILDING,
+    Generation,
+    GenerationError,
+    GenerationRegistry,
+)
+
+
+# Longueur minimum d'un terme pour la recherche lexicale (ignore le, de, la...)
+LEXICAL_MIN_TERM_LENGTH = 4
 
 
 @dataclass
@@ -30,6 +46,15 @@ class SearchResult:
     metadata: Dict[str, Any]
     score: float  # Distance (plus petit = plus proche)
     relevance: float  # Score de pertinence normalisé (0-1)
+    lexical: bool = False  # Issu de la recherche lexicale (mode dégradé)
+
+
+@dataclass(frozen=True)
+class _ActiveGeneration:
+    """Génération lue par le store : remplacée d'un bloc lors d'une bascule"""
+    generation: Generation
+    collection: Any
+    embedding_service: EmbeddingService
 
 
 class VectorStore:
@@ -60,28 +85,73 @@ class VectorStore:
         # S'assurer que le répertoire existe
         os.makedirs(self.persist_directory, exist_ok=True)
         
-        # Initialiser ChromaDB avec persistance
+        # Initialiser ChromaDB avec persistance (import différé : coûteux)
+        import chromadb
+        from chromadb.config import Settings
+
         self.client = chromadb.Client(Settings(
             chroma_db_impl="duckdb+parquet",
             persist_directory=self.persist_directory
         ))
         
-        # Récupérer ou créer la collection
-        self.collection = self.client.get_or_create_collection(
-            name=self.collection_name,
-            metadata={"hnsw:space": config.chromadb.distance_function}
-        )
+        # Génération active : collection physique + modèle d'embedding
+        self.generations = GenerationRegistry(self.persist_directory, self.collection_name)
+        self._active = self._open_generation(self.generations.active())
         
-        # Service d'embeddings
-        self.embedding_service = get_embedding_service()
+        # Écritures sérialisées avec la bascule de génération ; ids modifiés
+        # pendant un ré-embedding (None hors ré-embedding)
+        self.write_lock = threading.RLock()
+        self._changed: Optional[Set[str]] = None
+        # Publication des instantanés lus par les workers (core.shared_index)
+        self.publisher = None
+        
+        generation = self.generation
+        if generation.embedding_model != config.openai.embedding_model:
+            logger.warning(
+                "OPENAI_EMBEDDING_MODEL differs from the active generation: "
+                "queries keep using the generation model until a re-embedding completes",
+                configured_model=config.openai.embedding_model,
+                generation_model=generation.embedding_model
+            )
         
         logger.info(
             "VectorStore initialized",
             persist_directory=self.persist_directory,
-            collection=self.collection_name,
+            collection=generation.collection,
+            generation=generation.id,
+            embedding_model=generation.embedding_model,
             document_count=self.collection.count()
         )
     
+    @property
+    def collection(self):
+        """Collection ChromaDB de la génération active"""
+        return self._active.collection
+    
+    @property
+    def embedding_service(self) -> EmbeddingService:
+        """Service d'embeddings du modèle de la génération active"""
+        return self._active.embedding_service
+    
+    @property
+    def generation(self) -> Generation:
+        """Génération active"""
+        return self._active.generation
+    
+    def open_collection(self, name: str):
+        """Récupère ou crée une collection physique"""
+        return self.client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": config.chromadb.distance_function}
+        )
+    
+    def _open_generation(self, generation: Generation) -> _ActiveGeneration:
+        return _ActiveGeneration(
+            generation=generation,
+            collection=self.open_collection(generation.collection),
+            embedding_service=get_embedding_service(generation.embedding_model)
+        )
+    
     def add_document(
         self,
         doc_id: str,
@@ -98,15 +168,22 @@ class VectorStore:
         """
         try:
             # Générer l'embedding
-            embedding = self.embedding_service.embed(content)
+            service = self.embedding_service
+            embedding = service.embed(content)
             
             # Ajouter à la collection
-            self.collection.add(
-                ids=[doc_id],
-                embeddings=[embedding],
-                documents=[content],
-                metadatas=[metadata or {}]
-            )
+            with self.write_lock:
+                active = self._active
+                if active.embedding_service.model != service.model:
+                    # Bascule de génération pendant le calcul de l'embedding
+                    embedding = active.embedding_service.embed(content)
+                active.collection.add(
+                    ids=[doc_id],
+                    embeddings=[embedding],
+                    documents=[content],
+                    metadatas=[metadata or {}]
+                )
+                self._track([doc_id])
             
             logger.info(
                 f"Document added: {doc_id}",
@@ -123,13 +200,18 @@ class VectorStore:
     
     def add_documents(
         self,
-        documents: List[Dict[str, Any]]
+        documents: List[Dict[str, Any]],
+        embeddings: Optional[List[List[float]]] = None,
+        embedding_model: Optional[str] = None
     ) -> int:
         """
         Ajoute plusieurs documents en batch
         
         Args:
             documents: Liste de dicts avec keys: id, content, metadata
+            embeddings: Embeddings déjà calculés (même ordre que documents)
+            embedding_model: Modèle des embeddings fournis (défaut : celui
+                de la génération active) ; recalculés s'il a changé entre-temps
             
         Returns:
             int: Nombre de documents ajoutés
@@ -143,19 +225,29 @@ class VectorStore:
             metadatas = [doc.get("metadata", {}) for doc in documents]
             
             # Générer les embeddings en batch
-            embeddings = self.embedding_service.embed_chunks(contents)
+            if embeddings is None:
+                service = self.embedding_service
+                embeddings = service.embed_chunks(contents)
+                embedding_model = service.model
             
-            # Ajouter à la collection
-            self.collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=contents,
-                metadatas=metadatas
-            )
+            with self.write_lock:
+                active = self._active
+                if embedding_model and embedding_model != active.generation.embedding_model:
+                    # Bascule de génération pendant le calcul des embeddings
+                    embeddings = active.embedding_service.embed_chunks(contents)
+                
+                # Upsert : rejouer un batch (reprise d'ingestion) ne crée pas de doublon
+                active.collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=contents,
+                    metadatas=metadatas
+                )
+                self._track(ids)
             
             logger.info(
                 f"Batch documents added: {len(documents)}",
-                total_count=self.collection.count()
+                total_count=active.collection.count()
             )
             
             return len(documents)
@@ -173,7 +265,8 @@ class VectorStore:
         query: str,
         top_k: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None,
-        min_relevance: Optional[float] = None
+        min_relevance: Optional[float] = None,
+        deadline: Optional[Deadline] = None
     ) -> List[SearchResult]:
         """
         Recherche les documents les plus similaires à la requête
@@ -183,6 +276,7 @@ class VectorStore:
             top_k: Nombre de résultats à retourner
             filter_metadata: Filtre sur les métadonnées
             min_relevance: Score minimum de pertinence (0-1)
+            deadline: Deadline de la requête utilisateur
             
         Returns:
             List[SearchResult]: Résultats ordonnés par pertinence
@@ -193,18 +287,21 @@ class VectorStore:
         
         start_time = time.time()
         min_relevance = min_relevance or config.rag.min_relevance_score
+        # Modèle et collection de la même génération, même pendant une bascule
+        active = self._active
         
         try:
             # Générer l'embedding de la requête
-            query_embedding = self.embedding_service.embed(query)
+            query_embedding = active.embedding_service.embed(query, deadline=deadline)
             
             # Rechercher dans ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                where=filter_metadata,
-                include=["documents", "metadatas", "distances"]
-            )
+            with tracer.span("vector_store.query", top_k=top_k, generation=active.generation.id):
+                results = active.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=top_k,
+                    where=filter_metadata,
+                    include=["documents", "metadatas", "distances"]
+                )
             
             # Construire les résultats
             search_results = []
@@ -238,6 +335,10 @@ class VectorStore:
             
             return search_results
             
+        except (DeadlineExceeded, CircuitOpenError, AdmissionRejected):
+            # Budget épuisé, embeddings indisponibles ou serveur saturé :
+            # l'appelant doit le savoir (pas un "aucun résultat")
+            raise
         except Exception as e:
             logger.error(
                 f"Erreur lors de la recherche: {str(e)}",
@@ -246,6 +347,83 @@ class VectorStore:
             )
             return []
     
+    def lexical_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        max_terms: int = 4
+    ) -> List[SearchResult]:
+        """
+        Recherche par mots-clés, sans embedding (mode dégradé)
+        
+        Les chunks contenant les termes les plus longs de la requête sont
+        récupérés via le filtre $contains de ChromaDB, puis classés par
+        proportion des termes de la requête qu'ils contiennent.
+        
+        Args:
+            query: Requête de recherche
+            top_k: Nombre de résultats à retourner
+            filter_metadata: Filtre sur les métadonnées
+            max_terms: Nombre de termes interrogés dans ChromaDB
+            
+        Returns:
+            List[SearchResult]: Résultats ordonnés par recouvrement des termes
+        """
+        terms = sorted({
+            term for term in re.findall(r"\w+", (query or "").lower())
+            if len(term) >= LEXICAL_MIN_TERM_LENGTH
+        }, key=len, reverse=True)
+        if not terms:
+            return []
+        
+        start_time = time.time()
+        candidates: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        collection = self.collection
+        
+        try:
+            with tracer.span("vector_store.lexical_query", terms=min(len(terms), max_terms)):
+                for term in terms[:max_terms]:
+                    # $contains est sensible à la casse
+                    for variant in {term, term.capitalize()}:
+                        results = collection.get(
+                            where=filter_metadata,
+                            where_document={"$contains": variant},
+                            limit=top_k * 4,
+                            include=["documents", "metadatas"]
+                        )
+                        for i, doc_id in enumerate(results["ids"]):
+                            metadata = results["metadatas"][i] if results["metadatas"] else {}
+                            candidates[doc_id] = (results["documents"][i], metadata or {})
+        except Exception as e:
+            logger.error(f"Erreur recherche lexicale: {str(e)}", exc_info=True)
+            return []
+        
+        search_results = []
+        for doc_id, (content, metadata) in candidates.items():
+            lowered = content.lower()
+            relevance = sum(1 for term in terms if term in lowered) / len(terms)
+            search_results.append(SearchResult(
+                id=doc_id,
+                content=content,
+                metadata=metadata,
+                score=1 - relevance,
+                relevance=relevance,
+                lexical=True
+            ))
+        
+        search_results.sort(key=lambda r: r.relevance, reverse=True)
+        search_results = search_results[:top_k]
+        
+        logger.info(
+            "Lexical search",
+            terms=len(terms),
+            candidates=len(candidates),
+            num_results=len(search_results),
+            duration_ms=round((time.time() - start_time) * 1000, 2)
+        )
+        return search_results
+    
     def search_with_embedding(
         self,
         embedding: List[float],
@@ -264,34 +442,68 @@ class VectorStore:
             List[SearchResult]: Résultats de recherche
         """
         try:
-            results = self.collection.query(
-                query_embeddings=[embedding],
-                n_results=top_k,
-                where=filter_metadata,
-                include=["documents", "metadatas", "distances"]
-            )
-            
-            search_results = []
-            
-            if results["ids"] and results["ids"][0]:
-                for i, doc_id in enumerate(results["ids"][0]):
-                    distance = results["distances"][0][i]
-                    relevance = max(0, 1 - distance)
-                    
-                    search_results.append(SearchResult(
-                        id=doc_id,
-                        content=results["documents"][0][i],
-                        metadata=results["metadatas"][0][i] if results["metadatas"] else {},
-                        score=distance,
-                        relevance=relevance
-                    ))
-            
-            return search_results
-            
+            return self._query(self.collection, embedding, top_k, filter_metadata)
         except Exception as e:
             logger.error(f"Erreur recherche par embedding: {str(e)}", exc_info=True)
             return []
     
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[SearchResult]]:
+        """
+        Recherche batch : un seul appel d'embedding pour toutes les requêtes
+        
+        Args:
+            queries: Requêtes de recherche
+            top_k: Nombre de résultats par requête
+            filter_metadata: Filtre optionnel
+            
+        Returns:
+            List[List[SearchResult]]: Résultats, dans l'ordre des requêtes
+        """
+        active = self._active
+        embeddings = active.embedding_service.embed_batch(queries)
+        with tracer.span("vector_store.query", top_k=top_k, queries=len(queries),
+                         generation=active.generation.id):
+            return [
+                self._query(active.collection, embedding, top_k, filter_metadata)
+                for embedding in embeddings
+            ]
+    
+    @staticmethod
+    def _query(
+        collection,
+        embedding: List[float],
+        top_k: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> List[SearchResult]:
+        results = collection.query(
+            query_embeddings=[embedding],
+            n_results=top_k,
+            where=filter_metadata,
+            include=["documents", "metadatas", "distances"]
+        )
+        
+        search_results = []
+        
+        if results["ids"] and results["ids"][0]:
+            for i, doc_id in enumerate(results["ids"][0]):
+                distance = results["distances"][0][i]
+                relevance = max(0, 1 - distance)
+                
+                search_results.append(SearchResult(
+                    id=doc_id,
+                    content=results["documents"][0][i],
+                    metadata=results["metadatas"][0][i] if results["metadatas"] else {},
+                    score=distance,
+                    relevance=relevance
+                ))
+        
+        return search_results
+    
     def delete_document(self, doc_id: str) -> bool:
         """
         Supprime un document du store
@@ -303,13 +515,49 @@ class VectorStore:
             bool: True si supprimé avec succès
         """
         try:
-            self.collection.delete(ids=[doc_id])
+            with self.write_lock:
+                self.collection.delete(ids=[doc_id])
+                self._track([doc_id])
             logger.info(f"Document deleted: {doc_id}")
             return True
         except Exception as e:
             logger.error(f"Erreur suppression {doc_id}: {str(e)}")
             return False
     
+    def delete_documents(self, doc_ids: List[str], batch_size: int = 1000) -> int:
+        """
+        Supprime des documents par leurs IDs
+        
+        Args:
+            doc_ids: IDs des documents à supprimer
+            batch_size: IDs par appel ChromaDB
+            
+        Returns:
+            int: Nombre d'IDs traités
+        """
+        for start in range(0, len(doc_ids), batch_size):
+            batch = doc_ids[start:start + batch_size]
+            with self.write_lock:
+                self.collection.delete(ids=batch)
+                self._track(batch)
+        if doc_ids:
+            logger.info(f"Documents deleted: {len(doc_ids)}")
+        return len(doc_ids)
+    
+    def delete_where(self, where: Dict[str, Any]) -> int:
+        """
+        Supprime les documents correspondant à un filtre de métadonnées
+        
+        Args:
+            where: Filtre ChromaDB (ex: {"source": "guide.pdf"})
+            
+        Returns:
+            int: Nombre de documents supprimés
+        """
+        ids = self.collection.get(where=where, include=[])["ids"]
+        self.delete_documents(ids)
+        return len(ids)
+    
     def delete_all(self) -> int:
         """
         Supprime tous les documents
@@ -317,14 +565,20 @@ class VectorStore:
         Returns:
             int: Nombre de documents supprimés
         """
-        count = self.collection.count()
-        
-        # Récréer la collection
-        self.client.delete_collection(self.collection_name)
-        self.collection = self.client.create_collection(
-            name=self.collection_name,
-            metadata={"hnsw:space": config.chromadb.distance_function}
-        )
+        with self.write_lock:
+            active = self._active
+            count = active.collection.count()
+            if self._changed is not None:
+                self._track(active.collection.get(include=[])["ids"])
+            
+            # Récréer la collection de la génération active
+            self.client.delete_collection(active.generation.collection)
+            self._active = _ActiveGeneration(
+                generation=active.generation,
+                collection=self.open_collection(active.generation.collection),
+                embedding_service=active.embedding_service
+            )
+            self._written()
         
         logger.warning(f"All documents deleted: {count}")
         return count
@@ -365,10 +619,107 @@ class VectorStore:
         """Persiste les données sur disque"""
         self.client.persist()
         logger.info("Vector store persisted to disk")
+    
+    # ------------------------------------------------------------------
+    # Générations (bascule, rollback, suivi des écritures)
+    # ------------------------------------------------------------------
+    
+    def activate_generation(self, generation_id: int) -> Generation:
+        """
+        Bascule les lectures et écritures vers une génération
+        
+        Les générations au-delà de REEMBED_KEEP_GENERATIONS sont supprimées.
+        
+        Args:
+            generation_id: Génération à activer (nouvelle ou rollback)
+            
+        Returns:
+            Generation: Génération désormais active
+        """
+        generation = self.generations.get(generation_id)
+        if generation is None:
+            raise GenerationError(f"unknown generation {generation_id}")
+        
+        with self.write_lock:
+            previous = self.generation
+            active = self._open_generation(generation)
+            self._active = active
+            generation = self.generations.activate(generation_id, active.collection.count())
+            self._written()
+        self.persist()
+        
+        logger.warning(
+            f"Generation {generation.id} activated",
+            previous=previous.id,
+            collection=generation.collection,
+            embedding_model=generation.embedding_model,
+            document_count=generation.count
+        )
+        for expired in self.generations.expired(config.reembedding.keep_generations):
+            self.drop_generation(expired.id)
+        return generation
+    
+    def drop_generation(self, generation_id: int, force: bool = False) -> None:
+        """
+        Supprime une génération inactive et sa collection
+        
+        Args:
+            generation_id: Génération à supprimer
+            force: Autoriser la suppression d'une génération en construction
+        """
+        generation = self.generations.get(generation_id)
+        if generation is None:
+            raise GenerationError(f"unknown generation {generation_id}")
+        if generation.status == STATUS_ACTIVE:
+            raise GenerationError("cannot remove the active generation")
+        if generation.status == STATUS_BUILDING and not force:
+            raise GenerationError("generation is being built")
+        
+        try:
+            self.client.delete_collection(generation.collection)
+        except ValueError:
+            # Collection déjà absente
+            pass
+        self.generations.remove(generation_id)
+        logger.info(f"Generation {generation_id} removed", collection=generation.collection)
+    
+    def track_changes(self) -> None:
+        """Commence à enregistrer les ids écrits ou supprimés"""
+        with self.write_lock:
+            self._changed = set()
+    
+    def drain_changes(self) -> Set[str]:
+        """Ids modifiés depuis le dernier appel"""
+        with self.write_lock:
+            changed = self._changed or set()
+            if self._changed is not None:
+                self._changed = set()
+            return changed
+    
+    def restore_changes(self, ids: Set[str]) -> None:
+        """Remet des ids non rejoués dans le suivi"""
+        with self.write_lock:
+            if self._changed is not None:
+                self._changed.update(ids)
+    
+    def stop_tracking(self) -> None:
+        with self.write_lock:
+            self._changed = None
+    
+    def _track(self, ids: List[str]) -> None:
+        if self._changed is not None:
+            self._changed.update(ids)
+        self._written()
+    
+    def _written(self) -> None:
+        """La génération active a changé : instantané partagé à republier"""
+        if self.publisher is not None:
+            self.publisher.mark_dirty()
 
 
 # Instance globale
 _vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
 
 
 def get_vector_store() -> VectorStore:
@@ -380,9 +731,25 @@ def get_vector_store() -> VectorStore:
     """
     global _vector_store
     if _vector_store is None:
-        _vector_store = VectorStore()
+        # Un seul client ChromaDB par processus (warm-up et requêtes concurrents)
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = _create_vector_store()
     return _vector_store
 
 
+def _create_vector_store() -> VectorStore:
+    """VectorStore ChromaDB, ou instantané mappé dans un worker multi-process"""
+    if not config.shared_index.enabled:
+        return VectorStore()
+    from core.shared_index import SharedVectorStore, SnapshotPublisher, is_reader
+
+    if is_reader():
+        return SharedVectorStore()
+    store = VectorStore()
+    store.publisher = SnapshotPublisher(store)
+    return store
+
+
 # Alias pour l'import simplifié
 vector_store = get_vector_store
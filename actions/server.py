@@ -0,0 +1,293 @@
+# ============================================================================
+# SERVER - Serveur d'actions + API d'indexation
+# ============================================================================
+
+"""
+Point d'entrée du serveur d'actions
+
+Même application Sanic que `python -m rasa_sdk` (/webhook, /health,
+/actions), à laquelle s'ajoutent les routes d'indexation et de recherche
+de api/index_api.py (et, sur option, les routes d'inspection
+d'api/admin_api.py). Les actions et l'API partagent ainsi le même
+VectorStore : un seul processus ouvre les fichiers ChromaDB.
+
+Les dépendances lourdes (openai, chromadb, tenacity) ne sont importées
+qu'à la première utilisation : le serveur répond dès le démarrage aux
+actions qui n'en ont pas besoin, et un thread prépare le pipeline RAG en
+arrière-plan (ACTION_SERVER_WARMUP) pour que la première question n'en
+paie pas le coût.
+
+Avec plusieurs workers (ACTION_SERVER_SANIC_WORKERS) et SHARED_INDEX_ENABLED,
+un processus d'indexation dédié possède ChromaDB et sert l'API
+d'indexation sur SHARED_INDEX_WRITER_PORT ; il publie la collection en
+instantanés mappés en mémoire que les workers interrogent sans ouvrir
+ChromaDB (voir core/shared_index.py).
+
+Avec TRACE_SAMPLE_RATE > 0, chaque appel /webhook ouvre un span racine
+(ou continue la trace du router pour un follow-up) ; les spans des
+actions, du retrieval et des appels OpenAI s'y rattachent.
+
+Usage: python server.py --actions actions -p 5055
+"""
+
+import os
+import json
+import atexit
+import time
+import zlib
+import logging
+import threading
+import multiprocessing
+from typing import Optional
+
+from sanic import Sanic
+from sanic.request import Request
+from sanic.response import HTTPResponse
+from sanic.response import json as json_response
+
+from rasa_sdk import utils
+from rasa_sdk.constants import APPLICATION_ROOT_LOGGER_NAME
+from rasa_sdk.endpoint import create_app, create_argument_parser, create_ssl_context
+from rasa_sdk.plugin import plugin_manager
+
+from api import admin_api, index_api
+from utils.config import config
+from utils.logger import logger
+from utils.tracing import STATUS_ERROR, tracer
+
+
+# Délai maximum entre deux relances du processus d'indexation (secondes)
+WRITER_RESTART_MAX_SECONDS = 30
+
+
+def _action_call(request: Request):
+    """Corps de l'appel /webhook (compressé ou non), None si illisible"""
+    try:
+        if request.headers.get("Content-Encoding") == "deflate":
+            return json.loads(zlib.decompress(request.body))
+        return request.json
+    except Exception:
+        return None
+
+
+async def _trace_webhook_request(request: Request) -> None:
+    if request.path != "/webhook" or request.method != "POST":
+        return
+    action_call = _action_call(request)
+    if not isinstance(action_call, dict):
+        return
+    latest_message = (action_call.get("tracker") or {}).get("latest_message") or {}
+    # Même tâche que le handler : le span reste courant pendant l'action
+    request.ctx.trace_span = tracer.start_trace(
+        "webhook",
+        action_call.get("sender_id"),
+        latest_message.get("text"),
+        action=action_call.get("next_action")
+    )
+
+
+async def _trace_webhook_response(request: Request, response: HTTPResponse) -> None:
+    span = getattr(request.ctx, "trace_span", None)
+    if span is not None:
+        span.set(status=response.status)
+        if response.status >= 500:
+            span.status = STATUS_ERROR
+        tracer.finish(span)
+
+
+def _warm_up() -> None:
+    """Crée le pipeline RAG (imports openai/chromadb, ouverture de la collection)"""
+    start_time = time.perf_counter()
+    try:
+        from core.rag_pipeline import get_rag_pipeline
+
+        get_rag_pipeline()
+    except Exception as e:
+        # Nouvelle tentative à la première requête RAG
+        logger.warning(f"RAG warm-up failed: {str(e)}")
+        return
+    logger.info("RAG pipeline warmed up", duration_ms=round((time.perf_counter() - start_time) * 1000, 1))
+
+
+async def _start_warm_up(app: Sanic, loop) -> None:
+    threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+
+
+def _publish_snapshot() -> None:
+    """Premier instantané de la collection (attendu par les workers)"""
+    try:
+        from core.vector_store import get_vector_store
+
+        get_vector_store().publisher.publish()
+    except Exception as e:
+        logger.error(f"Initial index snapshot failed: {str(e)}", exc_info=True)
+
+
+async def _start_publish_snapshot(app: Sanic, loop) -> None:
+    from core.shared_index import start_heartbeat
+
+    start_heartbeat()
+    threading.Thread(target=_publish_snapshot, name="index-publisher-init", daemon=True).start()
+
+
+async def _report_writer_health(request: Request, response: HTTPResponse) -> Optional[HTTPResponse]:
+    """/health des workers : état du processus d'indexation"""
+    if request.path != "/health" or response.status != 200:
+        return None
+    from core.shared_index import writer_health
+
+    health = writer_health()
+    body = json.loads(response.body or b"{}")
+    body["index_writer"] = health
+    if not health["alive"]:
+        # Les workers répondent toujours, sur un instantané figé
+        body["status"] = "degraded"
+    return json_response(body, status=200)
+
+
+def _run_index_writer(args) -> None:
+    """Processus d'indexation : ChromaDB, API d'indexation, publication"""
+    from core.shared_index import ROLE_ENV, ROLE_WRITER
+
+    os.environ[ROLE_ENV] = ROLE_WRITER
+    utils.configure_colored_logging(args.loglevel)
+    utils.update_sanic_log_level()
+    app = create_server(args.actions or "actions", args.cors)
+    ssl_context = create_ssl_context(args.ssl_certificate, args.ssl_keyfile, args.ssl_password)
+    host = os.environ.get("SANIC_HOST", "0.0.0.0")
+    logger.info(
+        f"Index writer on {'https' if ssl_context else 'http'}://{host}:{config.shared_index.writer_port}"
+    )
+    app.run(host, config.shared_index.writer_port, ssl=ssl_context, workers=1)
+
+
+class IndexWriterSupervisor:
+    """
+    Lance le processus d'indexation et le relance s'il s'arrête
+
+    spawn plutôt que fork : le processus parent n'a pas encore de boucle
+    ni de client ChromaDB, mais l'écrivain ne doit rien en hériter. Le
+    thread de surveillance attend la fin du processus (sans verrou tenu
+    pendant le fork des workers Sanic) ; l'arrêt du serveur (atexit) le
+    désactive avant que multiprocessing ne termine le writer.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.restarts = 0
+        self._stopping = threading.Event()
+        atexit.register(self._stopping.set)
+
+    def start(self) -> None:
+        """Premier lancement, puis attente du premier instantané"""
+        from core.shared_index import wait_for_snapshot
+
+        self._spawn()
+        if not wait_for_snapshot():
+            logger.warning(
+                "No index snapshot yet: workers answer from an empty index until the writer publishes",
+                timeout_seconds=config.shared_index.startup_timeout_seconds
+            )
+        threading.Thread(target=self._watch, name="index-writer-supervisor", daemon=True).start()
+
+    def _spawn(self) -> None:
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=_run_index_writer, args=(self.args,), name="index-writer", daemon=True
+        )
+        self.process.start()
+
+    def _watch(self) -> None:
+        while True:
+            self.process.join()
+            if self._stopping.is_set():
+                return
+            self.restarts += 1
+            delay = min(WRITER_RESTART_MAX_SECONDS, 2 ** min(self.restarts, 5))
+            logger.error(
+                "Index writer exited: restarting",
+                exitcode=self.process.exitcode,
+                restarts=self.restarts,
+                delay_s=delay
+            )
+            if self._stopping.wait(delay):
+                return
+            self._spawn()
+
+
+def create_server(action_package_name: str = "actions", cors_origins="*",
+                  auto_reload: bool = False) -> Sanic:
+    """
+    Crée l'application Sanic du serveur d'actions avec l'API d'indexation
+
+    Args:
+        action_package_name: Package des actions
+        cors_origins: Origines CORS autorisées
+        auto_reload: Rechargement automatique des actions
+
+    Returns:
+        Sanic: Application prête à être lancée
+    """
+    app = create_app(action_package_name, cors_origins=cors_origins, auto_reload=auto_reload)
+    app.blueprint(index_api)
+    if config.admin.enabled:
+        if config.admin.token is None:
+            logger.error("ADMIN_API_ENABLED without ADMIN_API_TOKEN: admin routes not mounted")
+        else:
+            app.blueprint(admin_api)
+    if config.api.warmup:
+        app.register_listener(_start_warm_up, "after_server_start")
+    if config.shared_index.enabled:
+        from core.shared_index import is_reader, is_writer
+
+        if is_writer():
+            app.register_listener(_start_publish_snapshot, "after_server_start")
+        elif is_reader():
+            app.register_middleware(_report_writer_health, "response")
+    if tracer.enabled:
+        app.register_middleware(_trace_webhook_request, "request")
+        app.register_middleware(_trace_webhook_response, "response")
+    plugin_manager().hook.attach_sanic_app_extensions(app=app)
+    return app
+
+
+def main():
+    args = create_argument_parser().parse_args()
+
+    utils.configure_colored_logging(args.loglevel)
+    utils.configure_file_logging(
+        logging.getLogger(APPLICATION_ROOT_LOGGER_NAME),
+        args.log_file,
+        args.loglevel,
+        args.logging_config_file,
+    )
+    utils.update_sanic_log_level()
+
+    workers = utils.number_of_sanic_workers()
+    if workers > 1 and config.shared_index.enabled:
+        from core.shared_index import ROLE_ENV, ROLE_READER
+
+        IndexWriterSupervisor(args).start()
+        # Hérité par les workers (fork) : recherche sur l'instantané partagé
+        os.environ[ROLE_ENV] = ROLE_READER
+    elif workers > 1:
+        logger.warning(
+            "Several Sanic workers: each one opens its own ChromaDB client (set SHARED_INDEX_ENABLED)",
+            workers=workers
+        )
+
+    app = create_server(args.actions or "actions", args.cors, args.auto_reload)
+    if config.api.token is None:
+        logger.warning("ACTION_API_TOKEN not set: index writes and /search are refused (403)")
+    ssl_context = create_ssl_context(args.ssl_certificate, args.ssl_keyfile, args.ssl_password)
+    host = os.environ.get("SANIC_HOST", "0.0.0.0")
+
+    logger.info(
+        f"Action server with index API on {'https' if ssl_context else 'http'}://{host}:{args.port}",
+        auth_enabled=config.api.token is not None
+    )
+    app.run(host, args.port, ssl=ssl_context, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Tests unitaires (lancer depuis actions/ : python -m pytest tests)
@@ -0,0 +1,16 @@
+# ============================================================================
+# TESTS - Configuration commune
+# ============================================================================
+
+"""
+Environnement des tests, posé avant l'import des modules testés :
+logs synchrones dans un dossier temporaire (les logs/ du dépôt ne sont
+pas modifiés et aucun thread d'écriture ne survit à la session).
+"""
+
+import os
+import tempfile
+
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="action-server-tests-")
+os.environ["LOG_ASYNC"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,139 @@
+# ============================================================================
+# TESTS - Contrôle d'admission (core/admission.py)
+# ============================================================================
+
+import threading
+import time
+
+import pytest
+
+from core.admission import (
+    REASON_DEADLINE,
+    REASON_RATE,
+    REASON_TIMEOUT,
+    AdmissionController,
+    AdmissionRejected,
+)
+from utils.deadline import Deadline
+
+
+def make_controller(**overrides) -> AdmissionController:
+    """Contrôleur indépendant de la configuration d'environnement"""
+    params = {
+        "max_concurrent": 1,
+        "max_queue": 10,
+        "queue_timeout_ms": 10000,
+        "sender_rate": 0,
+        "sender_burst": 5,
+        "sender_weights": {},
+        "max_senders": 100,
+    }
+    params.update(overrides)
+    return AdmissionController(**params)
+
+
+def wait_until(predicate, timeout: float = 2.0) -> None:
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition non atteinte"
+        time.sleep(0.005)
+
+
+def queue_call(controller: AdmissionController, sender_id: str, granted: list) -> threading.Thread:
+    """Appel en attente dans un thread ; sender_id ajouté à granted une fois admis"""
+    def run():
+        controller.acquire(sender_id)
+        granted.append(sender_id)
+
+    queued = controller.stats()["queued"]
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    wait_until(lambda: controller.stats()["queued"] == queued + 1)
+    return thread
+
+
+def test_bucket_refills_at_sender_rate():
+    controller = make_controller(max_concurrent=10, sender_rate=20, sender_burst=1)
+
+    controller.acquire("alice")
+    controller.release()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire("alice")
+    assert rejected.value.reason == REASON_RATE
+    assert 0 < rejected.value.retry_after <= 1 / 20
+
+    # Un autre utilisateur a son propre seau
+    controller.acquire("bob")
+    controller.release()
+
+    time.sleep(1 / 20 + 0.02)
+    controller.acquire("alice")
+    controller.release()
+
+
+def test_queue_is_served_fairly_across_senders():
+    controller = make_controller()
+    controller.acquire("holder")
+
+    granted: list = []
+    threads = [queue_call(controller, sender, granted) for sender in ("alice", "alice", "alice", "bob")]
+
+    for expected in range(1, len(threads) + 1):
+        controller.release()
+        wait_until(lambda: len(granted) == expected)
+
+    # bob passe avant la deuxième requête d'alice malgré son arrivée tardive
+    assert granted == ["alice", "bob", "alice", "alice"]
+    for thread in threads:
+        thread.join(timeout=1)
+
+
+def test_rejects_when_estimated_wait_exceeds_budget():
+    controller = make_controller(queue_timeout_ms=100)
+    controller.acquire("holder")
+
+    # Une durée d'appel supposée de 1 s dépasse l'attente autorisée
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire("alice")
+    assert rejected.value.reason == REASON_DEADLINE
+
+    # Même refus quand la deadline de la requête ne laisse pas le temps d'attendre
+    controller.queue_timeout = 10.0
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire("alice", Deadline.after_ms(500))
+    assert rejected.value.reason == REASON_DEADLINE
+    assert controller.stats()["queued"] == 0
+
+
+def test_release_hands_slot_to_next_waiter():
+    controller = make_controller()
+    controller.acquire("holder")
+
+    granted: list = []
+    thread = queue_call(controller, "alice", granted)
+
+    controller.release()
+    wait_until(lambda: granted == ["alice"])
+    stats = controller.stats()
+    assert stats["in_flight"] == 1
+    assert stats["queued"] == 0
+
+    controller.release()
+    assert controller.stats()["in_flight"] == 0
+    thread.join(timeout=1)
+
+
+def test_queue_timeout_refunds_token():
+    controller = make_controller(queue_timeout_ms=50, sender_rate=0.001, sender_burst=1)
+    controller._service_s = 0.01
+    controller.acquire("holder")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire("alice")
+    assert rejected.value.reason == REASON_TIMEOUT
+
+    # L'appel refusé n'a pas consommé le seul jeton d'alice
+    controller.release()
+    controller.acquire("alice")
+    controller.release()
+    assert controller.stats()["in_flight"] == 0
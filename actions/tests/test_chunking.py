@@ -0,0 +1,86 @@
+# ============================================================================
+# TESTS - Stratégies de découpage (core/chunking.py)
+# ============================================================================
+
+import string
+
+from core.chunking import CharacterChunker, MarkdownChunker, SentenceChunker, TokenChunker
+
+
+class CharCounter:
+    """Un token par caractère : comptes exacts sans tiktoken"""
+
+    exact = True
+
+    def count(self, text: str) -> int:
+        return len(text)
+
+    def encode(self, text: str):
+        return [ord(char) for char in text]
+
+    def decode(self, tokens) -> str:
+        return "".join(map(chr, tokens))
+
+
+# Sans espace ni ponctuation : aucune coupure à une phrase, aucun strip
+TEXT = (string.ascii_letters * 5)[:250]
+
+
+def test_character_chunks_overlap_and_cover_text():
+    chunks = CharacterChunker(CharCounter(), 100, 20).split_text(TEXT)
+
+    assert [chunk.text for chunk in chunks] == [TEXT[0:100], TEXT[80:180], TEXT[160:250]]
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.text.startswith(previous.text[-20:])
+
+
+def test_character_chunks_cut_at_sentence_end():
+    text = "a" * 70 + ". " + "b" * 60
+    chunks = CharacterChunker(CharCounter(), 100, 0).split_text(text)
+
+    assert chunks[0].text == "a" * 70 + "."
+    assert chunks[-1].text.endswith("b" * 60)
+
+
+def test_character_chunks_track_pages():
+    pages = [(1, "x" * 90), (2, "y" * 90)]
+    chunks = list(CharacterChunker(CharCounter(), 100, 0).split(pages))
+
+    assert (chunks[0].page, chunks[0].page_end) == (1, 2)
+    assert chunks[-1].page == 2
+
+
+def test_token_windows_have_exact_size_and_overlap():
+    text = TEXT[:130]
+    chunks = TokenChunker(CharCounter(), 50, 10).split_text(text)
+
+    assert [chunk.text for chunk in chunks] == [text[0:50], text[40:90], text[80:130]]
+    assert [chunk.token_count for chunk in chunks] == [50, 50, 50]
+
+
+def test_sentence_chunks_end_on_sentences_within_budget():
+    text = ("Première phrase ici. Deuxième phrase un peu plus longue. "
+            "Troisième phrase. Quatrième phrase finale.")
+    chunks = SentenceChunker(CharCounter(), 45, 0).split_text(text)
+
+    assert [chunk.text for chunk in chunks] == [
+        "Première phrase ici.",
+        "Deuxième phrase un peu plus longue.",
+        "Troisième phrase. Quatrième phrase finale.",
+    ]
+    assert all(chunk.token_count <= 45 for chunk in chunks)
+
+
+def test_markdown_chunks_never_cross_headings():
+    text = (
+        "# Guide\nIntro du guide.\n"
+        "## Installation\nInstaller le paquet. Lancer le serveur.\n"
+        "## Usage\nAppeler l'API.\n"
+    )
+    chunks = MarkdownChunker(CharCounter(), 200, 0).split_text(text)
+
+    assert [chunk.section for chunk in chunks] == [
+        "Guide", "Guide > Installation", "Guide > Usage"
+    ]
+    assert chunks[1].text.startswith("## Installation")
+    assert "Usage" not in chunks[1].text
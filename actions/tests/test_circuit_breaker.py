@@ -0,0 +1,86 @@
+# ============================================================================
+# TESTS - Circuit breaker (core/circuit_breaker.py)
+# ============================================================================
+
+import time
+
+import pytest
+
+from core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+OPEN_SECONDS = 0.05
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    params = {
+        "failure_rate_threshold": 0.5,
+        "slow_call_ms": 1000,
+        "slow_call_rate_threshold": 1.0,
+        "window_size": 4,
+        "min_calls": 4,
+        "open_seconds": OPEN_SECONDS,
+        "half_open_max_calls": 1,
+    }
+    params.update(overrides)
+    return CircuitBreaker("test", **params)
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        breaker.allow()
+        breaker.record_failure()
+
+
+def test_stays_closed_below_min_calls_and_threshold():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    # 1 échec sur 4 : sous le seuil de 50 %
+    breaker = make_breaker()
+    breaker.record_failure()
+    for _ in range(3):
+        breaker.record_success(10)
+    assert breaker.state == CLOSED
+
+
+def test_closed_open_half_open_closed():
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.allow()
+    assert 0 < rejected.value.retry_after <= OPEN_SECONDS
+
+    time.sleep(OPEN_SECONDS + 0.01)
+    assert breaker.state == HALF_OPEN
+    breaker.allow()
+    # Un seul appel de test à la fois
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record_success(10)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["calls"] == 0
+    breaker.allow()
+
+
+def test_half_open_failure_reopens():
+    breaker = make_breaker()
+    trip(breaker)
+    time.sleep(OPEN_SECONDS + 0.01)
+    breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = make_breaker(slow_call_rate_threshold=0.5)
+    for _ in range(4):
+        breaker.record_success(5000)
+    assert breaker.state == OPEN
@@ -0,0 +1,88 @@
+# ============================================================================
+# TESTS - Manifeste d'ingestion (core/manifest.py)
+# ============================================================================
+
+import os
+
+import pytest
+
+from core.manifest import STATUS_DONE, IngestionManifest, chunk_id
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.db"))
+    yield manifest
+    manifest.close()
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "docs" / "faq.txt"
+    path.parent.mkdir()
+    path.write_text("Question : ...\nRéponse : ...\n", encoding="utf-8")
+    return str(path)
+
+
+def ingest(manifest: IngestionManifest, file_path: str, ids, complete: bool = True) -> None:
+    """Simule le pipeline : début, batch écrit, fin"""
+    manifest.begin(file_path)
+    manifest.checkpoint({file_path: list(ids)})
+    if complete:
+        manifest.complete(file_path)
+
+
+def test_unchanged_file_is_skipped_on_rerun(manifest, document):
+    plan = manifest.plan([document])
+    assert plan.to_ingest == [document] and plan.new == 1
+
+    ingest(manifest, document, [chunk_id(document, 0)])
+    assert manifest.get(document).status == STATUS_DONE
+
+    plan = manifest.plan([document])
+    assert plan.to_ingest == []
+    assert plan.unchanged == 1
+
+
+def test_touched_file_is_not_reingested(manifest, document):
+    ingest(manifest, document, [chunk_id(document, 0)])
+    stat = os.stat(document)
+    os.utime(document, (stat.st_atime, stat.st_mtime + 10))
+
+    plan = manifest.plan([document])
+    assert plan.to_ingest == []
+    assert plan.unchanged == 1
+
+
+def test_interrupted_file_resumes_without_written_chunks(manifest, document):
+    written = [chunk_id(document, 0), chunk_id(document, 1)]
+    ingest(manifest, document, written, complete=False)
+
+    plan = manifest.plan([document])
+    assert plan.to_ingest == [document]
+    assert plan.resumed == 1
+    assert plan.skip_ids[document] == set(written)
+    assert plan.stale_ids == []
+
+
+def test_modified_file_replaces_its_chunks(manifest, document):
+    old_ids = [chunk_id(document, 0)]
+    ingest(manifest, document, old_ids)
+    with open(document, "a", encoding="utf-8") as f:
+        f.write("Nouvelle ligne\n")
+
+    plan = manifest.plan([document])
+    assert plan.to_ingest == [document]
+    assert plan.changed == 1
+    assert plan.stale_ids == old_ids
+
+    # Les anciens ids sont oubliés au redémarrage du traitement
+    manifest.begin(document)
+    assert manifest.get(document).chunk_ids == []
+
+
+def test_chunk_ids_differ_across_directories(tmp_path):
+    first = str(tmp_path / "a" / "faq.txt")
+    second = str(tmp_path / "b" / "faq.txt")
+    assert chunk_id(first, 0) != chunk_id(second, 0)
+    assert chunk_id(first, 0).startswith("faq_")
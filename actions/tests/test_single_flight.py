@@ -0,0 +1,109 @@
+# ============================================================================
+# TESTS - Coalescence single-flight (core/single_flight.py)
+# ============================================================================
+
+import threading
+import time
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+
+def wait_until(predicate, timeout: float = 2.0) -> None:
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition non atteinte"
+        time.sleep(0.005)
+
+
+def start_followers(group: SingleFlight, key, count: int, outcomes: list) -> list:
+    """Suiveurs de key dans des threads ; (résultat, partagé) ou exception dans outcomes"""
+    def run():
+        try:
+            outcomes.append(group.do(key, lambda: pytest.fail("un suiveur ne doit pas exécuter fn")))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def run_leader(group: SingleFlight, key, fn, followers: int, outcomes: list):
+    """Le leader bloque dans fn jusqu'à ce que tous les suiveurs attendent"""
+    release = threading.Event()
+    calls = []
+
+    def leader_fn():
+        calls.append(1)
+        release.wait(2)
+        return fn()
+
+    leader_outcome = []
+
+    def lead():
+        try:
+            leader_outcome.append(group.do(key, leader_fn))
+        except Exception as e:
+            leader_outcome.append(e)
+
+    leader = threading.Thread(target=lead, daemon=True)
+    leader.start()
+    wait_until(lambda: calls)
+    threads = start_followers(group, key, followers, outcomes)
+    wait_until(lambda: group._calls[key].waiters == followers)
+    release.set()
+    for thread in [leader] + threads:
+        thread.join(timeout=2)
+    return leader_outcome[0], len(calls)
+
+
+def test_followers_share_leader_result():
+    group = SingleFlight()
+    outcomes: list = []
+
+    leader, calls = run_leader(group, "q", lambda: "réponse", 3, outcomes)
+
+    assert calls == 1
+    assert leader == ("réponse", False)
+    assert outcomes == [("réponse", True)] * 3
+    assert group.in_flight() == 0
+
+
+def test_followers_share_leader_error():
+    group = SingleFlight()
+    outcomes: list = []
+
+    def fail():
+        raise ValueError("panne")
+
+    leader, _ = run_leader(group, "q", fail, 2, outcomes)
+
+    assert isinstance(leader, ValueError)
+    assert all(outcome is leader for outcome in outcomes)
+    assert len(outcomes) == 2
+
+
+def test_key_is_released_after_execution():
+    group = SingleFlight()
+
+    assert group.do("q", lambda: 1) == (1, False)
+    # Pas de cache : l'appel suivant relance une exécution
+    assert group.do("q", lambda: 2) == (2, False)
+    assert group.in_flight() == 0
+
+
+def test_follower_timeout():
+    group = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=group.do, args=("q", lambda: release.wait(2)), daemon=True)
+    leader.start()
+    wait_until(lambda: group.in_flight() == 1)
+
+    with pytest.raises(TimeoutError):
+        group.do("q", lambda: None, timeout=0.05)
+
+    release.set()
+    leader.join(timeout=2)
@@ -1,5 +1,9 @@
 # Utils package
 from .config import config, Config
 from .logger import logger, get_logger, ActionLogger
+from .metrics import metrics, get_metrics, MetricsRegistry
 
-__all__ = ['config', 'Config', 'logger', 'get_logger', 'ActionLogger']
+__all__ = [
+    'config', 'Config', 'logger', 'get_logger', 'ActionLogger',
+    'metrics', 'get_metrics', 'MetricsRegistry'
+]
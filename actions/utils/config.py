@@ -8,19 +8,26 @@ Gère les variables d'environnement et les paramètres par défaut
 """
 
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 
 
 @dataclass
 class OpenAIConfig:
     """Configuration OpenAI"""
     api_key: str
+    base_url: Optional[str] = None  # API compatible OpenAI (None = api.openai.com)
     model: str = "gpt-4"
     embedding_model: str = "text-embedding-ada-002"
     max_tokens: int = 1024
     temperature: float = 0.7
-    timeout: int = 30
+    timeout: int = 30  # Timeout maximum d'une tentative (secondes)
+    max_retries: int = 3  # Nombre maximum de tentatives
+    min_attempt_ms: int = 500  # Budget minimum pour lancer une nouvelle tentative
+    hedge_enabled: bool = False  # Requête de couverture au-delà du p95
+    hedge_min_ms: int = 300  # Délai minimum avant la requête de couverture
+    hedge_max_workers: int = 0  # Threads des requêtes hedgées (0 = 2 x ADMISSION_MAX_CONCURRENT)
+    embedding_cache_size: int = 1024  # Embeddings de requêtes gardés en mémoire
 
 
 @dataclass
@@ -31,6 +38,20 @@ class ChromaDBConfig:
     distance_function: str = "cosine"  # cosine, l2, ip
 
 
+@dataclass
+class SharedIndexConfig:
+    """Configuration du mode multi-worker (index et cache partagés par mmap)"""
+    enabled: bool = False  # Workers en lecture seule + un processus writer
+    directory: str = "./chroma_db/shared"  # Instantanés et cache d'embeddings mappés
+    writer_port: int = 5056  # Port de l'API d'indexation (processus writer)
+    remap_interval_ms: int = 1000  # Vérification d'un nouvel instantané par les workers
+    publish_delay_ms: int = 2000  # Écritures regroupées avant publication
+    keep_versions: int = 2  # Instantanés conservés sur disque
+    page_size: int = 5000  # Chunks lus par appel ChromaDB pendant l'export
+    embedding_cache_slots: int = 16384  # Cache d'embeddings partagé (0 = désactivé)
+    startup_timeout_seconds: float = 120.0  # Attente du premier instantané au démarrage
+
+
 @dataclass
 class RAGConfig:
     """Configuration du pipeline RAG"""
@@ -38,7 +59,130 @@ class RAGConfig:
     top_k: int = 5  # Nombre de documents à récupérer
     chunk_size: int = 1000  # Taille des chunks de documents
     chunk_overlap: int = 200  # Overlap entre chunks
+    chunk_strategy: str = "auto"  # auto, characters, tokens, sentence, markdown
+    chunk_tokens: int = 256  # Budget de tokens par chunk (stratégies à tokens)
+    chunk_overlap_tokens: int = 32  # Overlap en tokens
     min_relevance_score: float = 0.5  # Score minimum de pertinence
+    fast_path_enabled: bool = True  # Réponse directe des chunks FAQ sans LLM
+    fast_path_threshold: float = 0.92  # Pertinence minimum pour le fast path
+    speculative_enabled: bool = True  # Recherche anticipée depuis le router
+    inline_chaining: bool = True  # Router/fallback : RAG dans la même requête (sinon FollowupAction)
+    speculative_ttl_seconds: float = 30.0  # Durée de vie d'une spéculation
+    single_flight_enabled: bool = True  # Partage des requêtes identiques en cours
+    request_deadline_ms: int = 20000  # Budget total d'une requête RAG
+
+
+@dataclass
+class RoutingConfig:
+    """Configuration du routage entre modèles LLM (rapide / puissant)"""
+    enabled: bool = True
+    fast_model: str = "gpt-4o-mini"
+    fast_max_tokens: int = 512
+    fast_max_context_tokens: int = 1500  # Au-delà → modèle puissant
+    fast_max_sources: int = 2  # Nombre de sources distinctes max pour le modèle rapide
+    fast_max_query_words: int = 25  # Longueur de question max pour le modèle rapide
+    escalate_on_not_found: bool = True  # Relance sur le modèle puissant si "Je n'ai pas trouvé"
+
+
+@dataclass
+class IngestionConfig:
+    """Configuration de l'ingestion de documents"""
+    extract_workers: int = 0  # Processus d'extraction/découpage (0 = nombre de CPU)
+    embed_workers: int = 4  # Appels d'embedding concurrents
+    batch_size: int = 100  # Chunks par appel d'embedding / écriture
+    queue_size: int = 8  # Batches en attente entre deux étapes (backpressure)
+    manifest_path: str = "./chroma_db/ingest_manifest.db"  # État par fichier (reprise)
+    watch_interval_seconds: float = 10.0  # Période de scan du mode --watch
+
+
+@dataclass
+class CircuitBreakerConfig:
+    """Configuration des circuit breakers OpenAI (LLM, embeddings)"""
+    enabled: bool = True
+    failure_rate_threshold: float = 0.5  # Taux d'échec déclenchant l'ouverture
+    slow_call_ms: float = 10000  # Au-delà, un appel réussi compte comme lent
+    slow_call_rate_threshold: float = 0.8  # Taux d'appels lents déclenchant l'ouverture
+    window_size: int = 20  # Appels observés dans la fenêtre glissante
+    min_calls: int = 5  # Appels minimum avant d'évaluer les taux
+    open_seconds: float = 30.0  # Durée d'ouverture avant les appels de test
+    half_open_max_calls: int = 2  # Appels de test en HALF_OPEN
+
+
+@dataclass
+class AdmissionConfig:
+    """Contrôle d'admission des appels OpenAI des conversations (core/admission.py)"""
+    enabled: bool = True
+    max_concurrent: int = 16  # Appels OpenAI simultanés, tous utilisateurs confondus
+    max_queue: int = 64  # Appels en attente au-delà desquels les suivants sont refusés
+    queue_timeout_ms: float = 3000  # Attente maximum dans la file
+    sender_rate: float = 1.0  # Appels par seconde et par utilisateur (recharge du seau)
+    sender_burst: int = 10  # Capacité du seau d'un utilisateur
+    sender_weights: Dict[str, float] = field(default_factory=dict)  # Poids par sender_id (défaut 1)
+    max_senders: int = 10000  # Utilisateurs suivis (seaux, LRU)
+
+
+@dataclass
+class ApiConfig:
+    """Configuration de l'API HTTP d'indexation et de recherche (server.py)"""
+    token: Optional[str] = None  # Bearer token exigé si défini
+    batch_size: int = 100  # Chunks par appel d'embedding / écriture
+    max_upload_mb: int = 1024  # Taille max d'un upload NDJSON
+    max_line_kb: int = 1024  # Taille max d'une ligne NDJSON
+    max_queries: int = 50  # Requêtes max par recherche batch
+    job_retention: int = 100  # Jobs terminés conservés pour /index/jobs
+    warmup: bool = True  # Pipeline RAG préparé en arrière-plan au démarrage
+
+
+@dataclass
+class AdminConfig:
+    """Configuration des endpoints d'administration (profilage, mémoire)"""
+    enabled: bool = False  # Routes /admin montées seulement si activé
+    token: Optional[str] = None  # Bearer token obligatoire
+    max_profile_seconds: float = 60.0  # Durée max d'un profil CPU
+    tracemalloc_frames: int = 5  # Profondeur des tracebacks d'allocation
+    tracemalloc_max_seconds: float = 900.0  # Arrêt automatique de tracemalloc
+
+
+@dataclass
+class ReembeddingConfig:
+    """Configuration du ré-embedding en arrière-plan (générations de collection)"""
+    rate_per_second: float = 100.0  # Chunks ré-vectorisés par seconde (0 = sans limite)
+    batch_size: int = 100  # Chunks par appel d'embedding
+    keep_generations: int = 2  # Générations conservées (active + rollback)
+
+
+@dataclass
+class TracingConfig:
+    """Configuration du tracing (spans par requête webhook)"""
+    sample_rate: float = 0.0  # Proportion de requêtes tracées (0 = désactivé)
+    exporter: str = "file"  # file, otlp
+    file: str = "logs/traces.jsonl"  # Export OTLP/JSON, un batch par ligne
+    otlp_endpoint: str = "http://localhost:4318/v1/traces"  # Collecteur OTLP/HTTP
+    service_name: str = "action-server"
+    queue_size: int = 2048  # Spans en attente d'export avant abandon
+    batch_size: int = 256  # Spans par export
+    hop_ttl_seconds: float = 60.0  # Rattachement router -> follow-up
+
+
+@dataclass
+class UsageConfig:
+    """Configuration du suivi de consommation de tokens"""
+    enabled: bool = True
+    flush_interval_seconds: float = 60.0  # Écriture des agrégats dans MongoDB
+    # Budgets par utilisateur et par jour (0 = illimité)
+    sender_daily_tokens: int = 0  # Au-delà : modèle rapide uniquement, sans escalade
+    sender_daily_hard_tokens: int = 0  # Au-delà : réponse extractive, sans LLM
+    # Prix en USD par million de tokens (entrée, sortie), en plus des prix par défaut
+    prices: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+
+
+@dataclass
+class PromptConfig:
+    """Configuration des templates de prompts"""
+    prompts_dir: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts"
+    )
+    max_context_tokens: int = 3000  # Plafond du contexte injecté dans le template
 
 
 @dataclass
@@ -49,6 +193,23 @@ class MongoDBConfig:
     conversations_collection: str = "conversations"
     analytics_collection: str = "analytics"
     tickets_collection: str = "tickets"
+    max_pool_size: int = 20  # Connexions du client partagé (writer, usage)
+    timeout_ms: int = 2000  # Sélection du serveur et connexion
+    # Écriture asynchrone des conversations, analytics et tickets
+    writer_enabled: bool = True
+    write_queue_size: int = 10000  # Opérations en attente avant abandon
+    write_batch_size: int = 500  # Opérations max par bulk_write
+    write_flush_interval_ms: float = 1000  # Délai max d'écriture d'une opération
+
+
+@dataclass
+class TicketConfig:
+    """Configuration du stockage des tickets"""
+    store: str = "mongodb"  # mongodb ou memory (tests, benchmarks)
+    cache_size: int = 10000  # Tickets gardés en cache (LRU)
+    cache_ttl_seconds: float = 30.0  # Fraîcheur max d'un statut lu en cache
+    negative_ttl_seconds: float = 5.0  # Numéros inconnus gardés en cache
+    lookup_timeout_ms: int = 500  # maxTimeMS d'une lecture
 
 
 @dataclass
@@ -57,6 +218,13 @@ class LoggingConfig:
     level: str = "INFO"
     format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     file: Optional[str] = "logs/action_server.log"
+    async_enabled: bool = True  # Écriture par un thread dédié (file bornée)
+    queue_size: int = 10000  # Records en attente avant abandon
+    batch_size: int = 512  # Records max écrits par passe
+    flush_interval_ms: float = 50  # Délai max d'écriture d'un record en mode async
+    json_encoder: str = "auto"  # auto (orjson si installé), orjson, json
+    # Taux d'échantillonnage des INFO/DEBUG par préfixe de message ("*" : défaut)
+    sample_rates: Dict[str, float] = field(default_factory=dict)
 
 
 class Config:
@@ -68,19 +236,38 @@ class Config:
     def __init__(self):
         self.openai = self._load_openai_config()
         self.chromadb = self._load_chromadb_config()
+        self.shared_index = self._load_shared_index_config()
         self.rag = self._load_rag_config()
+        self.prompts = self._load_prompt_config()
+        self.routing = self._load_routing_config()
+        self.circuit_breaker = self._load_circuit_breaker_config()
+        self.admission = self._load_admission_config()
+        self.ingestion = self._load_ingestion_config()
+        self.api = self._load_api_config()
+        self.reembedding = self._load_reembedding_config()
+        self.admin = self._load_admin_config()
+        self.tracing = self._load_tracing_config()
+        self.usage = self._load_usage_config()
         self.mongodb = self._load_mongodb_config()
+        self.tickets = self._load_ticket_config()
         self.logging = self._load_logging_config()
         
     def _load_openai_config(self) -> OpenAIConfig:
         """Charge la configuration OpenAI depuis l'environnement"""
         return OpenAIConfig(
             api_key=os.getenv("OPENAI_API_KEY", ""),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
             model=os.getenv("OPENAI_MODEL", "gpt-4"),
             embedding_model=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"),
             max_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "1024")),
             temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.7")),
-            timeout=int(os.getenv("OPENAI_TIMEOUT", "30"))
+            timeout=int(os.getenv("OPENAI_TIMEOUT", "30")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "3")),
+            min_attempt_ms=int(os.getenv("OPENAI_MIN_ATTEMPT_MS", "500")),
+            hedge_enabled=os.getenv("OPENAI_HEDGE_ENABLED", "false").lower() == "true",
+            hedge_min_ms=int(os.getenv("OPENAI_HEDGE_MIN_MS", "300")),
+            hedge_max_workers=int(os.getenv("OPENAI_HEDGE_MAX_WORKERS", "0")),
+            embedding_cache_size=int(os.getenv("OPENAI_EMBEDDING_CACHE_SIZE", "1024"))
         )
     
     def _load_chromadb_config(self) -> ChromaDBConfig:
@@ -91,6 +278,22 @@ class Config:
             distance_function=os.getenv("CHROMA_DISTANCE", "cosine")
         )
     
+    def _load_shared_index_config(self) -> SharedIndexConfig:
+        """Charge la configuration du mode multi-worker depuis l'environnement"""
+        return SharedIndexConfig(
+            enabled=os.getenv("SHARED_INDEX_ENABLED", "false").lower() == "true",
+            directory=os.getenv(
+                "SHARED_INDEX_DIR", os.path.join(self.chromadb.persist_directory, "shared")
+            ),
+            writer_port=int(os.getenv("SHARED_INDEX_WRITER_PORT", "5056")),
+            remap_interval_ms=int(os.getenv("SHARED_INDEX_REMAP_INTERVAL_MS", "1000")),
+            publish_delay_ms=int(os.getenv("SHARED_INDEX_PUBLISH_DELAY_MS", "2000")),
+            keep_versions=int(os.getenv("SHARED_INDEX_KEEP_VERSIONS", "2")),
+            page_size=int(os.getenv("SHARED_INDEX_PAGE_SIZE", "5000")),
+            embedding_cache_slots=int(os.getenv("SHARED_EMBEDDING_CACHE_SLOTS", "16384")),
+            startup_timeout_seconds=float(os.getenv("SHARED_INDEX_STARTUP_TIMEOUT", "120"))
+        )
+    
     def _load_rag_config(self) -> RAGConfig:
         """Charge la configuration RAG depuis l'environnement"""
         return RAGConfig(
@@ -98,7 +301,160 @@ class Config:
             top_k=int(os.getenv("RAG_TOP_K", "5")),
             chunk_size=int(os.getenv("RAG_CHUNK_SIZE", "1000")),
             chunk_overlap=int(os.getenv("RAG_CHUNK_OVERLAP", "200")),
-            min_relevance_score=float(os.getenv("RAG_MIN_RELEVANCE", "0.5"))
+            chunk_strategy=os.getenv("RAG_CHUNK_STRATEGY", "auto"),
+            chunk_tokens=int(os.getenv("RAG_CHUNK_TOKENS", "256")),
+            chunk_overlap_tokens=int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "32")),
+            min_relevance_score=float(os.getenv("RAG_MIN_RELEVANCE", "0.5")),
+            fast_path_enabled=os.getenv("RAG_FAST_PATH_ENABLED", "true").lower() == "true",
+            fast_path_threshold=float(os.getenv("RAG_FAST_PATH_THRESHOLD", "0.92")),
+            speculative_enabled=os.getenv("RAG_SPECULATIVE_ENABLED", "true").lower() == "true",
+            inline_chaining=os.getenv("RAG_INLINE_CHAINING", "true").lower() == "true",
+            speculative_ttl_seconds=float(os.getenv("RAG_SPECULATIVE_TTL", "30")),
+            single_flight_enabled=os.getenv("RAG_SINGLE_FLIGHT_ENABLED", "true").lower() == "true",
+            request_deadline_ms=int(os.getenv("RAG_REQUEST_DEADLINE_MS", "20000"))
+        )
+    
+    def _load_routing_config(self) -> RoutingConfig:
+        """Charge la configuration du routage LLM depuis l'environnement"""
+        return RoutingConfig(
+            enabled=os.getenv("LLM_ROUTING_ENABLED", "true").lower() == "true",
+            fast_model=os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini"),
+            fast_max_tokens=int(os.getenv("OPENAI_FAST_MAX_TOKENS", "512")),
+            fast_max_context_tokens=int(os.getenv("LLM_ROUTING_FAST_MAX_CONTEXT_TOKENS", "1500")),
+            fast_max_sources=int(os.getenv("LLM_ROUTING_FAST_MAX_SOURCES", "2")),
+            fast_max_query_words=int(os.getenv("LLM_ROUTING_FAST_MAX_QUERY_WORDS", "25")),
+            escalate_on_not_found=os.getenv("LLM_ROUTING_ESCALATE", "true").lower() == "true"
+        )
+    
+    def _load_circuit_breaker_config(self) -> CircuitBreakerConfig:
+        """Charge la configuration des circuit breakers depuis l'environnement"""
+        return CircuitBreakerConfig(
+            enabled=os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true",
+            failure_rate_threshold=float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_ms=float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_MS", "10000")),
+            slow_call_rate_threshold=float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8")),
+            window_size=int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20")),
+            min_calls=int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5")),
+            open_seconds=float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30")),
+            half_open_max_calls=int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "2"))
+        )
+    
+    def _load_admission_config(self) -> AdmissionConfig:
+        """Charge la configuration du contrôle d'admission depuis l'environnement"""
+        return AdmissionConfig(
+            enabled=os.getenv("ADMISSION_ENABLED", "true").lower() == "true",
+            max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "16")),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+            queue_timeout_ms=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "3000")),
+            sender_rate=float(os.getenv("ADMISSION_SENDER_RATE", "1.0")),
+            sender_burst=int(os.getenv("ADMISSION_SENDER_BURST", "10")),
+            sender_weights=self._parse_sender_weights(os.getenv("ADMISSION_SENDER_WEIGHTS", "")),
+            max_senders=int(os.getenv("ADMISSION_MAX_SENDERS", "10000"))
+        )
+    
+    @staticmethod
+    def _parse_sender_weights(value: str) -> Dict[str, float]:
+        """
+        Parse ADMISSION_SENDER_WEIGHTS
+        
+        Format : "supervision=4,demo-kiosk=0.5"
+        """
+        weights = {}
+        for item in value.split(","):
+            sender_id, sep, weight = item.rpartition("=")
+            if sep and sender_id.strip() and float(weight) > 0:
+                weights[sender_id.strip()] = float(weight)
+        return weights
+    
+    def _load_ingestion_config(self) -> IngestionConfig:
+        """Charge la configuration de l'ingestion depuis l'environnement"""
+        return IngestionConfig(
+            extract_workers=int(os.getenv("INGEST_EXTRACT_WORKERS", "0")),
+            embed_workers=int(os.getenv("INGEST_EMBED_WORKERS", "4")),
+            batch_size=int(os.getenv("INGEST_BATCH_SIZE", "100")),
+            queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "8")),
+            manifest_path=os.getenv(
+                "INGEST_MANIFEST_PATH",
+                os.path.join(os.getenv("CHROMA_PERSIST_DIR", "./chroma_db"), "ingest_manifest.db")
+            ),
+            watch_interval_seconds=float(os.getenv("INGEST_WATCH_INTERVAL", "10"))
+        )
+    
+    def _load_api_config(self) -> ApiConfig:
+        """Charge la configuration de l'API HTTP depuis l'environnement"""
+        return ApiConfig(
+            token=os.getenv("ACTION_API_TOKEN") or None,
+            batch_size=int(os.getenv("API_INDEX_BATCH_SIZE", "100")),
+            max_upload_mb=int(os.getenv("API_MAX_UPLOAD_MB", "1024")),
+            max_line_kb=int(os.getenv("API_MAX_LINE_KB", "1024")),
+            max_queries=int(os.getenv("API_MAX_QUERIES", "50")),
+            job_retention=int(os.getenv("API_JOB_RETENTION", "100")),
+            warmup=os.getenv("ACTION_SERVER_WARMUP", "true").lower() == "true"
+        )
+    
+    def _load_admin_config(self) -> AdminConfig:
+        """Charge la configuration des endpoints d'administration"""
+        return AdminConfig(
+            enabled=os.getenv("ADMIN_API_ENABLED", "false").lower() == "true",
+            token=os.getenv("ADMIN_API_TOKEN") or None,
+            max_profile_seconds=float(os.getenv("ADMIN_PROFILE_MAX_SECONDS", "60")),
+            tracemalloc_frames=int(os.getenv("ADMIN_TRACEMALLOC_FRAMES", "5")),
+            tracemalloc_max_seconds=float(os.getenv("ADMIN_TRACEMALLOC_MAX_SECONDS", "900"))
+        )
+    
+    def _load_reembedding_config(self) -> ReembeddingConfig:
+        """Charge la configuration du ré-embedding"""
+        return ReembeddingConfig(
+            rate_per_second=float(os.getenv("REEMBED_RATE", "100")),
+            batch_size=int(os.getenv("REEMBED_BATCH_SIZE", "100")),
+            keep_generations=max(1, int(os.getenv("REEMBED_KEEP_GENERATIONS", "2")))
+        )
+    
+    def _load_tracing_config(self) -> TracingConfig:
+        """Charge la configuration du tracing"""
+        return TracingConfig(
+            sample_rate=min(1.0, max(0.0, float(os.getenv("TRACE_SAMPLE_RATE", "0")))),
+            exporter=os.getenv("TRACE_EXPORTER", "file"),
+            file=os.getenv(
+                "TRACE_FILE", os.path.join(os.getenv("LOG_DIR", "logs"), "traces.jsonl")
+            ),
+            otlp_endpoint=os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+            service_name=os.getenv("TRACE_SERVICE_NAME", "action-server"),
+            queue_size=int(os.getenv("TRACE_QUEUE_SIZE", "2048")),
+            batch_size=int(os.getenv("TRACE_BATCH_SIZE", "256")),
+            hop_ttl_seconds=float(os.getenv("TRACE_HOP_TTL", "60"))
+        )
+    
+    def _load_usage_config(self) -> UsageConfig:
+        """Charge la configuration du suivi de consommation"""
+        return UsageConfig(
+            enabled=os.getenv("USAGE_TRACKING", "true").lower() == "true",
+            flush_interval_seconds=float(os.getenv("USAGE_FLUSH_INTERVAL", "60")),
+            sender_daily_tokens=int(os.getenv("USAGE_SENDER_DAILY_TOKENS", "0")),
+            sender_daily_hard_tokens=int(os.getenv("USAGE_SENDER_DAILY_HARD_TOKENS", "0")),
+            prices=self._parse_prices(os.getenv("USAGE_PRICES", ""))
+        )
+    
+    @staticmethod
+    def _parse_prices(value: str) -> Dict[str, Tuple[float, float]]:
+        """
+        Parse USAGE_PRICES (USD par million de tokens)
+        
+        Format : "gpt-4o=2.5/10,text-embedding-3-small=0.02"
+        """
+        prices = {}
+        for item in value.split(","):
+            model, sep, price = item.partition("=")
+            if sep and model.strip():
+                prompt, _, completion = price.partition("/")
+                prices[model.strip()] = (float(prompt), float(completion or 0))
+        return prices
+    
+    def _load_prompt_config(self) -> PromptConfig:
+        """Charge la configuration des prompts depuis l'environnement"""
+        return PromptConfig(
+            prompts_dir=os.getenv("PROMPTS_DIR", PromptConfig.prompts_dir),
+            max_context_tokens=int(os.getenv("PROMPT_MAX_CONTEXT_TOKENS", "3000"))
         )
     
     def _load_mongodb_config(self) -> MongoDBConfig:
@@ -108,7 +464,23 @@ class Config:
             database=os.getenv("MONGODB_DATABASE", "sofrecom_chatbot"),
             conversations_collection=os.getenv("MONGODB_CONVERSATIONS_COLLECTION", "conversations"),
             analytics_collection=os.getenv("MONGODB_ANALYTICS_COLLECTION", "analytics"),
-            tickets_collection=os.getenv("MONGODB_TICKETS_COLLECTION", "tickets")
+            tickets_collection=os.getenv("MONGODB_TICKETS_COLLECTION", "tickets"),
+            max_pool_size=int(os.getenv("MONGODB_MAX_POOL_SIZE", "20")),
+            timeout_ms=int(os.getenv("MONGODB_TIMEOUT_MS", "2000")),
+            writer_enabled=os.getenv("MONGODB_WRITER", "true").lower() == "true",
+            write_queue_size=int(os.getenv("MONGODB_WRITE_QUEUE_SIZE", "10000")),
+            write_batch_size=int(os.getenv("MONGODB_WRITE_BATCH_SIZE", "500")),
+            write_flush_interval_ms=float(os.getenv("MONGODB_WRITE_FLUSH_INTERVAL_MS", "1000"))
+        )
+    
+    def _load_ticket_config(self) -> TicketConfig:
+        """Charge la configuration des tickets depuis l'environnement"""
+        return TicketConfig(
+            store=os.getenv("TICKET_STORE", "mongodb"),
+            cache_size=int(os.getenv("TICKET_CACHE_SIZE", "10000")),
+            cache_ttl_seconds=float(os.getenv("TICKET_CACHE_TTL", "30")),
+            negative_ttl_seconds=float(os.getenv("TICKET_CACHE_NEGATIVE_TTL", "5")),
+            lookup_timeout_ms=int(os.getenv("TICKET_LOOKUP_TIMEOUT_MS", "500"))
         )
     
     def _load_logging_config(self) -> LoggingConfig:
@@ -116,9 +488,29 @@ class Config:
         return LoggingConfig(
             level=os.getenv("LOG_LEVEL", "INFO"),
             format=os.getenv("LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"),
-            file=os.getenv("LOG_FILE", "logs/action_server.log")
+            file=os.getenv("LOG_FILE", "logs/action_server.log"),
+            async_enabled=os.getenv("LOG_ASYNC", "true").lower() == "true",
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("LOG_BATCH_SIZE", "512")),
+            flush_interval_ms=float(os.getenv("LOG_FLUSH_INTERVAL_MS", "50")),
+            json_encoder=os.getenv("LOG_JSON_ENCODER", "auto"),
+            sample_rates=self._parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
         )
     
+    @staticmethod
+    def _parse_sample_rates(value: str) -> Dict[str, float]:
+        """
+        Parse LOG_SAMPLE_RATES
+        
+        Format : "RAG query executed=0.1,Batch embeddings=0.05,*=1"
+        """
+        rates = {}
+        for item in value.split(","):
+            prefix, sep, rate = item.rpartition("=")
+            if sep and prefix.strip():
+                rates[prefix.strip()] = min(1.0, max(0.0, float(rate)))
+        return rates
+    
     def validate(self) -> bool:
         """
         Valide que toutes les configurations requises sont présentes
@@ -144,10 +536,15 @@ class Config:
         """
         return {
             "openai": {
+                "base_url": self.openai.base_url,
                 "model": self.openai.model,
                 "embedding_model": self.openai.embedding_model,
                 "max_tokens": self.openai.max_tokens,
                 "temperature": self.openai.temperature,
+                "timeout": self.openai.timeout,
+                "max_retries": self.openai.max_retries,
+                "hedge_enabled": self.openai.hedge_enabled,
+                "hedge_max_workers": self.openai.hedge_max_workers,
                 "api_key": "***" if self.openai.api_key else "NOT_SET"
             },
             "chromadb": {
@@ -155,19 +552,108 @@ class Config:
                 "collection_name": self.chromadb.collection_name,
                 "distance_function": self.chromadb.distance_function
             },
+            "shared_index": {
+                "enabled": self.shared_index.enabled,
+                "directory": self.shared_index.directory,
+                "writer_port": self.shared_index.writer_port,
+                "remap_interval_ms": self.shared_index.remap_interval_ms,
+                "publish_delay_ms": self.shared_index.publish_delay_ms,
+                "embedding_cache_slots": self.shared_index.embedding_cache_slots
+            },
             "rag": {
                 "confidence_threshold": self.rag.confidence_threshold,
                 "top_k": self.rag.top_k,
                 "chunk_size": self.rag.chunk_size,
                 "chunk_overlap": self.rag.chunk_overlap,
-                "min_relevance_score": self.rag.min_relevance_score
+                "chunk_strategy": self.rag.chunk_strategy,
+                "chunk_tokens": self.rag.chunk_tokens,
+                "chunk_overlap_tokens": self.rag.chunk_overlap_tokens,
+                "min_relevance_score": self.rag.min_relevance_score,
+                "fast_path_enabled": self.rag.fast_path_enabled,
+                "fast_path_threshold": self.rag.fast_path_threshold,
+                "speculative_enabled": self.rag.speculative_enabled,
+                "inline_chaining": self.rag.inline_chaining,
+                "single_flight_enabled": self.rag.single_flight_enabled,
+                "request_deadline_ms": self.rag.request_deadline_ms
+            },
+            "routing": {
+                "enabled": self.routing.enabled,
+                "fast_model": self.routing.fast_model,
+                "strong_model": self.openai.model,
+                "escalate_on_not_found": self.routing.escalate_on_not_found
+            },
+            "circuit_breaker": {
+                "enabled": self.circuit_breaker.enabled,
+                "failure_rate_threshold": self.circuit_breaker.failure_rate_threshold,
+                "slow_call_ms": self.circuit_breaker.slow_call_ms,
+                "open_seconds": self.circuit_breaker.open_seconds
+            },
+            "admission": {
+                "enabled": self.admission.enabled,
+                "max_concurrent": self.admission.max_concurrent,
+                "max_queue": self.admission.max_queue,
+                "queue_timeout_ms": self.admission.queue_timeout_ms,
+                "sender_rate": self.admission.sender_rate,
+                "sender_burst": self.admission.sender_burst
+            },
+            "ingestion": {
+                "extract_workers": self.ingestion.extract_workers,
+                "embed_workers": self.ingestion.embed_workers,
+                "batch_size": self.ingestion.batch_size,
+                "manifest_path": self.ingestion.manifest_path
+            },
+            "api": {
+                "auth_enabled": self.api.token is not None,
+                "batch_size": self.api.batch_size,
+                "max_upload_mb": self.api.max_upload_mb,
+                "max_queries": self.api.max_queries,
+                "warmup": self.api.warmup
+            },
+            "admin": {
+                "enabled": self.admin.enabled,
+                "auth_enabled": self.admin.token is not None,
+                "max_profile_seconds": self.admin.max_profile_seconds
+            },
+            "usage": {
+                "enabled": self.usage.enabled,
+                "flush_interval_seconds": self.usage.flush_interval_seconds,
+                "sender_daily_tokens": self.usage.sender_daily_tokens,
+                "sender_daily_hard_tokens": self.usage.sender_daily_hard_tokens
+            },
+            "tracing": {
+                "sample_rate": self.tracing.sample_rate,
+                "exporter": self.tracing.exporter,
+                "file": self.tracing.file,
+                "otlp_endpoint": self.tracing.otlp_endpoint
+            },
+            "reembedding": {
+                "rate_per_second": self.reembedding.rate_per_second,
+                "batch_size": self.reembedding.batch_size,
+                "keep_generations": self.reembedding.keep_generations
+            },
+            "prompts": {
+                "prompts_dir": self.prompts.prompts_dir,
+                "max_context_tokens": self.prompts.max_context_tokens
             },
             "mongodb": {
                 "uri": self.mongodb.uri.split("@")[-1] if "@" in self.mongodb.uri else self.mongodb.uri,
-                "database": self.mongodb.database
+                "database": self.mongodb.database,
+                "max_pool_size": self.mongodb.max_pool_size,
+                "writer_enabled": self.mongodb.writer_enabled,
+                "write_batch_size": self.mongodb.write_batch_size,
+                "write_flush_interval_ms": self.mongodb.write_flush_interval_ms
+            },
+            "tickets": {
+                "store": self.tickets.store,
+                "cache_size": self.tickets.cache_size,
+                "cache_ttl_seconds": self.tickets.cache_ttl_seconds
             },
             "logging": {
-                "level": self.logging.level
+                "level": self.logging.level,
+                "async_enabled": self.logging.async_enabled,
+                "queue_size": self.logging.queue_size,
+                "json_encoder": self.logging.json_encoder,
+                "sample_rates": self.logging.sample_rates
             }
         }
 
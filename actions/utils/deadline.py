@@ -0,0 +1,70 @@
+# ============================================================================
+# DEADLINE - Budget de temps par requête utilisateur
+# ============================================================================
+
+"""
+Deadline propagée de l'action jusqu'aux appels OpenAI
+Permet d'arrêter les retries quand le budget restant ne suffit plus
+et de borner le timeout de chaque tentative
+"""
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Le budget de temps de la requête est épuisé"""
+
+
+class Deadline:
+    """
+    Échéance absolue (horloge monotone)
+
+    Exemple :
+        deadline = Deadline.after_ms(20000)
+        timeout = deadline.cap(30.0)  # min(30 s, temps restant)
+    """
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after_ms(cls, budget_ms: float) -> "Deadline":
+        """Crée une deadline dans budget_ms millisecondes"""
+        return cls(time.monotonic() + budget_ms / 1000)
+
+    def remaining(self) -> float:
+        """Temps restant en secondes (jamais négatif)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def remaining_ms(self) -> float:
+        """Temps restant en millisecondes"""
+        return self.remaining() * 1000
+
+    def expired(self) -> bool:
+        """True si l'échéance est passée"""
+        return time.monotonic() >= self.expires_at
+
+    def cap(self, timeout: float) -> float:
+        """Borne un timeout (secondes) par le temps restant"""
+        return min(timeout, self.remaining())
+
+    def check(self, operation: str = "request") -> None:
+        """
+        Vérifie que la deadline n'est pas dépassée
+
+        Raises:
+            DeadlineExceeded: Si le budget est épuisé
+        """
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline dépassée avant {operation}")
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining_ms={self.remaining_ms():.0f})"
+
+
+def remaining_or_none(deadline: Optional[Deadline]) -> Optional[float]:
+    """Temps restant en secondes, ou None sans deadline"""
+    return deadline.remaining() if deadline is not None else None
@@ -6,16 +6,62 @@
 Module de logging structuré
 Fournit un logger configuré avec rotation des fichiers
 et formatage JSON pour l'analyse
+
+Par défaut (LOG_ASYNC=true), les records sont déposés dans une file bornée
+et écrits par batch par un thread dédié : l'écriture disque, le flush et la
+rotation ne sont plus dans le chemin des requêtes. File pleine : le record
+est abandonné et compté (log_records_dropped).
 """
 
 import os
 import sys
 import json
+import time
+import queue
+import atexit
+import random
 import logging
-from datetime import datetime
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, List, Optional
 from logging.handlers import RotatingFileHandler
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from utils.config import config
+from utils.metrics import metrics
+from utils.tracing import current_span
+
+
+# Fin de la file du thread d'écriture
+_STOP = object()
+# Préfixes de messages résolus gardés en cache par l'échantillonneur
+_SAMPLER_CACHE_SIZE = 4096
+
+
+def _json_dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _orjson_dumps(data: Dict[str, Any]) -> str:
+    return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+def get_json_encoder(name: str = "auto"):
+    """
+    Encodeur JSON des records
+    
+    Args:
+        name: auto (orjson si installé), orjson ou json
+    """
+    if name == "orjson" and orjson is None:
+        raise ValueError("LOG_JSON_ENCODER=orjson requires the orjson package")
+    if name in ("auto", "orjson") and orjson is not None:
+        return _orjson_dumps
+    return _json_dumps
+
 
 class JsonFormatter(logging.Formatter):
     """
@@ -23,6 +69,21 @@ class JsonFormatter(logging.Formatter):
     Permet une analyse facile avec des outils comme ELK
     """
     
+    def __init__(self, encoder: str = "auto"):
+        super().__init__()
+        self._dumps = get_json_encoder(encoder)
+        # Préfixe "YYYY-MM-DDTHH:MM:SS" de la dernière seconde formatée
+        self._second = -1
+        self._second_prefix = ""
+    
+    def _timestamp(self, created: float) -> str:
+        """Heure UTC de création du record (pas de l'écriture, différée en mode async)"""
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._second_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        return f"{self._second_prefix}.{int((created - second) * 1e6):06d}"
+    
     def format(self, record: logging.LogRecord) -> str:
         """
         Formate un record de log en JSON
@@ -34,7 +95,7 @@ class JsonFormatter(logging.Formatter):
             str: Log formaté en JSON
         """
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -47,11 +108,211 @@ class JsonFormatter(logging.Formatter):
         if hasattr(record, 'extra_data'):
             log_data["data"] = record.extra_data
             
-        # Ajouter l'exception si présente
-        if record.exc_info:
-            log_data["exception"] = self.formatException(record.exc_info)
+        # Ajouter l'exception si présente (déjà formatée en mode async)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_data["exception"] = record.exc_text
             
-        return json.dumps(log_data, ensure_ascii=False, default=str)
+        return self._dumps(log_data)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """Handler console : un write et un flush par batch"""
+    
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        # Flux déjà fermé (fin de l'interpréteur, capture de pytest) : rien à écrire
+        if getattr(self.stream, "closed", False):
+            return
+        text = "".join(self.format(record) + self.terminator for record in records)
+        with self.lock:
+            self.stream.write(text)
+            self.flush()
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """Handler fichier avec rotation : un write et un flush par batch"""
+    
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        text = "".join(self.format(record) + self.terminator for record in records)
+        with self.lock:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self.stream.tell() > 0 \
+                    and self.stream.tell() + len(text) >= self.maxBytes:
+                self.doRollover()
+            self.stream.write(text)
+            self.stream.flush()
+
+
+class QueueBatchHandler(logging.Handler):
+    """
+    Handler non bloquant : file bornée vidée par batch par un thread dédié
+    
+    emit() ne fait que préparer le record et le déposer dans la file ; le
+    thread d'écriture formate et écrit tout ce qui est en attente (jusqu'à
+    batch_size records) en une passe par handler cible.
+    """
+    
+    def __init__(self, handlers: List[logging.Handler], queue_size: int = 10000,
+                 batch_size: int = 512, flush_interval_ms: float = 50):
+        """
+        Args:
+            handlers: Handlers cibles (emit_batch utilisé s'il existe)
+            queue_size: Records en attente avant abandon
+            batch_size: Records max par passe d'écriture
+            flush_interval_ms: Pause après un batch incomplet (regroupe les
+                records suivants, moins de réveils du thread)
+        """
+        super().__init__()
+        self.targets = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue: "queue.Queue" = queue.Queue(queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        # Démarré au premier record (et de nouveau dans un processus fils)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._after_fork)
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._closed:
+            # Après close() (autres handlers atexit) : écriture directe
+            self._write([self._prepare(record)])
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(self._prepare(record))
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("log_records_dropped", level=record.levelname)
+    
+    def _prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Fige le message et la trace : le record est formaté plus tard, ailleurs"""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def _run(self) -> None:
+        while True:
+            record = self.queue.get()
+            if record is _STOP:
+                return
+            batch = [record]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                    break
+                batch.append(record)
+            self._write(batch)
+            if stop:
+                return
+            if len(batch) < self.batch_size and self.flush_interval > 0:
+                time.sleep(self.flush_interval)
+    
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        for handler in self.targets:
+            records = [record for record in batch if record.levelno >= handler.level]
+            if not records:
+                continue
+            try:
+                if hasattr(handler, "emit_batch"):
+                    handler.emit_batch(records)
+                else:
+                    for record in records:
+                        handler.handle(record)
+            except Exception:
+                handler.handleError(records[0])
+        self.written += len(batch)
+        self.batches += 1
+    
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+    
+    def _after_fork(self) -> None:
+        # Records du parent écrits par le parent ; thread recréé au premier emit
+        self.queue = queue.Queue(self.queue.maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+        }
+    
+    def close(self) -> None:
+        """Arrête le thread, écrit les records en attente puis ferme les handlers cibles"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=1)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=5)
+        # Records restés dans la file (thread arrêté ou jamais démarré)
+        pending = []
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not _STOP:
+                pending.append(record)
+        if pending:
+            self._write(pending)
+        for handler in self.targets:
+            handler.close()
+        super().close()
+
+
+class LogSampler:
+    """
+    Échantillonnage des records INFO/DEBUG à fort volume
+    
+    Le taux est choisi par préfixe de message (LOG_SAMPLE_RATES) ; les
+    records gardés portent sample_rate pour pondérer les analyses.
+    """
+    
+    def __init__(self, rates: Dict[str, float]):
+        rates = dict(rates)
+        self.default = rates.pop("*", 1.0)
+        # Préfixes les plus longs d'abord
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._cache: Dict[str, float] = {}
+    
+    def rate(self, message: str) -> float:
+        rate = self._cache.get(message)
+        if rate is None:
+            rate = next(
+                (rate for prefix, rate in self.rates if message.startswith(prefix)),
+                self.default
+            )
+            if len(self._cache) < _SAMPLER_CACHE_SIZE:
+                self._cache[message] = rate
+        return rate
 
 
 class ActionLogger:
@@ -81,6 +342,9 @@ class ActionLogger:
             
         self.name = name
         self.logger = logging.getLogger(name)
+        self.queue_handler: Optional[QueueBatchHandler] = None
+        self.sampler = LogSampler(config.logging.sample_rates) if config.logging.sample_rates else None
+        self.sampled_out = 0
         self._initialized = True
         self._setup_logger()
         
@@ -90,30 +354,49 @@ class ActionLogger:
         if self.logger.handlers:
             return
             
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(config.logging.level.upper())
         
         # Handler console avec format lisible
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = BatchStreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         console_format = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         console_handler.setFormatter(console_format)
-        self.logger.addHandler(console_handler)
         
         # Handler fichier avec format JSON
         log_dir = os.getenv("LOG_DIR", "logs")
         os.makedirs(log_dir, exist_ok=True)
         
-        file_handler = RotatingFileHandler(
+        file_handler = BatchRotatingFileHandler(
             os.path.join(log_dir, "action_server.log"),
             maxBytes=10 * 1024 * 1024,  # 10 MB
             backupCount=5,
             encoding='utf-8'
         )
         file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(JsonFormatter())
-        self.logger.addHandler(file_handler)
+        file_handler.setFormatter(JsonFormatter(config.logging.json_encoder))
+        
+        if config.logging.async_enabled:
+            self.queue_handler = QueueBatchHandler(
+                [console_handler, file_handler],
+                queue_size=config.logging.queue_size,
+                batch_size=config.logging.batch_size,
+                flush_interval_ms=config.logging.flush_interval_ms
+            )
+            self.logger.addHandler(self.queue_handler)
+        else:
+            self.logger.addHandler(console_handler)
+            self.logger.addHandler(file_handler)
+    
+    def is_enabled(self, level: int) -> bool:
+        """Niveau actif : permet d'éviter de construire des données coûteuses"""
+        return self.logger.isEnabledFor(level)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs du logging (file, abandons, échantillonnage)"""
+        stats = self.queue_handler.stats() if self.queue_handler else {}
+        return {"async": self.queue_handler is not None, "sampled_out": self.sampled_out, **stats}
         
     def _log_with_extra(
         self,
@@ -131,6 +414,20 @@ class ActionLogger:
             extra_data: Données additionnelles
             exc_info: Inclure les infos d'exception
         """
+        if not self.logger.isEnabledFor(level):
+            return
+        if self.sampler is not None and level < logging.WARNING:
+            rate = self.sampler.rate(message)
+            if rate < 1.0:
+                if random.random() >= rate:
+                    self.sampled_out += 1
+                    metrics.increment("log_records_sampled_out")
+                    return
+                extra_data = {**(extra_data or {}), "sample_rate": rate}
+        span = current_span()
+        if span is not None:
+            # Corrélation logs / traces
+            extra_data = {**(extra_data or {}), "trace_id": span.trace_id, "span_id": span.span_id}
         extra = {'extra_data': extra_data} if extra_data else {}
         self.logger.log(level, message, extra=extra, exc_info=exc_info)
     
@@ -188,6 +485,8 @@ class ActionLogger:
             duration_ms: Durée d'exécution en ms
             success: Succès de l'action
         """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         self.info(
             f"Action executed: {action_name}",
             action=action_name,
@@ -218,6 +517,8 @@ class ActionLogger:
             llm_response: Réponse du LLM
             duration_ms: Durée totale en ms
         """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         self.info(
             "RAG query executed",
             query=query[:100],
@@ -0,0 +1,176 @@
+# ============================================================================
+# METRICS - Compteurs et latences en mémoire pour l'Action Server
+# ============================================================================
+
+"""
+Registre de métriques en mémoire
+Compteurs, jauges et distributions de latence (fenêtre glissante)
+consultables via snapshot() pour le reporting
+"""
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+
+def _series_key(name: str, labels: Dict[str, Any]) -> str:
+    """Construit la clé d'une série : name{label=value,...}"""
+    if not labels:
+        return name
+    parts = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{parts}}}"
+
+
+class MetricsRegistry:
+    """
+    Registre de métriques thread-safe
+
+    - Compteurs : valeurs cumulées (hits, erreurs, ms économisées...)
+    - Jauges : dernière valeur observée (taille de file, état...)
+    - Distributions : derniers échantillons pour p50/p95/p99
+    """
+
+    def __init__(self, window_size: int = 1024):
+        """
+        Initialise le registre
+
+        Args:
+            window_size: Nombre d'échantillons conservés par distribution
+        """
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+        self._observed: Dict[str, int] = {}
+
+    def increment(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Incrémente un compteur"""
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Met à jour une jauge"""
+        key = _series_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Ajoute un échantillon à une distribution"""
+        key = _series_key(name, labels)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.window_size)
+                self._samples[key] = samples
+            samples.append(value)
+            self._observed[key] = self._observed.get(key, 0) + 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Mesure la durée d'un bloc en millisecondes"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start_time) * 1000, **labels)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """Valeur courante d'un compteur (0 si absent)"""
+        with self._lock:
+            return self._counters.get(_series_key(name, labels), 0.0)
+
+    def gauge(self, name: str, **labels: Any) -> Optional[float]:
+        """Valeur courante d'une jauge (None si absente)"""
+        with self._lock:
+            return self._gauges.get(_series_key(name, labels))
+
+    def mean(self, name: str, **labels: Any) -> Optional[float]:
+        """Moyenne glissante d'une distribution (None si vide)"""
+        with self._lock:
+            samples = self._samples.get(_series_key(name, labels))
+            if not samples:
+                return None
+            return sum(samples) / len(samples)
+
+    def percentile(self, name: str, q: float, **labels: Any) -> Optional[float]:
+        """
+        Percentile glissant d'une distribution
+
+        Args:
+            name: Nom de la distribution
+            q: Percentile entre 0 et 100
+
+        Returns:
+            float ou None si aucun échantillon
+        """
+        with self._lock:
+            samples = self._samples.get(_series_key(name, labels))
+            if not samples:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def size(self) -> Dict[str, int]:
+        """Nombre de séries et d'échantillons conservés"""
+        with self._lock:
+            return {
+                "counters": len(self._counters),
+                "gauges": len(self._gauges),
+                "distributions": len(self._samples),
+                "samples": sum(len(values) for values in self._samples.values()),
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Exporte l'état courant des métriques
+
+        Returns:
+            dict: counters, gauges et distributions (count, mean, p50, p95, p99)
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+            observed = dict(self._observed)
+
+        distributions = {}
+        for key, ordered in samples.items():
+            if not ordered:
+                continue
+            last = len(ordered) - 1
+            distributions[key] = {
+                "count": observed.get(key, len(ordered)),
+                "mean": round(sum(ordered) / len(ordered), 2),
+                "p50": round(ordered[int(round(0.50 * last))], 2),
+                "p95": round(ordered[int(round(0.95 * last))], 2),
+                "p99": round(ordered[int(round(0.99 * last))], 2),
+            }
+
+        return {"counters": counters, "gauges": gauges, "distributions": distributions}
+
+    def reset(self) -> None:
+        """Réinitialise toutes les métriques"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+            self._observed.clear()
+
+
+# Instance globale des métriques
+metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Récupère le registre global de métriques
+
+    Returns:
+        MetricsRegistry: Instance du registre
+    """
+    return metrics
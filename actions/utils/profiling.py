@@ -0,0 +1,283 @@
+# ============================================================================
+# PROFILING - Profil CPU par échantillonnage et diff d'allocations mémoire
+# ============================================================================
+
+"""
+Outils d'inspection d'un processus en production (api/admin_api.py)
+
+- SamplingProfiler : un thread relève les piles de tous les threads
+  (sys._current_frames) à intervalle fixe, pendant N secondes. Le résultat
+  est au format "collapsed stacks" (flamegraph.pl, speedscope, py-spy).
+  Aucun hook sur les appels : le coût est celui des relevés, mesuré et
+  renvoyé avec le profil.
+- AllocationTracker : tracemalloc démarré à la demande, diff entre une
+  snapshot de référence et l'état courant, arrêt automatique.
+
+Un seul profil et un seul suivi d'allocations à la fois par processus.
+"""
+
+import gc
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from utils.config import config
+from utils.logger import logger
+
+
+# Profondeur max d'une pile relevée
+MAX_STACK_DEPTH = 128
+# Intervalle d'échantillonnage minimum (ms)
+MIN_INTERVAL_MS = 1.0
+
+_started_at = time.time()
+
+
+class ProfilerBusy(Exception):
+    """Un profil ou un suivi d'allocations est déjà en cours"""
+
+
+class SamplingProfiler:
+    """
+    Profileur CPU par échantillonnage des piles de threads
+
+    Usage:
+        profiler = SamplingProfiler(interval_ms=10)
+        profiler.start()
+        ...
+        stacks = profiler.stop()
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, interval_ms: float = 10.0, thread_filter: Optional[str] = None,
+                 line_numbers: bool = False):
+        """
+        Args:
+            interval_ms: Intervalle entre deux relevés
+            thread_filter: Ne relever que les threads dont le nom contient ce texte
+            line_numbers: Distinguer les lignes d'une même fonction
+        """
+        self.interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+        self.thread_filter = thread_filter
+        self.line_numbers = line_numbers
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        if not SamplingProfiler._lock.acquire(blocking=False):
+            raise ProfilerBusy("a CPU profile is already running")
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="cpu-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        """Arrête l'échantillonnage et renvoie les piles agrégées"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self.started_at
+            SamplingProfiler._lock.release()
+        return self.stacks
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                name = names.get(ident, str(ident))
+                if self.thread_filter and self.thread_filter not in name:
+                    continue
+                self.stacks[self._collapse(name, frame)] += 1
+            del frames
+            self.samples += 1
+            self.sampling_seconds += time.perf_counter() - start
+            next_at += self.interval
+            self._stop.wait(max(0.0, next_at - time.perf_counter()))
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        parts: List[str] = []
+        while frame is not None and len(parts) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            location = os.path.basename(code.co_filename)
+            if self.line_numbers:
+                location = f"{location}:{frame.f_lineno}"
+            parts.append(f"{code.co_name} ({location})")
+            frame = frame.f_back
+        parts.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(parts))
+
+    def collapsed(self) -> str:
+        """Une ligne "thread;frame;...;frame count" par pile (racine d'abord)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, limit: int = 30) -> Dict[str, Any]:
+        """Fonctions les plus vues : en feuille (self) et dans la pile (total)"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        return {
+            "samples": self.samples,
+            "duration_s": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "overhead_pct": round(100 * self.sampling_seconds / self.duration, 2) if self.duration else 0.0,
+            "stacks": len(self.stacks),
+            "self": [{"frame": name, "samples": count} for name, count in own.most_common(limit)],
+            "total": [{"frame": name, "samples": count} for name, count in total.most_common(limit)],
+        }
+
+
+class AllocationTracker:
+    """
+    Suivi des allocations avec tracemalloc (diff par rapport à une référence)
+
+    tracemalloc ralentit chaque allocation : le suivi s'arrête tout seul
+    après max_seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._timer: Optional[threading.Timer] = None
+        self.started_at: Optional[float] = None
+        self.frames = 0
+
+    @property
+    def running(self) -> bool:
+        return self._baseline is not None and tracemalloc.is_tracing()
+
+    def start(self, frames: Optional[int] = None, max_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Démarre tracemalloc et prend la snapshot de référence"""
+        with self._lock:
+            if tracemalloc.is_tracing():
+                raise ProfilerBusy("tracemalloc is already tracing")
+            self.frames = max(1, min(frames or config.admin.tracemalloc_frames, 50))
+            max_seconds = max_seconds or config.admin.tracemalloc_max_seconds
+            tracemalloc.start(self.frames)
+            self._baseline = self._snapshot()
+            self.started_at = time.time()
+            self._timer = threading.Timer(max_seconds, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        logger.warning("tracemalloc started", frames=self.frames, max_seconds=max_seconds)
+        return self.status()
+
+    def diff(self, limit: int = 20, group_by: str = "lineno", reset: bool = False) -> Dict[str, Any]:
+        """
+        Allocations ayant le plus grossi depuis la référence
+
+        Args:
+            limit: Nombre d'entrées
+            group_by: lineno, filename ou traceback
+            reset: La snapshot courante devient la nouvelle référence
+        """
+        with self._lock:
+            if not self.running:
+                raise RuntimeError("tracemalloc is not running")
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self._baseline, group_by)
+            if reset:
+                self._baseline = snapshot
+        return {
+            **self.status(),
+            "group_by": group_by,
+            "growth_kb": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            "top": [
+                {
+                    # Frames de la plus ancienne à la plus récente
+                    "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+                    if group_by == "traceback" else f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            self._stop()
+        logger.info("tracemalloc stopped")
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": self.frames,
+            "running_s": round(time.time() - self.started_at, 1) if self.running else None,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def _expire(self) -> None:
+        with self._lock:
+            if self._baseline is not None:
+                logger.warning("tracemalloc stopped after max duration")
+                self._stop()
+
+    def _stop(self) -> None:
+        # Lock détenu
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._baseline = None
+        self.started_at = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def process_stats() -> Dict[str, Any]:
+    """Mémoire, threads et GC du processus courant"""
+    stats: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - _started_at, 1),
+        "threads": sorted(thread.name for thread in threading.enumerate()),
+        "gc_counts": gc.get_count(),
+    }
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM", "VmSize"):
+                    stats[key.lower() + "_kb"] = int(value.split()[0])
+    except OSError:
+        import resource
+        stats["maxrss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return stats
+
+
+# Instance globale (tracemalloc est global au processus)
+allocation_tracker = AllocationTracker()
@@ -0,0 +1,416 @@
+# ============================================================================
+# TRACING - Spans par requête webhook (actions, retrieval, OpenAI)
+# ============================================================================
+
+"""
+Tracing léger compatible OTLP
+
+Une trace est ouverte par requête webhook (server.py) ou par action. Le
+router annonce son follow-up pour le couple (sender_id, message) : la
+requête action_rag_query qui suit continue la trace du router. Les spans enfants
+couvrent embeddings, requête vectorielle, contexte, appel LLM et retries.
+
+    with tracer.span("vector_store.query", top_k=5) as span:
+        ...
+        span.set(num_results=len(results))
+
+Le contexte suit les coroutines (contextvars) ; pour un thread, passer
+la fonction par wrap(). Sans trace échantillonnée, span() renvoie un
+span inerte partagé : le coût se limite à une lecture de ContextVar.
+
+Export OTLP/JSON par batch depuis un thread dédié : fichier local (une
+requête ExportTraceServiceRequest par ligne) ou collecteur OTLP/HTTP.
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import threading
+import contextvars
+import urllib.request
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.config import config
+from utils.metrics import metrics
+
+
+# Types de span OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+
+# Codes de statut OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Traces de follow-up gardées en attente de rattachement
+_MAX_HOPS = 4096
+# Timeout d'un envoi au collecteur OTLP
+_OTLP_TIMEOUT_SECONDS = 2.0
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("trace_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _hop_key(sender_id: str, message: str) -> Tuple[str, str]:
+    return sender_id, " ".join((message or "").lower().split())
+
+
+class Span:
+    """Opération chronométrée d'une trace"""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+        "start_ns", "end_ns", "attributes", "events", "status", "message", "_token"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.events: List[Tuple[int, str, Dict[str, Any]]] = []
+        self.status = STATUS_OK
+        self.message: Optional[str] = None
+        self._token = None
+
+    def set(self, **attributes: Any) -> "Span":
+        if self.sampled:
+            self.attributes.update(attributes)
+        return self
+
+    def event(self, name: str, **attributes: Any) -> None:
+        if self.sampled:
+            self.events.append((time.time_ns(), name, attributes))
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.message = f"{type(exc).__name__}: {exc}"[:500]
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_error(exc)
+        _current.reset(self._token)
+        self._token = None
+        tracer.finish(self)
+
+
+class _NoopSpan:
+    """Span inerte (trace non échantillonnée ou tracing désactivé)"""
+
+    __slots__ = ()
+    sampled = False
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes: Any) -> "_NoopSpan":
+        return self
+
+    def event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def record_error(self, exc: BaseException) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    """Span courant (racine non échantillonnée comprise), None hors trace"""
+    return _current.get()
+
+
+def wrap(fn: Callable) -> Callable:
+    """Exécute fn dans le contexte courant (trace, usage_scope) depuis un thread"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items() if value is not None
+    ]
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": span.status},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    if span.message:
+        data["status"]["message"] = span.message
+    if span.events:
+        data["events"] = [
+            {"timeUnixNano": str(at), "name": name, "attributes": _otlp_attributes(attributes)}
+            for at, name, attributes in span.events
+        ]
+    return data
+
+
+class SpanExporter:
+    """Export OTLP/JSON par batch depuis un thread dédié (file bornée)"""
+
+    def __init__(self, exporter: str, file_path: str, endpoint: str, service_name: str,
+                 queue_size: int, batch_size: int):
+        self.exporter = exporter
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.resource = {"attributes": _otlp_attributes({
+            "service.name": service_name,
+            "process.pid": os.getpid(),
+        })}
+        self.queue: "queue.Queue" = queue.Queue(queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def submit(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("trace_spans_dropped")
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.export(batch)
+                self.exported += len(batch)
+            except Exception:
+                metrics.increment("trace_export_errors", exporter=self.exporter)
+
+    def export(self, spans: List[Span]) -> None:
+        """Écrit un batch de spans (ExportTraceServiceRequest OTLP/JSON)"""
+        payload = json.dumps({
+            "resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{
+                    "scope": {"name": "sofrecom.actions"},
+                    "spans": [_otlp_span(span) for span in spans],
+                }],
+            }]
+        }, ensure_ascii=False, default=str)
+        if self.exporter == "otlp":
+            request = urllib.request.Request(
+                self.endpoint, data=payload.encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=_OTLP_TIMEOUT_SECONDS):
+                pass
+        else:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(payload + "\n")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Attend que la file soit vide (tests, arrêt)"""
+        end = time.monotonic() + timeout
+        while not self.queue.empty() and time.monotonic() < end:
+            time.sleep(0.01)
+
+    def _after_fork(self) -> None:
+        # Le thread n'existe pas dans le fils : redémarré à la demande
+        self._thread = None
+        self._lock = threading.Lock()
+        self.queue = queue.Queue(self.queue.maxsize)
+
+
+class Tracer:
+    """
+    Ouverture des traces, échantillonnage et rattachement des follow-ups
+    """
+
+    def __init__(self, sample_rate: Optional[float] = None, exporter: Optional[SpanExporter] = None):
+        cfg = config.tracing
+        self.sample_rate = cfg.sample_rate if sample_rate is None else sample_rate
+        self.hop_ttl = cfg.hop_ttl_seconds
+        self.exporter = exporter or SpanExporter(
+            cfg.exporter, cfg.file, cfg.otlp_endpoint, cfg.service_name,
+            cfg.queue_size, cfg.batch_size
+        )
+        self._hops: "OrderedDict[Tuple[str, str], Tuple[float, str, str, bool]]" = OrderedDict()
+        self._hops_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start_trace(self, name: str, sender_id: Optional[str] = None,
+                    message: Optional[str] = None, kind: int = KIND_SERVER,
+                    **attributes: Any) -> Optional[Span]:
+        """
+        Ouvre la trace d'une requête et en fait le span courant
+
+        Un span existe déjà (webhook) : span enfant. Follow-up attendu pour
+        ce sender_id et ce message (expect_followup) : la trace est continuée.
+        À fermer avec finish() (ou utiliser trace()).
+
+        Returns:
+            Span ou None si le tracing est désactivé
+        """
+        span = self._open(name, sender_id, message, kind, attributes)
+        if span is not None:
+            span._token = _current.set(span)
+        return span
+
+    def trace(self, name: str, sender_id: Optional[str] = None,
+              message: Optional[str] = None, **attributes: Any):
+        """Context manager équivalent à start_trace() / finish()"""
+        return self._open(name, sender_id, message, KIND_INTERNAL, attributes) or NOOP_SPAN
+
+    def _open(self, name: str, sender_id: Optional[str], message: Optional[str],
+              kind: int, attributes: Dict[str, Any]) -> Optional[Span]:
+        if not self.enabled:
+            return None
+        parent = _current.get()
+        if parent is not None:
+            if not parent.sampled:
+                return None
+            return Span(name, parent.trace_id, parent.span_id, True, attributes=attributes)
+
+        hop = self._take_hop(sender_id, message) if sender_id else None
+        if hop is not None:
+            trace_id, parent_id, sampled = hop
+            attributes["followup"] = True
+        else:
+            trace_id, parent_id = _new_id(128), None
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        if sender_id:
+            attributes["sender_id"] = sender_id
+        return Span(name, trace_id, parent_id, sampled, kind=kind, attributes=attributes)
+
+    def expect_followup(self, sender_id: str, message: Optional[str]) -> None:
+        """
+        Annonce une action de suivi (FollowupAction) pour ce message
+
+        La requête webhook du follow-up continue la trace courante au lieu
+        d'en ouvrir une nouvelle.
+        """
+        span = _current.get()
+        if span is None:
+            return
+        key = _hop_key(sender_id, message)
+        with self._hops_lock:
+            self._hops[key] = (time.monotonic() + self.hop_ttl, span.trace_id, span.span_id, span.sampled)
+            self._hops.move_to_end(key)
+            while len(self._hops) > _MAX_HOPS:
+                self._hops.popitem(last=False)
+
+    def span(self, name: str, **attributes: Any):
+        """
+        Span enfant du span courant (context manager)
+
+        Inerte hors trace échantillonnée.
+        """
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return NOOP_SPAN
+        return Span(name, parent.trace_id, parent.span_id, True, attributes=attributes)
+
+    def finish(self, span: Optional[Span], error: Optional[BaseException] = None) -> None:
+        """Ferme un span ; ouvert par start_trace(), le contexte est restauré"""
+        if span is None or span.end_ns is not None:
+            return
+        if error is not None:
+            span.record_error(error)
+        if span._token is not None:
+            try:
+                _current.reset(span._token)
+            except ValueError:
+                # Fermé depuis un autre contexte
+                pass
+            span._token = None
+        span.end_ns = time.time_ns()
+        if span.sampled:
+            self.exporter.submit(span)
+
+    def _take_hop(self, sender_id: str, message: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+        with self._hops_lock:
+            hop = self._hops.pop(_hop_key(sender_id, message), None)
+        if hop is None or hop[0] < time.monotonic():
+            return None
+        return hop[1], hop[2], hop[3]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "exporter": self.exporter.exporter,
+            "exported": self.exporter.exported,
+            "dropped": self.exporter.dropped,
+            "queued": self.exporter.queue.qsize(),
+        }
+
+
+# Instance globale du tracer
+tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    Récupère l'instance globale du tracer
+
+    Returns:
+        Tracer: Instance du tracer
+    """
+    return tracer
@@ -44,4 +44,14 @@ const getRagStats = async (req, res, next) => {
     }
 };
 
-module.exports = { getDashboard, getIntentStats, getConversationStats, getRagStats };
+const getUsageStats = async (req, res, next) => {
+    try {
+        const { period = '7d', groupBy = 'intent' } = req.query;
+        const stats = await analyticsService.getUsageStats(period, groupBy);
+        res.json(stats);
+    } catch (error) {
+        next(error);
+    }
+};
+
+module.exports = { getDashboard, getIntentStats, getConversationStats, getRagStats, getUsageStats };
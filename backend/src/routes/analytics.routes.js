@@ -13,5 +13,6 @@ router.get('/dashboard', analyticsController.getDashboard);
 router.get('/intents', analyticsController.getIntentStats);
 router.get('/conversations', analyticsController.getConversationStats);
 router.get('/rag', analyticsController.getRagStats);
+router.get('/usage', analyticsController.getUsageStats);
 
 module.exports = router;
@@ -71,4 +71,29 @@ const getRagStats = async (period) => {
     return { data: stats[0] || { total: 0, avgRelevance: 0 }, period };
 };
 
-module.exports = { getDashboard, getIntentStats, getConversationStats, getRagStats };
+// Tokens et coût OpenAI agrégés par le action server (un document par jour et par clé)
+const getUsageStats = async (period, groupBy = 'intent') => {
+    const startDate = getPeriodDate(period);
+    const field = ['intent', 'model', 'stage', 'sender_id', 'date'].includes(groupBy) ? groupBy : 'intent';
+
+    const stats = await Analytics.aggregate([
+        { $match: { createdAt: { $gte: startDate }, type: 'token_usage' } },
+        {
+            $group: {
+                _id: `$${field}`,
+                calls: { $sum: '$calls' },
+                promptTokens: { $sum: '$prompt_tokens' },
+                completionTokens: { $sum: '$completion_tokens' },
+                totalTokens: { $sum: '$total_tokens' },
+                costUsd: { $sum: '$cost_usd' },
+                durationMs: { $sum: '$duration_ms' }
+            }
+        },
+        { $sort: { costUsd: -1 } },
+        { $limit: 50 }
+    ]);
+
+    return { data: stats, groupBy: field, period };
+};
+
+module.exports = { getDashboard, getIntentStats, getConversationStats, getRagStats, getUsageStats };
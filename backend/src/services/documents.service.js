@@ -76,8 +76,8 @@ const chunkText = (text, chunkSize, overlap) => {
     while (start < text.length) {
         const end = Math.min(start + chunkSize, text.length);
         chunks.push(text.slice(start, end));
+        if (end === text.length) break;
         start = end - overlap;
-        if (start >= text.length) break;
     }
 
     return chunks;
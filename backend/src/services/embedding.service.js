@@ -1,33 +1,89 @@
 // ============================================================================
-// EMBEDDING SERVICE - Client pour le service d'embeddings Python
+// EMBEDDING SERVICE - Client pour l'API d'indexation du action server Python
 // ============================================================================
 
 const axios = require('axios');
 const logger = require('../config/logger');
 
 const ACTION_SERVER_URL = process.env.ACTION_SERVER_URL || 'http://localhost:5055';
+// Écritures (indexation, jobs, suppression) : processus d'indexation en mode
+// multi-worker (SHARED_INDEX_WRITER_PORT), sinon le action server lui-même
+const ACTION_INDEX_URL = process.env.ACTION_INDEX_URL || ACTION_SERVER_URL;
+const ACTION_API_TOKEN = process.env.ACTION_API_TOKEN;
+
+// Au-delà, l'indexation passe en job asynchrone (réponse 202 + suivi)
+const ASYNC_THRESHOLD = 2000;
+
+const createClient = (baseURL) => axios.create({
+    baseURL,
+    timeout: 120000,
+    maxBodyLength: Infinity,
+    headers: ACTION_API_TOKEN ? { Authorization: `Bearer ${ACTION_API_TOKEN}` } : {}
+});
+
+const client = createClient(ACTION_SERVER_URL);
+const indexClient = createClient(ACTION_INDEX_URL);
+
+// 421 d'un worker : la requête est rejouée une fois sur le port du writer
+indexClient.interceptors.response.use(null, (error) => {
+    const { response, config } = error;
+    const writerPort = response && response.status === 421 && response.data && response.data.writer_port;
+    if (!writerPort || config.redirectedToWriter) {
+        return Promise.reject(error);
+    }
+    const writerURL = new URL(config.baseURL);
+    writerURL.port = String(writerPort);
+    logger.warn(`Index write redirected to the writer process (${writerURL.origin}), set ACTION_INDEX_URL`);
+    return indexClient.request({ ...config, baseURL: writerURL.origin, redirectedToWriter: true });
+});
 
 const indexChunks = async (docId, chunks, metadata = {}) => {
     try {
-        // Pour l'instant, log seulement - l'indexation réelle est faite par le action server Python
-        logger.info(`Indexing ${chunks.length} chunks for document ${docId}`);
+        // Une ligne NDJSON par chunk
+        const body = chunks
+            .map((content, index) => JSON.stringify({
+                id: `${docId}_${index}`,
+                doc_id: docId,
+                content,
+                metadata: { ...metadata, chunk_index: index, total_chunks: chunks.length }
+            }))
+            .join('\n');
+
+        const runAsync = chunks.length > ASYNC_THRESHOLD;
+        const response = await indexClient.post('/index', body, {
+            params: runAsync ? { async: 'true' } : {},
+            headers: { 'Content-Type': 'application/x-ndjson' }
+        });
 
-        // TODO: Appeler le service Python pour indexer
-        // const response = await axios.post(`${ACTION_SERVER_URL}/index`, { docId, chunks, metadata });
+        logger.info(`Indexing ${chunks.length} chunks for document ${docId}`, {
+            jobId: response.data.job_id,
+            status: response.data.status,
+            failed: response.data.failed
+        });
 
-        return { indexed: chunks.length };
+        return {
+            indexed: response.data.indexed,
+            failed: response.data.failed,
+            jobId: response.data.job_id,
+            status: response.data.status
+        };
     } catch (error) {
         logger.error('Embedding service error:', error);
         throw error;
     }
 };
 
+const getIndexJob = async (jobId) => {
+    const response = await indexClient.get(`/index/jobs/${jobId}`);
+    return response.data;
+};
+
 const search = async (query, limit = 5) => {
     try {
-        // TODO: Appeler le service Python pour la recherche
-        logger.info(`Searching: ${query}`);
+        const response = await client.post('/search', { queries: [query], top_k: limit });
+        const [result] = response.data.results;
 
-        return { results: [], query };
+        return { results: result ? result.matches : [], query };
     } catch (error) {
         logger.error('Search error:', error);
         return { results: [], error: error.message };
@@ -35,7 +91,15 @@ const search = async (query, limit = 5) => {
 };
 
 const deleteByDocId = async (docId) => {
-    logger.info(`Deleting embeddings for document ${docId}`);
+    try {
+        const response = await indexClient.delete('/index', { params: { doc_id: docId } });
+        logger.info(`Deleted ${response.data.deleted} embeddings for document ${docId}`);
+        return response.data;
+    } catch (error) {
+        // Le document Mongo est déjà supprimé : ne pas faire échouer la suppression
+        logger.error('Delete embeddings error:', error);
+        return { deleted: 0, error: error.message };
+    }
 };
 
-module.exports = { indexChunks, search, deleteByDocId };
+module.exports = { indexChunks, getIndexJob, search, deleteByDocId };
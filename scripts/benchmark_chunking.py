@@ -0,0 +1,154 @@
+# ============================================================================
+# SCRIPTS - Micro-benchmark des stratégies de découpage
+# ============================================================================
+
+"""
+Micro-benchmark des stratégies de core.chunking sur un texte synthétique
+
+Pour chaque stratégie et chaque taille de texte : débit (Mo/s), nombre de
+chunks et distribution des tokens par chunk. Le débit doit rester stable
+quand la taille augmente (découpage en temps linéaire) : le ratio entre la
+plus grande et la plus petite taille est affiché en fin de run.
+
+Le texte est fourni par blocs de 64 Ko, comme pour un fichier lu en flux.
+
+Usage:
+    python benchmark_chunking.py --sizes 100,1000,10000 --output chunking.json
+    python benchmark_chunking.py --strategies sentence,markdown --max-tokens 512
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Ajouter le chemin du projet
+sys.path.insert(0, str(Path(__file__).parent.parent / "actions"))
+
+from benchmark_rag import FILLER, TOPICS, git_revision, percentile
+
+
+BLOCK_CHARS = 64 * 1024
+DEFAULT_STRATEGIES = "characters,tokens,sentence,markdown"
+
+# Amorces de phrases avec abréviations (ne doivent pas couper la phrase)
+OPENINGS = ["M. Martin indique que", "Selon l'art. 4 du contrat,", "Voir p. 12 :",
+            "Mme Durand précise que", "Comme prévu (cf. annexe),"]
+
+
+def build_text(size_chars: int, seed: int) -> str:
+    """Texte français synthétique : titres Markdown, paragraphes, phrases"""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    parts: List[str] = []
+    length = 0
+    section = 0
+    while length < size_chars:
+        topic = topics[section % len(topics)]
+        section += 1
+        parts.append(f"## {section}. {topic.capitalize()}\n\n")
+        for _ in range(rng.randint(2, 5)):
+            sentences = []
+            for _ in range(rng.randint(2, 6)):
+                words = [
+                    rng.choice(TOPICS[topic]) if rng.random() < 0.35 else rng.choice(FILLER)
+                    for _ in range(rng.randint(6, 30))
+                ]
+                if rng.random() < 0.2:
+                    words.insert(0, rng.choice(OPENINGS))
+                sentence = " ".join(words)
+                sentences.append(sentence[0].upper() + sentence[1:] + rng.choice([".", ".", ".", " ?", " !"]))
+            paragraph = " ".join(sentences) + "\n\n"
+            parts.append(paragraph)
+            length += len(paragraph)
+    return "".join(parts)[:size_chars]
+
+
+def blocks(text: str):
+    for start in range(0, len(text), BLOCK_CHARS):
+        yield None, text[start:start + BLOCK_CHARS]
+
+
+def run_case(chunker, text: str, repeat: int) -> Dict[str, Any]:
+    """Découpe le texte `repeat` fois et garde le meilleur temps"""
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = list(chunker.split(blocks(text)))
+        best = min(best, time.perf_counter() - started)
+
+    tokens = sorted(chunk.token_count for chunk in chunks)
+    budget = getattr(chunker, "max_tokens", None)
+    return {
+        "chars": len(text),
+        "seconds": round(best, 4),
+        "mb_per_s": round(len(text) / 1e6 / max(best, 1e-9), 2),
+        "chunks": len(chunks),
+        "tokens_p50": percentile(tokens, 50) if tokens else 0,
+        "tokens_p95": percentile(tokens, 95) if tokens else 0,
+        "tokens_max": tokens[-1] if tokens else 0,
+        "over_budget": sum(1 for count in tokens if budget and count > budget),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark of chunking strategies")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Text sizes in KB")
+    parser.add_argument("--strategies", default=DEFAULT_STRATEGIES)
+    parser.add_argument("--max-tokens", type=int, help="Token budget (default: RAG_CHUNK_TOKENS)")
+    parser.add_argument("--overlap-tokens", type=int, help="Token overlap (default: RAG_CHUNK_OVERLAP_TOKENS)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best time kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    from core.chunking import create_chunker, get_token_counter
+
+    sizes = [int(size) * 1000 for size in args.sizes.split(",")]
+    strategies = [strategy.strip() for strategy in args.strategies.split(",")]
+    texts = {size: build_text(size, args.seed) for size in sizes}
+
+    counter = get_token_counter()
+    print(f"Tokenizer: {'tiktoken' if counter.exact else 'estimation (tiktoken not installed)'}")
+    print(f"{'strategy':<12} {'size':>10} {'MB/s':>8} {'chunks':>8} {'p50':>6} {'p95':>6} {'max':>6} {'over':>6}")
+
+    results: Dict[str, Any] = {}
+    for strategy in strategies:
+        chunker = create_chunker(
+            strategy, max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens
+        )
+        cases = []
+        for size in sizes:
+            case = run_case(chunker, texts[size], args.repeat)
+            cases.append(case)
+            print(
+                f"{strategy:<12} {case['chars']:>10} {case['mb_per_s']:>8} {case['chunks']:>8} "
+                f"{case['tokens_p50']:>6} {case['tokens_p95']:>6} {case['tokens_max']:>6} "
+                f"{case['over_budget']:>6}"
+            )
+        # ~1.0 : débit indépendant de la taille (linéaire)
+        scaling = round(cases[-1]["mb_per_s"] / max(cases[0]["mb_per_s"], 1e-9), 2)
+        results[strategy] = {"cases": cases, "throughput_ratio": scaling}
+        print(f"{strategy:<12} throughput ratio largest/smallest: {scaling}")
+
+    if args.output:
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "tokenizer": "tiktoken" if counter.exact else "estimation",
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# ============================================================================
+# SCRIPTS - Benchmark hors ligne du pipeline RAG
+# ============================================================================
+
+"""
+Benchmark du pipeline RAG contre le serveur OpenAI simulé (openai_standin.py)
+
+Étapes mesurées :
+- embed_chunks : EmbeddingService.embed_chunks sur le corpus synthétique
+- index        : insertion dans ChromaDB
+- embed        : EmbeddingService.embed par requête
+- search       : VectorStore.search par requête
+- rag_query    : RAGPipeline.query de bout en bout
+
+Les étapes par requête sont rejouées à plusieurs niveaux de concurrence ;
+les résultats (p50/p95/p99, débit, erreurs) sont écrits en JSON pour être
+comparés entre deux versions (--baseline).
+
+Les variables d'environnement habituelles (RAG_*, LLM_ROUTING_*, OPENAI_*,
+CIRCUIT_BREAKER_*) s'appliquent au pipeline mesuré.
+
+Usage:
+    python benchmark_rag.py --docs 200 --concurrency 1,4,16 --output results.json
+    python benchmark_rag.py --queries queries.txt --baseline results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Ajouter le chemin du projet
+sys.path.insert(0, str(Path(__file__).parent.parent / "actions"))
+
+from openai_standin import add_standin_arguments, standin_config_from_args, start_standin
+
+
+# Vocabulaire du corpus synthétique (un thème = un groupe de documents)
+TOPICS = {
+    "facturation": ["facture", "paiement", "échéance", "prélèvement", "montant", "avoir",
+                    "relance", "tarif", "remboursement", "TVA"],
+    "contrat": ["contrat", "résiliation", "engagement", "avenant", "signature", "durée",
+                "renouvellement", "clause", "préavis", "souscription"],
+    "support": ["ticket", "incident", "assistance", "conseiller", "délai", "priorité",
+                "escalade", "diagnostic", "intervention", "horaires"],
+    "compte": ["compte", "identifiant", "mot", "passe", "connexion", "profil", "sécurité",
+               "authentification", "adresse", "modification"],
+    "réseau": ["fibre", "débit", "box", "installation", "raccordement", "coupure",
+               "antenne", "couverture", "routeur", "latence"],
+}
+FILLER = ["le", "la", "les", "un", "une", "de", "du", "des", "pour", "avec", "dans",
+          "votre", "notre", "est", "sont", "peut", "doit", "selon", "chaque", "client"]
+
+PER_QUERY_STAGES = ("embed", "search", "rag_query")
+
+# Distributions internes reportées par niveau de concurrence
+INTERNAL_METRICS = ("rag_query_ms", "rag_generation_ms", "llm_tier_ms", "openai_attempt_ms")
+
+
+def build_corpus(num_docs: int, chunks_per_doc: int, chunk_words: int, seed: int) -> List[Dict[str, Any]]:
+    """Génère un corpus déterministe de chunks thématiques"""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    corpus = []
+    for doc_index in range(num_docs):
+        topic = topics[doc_index % len(topics)]
+        vocabulary = TOPICS[topic]
+        for chunk_index in range(chunks_per_doc):
+            words = [
+                rng.choice(vocabulary) if rng.random() < 0.35 else rng.choice(FILLER)
+                for _ in range(chunk_words)
+            ]
+            corpus.append({
+                "id": f"bench_{doc_index}_{chunk_index}",
+                "content": " ".join(words) + ".",
+                "metadata": {
+                    "source": f"{topic}_{doc_index}.txt",
+                    "topic": topic,
+                    "chunk_index": chunk_index
+                }
+            })
+    return corpus
+
+
+def build_queries(corpus: List[Dict[str, Any]], count: int, query_words: int, seed: int) -> List[str]:
+    """Tire des requêtes à partir d'extraits du corpus"""
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(corpus)["content"].rstrip(".").split()
+        start = rng.randrange(max(1, len(words) - query_words))
+        queries.append(" ".join(words[start:start + query_words]) + " ?")
+    return queries
+
+
+def load_queries(path: str) -> List[str]:
+    """Charge un fichier de requêtes (une par ligne, ou JSONL avec une clé "query")"""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line).get("query", "")
+            if line:
+                queries.append(line)
+    return queries
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Percentile (rang le plus proche) d'une liste triée"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))]
+
+
+def summarize(latencies_ms: List[float], errors: int, wall_s: float) -> Dict[str, Any]:
+    """Statistiques d'une étape"""
+    ordered = sorted(latencies_ms)
+    total = len(ordered) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(ordered) / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            "p50": round(percentile(ordered, 50), 2),
+            "p95": round(percentile(ordered, 95), 2),
+            "p99": round(percentile(ordered, 99), 2),
+            "max": round(ordered[-1], 2) if ordered else 0.0
+        }
+    }
+
+
+def run_stage(fn: Callable[[str], Any], queries: List[str], concurrency: int, requests: int) -> Dict[str, Any]:
+    """Rejoue les requêtes (en boucle) avec un nombre fixe de workers"""
+    workload = [queries[i % len(queries)] for i in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+
+    def timed(query: str):
+        start_time = time.perf_counter()
+        try:
+            fn(query)
+        except Exception:
+            return None
+        return (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for duration_ms in executor.map(timed, workload):
+            if duration_ms is None:
+                errors += 1
+            else:
+                latencies.append(duration_ms)
+    return summarize(latencies, errors, time.perf_counter() - start_time)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Affiche l'écart p95 / débit avec un résultat précédent"""
+    previous = {(r["stage"], r["concurrency"]): r for r in baseline.get("results", [])}
+    print("\n📊 Comparison with baseline"
+          f" ({baseline.get('meta', {}).get('git_revision') or 'unknown'})")
+    for result in results["results"]:
+        before = previous.get((result["stage"], result["concurrency"]))
+        if before is None:
+            continue
+
+        def delta(after: float, base: float) -> str:
+            return f"{(after - base) / base * 100:+.1f}%" if base else "n/a"
+
+        print(
+            f"  {result['stage']:<12} c={result['concurrency']:<3} "
+            f"p95 {before['latency_ms']['p95']:>9.1f} → {result['latency_ms']['p95']:>9.1f} ms "
+            f"({delta(result['latency_ms']['p95'], before['latency_ms']['p95'])})  "
+            f"rps {before['throughput_rps']:>7.1f} → {result['throughput_rps']:>7.1f} "
+            f"({delta(result['throughput_rps'], before['throughput_rps'])})"
+        )
+
+
+def print_row(stage: str, concurrency: Any, summary: Dict[str, Any]) -> None:
+    latency = summary["latency_ms"]
+    print(
+        f"  {stage:<12} c={concurrency:<3} n={summary['requests']:<5} "
+        f"p50={latency['p50']:>8.1f}  p95={latency['p95']:>8.1f}  p99={latency['p99']:>8.1f} ms  "
+        f"{summary['throughput_rps']:>7.1f} rps  errors={summary['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmark")
+    parser.add_argument("--docs", type=int, default=100, help="Number of synthetic documents")
+    parser.add_argument("--chunks-per-doc", type=int, default=5, help="Chunks per document")
+    parser.add_argument("--chunk-words", type=int, default=150, help="Words per chunk")
+    parser.add_argument("--queries", help="Query file (one per line or JSONL with 'query')")
+    parser.add_argument("--num-queries", type=int, default=50, help="Synthetic queries when no file is given")
+    parser.add_argument("--query-words", type=int, default=12, help="Words per synthetic query")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per stage and level")
+    parser.add_argument("--stages", default=",".join(PER_QUERY_STAGES), help="Per-query stages to run")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per search")
+    parser.add_argument("--min-relevance", type=float, default=0.1,
+                        help="RAG_MIN_RELEVANCE for the run (hashed vectors score lower than real ones)")
+    parser.add_argument("--embedding-cache", action="store_true",
+                        help="Keep the query embedding cache enabled")
+    parser.add_argument("--base-url", help="Use an already running OpenAI-compatible server")
+    parser.add_argument("--persist-dir", help="ChromaDB directory (default: temporary)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Previous JSON results to compare against")
+    parser.add_argument("--log-level", default="WARNING", help="Action server log level during the run")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = start_standin(standin_config=standin_config_from_args(args))
+        base_url = server.base_url
+    persist_dir = args.persist_dir or tempfile.mkdtemp(prefix="rag_bench_")
+
+    # La configuration est lue à l'import des modules du pipeline
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "standin")
+    os.environ["CHROMA_PERSIST_DIR"] = persist_dir
+    os.environ["CHROMA_COLLECTION"] = "benchmark"
+    os.environ["RAG_MIN_RELEVANCE"] = str(args.min_relevance)
+    os.environ["LOG_DIR"] = os.path.join(persist_dir, "logs")
+    if not args.embedding_cache:
+        os.environ["OPENAI_EMBEDDING_CACHE_SIZE"] = "0"
+
+    from core.embeddings import get_embedding_service
+    from core.rag_pipeline import get_rag_pipeline
+    from core.vector_store import get_vector_store
+    from utils.config import config
+    from utils.deadline import Deadline
+    from utils.logger import logger
+    from utils.metrics import metrics
+
+    # Les logs INFO par requête fausseraient les mesures
+    logger.logger.setLevel(args.log_level.upper())
+
+    corpus = build_corpus(args.docs, args.chunks_per_doc, args.chunk_words, args.seed)
+    queries = load_queries(args.queries) if args.queries else build_queries(
+        corpus, args.num_queries, args.query_words, args.seed
+    )
+    if not queries:
+        parser.error("No queries to replay")
+
+    print(f"🧪 Benchmark against {base_url}")
+    print(f"   corpus: {len(corpus)} chunks, queries: {len(queries)}, levels: {levels}")
+
+    embedding_service = get_embedding_service()
+    vector_store = get_vector_store()
+    pipeline = get_rag_pipeline()
+
+    results: List[Dict[str, Any]] = []
+    contents = [chunk["content"] for chunk in corpus]
+
+    # 1. Ingestion (séquentielle, comme scripts/ingest_documents.py)
+    start_time = time.perf_counter()
+    embeddings = embedding_service.embed_chunks(contents)
+    embed_s = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    vector_store.collection.add(
+        ids=[chunk["id"] for chunk in corpus],
+        embeddings=embeddings,
+        documents=contents,
+        metadatas=[chunk["metadata"] for chunk in corpus]
+    )
+    index_s = time.perf_counter() - start_time
+
+    for stage, wall_s in (("embed_chunks", embed_s), ("index", index_s)):
+        summary = summarize([wall_s * 1000], 0, wall_s)
+        summary["throughput_rps"] = round(len(corpus) / wall_s, 2) if wall_s > 0 else 0.0
+        summary["chunks"] = len(corpus)
+        results.append({"stage": stage, "concurrency": 1, **summary})
+        print_row(stage, 1, summary)
+
+    # 2. Étapes par requête, à chaque niveau de concurrence
+    stage_fns: Dict[str, Callable[[str], Any]] = {
+        "embed": embedding_service.embed,
+        "search": lambda query: vector_store.search(query, top_k=args.top_k),
+        "rag_query": lambda query: pipeline.query(
+            query, top_k=args.top_k,
+            deadline=Deadline.after_ms(config.rag.request_deadline_ms)
+        ),
+    }
+    for level in levels:
+        for stage in stages:
+            if stage not in stage_fns:
+                parser.error(f"Unknown stage '{stage}' (expected {', '.join(PER_QUERY_STAGES)})")
+            metrics.reset()
+            summary = run_stage(stage_fns[stage], queries, level, args.requests)
+            snapshot = metrics.snapshot()
+            summary["internal"] = {
+                key: value for key, value in snapshot["distributions"].items()
+                if key.split("{", 1)[0] in INTERNAL_METRICS
+            }
+            summary["counters"] = snapshot["counters"]
+            results.append({"stage": stage, "concurrency": level, **summary})
+            print_row(stage, level, summary)
+
+    output = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "base_url": base_url if args.base_url else "standin",
+            "corpus_chunks": len(corpus),
+            "queries": len(queries),
+            "args": vars(args),
+            "config": config.to_dict()
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\n✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(output, json.load(f))
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
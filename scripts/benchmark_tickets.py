@@ -0,0 +1,155 @@
+# ============================================================================
+# SCRIPTS - Benchmark des lectures de statut de ticket
+# ============================================================================
+
+"""
+Benchmark des lectures de statut de core.tickets
+
+Charge N tickets puis mesure la latence de get() (p50/p95/p99) :
+- cold : cache désactivé, chaque lecture va au stockage
+- cached : cache read-through, trafic concentré sur les tickets récents
+  (--hot-ratio des lectures portent sur les --hot-tickets derniers créés)
+
+Avec --store mongodb, les tickets sont insérés directement (insert_many)
+dans une base dédiée (--database, défaut sofrecom_chatbot_bench) qui
+reçoit les mêmes index que la production.
+
+Usage:
+    python benchmark_tickets.py --tickets 1000000 --store memory
+    python benchmark_tickets.py --tickets 1000000 --store mongodb --output tickets.json
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Ajouter le chemin du projet
+sys.path.insert(0, str(Path(__file__).parent.parent / "actions"))
+
+from benchmark_rag import git_revision, percentile
+
+
+INSERT_BATCH = 10000
+
+
+def seed_memory(store, count: int) -> List[str]:
+    ids = []
+    for index in range(count):
+        ticket = store.create("support", f"user-{index % 50000}", user_name="Bench")
+        ids.append(ticket.ticket_id)
+    return ids
+
+
+def seed_mongodb(store, count: int) -> List[str]:
+    from core.tickets import STATUS_LABELS, Ticket, new_ticket_id
+
+    collection = store.collection
+    collection.delete_many({})
+    statuses = list(STATUS_LABELS)
+    ids: List[str] = []
+    batch = []
+    for index in range(count):
+        ticket = Ticket(new_ticket_id(), "support", statuses[index % len(statuses)],
+                        f"user-{index % 50000}", fields={"user_name": "Bench"})
+        ids.append(ticket.ticket_id)
+        batch.append(ticket.to_document())
+        if len(batch) >= INSERT_BATCH:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    return ids
+
+
+def measure(store, ids: List[str], lookups: int, hot_ratio: float, hot_tickets: int,
+            seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    hot = ids[-hot_tickets:]
+    latencies = []
+    missing = 0
+    for _ in range(lookups):
+        ticket_id = rng.choice(hot) if rng.random() < hot_ratio else rng.choice(ids)
+        started = time.perf_counter()
+        ticket = store.get(ticket_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+        missing += ticket is None
+    latencies.sort()
+    return {
+        "lookups": lookups,
+        "missing": missing,
+        "p50_ms": round(percentile(latencies, 50), 4),
+        "p95_ms": round(percentile(latencies, 95), 4),
+        "p99_ms": round(percentile(latencies, 99), 4),
+        "max_ms": round(latencies[-1], 4),
+        "lookups_per_s": round(lookups / (sum(latencies) / 1000), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticket status lookup benchmark")
+    parser.add_argument("--tickets", type=int, default=1000000)
+    parser.add_argument("--store", choices=["memory", "mongodb"], default="memory")
+    parser.add_argument("--database", default="sofrecom_chatbot_bench", help="MongoDB database (mongodb store)")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--hot-ratio", type=float, default=0.8, help="Share of lookups on recent tickets")
+    parser.add_argument("--hot-tickets", type=int, default=1000, help="Recent tickets receiving hot lookups")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    from utils.config import config
+    from core.tickets import InMemoryTicketStore, MongoTicketStore, TicketCache
+
+    if args.store == "mongodb" and args.database == config.mongodb.database:
+        parser.error("--database must not be the application database (its tickets are deleted)")
+    config.mongodb.database = args.database
+    cfg = config.tickets
+    cold = TicketCache(0, 0, 0)
+    if args.store == "memory":
+        store = InMemoryTicketStore(cache=cold)
+        seed = seed_memory
+    else:
+        store = MongoTicketStore(cache=cold)
+        seed = seed_mongodb
+
+    started = time.perf_counter()
+    ids = seed(store, args.tickets)
+    print(f"Seeded {len(ids)} tickets ({args.store}) in {time.perf_counter() - started:.1f}s")
+
+    results: Dict[str, Any] = {}
+    results["cold"] = measure(store, ids, args.lookups, args.hot_ratio, args.hot_tickets, args.seed)
+    store.cache = TicketCache(cfg.cache_size, cfg.cache_ttl_seconds, cfg.negative_ttl_seconds)
+    results["cached"] = measure(store, ids, args.lookups, args.hot_ratio, args.hot_tickets, args.seed)
+
+    print(f"{'case':<8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'lookups/s':>11}")
+    for name, case in results.items():
+        print(
+            f"{name:<8} {case['p50_ms']:>9} {case['p95_ms']:>9} {case['p99_ms']:>9} "
+            f"{case['max_ms']:>9} {case['lookups_per_s']:>11}"
+        )
+
+    if args.output:
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "store": args.store,
+            "tickets": args.tickets,
+            "hot_ratio": args.hot_ratio,
+            "hot_tickets": args.hot_tickets,
+            "cache_size": cfg.cache_size,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,159 +4,151 @@
 
 """
 Script d'ingestion de documents PDF/TXT dans le vector store ChromaDB
-Usage: python ingest_documents.py --path /path/to/documents
+Usage: python ingest_documents.py --path /path/to/documents [--workers 8 --embed-workers 4]
+       python ingest_documents.py --path /path/to/documents --watch --prune
+
+Un manifeste enregistre l'état de chaque fichier : relancer la commande
+reprend une ingestion interrompue et ignore les fichiers inchangés.
 """
 
 import os
 import sys
+import time
 import argparse
 from pathlib import Path
+from typing import List, Optional
 
 # Ajouter le chemin du projet
 sys.path.insert(0, str(Path(__file__).parent.parent / "actions"))
 
 from core.vector_store import VectorStore
-from core.embeddings import EmbeddingService
+from core.chunking import STRATEGIES
+from core.documents import find_documents
+from core.ingestion import IngestionPipeline
+from core.manifest import IngestionManifest
+from utils.config import config
 from utils.logger import logger
 
-try:
-    import pypdf
-    from pypdf import PdfReader
-except ImportError:
-    pypdf = None
-    logger.warning("pypdf not installed, PDF support disabled")
-
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list:
-    """Divise le texte en chunks avec overlap"""
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        chunk = text[start:end]
-        
-        # Essayer de couper à une phrase
-        if end < len(text):
-            last_period = chunk.rfind('.')
-            if last_period > chunk_size // 2:
-                end = start + last_period + 1
-                chunk = text[start:end]
-        
-        chunks.append(chunk.strip())
-        start = end - overlap
-        
-        if start >= len(text):
-            break
-    
-    return [c for c in chunks if c]
-
-
-def extract_pdf_text(file_path: str) -> str:
-    """Extrait le texte d'un PDF"""
-    if pypdf is None:
-        raise ImportError("pypdf is required for PDF processing")
-    
-    reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
-
-
-def extract_text(file_path: str) -> str:
-    """Extrait le texte d'un fichier"""
-    path = Path(file_path)
-    
-    if path.suffix.lower() == '.pdf':
-        return extract_pdf_text(file_path)
-    elif path.suffix.lower() in ['.txt', '.md']:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    else:
-        raise ValueError(f"Unsupported file type: {path.suffix}")
-
-
-def ingest_file(file_path: str, vector_store: VectorStore, chunk_size: int = 1000):
-    """Ingère un fichier dans le vector store"""
-    path = Path(file_path)
-    logger.info(f"Processing: {path.name}")
-    
+def create_pipeline(
+    vector_store: VectorStore,
+    manifest: Optional[IngestionManifest] = None,
+    chunk_size: int = 1000,
+    extract_workers: int = None,
+    embed_workers: int = None,
+    batch_size: int = None,
+    strategy: str = None
+) -> IngestionPipeline:
+    """Pipeline d'ingestion configuré depuis la ligne de commande"""
+    return IngestionPipeline(
+        vector_store=vector_store,
+        manifest=manifest,
+        chunk_size=chunk_size,
+        strategy=strategy,
+        extract_workers=extract_workers,
+        embed_workers=embed_workers,
+        batch_size=batch_size
+    )
+
+
+def prune_missing(directory: str, files: List[str], vector_store: VectorStore,
+                  manifest: IngestionManifest) -> int:
+    """Supprime les chunks des fichiers disparus du répertoire"""
+    removed = manifest.missing(directory, files)
+    for state in removed:
+        vector_store.delete_documents(state.chunk_ids)
+        manifest.remove(state.path)
+        logger.info(f"Removed deleted file: {state.path}", chunks=len(state.chunk_ids))
+    return len(removed)
+
+
+def watch(path: Path, pipeline: IngestionPipeline, vector_store: VectorStore,
+          manifest: IngestionManifest, interval: float, prune: bool) -> None:
+    """Ingère en continu les fichiers nouveaux ou modifiés (scan périodique)"""
+    logger.info(f"Watching {path} every {interval}s (Ctrl+C to stop)")
+    first = True
     try:
-        # Extraire le texte
-        text = extract_text(file_path)
-        
-        # Chunker
-        chunks = chunk_text(text, chunk_size=chunk_size)
-        logger.info(f"Created {len(chunks)} chunks")
-        
-        # Préparer les documents
-        documents = []
-        for i, chunk in enumerate(chunks):
-            doc_id = f"{path.stem}_{i}"
-            documents.append({
-                "id": doc_id,
-                "content": chunk,
-                "metadata": {
-                    "source": path.name,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks)
-                }
-            })
-        
-        # Indexer
-        vector_store.add_documents(documents)
-        logger.info(f"Indexed {len(documents)} documents from {path.name}")
-        
-        return len(documents)
-        
-    except Exception as e:
-        logger.error(f"Error processing {path.name}: {e}")
-        return 0
-
-
-def ingest_directory(directory: str, vector_store: VectorStore, chunk_size: int = 1000):
-    """Ingère tous les fichiers d'un répertoire"""
-    path = Path(directory)
-    total = 0
-    
-    for file_path in path.glob("**/*"):
-        if file_path.suffix.lower() in ['.pdf', '.txt', '.md']:
-            total += ingest_file(str(file_path), vector_store, chunk_size)
-    
-    return total
+        while True:
+            files = find_documents(str(path)) if path.is_dir() else [str(path)]
+            # Les fichiers en échec ne sont retentés que s'ils changent
+            stats = pipeline.run(files, retry_failed=first)
+            removed = prune_missing(str(path), files, vector_store, manifest) if prune and path.is_dir() else 0
+            if stats.files_total or removed:
+                vector_store.persist()
+            first = False
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info("Watch stopped")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest documents into ChromaDB")
     parser.add_argument("--path", required=True, help="Path to file or directory")
-    parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Chunk size in characters (characters strategy)")
+    parser.add_argument("--strategy", choices=STRATEGIES,
+                        help="Chunking strategy (default: RAG_CHUNK_STRATEGY)")
     parser.add_argument("--clear", action="store_true", help="Clear existing data")
+    parser.add_argument("--workers", type=int, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--embed-workers", type=int, help="Concurrent embedding requests")
+    parser.add_argument("--batch-size", type=int, help="Chunks per embedding call and write")
+    parser.add_argument("--manifest", help="Ingestion manifest (default: INGEST_MANIFEST_PATH)")
+    parser.add_argument("--no-manifest", action="store_true",
+                        help="Ingest everything without recording progress")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-ingest unchanged files (replaces their chunks)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and ingest new or changed files")
+    parser.add_argument("--interval", type=float, help="Watch scan interval in seconds")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete chunks of files removed from the directory")
     
     args = parser.parse_args()
     
+    path = Path(args.path)
+    if not path.exists():
+        logger.error(f"Path not found: {args.path}")
+        sys.exit(1)
+    if args.no_manifest and (args.watch or args.prune):
+        parser.error("--watch and --prune need the manifest")
+    
     # Initialiser le vector store
     vector_store = VectorStore()
+    manifest = None if args.no_manifest else IngestionManifest(args.manifest)
     
     if args.clear:
         logger.warning("Clearing all existing documents...")
         vector_store.delete_all()
     
-    path = Path(args.path)
+    pipeline = create_pipeline(
+        vector_store, manifest, args.chunk_size,
+        extract_workers=args.workers if path.is_dir() else 1,
+        embed_workers=args.embed_workers,
+        batch_size=args.batch_size,
+        strategy=args.strategy
+    )
     
-    if path.is_file():
-        total = ingest_file(args.path, vector_store, args.chunk_size)
-    elif path.is_dir():
-        total = ingest_directory(args.path, vector_store, args.chunk_size)
-    else:
-        logger.error(f"Path not found: {args.path}")
-        sys.exit(1)
+    if args.watch:
+        watch(
+            path, pipeline, vector_store, manifest,
+            args.interval or config.ingestion.watch_interval_seconds, args.prune
+        )
+        return
+    
+    files = find_documents(args.path) if path.is_dir() else [args.path]
+    # Après --clear, le manifeste ne reflète plus le vector store
+    stats = pipeline.run(files, force=args.force or args.clear)
+    if args.prune and path.is_dir():
+        prune_missing(args.path, files, vector_store, manifest)
     
     # Persister
     vector_store.persist()
     
-    logger.info(f"✅ Ingestion complete! Total documents: {total}")
+    logger.info(f"✅ Ingestion complete! Total documents: {stats.written}")
     logger.info(f"Vector store contains {vector_store.count()} documents")
+    if stats.failed:
+        logger.error(f"{len(stats.failed)} file(s) failed, run again to retry them")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,412 @@
+# ============================================================================
+# SCRIPTS - Générateur de charge pour le webhook de l'Action Server
+# ============================================================================
+
+"""
+Test de charge de bout en bout de POST /webhook (Rasa SDK)
+
+Construit des payloads Rasa réalistes (tracker, latest_message, slots)
+à partir des exemples de rasa/data/nlu.yml pour action_router,
+action_rag_query, action_default_fallback et les actions métier, puis :
+- boucle fermée (--mode closed) : N utilisateurs virtuels enchaînent les requêtes
+- boucle ouverte (--mode open) : arrivées à débit cible, indépendantes des réponses
+
+Chaque palier (--steps) rapporte p50/p95/p99, taux d'erreur et débit atteint ;
+le premier palier qui viole le SLO est reporté comme point de saturation.
+
+Pour ne pas consommer de crédits OpenAI, lancer l'Action Server contre
+le serveur simulé (openai_standin.py ou --standin-port) :
+    python load_test_webhook.py --standin-port 8089
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=standin python -m rasa_sdk --actions actions
+
+Usage:
+    python load_test_webhook.py --mode closed --steps 1,5,10,20 --step-duration 30
+    python load_test_webhook.py --mode open --steps 5,10,20,40 --slo-p95-ms 3000 --output load.json
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from benchmark_rag import git_revision, summarize
+from openai_standin import add_standin_arguments, standin_config_from_args, start_standin
+
+
+NLU_PATH = Path(__file__).parent.parent / "rasa" / "data" / "nlu.yml"
+
+# Intents posés à action_rag_query / au fallback (questions documentaires)
+RAG_INTENTS = ("ask_faq", "ask_documentation", "ask_product_info", "ask_services", "ask_pricing")
+FALLBACK_INTENTS = ("out_of_scope",)
+
+# Répartition par défaut des actions appelées
+DEFAULT_MIX = {
+    "action_router": 30,
+    "action_check_confidence": 10,
+    "action_rag_query": 25,
+    "action_default_fallback": 5,
+    "action_create_ticket": 8,
+    "action_get_ticket_status": 7,
+    "action_request_callback": 5,
+    "action_send_feedback": 5,
+    "action_get_user_info": 5,
+}
+
+# Entités annotées : [texte](entité) ou [texte]{"entity": ...}
+ENTITY_PATTERN = re.compile(r"\[([^\]]+)\](?:\([^)]*\)|\{[^}]*\})?")
+
+
+def load_nlu_examples(path: Path) -> Dict[str, List[str]]:
+    """
+    Extrait les exemples par intent de nlu.yml
+
+    Lecture ligne à ligne (pas de dépendance YAML) : seuls les blocs
+    "- intent:" sont retenus, les regex et synonymes sont ignorés.
+    """
+    examples: Dict[str, List[str]] = {}
+    current: Optional[str] = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith("- intent:"):
+                current = stripped.split(":", 1)[1].strip()
+                examples[current] = []
+            elif stripped.startswith("- ") and line.startswith("- "):
+                current = None
+            elif current and stripped.startswith("- "):
+                text = ENTITY_PATTERN.sub(r"\1", stripped[2:]).strip()
+                if text:
+                    examples[current].append(text)
+    return {intent: texts for intent, texts in examples.items() if texts}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse "action=poids,action=poids" """
+    mix = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+@dataclass
+class Scenario:
+    """Une requête webhook prête à envoyer"""
+    action: str
+    payload: Dict[str, Any]
+
+
+class PayloadFactory:
+    """Construit des payloads webhook Rasa à partir des exemples NLU"""
+
+    def __init__(self, examples: Dict[str, List[str]], mix: Dict[str, float],
+                 confidence_threshold: float, seed: int):
+        self.examples = examples
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.threshold = confidence_threshold
+        self.rng = random.Random(seed)
+        self.rag_intents = [i for i in RAG_INTENTS if i in examples] or list(examples)
+        self.fallback_intents = [i for i in FALLBACK_INTENTS if i in examples] or list(examples)
+
+    def _message(self, intents: List[str], low_confidence: bool) -> Tuple[str, str, float]:
+        intent = self.rng.choice(intents)
+        text = self.rng.choice(self.examples[intent])
+        if low_confidence:
+            confidence = round(self.rng.uniform(0.2, self.threshold - 0.01), 3)
+        else:
+            confidence = round(self.rng.uniform(self.threshold, 0.99), 3)
+        return intent, text, confidence
+
+    def next(self) -> Scenario:
+        action = self.rng.choices(self.actions, weights=self.weights)[0]
+        slots: Dict[str, Any] = {}
+
+        if action in ("action_router", "action_check_confidence"):
+            # ~1/2 des messages sous le seuil : déclenche la recherche spéculative
+            low = self.rng.random() < 0.5
+            intent, text, confidence = self._message(
+                self.rag_intents if low else list(self.examples), low
+            )
+        elif action == "action_rag_query":
+            intent, text, confidence = self._message(self.rag_intents, True)
+        elif action == "action_default_fallback":
+            intent, text, confidence = self._message(self.fallback_intents, True)
+            slots["fallback_count"] = self.rng.choice([0, 0, 1, 2])
+        else:
+            intent, text, confidence = self._message(list(self.examples), False)
+            slots.update({
+                "user_name": "Client Test",
+                "user_email": "client.test@example.com",
+                "user_phone": "0612345678",
+                "ticket_number": f"TKT-{self.rng.randrange(16 ** 6):06X}",
+                "user_feedback": self.rng.choice(["positive", "negative"]),
+            })
+
+        return Scenario(action, build_payload(action, text, intent, confidence, slots))
+
+
+def build_payload(
+    action: str,
+    text: str,
+    intent: str,
+    confidence: float,
+    slots: Optional[Dict[str, Any]] = None,
+    sender_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Payload /webhook tel qu'envoyé par Rasa Open Source"""
+    sender_id = sender_id or f"load-{uuid.uuid4().hex[:12]}"
+    now = time.time()
+    parse_data = {
+        "text": text,
+        "intent": {"name": intent, "confidence": confidence},
+        "intent_ranking": [{"name": intent, "confidence": confidence}],
+        "entities": [],
+        "message_id": uuid.uuid4().hex
+    }
+    events = [
+        {"event": "action", "timestamp": now - 2, "name": "action_session_start"},
+        {"event": "session_started", "timestamp": now - 2},
+        {"event": "action", "timestamp": now - 2, "name": "action_listen"},
+        {"event": "user", "timestamp": now - 1, "text": text,
+         "parse_data": parse_data, "input_channel": "rest"},
+    ]
+    return {
+        "next_action": action,
+        "sender_id": sender_id,
+        "tracker": {
+            "sender_id": sender_id,
+            "slots": {"nlu_confidence": None, "rag_response": None, **(slots or {})},
+            "latest_message": parse_data,
+            "events": events,
+            "paused": False,
+            "followup_action": None,
+            "active_loop": {},
+            "latest_action_name": "action_listen",
+            "latest_event_time": now - 1,
+            "latest_input_channel": "rest"
+        },
+        "domain": {},
+        "version": "3.6.2"
+    }
+
+
+@dataclass
+class StepStats:
+    """Mesures d'un palier de charge"""
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    sent: int = 0
+    dropped: int = 0  # Arrivées non envoyées (limite --max-in-flight atteinte)
+
+    def record(self, action: str, duration_ms: Optional[float], error: Optional[str]) -> None:
+        if error is None:
+            self.latencies.setdefault(action, []).append(duration_ms)
+        else:
+            by_kind = self.errors.setdefault(action, {})
+            by_kind[error] = by_kind.get(error, 0) + 1
+
+    def report(self, wall_s: float) -> Dict[str, Any]:
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        all_errors = sum(sum(kinds.values()) for kinds in self.errors.values()) + self.dropped
+        report = summarize(all_latencies, all_errors, wall_s)
+        report["dropped"] = self.dropped
+        report["actions"] = {}
+        for action in sorted(set(self.latencies) | set(self.errors)):
+            errors = self.errors.get(action, {})
+            action_report = summarize(self.latencies.get(action, []), sum(errors.values()), wall_s)
+            action_report["error_kinds"] = errors
+            report["actions"][action] = action_report
+        return report
+
+
+async def send(session: aiohttp.ClientSession, url: str, scenario: Scenario,
+               timeout_s: float, stats: StepStats) -> None:
+    """Envoie une requête et enregistre latence ou type d'erreur"""
+    stats.sent += 1
+    start_time = time.perf_counter()
+    error = None
+    try:
+        async with session.post(url, json=scenario.payload,
+                                timeout=aiohttp.ClientTimeout(total=timeout_s)) as response:
+            await response.read()
+            if response.status >= 400:
+                error = f"http_{response.status}"
+    except asyncio.TimeoutError:
+        error = "timeout"
+    except aiohttp.ClientError as e:
+        error = type(e).__name__
+    duration_ms = (time.perf_counter() - start_time) * 1000
+    stats.record(scenario.action, duration_ms, error)
+
+
+async def run_closed_step(session, url, factory, users: int, duration_s: float,
+                          think_ms: float, timeout_s: float) -> StepStats:
+    """N utilisateurs virtuels : chaque réponse déclenche la requête suivante"""
+    stats = StepStats()
+    stop_at = time.perf_counter() + duration_s
+
+    async def user():
+        while time.perf_counter() < stop_at:
+            await send(session, url, factory.next(), timeout_s, stats)
+            if think_ms:
+                await asyncio.sleep(think_ms / 1000)
+
+    await asyncio.gather(*(user() for _ in range(users)))
+    return stats
+
+
+async def run_open_step(session, url, factory, rate: float, duration_s: float,
+                        timeout_s: float, max_in_flight: int, poisson: bool,
+                        rng: random.Random) -> StepStats:
+    """Arrivées à débit cible, sans attendre les réponses précédentes"""
+    stats = StepStats()
+    in_flight: set = set()
+    start_time = time.perf_counter()
+    next_arrival = start_time
+
+    while next_arrival < start_time + duration_s:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            stats.dropped += 1
+        else:
+            task = asyncio.ensure_future(send(session, url, factory.next(), timeout_s, stats))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_arrival += rng.expovariate(rate) if poisson else 1 / rate
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return stats
+
+
+def violates_slo(report: Dict[str, Any], args: argparse.Namespace, target: float) -> Optional[str]:
+    """Raison de saturation du palier (None si le SLO est tenu)"""
+    if report["latency_ms"]["p95"] > args.slo_p95_ms:
+        return f"p95 {report['latency_ms']['p95']:.0f} ms > {args.slo_p95_ms:.0f} ms"
+    if report["error_rate"] > args.slo_error_rate:
+        return f"error rate {report['error_rate']:.2%} > {args.slo_error_rate:.2%}"
+    if args.mode == "open" and report["throughput_rps"] < 0.9 * target:
+        return f"throughput {report['throughput_rps']:.1f} rps < 90% of {target:g} rps"
+    return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    examples = load_nlu_examples(Path(args.nlu))
+    factory = PayloadFactory(examples, parse_mix(args.mix) if args.mix else DEFAULT_MIX,
+                             args.confidence_threshold, args.seed)
+    rng = random.Random(args.seed)
+    url = args.url.rstrip("/") + "/webhook"
+    steps = [float(step) for step in args.steps.split(",") if step.strip()]
+
+    connector = aiohttp.TCPConnector(limit=args.max_in_flight)
+    results = []
+    saturation = None
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if args.warmup:
+            await run_closed_step(session, url, factory, 1, args.warmup, 0, args.timeout)
+
+        for target in steps:
+            start_time = time.perf_counter()
+            if args.mode == "closed":
+                stats = await run_closed_step(session, url, factory, int(target),
+                                              args.step_duration, args.think_ms, args.timeout)
+            else:
+                stats = await run_open_step(session, url, factory, target, args.step_duration,
+                                            args.timeout, args.max_in_flight, args.poisson, rng)
+            report = stats.report(time.perf_counter() - start_time)
+            reason = violates_slo(report, args, target)
+            results.append({"mode": args.mode, "target": target, "saturated": reason, **report})
+
+            latency = report["latency_ms"]
+            unit = "users" if args.mode == "closed" else "rps"
+            print(
+                f"  {target:>6g} {unit:<5} n={report['requests']:<6} "
+                f"p50={latency['p50']:>8.1f}  p95={latency['p95']:>8.1f}  p99={latency['p99']:>8.1f} ms  "
+                f"{report['throughput_rps']:>7.1f} rps  errors={report['error_rate']:.2%}"
+                + (f"  ⚠️  {reason}" if reason else "")
+            )
+
+            if reason and saturation is None:
+                saturation = {"target": target, "reason": reason}
+                if args.stop_on_saturation:
+                    break
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": git_revision(),
+            "url": url,
+            "mix": factory.actions,
+            "args": vars(args)
+        },
+        "saturation": saturation,
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the action server webhook")
+    parser.add_argument("--url", default="http://localhost:5055", help="Action server base URL")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed",
+                        help="closed: concurrent users, open: target arrival rate")
+    parser.add_argument("--steps", default="1,5,10,20",
+                        help="Comma-separated users (closed) or requests/s (open) per step")
+    parser.add_argument("--step-duration", type=float, default=30, help="Seconds per step")
+    parser.add_argument("--warmup", type=float, default=5, help="Warm-up seconds before the first step")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between requests of a user (closed)")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of constant (open)")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Client-side cap on concurrent requests (excess arrivals are dropped)")
+    parser.add_argument("--timeout", type=float, default=30, help="Request timeout (seconds)")
+    parser.add_argument("--mix", help="Action weights, e.g. action_router=30,action_rag_query=20")
+    parser.add_argument("--nlu", default=str(NLU_PATH), help="Rasa NLU file for message phrasing")
+    parser.add_argument("--confidence-threshold", type=float, default=0.75,
+                        help="RAG_CONFIDENCE_THRESHOLD of the server (low/high confidence messages)")
+    parser.add_argument("--slo-p95-ms", type=float, default=5000, help="p95 latency SLO")
+    parser.add_argument("--slo-error-rate", type=float, default=0.01, help="Error rate SLO")
+    parser.add_argument("--stop-on-saturation", action="store_true", help="Stop at the first saturated step")
+    parser.add_argument("--standin-port", type=int,
+                        help="Also serve the OpenAI stand-in on this port for the action server")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.standin_port:
+        server = start_standin(port=args.standin_port, standin_config=standin_config_from_args(args))
+        print(f"🧪 OpenAI stand-in on {server.base_url} (set OPENAI_BASE_URL on the action server)")
+
+    unit = "users" if args.mode == "closed" else "rps"
+    print(f"🚀 Load test {args.url}/webhook ({args.mode} loop, steps: {args.steps} {unit})")
+    output = asyncio.run(run(args))
+
+    if output["saturation"]:
+        print(f"\n📉 Saturation at {output['saturation']['target']:g} {unit}: {output['saturation']['reason']}")
+    else:
+        print("\n✅ No saturation within the tested steps")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2, ensure_ascii=False, default=str)
+        print(f"Results written to {args.output}")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# ============================================================================
+# SCRIPTS - Serveur local compatible OpenAI (benchmarks hors ligne)
+# ============================================================================
+
+"""
+Remplaçant local des endpoints OpenAI /v1/embeddings et /v1/chat/completions
+Réponses déterministes, latence et taux d'erreur configurables :
+permet de mesurer le pipeline RAG sans crédits API ni réseau.
+
+Usage:
+    python openai_standin.py --port 8089 --embed-latency-ms 40 --chat-latency-ms 900
+    OPENAI_BASE_URL=http://localhost:8089/v1 OPENAI_API_KEY=standin python ...
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from array import array
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Réponse déclenchant l'escalade vers le modèle puissant (core.model_router)
+NOT_FOUND_ANSWER = "Je n'ai pas trouvé cette information dans la documentation."
+
+
+@dataclass
+class StandinConfig:
+    """Comportement du serveur simulé"""
+    dimension: int = 1536
+    embed_latency_ms: float = 40.0  # Latence médiane /embeddings
+    chat_latency_ms: float = 800.0  # Latence médiane /chat/completions
+    latency_sigma: float = 0.4  # Dispersion log-normale (0 = latence fixe)
+    error_rate: float = 0.0  # Proportion de requêtes en erreur
+    error_status: int = 500  # Code HTTP des erreurs injectées
+    not_found_rate: float = 0.0  # Proportion de réponses "Je n'ai pas trouvé"
+    seed: int = 42
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def embed_text(text: str, dimension: int) -> List[float]:
+    """
+    Vecteur déterministe par hashing des mots (feature hashing)
+
+    Deux textes partageant des mots ont des vecteurs proches :
+    la recherche vectorielle reste significative sur un corpus synthétique.
+    """
+    vector = [0.0] * dimension
+    for token in re.findall(r"\w+", text.lower()):
+        h = _stable_hash(token)
+        vector[h % dimension] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        vector[_stable_hash(text) % dimension] = 1.0
+        return vector
+    return [v / norm for v in vector]
+
+
+def _encode_base64(vector: List[float]) -> str:
+    """Encodage base64 float32 little-endian (format demandé par le client v1)"""
+    packed = array("f", vector)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _count_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class StandinState:
+    """État partagé entre les threads du serveur (RNG, compteurs)"""
+
+    def __init__(self, standin_config: StandinConfig):
+        self.config = standin_config
+        self._rng = random.Random(standin_config.seed)
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+
+    def draw(self, median_ms: float) -> Tuple[float, bool]:
+        """Tire (latence en secondes, erreur injectée)"""
+        with self._lock:
+            gauss = self._rng.gauss(0, 1)
+            failed = self._rng.random() < self.config.error_rate
+        latency_ms = median_ms * math.exp(self.config.latency_sigma * gauss)
+        return latency_ms / 1000, failed
+
+    def count(self, endpoint: str) -> None:
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Handler HTTP des endpoints OpenAI simulés"""
+
+    server_version = "OpenAIStandin/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StandinState:
+        return self.server.state
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Silencieux : le serveur tourne pendant les mesures
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json(status, {
+            "error": {"message": message, "type": "standin_error", "code": str(status)}
+        })
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/health"):
+            self._send_json(200, {"status": "ok", "requests": dict(self.state.requests)})
+            return
+        self._send_error(404, f"Unknown path {self.path}")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_error(400, "Invalid JSON body")
+            return
+
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/embeddings"):
+            endpoint, median_ms, handler = "embeddings", self.state.config.embed_latency_ms, self._embeddings
+        elif path.endswith("/chat/completions"):
+            endpoint, median_ms, handler = "chat", self.state.config.chat_latency_ms, self._chat
+        else:
+            self._send_error(404, f"Unknown path {self.path}")
+            return
+
+        self.state.count(endpoint)
+        latency_s, failed = self.state.draw(median_ms)
+        time.sleep(latency_s)
+
+        if failed:
+            self._send_error(self.state.config.error_status, "Injected error")
+            return
+        try:
+            self._send_json(200, handler(payload))
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_error(400, f"Invalid request: {e}")
+
+    def _embeddings(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = payload["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        as_base64 = payload.get("encoding_format") == "base64"
+        dimension = int(payload.get("dimensions") or self.state.config.dimension)
+
+        data = []
+        for index, text in enumerate(inputs):
+            vector = embed_text(str(text), dimension)
+            data.append({
+                "object": "embedding",
+                "index": index,
+                "embedding": _encode_base64(vector) if as_base64 else vector
+            })
+
+        tokens = sum(_count_tokens(str(text)) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "standin-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    def _chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        messages = payload["messages"]
+        user_messages = [m.get("content") or "" for m in messages if m.get("role") == "user"]
+        prompt = user_messages[-1] if user_messages else ""
+        digest = _stable_hash(json.dumps(messages, sort_keys=True))
+
+        # Réponse déterministe : mêmes messages → même texte
+        if (digest % 10000) / 10000 < self.state.config.not_found_rate:
+            content = NOT_FOUND_ANSWER
+        else:
+            words = prompt.split()
+            max_words = int(payload.get("max_tokens") or 256)
+            start = digest % max(1, len(words) - 40) if len(words) > 40 else 0
+            content = "D'après la documentation : " + " ".join(words[start:start + min(40, max_words)])
+
+        prompt_tokens = sum(_count_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = _count_tokens(content)
+        return {
+            "id": f"chatcmpl-standin-{digest:x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "standin-chat"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Serveur HTTP multi-thread portant l'état simulé"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], standin_config: StandinConfig):
+        super().__init__(address, StandinHandler)
+        self.state = StandinState(standin_config)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_standin(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    standin_config: Optional[StandinConfig] = None
+) -> StandinServer:
+    """
+    Démarre le serveur dans un thread d'arrière-plan
+
+    Args:
+        host: Adresse d'écoute
+        port: Port (0 = port libre choisi par le système)
+        standin_config: Comportement simulé
+
+    Returns:
+        StandinServer: Serveur démarré (server.base_url, server.shutdown())
+    """
+    server = StandinServer((host, port), standin_config or StandinConfig())
+    thread = threading.Thread(target=server.serve_forever, name="openai-standin", daemon=True)
+    thread.start()
+    return server
+
+
+def add_standin_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options du serveur simulé (partagées avec les scripts de benchmark)"""
+    defaults = StandinConfig()
+    parser.add_argument("--embed-latency-ms", type=float, default=defaults.embed_latency_ms,
+                        help="Median latency of /embeddings")
+    parser.add_argument("--chat-latency-ms", type=float, default=defaults.chat_latency_ms,
+                        help="Median latency of /chat/completions")
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma,
+                        help="Log-normal latency spread (0 = constant)")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=defaults.error_status,
+                        help="HTTP status of injected errors")
+    parser.add_argument("--not-found-rate", type=float, default=defaults.not_found_rate,
+                        help="Fraction of chat answers saying the answer was not found")
+    parser.add_argument("--dimension", type=int, default=defaults.dimension,
+                        help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed")
+
+
+def standin_config_from_args(args: argparse.Namespace) -> StandinConfig:
+    return StandinConfig(
+        dimension=args.dimension,
+        embed_latency_ms=args.embed_latency_ms,
+        chat_latency_ms=args.chat_latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        not_found_rate=args.not_found_rate,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address")
+    parser.add_argument("--port", type=int, default=8089, help="Listen port")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    server = StandinServer((args.host, args.port), standin_config_from_args(args))
+    print(f"🧪 OpenAI stand-in listening on {server.base_url}")
+    print(f"   export OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=standin")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# ============================================================================
+# SCRIPTS - Profil de démarrage du serveur d'actions
+# ============================================================================
+
+"""
+Temps d'import du package d'actions et cold start du serveur
+
+- import : `python -X importtime -c "import actions"` dans un processus
+  neuf (meilleur de --repeat essais), modules les plus coûteux et
+  dépendances lourdes chargées au démarrage. Code de sortie 1 si le temps
+  dépasse --max-ms ou si une dépendance de --forbid est importée.
+- cold start (--cold-start) : lance server.py et mesure le délai jusqu'à
+  la première réponse de /webhook (action_session_start).
+
+Usage:
+    python profile_startup.py --max-ms 300
+    python profile_startup.py --cold-start --output startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import subprocess
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmark_rag import git_revision
+
+
+ACTIONS_DIR = Path(__file__).parent.parent / "actions"
+
+# Dépendances qui ne doivent être importées qu'à la première utilisation
+HEAVY_MODULES = ("openai", "chromadb", "tenacity", "numpy", "pymongo", "tiktoken", "pypdf", "docx")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """Lignes -X importtime : (module, self µs, cumulé µs, profondeur)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile_import(module: str) -> Dict[str, Any]:
+    """Importe `module` dans un processus neuf avec -X importtime"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ACTIONS_DIR,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = parse_importtime(completed.stderr)
+    # Les modules de profondeur 0 couvrent tout le temps d'import (cumulé)
+    total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    return {"total_ms": total_us / 1000, "rows": rows}
+
+
+def heavy_imports(rows: List[Tuple[str, int, int, int]], forbidden: List[str]) -> Dict[str, float]:
+    """Dépendances lourdes importées et leur temps cumulé (ms)"""
+    found = {}
+    for name, _, cumulative, _ in rows:
+        if name in forbidden:
+            found[name] = max(found.get(name, 0.0), cumulative / 1000)
+    return found
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def session_start_call(sender_id: str) -> bytes:
+    return json.dumps({
+        "next_action": "action_session_start",
+        "sender_id": sender_id,
+        "tracker": {
+            "sender_id": sender_id,
+            "slots": {},
+            "latest_message": {},
+            "latest_event_time": None,
+            "followup_action": None,
+            "paused": False,
+            "events": [],
+            "latest_input_channel": None,
+            "active_loop": {},
+            "latest_action_name": None,
+        },
+        "domain": {},
+        "version": "3.6.0",
+    }).encode()
+
+
+def measure_cold_start(timeout: float) -> Dict[str, Any]:
+    """Lance server.py et attend la première réponse 200 de /webhook"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/webhook"
+    body = session_start_call("profile-startup")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "server.py", "--actions", "actions", "-p", str(port)],
+        cwd=ACTIONS_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env={**os.environ, "SANIC_HOST": "127.0.0.1"}
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"server.py exited:\n{process.stderr.read().decode()[-2000:]}")
+            request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=1) as response:
+                    if response.status == 200:
+                        return {"first_webhook_ms": round((time.perf_counter() - started) * 1000, 1)}
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                pass
+            time.sleep(0.02)
+        raise RuntimeError(f"no /webhook answer within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Action server import time and cold start")
+    parser.add_argument("--module", default="actions", help="Module imported by the profile")
+    parser.add_argument("--repeat", type=int, default=5, help="Import runs (best one is kept)")
+    parser.add_argument("--top", type=int, default=15, help="Modules listed by self time")
+    parser.add_argument("--max-ms", type=float, help="Fail above this import time")
+    parser.add_argument("--forbid", default=",".join(HEAVY_MODULES),
+                        help="Comma-separated modules that must not be imported at startup")
+    parser.add_argument("--cold-start", action="store_true", help="Also time server.py to first /webhook")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Cold start timeout (s)")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    forbidden = [name for name in args.forbid.split(",") if name]
+    runs = [profile_import(args.module) for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda run: run["total_ms"])
+    heavy = heavy_imports(best["rows"], forbidden)
+
+    print(f"import {args.module}: {best['total_ms']:.1f} ms "
+          f"(best of {len(runs)}, worst {max(run['total_ms'] for run in runs):.1f} ms)")
+    print(f"{'module':<48} {'self ms':>9} {'cumul ms':>9}")
+    for name, self_us, cumulative_us, _ in sorted(best["rows"], key=lambda row: -row[1])[:args.top]:
+        print(f"{name:<48} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+    for name, cumulative_ms in heavy.items():
+        print(f"Heavy dependency imported at startup: {name} ({cumulative_ms:.1f} ms)")
+
+    results: Dict[str, Any] = {
+        "import_ms": round(best["total_ms"], 1),
+        "heavy_imports": heavy,
+    }
+    if args.cold_start:
+        results.update(measure_cold_start(args.timeout))
+        print(f"cold start to first /webhook: {results['first_webhook_ms']} ms")
+
+    if args.output:
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "module": args.module,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.output}")
+
+    failed = bool(heavy)
+    if args.max_ms is not None and best["total_ms"] > args.max_ms:
+        print(f"Import time above target: {best['total_ms']:.1f} ms > {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
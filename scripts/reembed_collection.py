@@ -0,0 +1,106 @@
+# ============================================================================
+# SCRIPTS - Ré-embedding de la collection (générations)
+# ============================================================================
+
+"""
+Ré-vectorise la collection ChromaDB avec un autre modèle d'embedding
+
+Les chunks de la génération active sont copiés dans une nouvelle génération
+à débit limité, puis la lecture bascule dessus. L'ancienne génération est
+gardée pour un rollback.
+
+À lancer serveur d'actions arrêté : serveur démarré, utiliser
+POST /index/generations (même job, sans interruption du service).
+
+Usage:
+    python reembed_collection.py --model text-embedding-3-small --rate 200
+    python reembed_collection.py --list
+    python reembed_collection.py --activate 0
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Ajouter le chemin du projet
+sys.path.insert(0, str(Path(__file__).parent.parent / "actions"))
+
+from core.generations import STATUS_RETIRED, ReembeddingJob
+from core.vector_store import VectorStore
+from utils.config import config
+from utils.logger import logger
+
+
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def print_generations(vector_store: VectorStore) -> None:
+    active = vector_store.generation.id
+    print(f"{'id':>4} {'collection':<32} {'model':<28} {'status':<10} {'count':>8}")
+    for generation in vector_store.generations.all():
+        marker = "*" if generation.id == active else " "
+        print(
+            f"{generation.id:>3}{marker} {generation.collection:<32} "
+            f"{generation.embedding_model:<28} {generation.status:<10} {generation.count:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed the ChromaDB collection into a new generation")
+    parser.add_argument("--model", help="Embedding model (default: OPENAI_EMBEDDING_MODEL)")
+    parser.add_argument("--rate", type=float, help="Chunks per second (default: REEMBED_RATE, 0 = unlimited)")
+    parser.add_argument("--batch-size", type=int, help="Chunks per embedding call (default: REEMBED_BATCH_SIZE)")
+    parser.add_argument("--list", action="store_true", help="List generations and exit")
+    parser.add_argument("--activate", type=int, metavar="ID", help="Switch to a kept generation (rollback)")
+    parser.add_argument("--drop", type=int, metavar="ID", help="Remove an inactive generation")
+    args = parser.parse_args()
+
+    vector_store = VectorStore()
+
+    if args.list:
+        print_generations(vector_store)
+        return
+    if args.activate is not None:
+        generation = vector_store.generations.get(args.activate)
+        if generation is None or generation.status != STATUS_RETIRED:
+            parser.error(f"generation {args.activate} is not a kept generation")
+        vector_store.activate_generation(args.activate)
+        print_generations(vector_store)
+        return
+    if args.drop is not None:
+        vector_store.drop_generation(args.drop)
+        vector_store.persist()
+        print_generations(vector_store)
+        return
+
+    model = args.model or config.openai.embedding_model
+    if model == vector_store.generation.embedding_model:
+        logger.info(f"Active generation already uses {model}: re-embedding anyway")
+
+    job = ReembeddingJob(
+        vector_store, embedding_model=model,
+        rate_per_second=args.rate, batch_size=args.batch_size
+    ).start()
+    try:
+        while job.running:
+            job.join(PROGRESS_INTERVAL_SECONDS)
+            if job.running:
+                progress = job.to_dict()
+                logger.info(
+                    f"Re-embedding: {progress['copied']}/{progress['total']}",
+                    status=progress["status"],
+                    replayed=progress["replayed"]
+                )
+    except KeyboardInterrupt:
+        logger.warning("Cancelling re-embedding...")
+        job.cancel()
+        job.join()
+
+    print_generations(vector_store)
+    if job.status != "done":
+        logger.error(f"Re-embedding {job.status}: {job.error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()